@@ -0,0 +1,128 @@
+import logging
+import time
+from typing import Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet, Min
+from django.db.models.functions import Abs
+from common.functions import compute_fingerprint
+from .models import Experiment
+from .models_choices import ExperimentState
+from .partitions_service import create_combinations_partition
+
+# Maximum number of previous experiments checked to find one whose result contains the new experiment's result
+MAX_REUSE_CANDIDATES = 5
+
+
+def get_experiment_fingerprint(experiment: Experiment) -> str:
+    """
+    Computes the fingerprint of a correlation analysis: the identity (and version) of its mRNA and GEM datasets, the
+    parameters and the settings that change the evaluated combinations and their (adjusted) p-values. The correlation
+    threshold and the result rows limit are not included as they only filter the stored combinations: an experiment
+    with a higher threshold is a subset of another one with the same fingerprint. The clinical source is not
+    considered as it isn't used in the analysis.
+    @param experiment: Experiment to compute.
+    @return: Fingerprint of the experiment.
+    """
+    return compute_fingerprint({
+        'mrna_source': experiment.mRNA_source.get_identity(),
+        'gem_source': experiment.gem_source.get_identity(),
+        'type': experiment.type,
+        'correlation_method': experiment.correlation_method,
+        'p_values_adjustment_method': experiment.p_values_adjustment_method,
+        'minimum_std_gene': experiment.minimum_std_gene,
+        'minimum_std_gem': experiment.minimum_std_gem,
+        'correlate_with_all_genes': experiment.correlate_with_all_genes,
+        'prescreen_min_combinations': settings.CORRELATION_PRESCREEN_MIN_COMBINATIONS,
+        'prescreen_residual_factor': settings.CORRELATION_PRESCREEN_RESIDUAL_FACTOR
+    })
+
+
+def __contains_result(candidate: Experiment, threshold: float) -> bool:
+    """
+    Checks if the stored combinations of a completed experiment include all the combinations over a (greater or equal)
+    threshold. If the result was truncated, only the combinations with an absolute correlation greater than the
+    lowest stored one are guaranteed to be stored.
+    @param candidate: Completed experiment with a threshold lower than or equal to the new one.
+    @param threshold: Correlation threshold of the new experiment.
+    @return: True if the new experiment's result can be obtained filtering the candidate's one.
+    """
+    if candidate.result_total_row_count is None or candidate.result_final_row_count is None:
+        return False
+
+    if candidate.result_final_row_count >= candidate.result_total_row_count:
+        return True
+
+    min_stored_correlation = candidate.combinations.aggregate(value=Min(Abs('correlation')))['value']
+    return min_stored_correlation is not None and threshold > min_stored_correlation
+
+
+def get_reusable_experiment(experiment: Experiment, accessible_experiments: QuerySet) -> Optional[Experiment]:
+    """
+    Gets a completed experiment with the same fingerprint and a lower or equal correlation threshold, among the ones
+    the user can access, whose result contains the new experiment's one. The ones with the highest threshold (smallest
+    result) are preferred.
+    @param experiment: New experiment (with its fingerprint computed).
+    @param accessible_experiments: Experiments accessible to the user who submitted the new experiment.
+    @return: Experiment whose results can be reused or None if there isn't any (or reusing is disabled in settings).
+    """
+    if not settings.REUSE_IDENTICAL_EXPERIMENTS_RESULTS or not experiment.fingerprint:
+        return None
+
+    candidates = accessible_experiments.filter(
+        fingerprint=experiment.fingerprint,
+        state=ExperimentState.COMPLETED,
+        minimum_coefficient_threshold__lte=experiment.minimum_coefficient_threshold
+    ).exclude(pk=experiment.pk).order_by('-minimum_coefficient_threshold', '-submit_date')
+
+    for candidate in candidates[:MAX_REUSE_CANDIDATES]:
+        if __contains_result(candidate, experiment.minimum_coefficient_threshold):
+            return candidate
+    return None
+
+
+def clone_experiment_results(original: Experiment, experiment: Experiment):
+    """
+    Copies the resulting combinations of an experiment over the new experiment's threshold (truncated by
+    settings.RESULT_DATAFRAME_LIMIT_ROWS, keeping the highest absolute correlations as the pipeline does) inside the DB
+    and marks the new experiment as completed. As the p-values are adjusted considering all the evaluated combinations,
+    they are the same in both experiments. The statistical properties of the combinations are not copied, they are
+    computed on demand.
+    @param original: Completed experiment to copy its results.
+    @param experiment: New experiment with the same fingerprint and a greater or equal threshold.
+    """
+    start = time.time()
+    table_name = experiment.get_combination_class()._meta.db_table
+    threshold = experiment.minimum_coefficient_threshold
+
+    # The partition is attached outside the transaction so the combinations table is not locked while copying
+    create_combinations_partition(table_name, experiment.pk)
+
+    limit_clause = f'ORDER BY ABS(correlation) DESC LIMIT {int(settings.RESULT_DATAFRAME_LIMIT_ROWS)}' \
+        if settings.RESULT_DATAFRAME_LIMIT_ROWS else ''
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table_name} (gene,gem,correlation,p_value,adjusted_p_value,experiment_id) '
+                f'SELECT gene,gem,correlation,p_value,adjusted_p_value,%s FROM {table_name} '
+                f'WHERE experiment_id = %s AND ABS(correlation) >= %s {limit_clause}',
+                [experiment.pk, original.pk, threshold]
+            )
+            final_row_count = cursor.rowcount
+
+            if threshold == original.minimum_coefficient_threshold:
+                total_row_count = original.result_total_row_count
+            else:
+                cursor.execute(f'SELECT COUNT(*) FROM {table_name} WHERE experiment_id = %s AND ABS(correlation) >= %s',
+                               [original.pk, threshold])
+                total_row_count = cursor.fetchone()[0]
+
+        experiment.evaluated_row_count = original.evaluated_row_count
+        experiment.result_total_row_count = total_row_count
+        experiment.result_final_row_count = final_row_count
+        experiment.execution_time = time.time() - start
+        experiment.state = ExperimentState.COMPLETED
+        experiment.save(update_fields=['evaluated_row_count', 'result_total_row_count', 'result_final_row_count',
+                                       'execution_time', 'state'])
+
+    logging.warning(f'Experiment {experiment.pk} results filtered from experiment {original.pk}')
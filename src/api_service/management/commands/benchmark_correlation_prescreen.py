@@ -0,0 +1,93 @@
+import time
+from typing import Tuple
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from api_service.models_choices import CorrelationMethod, PValuesAdjustmentMethod
+from api_service.numpy_correlation_service import correlate_in_memory, count_prescreen_discarded_pairs
+
+
+class Command(BaseCommand):
+    help = ('Compares the all-vs-all correlation pre-screen (see CORRELATION_PRESCREEN_MIN_COMBINATIONS) against the '
+            'exhaustive NumPy engine, reporting the fraction of discarded pairs and the recall of the combinations '
+            'over the threshold. Uses two TSV datasets (molecules as rows, samples as columns) or synthetic data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--genes-file', help='TSV file with the genes dataset')
+        parser.add_argument('--gems-file', help='TSV file with the GEMs dataset')
+        parser.add_argument('--genes', type=int, default=1000, help='Number of synthetic genes')
+        parser.add_argument('--gems', type=int, default=10000, help='Number of synthetic GEMs')
+        parser.add_argument('--samples', type=int, default=200, help='Number of synthetic samples')
+        parser.add_argument('--latent-factors', type=int, default=10,
+                            help='Number of latent factors shared by the synthetic molecules')
+        parser.add_argument('--method', choices=['pearson', 'spearman'], default='pearson')
+        parser.add_argument('--threshold', type=float, default=0.5, help='Correlation threshold')
+        parser.add_argument('--rank', type=int, default=32, help='Number of dimensions of the sketch')
+        parser.add_argument('--residual-factors', type=float, nargs='+', default=[1.0, 0.5, 0.3],
+                            help='Residual factors to evaluate')
+
+    @staticmethod
+    def __get_synthetic_datasets(options) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Generates molecules driven by some latent factors (as in expression data) plus independent noise."""
+        rng = np.random.default_rng(0)
+        samples = [f'sample_{i}' for i in range(options['samples'])]
+        factors = rng.normal(size=(options['latent_factors'], options['samples']))
+
+        def generate(n_rows: int, prefix: str) -> pd.DataFrame:
+            loadings = rng.normal(size=(n_rows, options['latent_factors'])) * rng.uniform(0, 1, size=(n_rows, 1))
+            values = loadings @ factors + rng.normal(size=(n_rows, options['samples']))
+            return pd.DataFrame(values, index=[f'{prefix}{i}' for i in range(n_rows)], columns=samples)
+
+        return generate(options['genes'], 'gene_'), generate(options['gems'], 'gem_')
+
+    @staticmethod
+    def __read_datasets(options) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Reads both datasets keeping the samples in common and the rows without NaNs."""
+        genes_df = pd.read_csv(options['genes_file'], sep='\t', index_col=0)
+        gems_df = pd.read_csv(options['gems_file'], sep='\t', index_col=0)
+        common_samples = np.intersect1d(genes_df.columns, gems_df.columns)
+        return genes_df[common_samples].dropna(), gems_df[common_samples].dropna()
+
+    def handle(self, *args, **options):
+        if options['genes_file'] and options['gems_file']:
+            genes_df, gems_df = self.__read_datasets(options)
+        else:
+            genes_df, gems_df = self.__get_synthetic_datasets(options)
+
+        correlation_method = CorrelationMethod.PEARSON if options['method'] == 'pearson' \
+            else CorrelationMethod.SPEARMAN
+        params = {
+            'correlation_method': correlation_method,
+            'correlation_threshold': options['threshold'],
+            'adjustment_method': PValuesAdjustmentMethod.BENJAMINI_HOCHBERG,
+            'is_all_vs_all': True,
+            'gem_contains_cpg': False,
+            'keep_top_n': None,
+            'use_float32': False,
+            'is_aborted': lambda: False
+        }
+
+        start = time.time()
+        exhaustive, _, n_evaluated = correlate_in_memory(genes_df, gems_df, **params)
+        exhaustive_time = time.time() - start
+        expected = {(res.gene, res.gem): res.adjusted_p_value for res in exhaustive}
+        self.stdout.write(f'{genes_df.shape[0]} genes x {gems_df.shape[0]} GEMs ({genes_df.shape[1]} samples): '
+                          f'{len(expected)} of {n_evaluated} combinations over the threshold. Exhaustive time: '
+                          f'{exhaustive_time:.2f} seconds')
+
+        for residual_factor in options['residual_factors']:
+            start = time.time()
+            result, _, _ = correlate_in_memory(genes_df, gems_df, prescreen_rank=options['rank'],
+                                               prescreen_residual_factor=residual_factor, **params)
+            prescreen_time = time.time() - start
+            n_discarded, _ = count_prescreen_discarded_pairs(genes_df, gems_df, correlation_method,
+                                                             options['threshold'], options['rank'], residual_factor)
+
+            found = {(res.gene, res.gem): res.adjusted_p_value for res in result}
+            n_found = len(found.keys() & expected.keys())
+            recall = n_found / len(expected) if expected else 1.0
+            max_difference = max((abs(found[key] - expected[key]) for key in found.keys() & expected.keys()),
+                                 default=0.0)
+            self.stdout.write(f'Residual factor {residual_factor}: {n_discarded / n_evaluated:.2%} of pairs discarded, '
+                              f'recall {recall:.5f}, max adjusted p-value difference {max_difference:.2e}, time '
+                              f'{prescreen_time:.2f} seconds')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_service', '0061_alter_experiment_shared_users'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
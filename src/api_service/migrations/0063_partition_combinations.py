@@ -0,0 +1,159 @@
+from typing import List, Iterator
+from django.db import migrations, transaction
+
+# Combinations tables and the type of the experiments whose results are stored in them
+COMBINATIONS_TABLES = {
+    'gene_mirna_combination': 1,  # ExperimentType.MIRNA
+    'gene_cna_combination': 2,  # ExperimentType.CNA
+    'gene_methylation_combination': 3,  # ExperimentType.METHYLATION
+}
+
+SOURCE_STATS_TABLE = 'statistical_properties_sourcedatastatisticalproperties'
+
+# Number of partitions created (and filled) in every transaction. Every partition (and its indexes) is locked until the
+# end of the transaction, so creating all of them at once exceeds the max_locks_per_transaction of Postgres when there
+# are thousands of experiments
+PARTITIONS_BATCH_SIZE = 100
+
+
+def __rename_table(cursor, table: str, old_table: str):
+    """
+    Renames a table with its indexes and id sequence, so the new table can be created with the same names while the
+    old one is kept to move its rows.
+    """
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+    cursor.execute(f'ALTER SEQUENCE IF EXISTS {table}_id_seq RENAME TO {old_table}_id_seq')
+    cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = %s ORDER BY indexname', [old_table])
+    for i, (index_name,) in enumerate(cursor.fetchall()):
+        cursor.execute(f'ALTER INDEX {index_name} RENAME TO {old_table}_idx_{i}')
+
+
+def __add_id_sequence(cursor, table: str):
+    """Adds the sequence of the id column as the old one is dropped with the previous table."""
+    cursor.execute(f'CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+
+
+def __reset_id_sequence(cursor, table: str, data_table: str):
+    """Sets the next value of the id sequence of a table after the greatest id of the table with the data."""
+    cursor.execute(f"SELECT setval('{table}_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM {data_table}")
+
+
+def __add_foreign_keys(cursor, table: str):
+    """Adds the foreign keys of a combinations table (the same that Django generates)."""
+    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_experiment_id_fk FOREIGN KEY (experiment_id) '
+                   f'REFERENCES api_service_experiment (id) DEFERRABLE INITIALLY DEFERRED')
+    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_source_statistical_data_id_fk '
+                   f'FOREIGN KEY (source_statistical_data_id) REFERENCES {SOURCE_STATS_TABLE} (id) '
+                   f'DEFERRABLE INITIALLY DEFERRED')
+    cursor.execute(f'CREATE INDEX {table}_gene_idx ON {table} (gene)')
+
+
+def __table_exists(cursor, table: str) -> bool:
+    """Checks if a table exists (e.g. the old table of a previous run of the migration which was interrupted)."""
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [table])
+    return cursor.fetchone()[0]
+
+
+def __is_partitioned(cursor, table: str) -> bool:
+    """Checks if a table is partitioned (e.g. it was converted by a previous run of the migration)."""
+    cursor.execute('SELECT EXISTS(SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))', [table])
+    return cursor.fetchone()[0]
+
+
+def __in_batches(items: List, batch_size: int = PARTITIONS_BATCH_SIZE) -> Iterator[List]:
+    """Splits a list in batches."""
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def partition_combinations(apps, schema_editor):
+    """
+    Converts every combinations table in a table partitioned by LIST (experiment_id) with one partition by experiment.
+    The PK and the unique constraint of the source_statistical_data OneToOneField must include the partition key. The
+    combinations of every batch of experiments are moved to their partitions in a separate transaction, so if the
+    migration is interrupted, running it again moves the remaining ones.
+    """
+    alias = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        for table, experiment_type in COMBINATIONS_TABLES.items():
+            old_table = f'{table}_unpartitioned'
+            if not __table_exists(cursor, old_table):
+                if __is_partitioned(cursor, table):
+                    continue
+
+                with transaction.atomic(using=alias):
+                    __rename_table(cursor, table, old_table)
+                    cursor.execute(f'CREATE TABLE {table} (LIKE {old_table}) PARTITION BY LIST (experiment_id)')
+
+                    # Constraints are added to the (empty) partitioned table, so every partition is created with them
+                    __add_id_sequence(cursor, table)
+                    __reset_id_sequence(cursor, table, old_table)
+                    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, experiment_id)')
+                    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_source_statistical_data_id_uniq '
+                                   f'UNIQUE (source_statistical_data_id, experiment_id)')
+                    __add_foreign_keys(cursor, table)
+
+            # One partition by experiment (and for orphan combinations of experiments with another type, if any)
+            cursor.execute(f'SELECT id FROM api_service_experiment WHERE type = %s '
+                           f'UNION SELECT DISTINCT experiment_id FROM {old_table}', [experiment_type])
+            experiment_ids = [experiment_id for (experiment_id,) in cursor.fetchall()]
+            for batch in __in_batches(experiment_ids):
+                with transaction.atomic(using=alias):
+                    for experiment_id in batch:
+                        partition = f'{table}_{int(experiment_id)}'
+                        cursor.execute(f'CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} '
+                                       f'FOR VALUES IN ({int(experiment_id)})')
+                        cursor.execute(f'WITH moved AS (DELETE FROM {old_table} WHERE experiment_id = %s RETURNING *) '
+                                       f'INSERT INTO {partition} SELECT * FROM moved', [experiment_id])
+
+            cursor.execute(f'DROP TABLE {old_table}')
+
+
+def unpartition_combinations(apps, schema_editor):
+    """Converts every partitioned combinations table back in a plain table, moving the partitions in batches."""
+    alias = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        for table in COMBINATIONS_TABLES:
+            old_table = f'{table}_partitioned'
+            if not __table_exists(cursor, old_table):
+                if not __is_partitioned(cursor, table):
+                    continue
+
+                with transaction.atomic(using=alias):
+                    __rename_table(cursor, table, old_table)
+                    cursor.execute(f'CREATE TABLE {table} (LIKE {old_table})')
+
+                    __add_id_sequence(cursor, table)
+                    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+                    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_source_statistical_data_id_uniq '
+                                   f'UNIQUE (source_statistical_data_id)')
+                    cursor.execute(f'CREATE INDEX {table}_experiment_id_idx ON {table} (experiment_id)')
+                    __add_foreign_keys(cursor, table)
+
+            cursor.execute('SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass',
+                           [old_table])
+            partitions = [partition for (partition,) in cursor.fetchall()]
+            for batch in __in_batches(partitions):
+                with transaction.atomic(using=alias):
+                    for partition in batch:
+                        cursor.execute(f'INSERT INTO {table} SELECT * FROM {partition}')
+                        cursor.execute(f'DROP TABLE {partition}')
+
+            cursor.execute(f'DROP TABLE {old_table}')
+            __reset_id_sequence(cursor, table, table)
+
+
+class Migration(migrations.Migration):
+    # Every step is committed separately (see PARTITIONS_BATCH_SIZE)
+    atomic = False
+
+    dependencies = [
+        ('api_service', '0062_experiment_fingerprint'),
+        ('statistical_properties', '0018_statisticalvalidation_prepared_data'),
+    ]
+
+    operations = [
+        # Django's state doesn't change: id is still considered the PK (it's unique as it comes from a sequence)
+        migrations.RunPython(partition_combinations, unpartition_combinations),
+    ]
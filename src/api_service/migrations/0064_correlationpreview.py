@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-19 05:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_files', '0016_rowstatistics'),
+        ('api_service', '0063_partition_combinations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorrelationPreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preview_id', models.CharField(max_length=32, unique=True)),
+                ('expiration_date', models.DateTimeField()),
+                ('clinical_source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_service.experimentclinicalsource')),
+                ('gem_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_service.experimentsource')),
+                ('mRNA_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api_service.experimentsource')),
+                ('uploaded_files', models.ManyToManyField(blank=True, related_name='+', to='user_files.userfile')),
+            ],
+        ),
+    ]
@@ -1,11 +1,13 @@
 import datetime
-from typing import Iterable, List, Optional, Type, Set, Any
+from typing import Iterable, List, Optional, Type, Set, Any, Dict
 
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import User
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.db.models import QuerySet, Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from common.constants import PATIENT_ID_COLUMN, SAMPLE_ID_COLUMN, SAMPLES_TYPE_COLUMN, PRIMARY_TYPE_VALUE
 from common.methylation import get_methylation_platform_dataframe
 from genes.models import Gene
@@ -15,6 +17,7 @@ from tags.models import Tag
 from user_files.models import UserFile
 from user_files.models_choices import FileType
 from .models_choices import ExperimentType, ExperimentState, CorrelationMethod, PValuesAdjustmentMethod
+from .partitions_service import detach_combinations_partition, drop_combinations_partition
 from .websocket_functions import send_update_experiments_command
 from datasets_synchronization.models import CGDSDataset
 import pandas as pd
@@ -34,6 +37,35 @@ def get_combination_class(experiment_type: ExperimentType):
     return GeneMethylationCombination
 
 
+def get_dataset_identity(dataset: Optional[UserFile | CGDSDataset]) -> Optional[Dict[str, Any]]:
+    """
+    Gets the identity and version of a dataset (the fields that change its content or how it's read) to compute the
+    fingerprint of the experiments.
+    @param dataset: UserFile or CGDSDataset instance.
+    @return: Dict with the identity of the dataset. None if there's no dataset.
+    """
+    if dataset is None:
+        return None
+
+    if isinstance(dataset, UserFile):
+        return {
+            'user_file': dataset.pk,
+            'file': dataset.file_obj.name,
+            'upload_date': dataset.upload_date,
+            'decimal_separator': dataset.decimal_separator,
+            'is_cpg_site_id': dataset.is_cpg_site_id,
+            'platform': dataset.platform
+        }
+
+    return {
+        'cgds_dataset': dataset.pk,
+        'mongo_collection_name': dataset.mongo_collection_name,
+        'date_last_synchronization': dataset.date_last_synchronization,
+        'is_cpg_site_id': dataset.is_cpg_site_id,
+        'platform': dataset.platform
+    }
+
+
 class ExperimentSource(models.Model):
     """
     Represents a Pipeline source. A source could be a file (new or previously uploaded by
@@ -57,6 +89,13 @@ class ExperimentSource(models.Model):
         """
         return self.user_file if self.user_file else self.cgds_dataset
 
+    def get_identity(self) -> Optional[Dict[str, Any]]:
+        """
+        Gets the identity of the source's dataset, which is the same for all the sources using the same dataset version
+        @return: Dict with the identity of the dataset
+        """
+        return get_dataset_identity(self.get_valid_source())
+
     def get_methylation_platform_df(self) -> Optional[pd.DataFrame]:
         """
         Gets (if corresponds) the Methylation CpG platform
@@ -100,15 +139,16 @@ class ExperimentSource(models.Model):
         """
         return self.get_valid_source().get_df(only_matching)
 
-    def get_df_in_chunks(self, only_matching: bool = False) -> Iterable[pd.DataFrame]:
+    def get_df_in_chunks(self, only_matching: bool = False, rows: Optional[List[str]] = None) -> Iterable[pd.DataFrame]:
         """
         Returns an Iterator of a DataFrame in divided in chunks from an experiment source.
         @param only_matching: @param only_matching: If True only returns the molecules that are equal in both columns
         MOLECULE_SYMBOL and
         STANDARD_SYMBOL (only used for CGDSDatasets).
+        @param rows: If specified, only these rows are retrieved.
         @return: A DataFrame Iterator with the data to work.
         """
-        return self.get_valid_source().get_df_in_chunks(only_matching)
+        return self.get_valid_source().get_df_in_chunks(only_matching, rows=rows)
 
     @property
     def number_of_rows(self) -> int:
@@ -144,6 +184,16 @@ class ExperimentClinicalSource(ExperimentSource):
         """
         return None
 
+    def get_identity(self) -> Optional[Dict[str, Any]]:
+        """
+        Gets the identity of the source's datasets (CGDS clinical sources use two datasets)
+        @return: Dict with the identity of the datasets
+        """
+        identity = super().get_identity()
+        if identity is not None and self.extra_cgds_dataset is not None:
+            identity['extra_cgds_dataset'] = get_dataset_identity(self.extra_cgds_dataset)
+        return identity
+
     def get_samples(self) -> List[str]:
         """
         Gets the samples of a ExperimentSource
@@ -367,6 +417,9 @@ class Experiment(models.Model):
     attempt: int = models.PositiveSmallIntegerField(default=0)
     task_id: Optional[str] = models.CharField(max_length=100, blank=True, null=True)  # Celery Task ID
     execution_time: Optional[float] = models.FloatField(blank=True, null=True)  # Execution time in seconds
+    # Canonical fingerprint of the sources and parameters (except the threshold) to reuse the results of previous
+    # experiments
+    fingerprint: Optional[str] = models.CharField(max_length=64, blank=True, null=True, db_index=True)
 
     # TODO: analyze if this go here, maybe when refactor the GEM type for UserFile and CGDSDataset
     # TODO: this can be stored in the Methylation type entity. Set the corresponding nullity in the new schema
@@ -400,6 +453,10 @@ class Experiment(models.Model):
         """
         return self.clinical_source.get_samples()
 
+    def get_combinations_table(self) -> str:
+        """Gets the name of the (partitioned) table where the combinations of the experiment are stored."""
+        return self.get_combination_class()._meta.db_table
+
     def save(self, *args, **kwargs) -> None:
         """Every time the experiment status changes, uses websockets to update state in the frontend"""
         super().save(*args, **kwargs)
@@ -409,6 +466,8 @@ class Experiment(models.Model):
 
     def delete(self, *args, **kwargs) -> None:
         """Deletes the instance and sends a websockets message to update state in the frontend"""
+        # Detaches the combinations partition (if possible) so dropping it doesn't block the rest of the experiments
+        detach_combinations_partition(self.get_combinations_table(), self.pk)
         super().delete(*args, **kwargs)
 
         # Sends a websockets message to update the experiment state in the frontend
@@ -418,6 +477,33 @@ class Experiment(models.Model):
         return f'{self.pk} | {self.name}'
 
 
+@receiver(pre_delete, sender=Experiment)
+def experiment_pre_delete(sender, instance: Experiment, **kwargs):
+    """
+    Drops the partition with the combinations of an `Experiment` when it's deleted (also in cascade), instead of
+    deleting them row by row.
+    """
+    drop_combinations_partition(instance.get_combinations_table(), instance.pk)
+
+
+class CorrelationPreview(models.Model):
+    """
+    Sources saved to run a correlation analysis preview. If the analysis is not submitted before the preview expires
+    they are removed, with the datasets uploaded for the preview (see preview_service.remove_expired_previews)
+    """
+    preview_id: str = models.CharField(max_length=32, unique=True)
+    mRNA_source = models.ForeignKey(ExperimentSource, on_delete=models.CASCADE, related_name='+')
+    gem_source = models.ForeignKey(ExperimentSource, on_delete=models.CASCADE, related_name='+')
+    clinical_source = models.ForeignKey(ExperimentClinicalSource, on_delete=models.CASCADE, related_name='+',
+                                        blank=True, null=True)
+    # New datasets uploaded by the user to run the preview (existing files are never removed)
+    uploaded_files = models.ManyToManyField(UserFile, blank=True, related_name='+')
+    expiration_date: datetime.datetime = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f'{self.preview_id} | {self.expiration_date}'
+
+
 class GeneGEMCombination(models.Model):
     """Super class for Gene x GEM combination"""
     id = models.BigAutoField(primary_key=True)
@@ -1,5 +1,4 @@
-from copy import deepcopy
-from typing import List, Dict, Any, Iterator, Optional, Union
+from typing import List, Dict, Any, Iterator, Optional, Union, Iterable
 import pandas as pd
 from pymongo import MongoClient
 from pymongo.database import Database
@@ -8,9 +7,10 @@ import random
 import string
 from django.conf import settings
 import logging
+from genes.aliases_service import get_molecules_aliases
+from genes.models import MoleculeAliasService
 from user_files.models_choices import FileType
 from .exceptions import CouldNotDeleteInMongo
-from .mrna_service import global_mrna_service
 
 # Symbol used by cBioPortal to indicate the code of molecule (gene, miRNA, of Methylation CpG site ID)
 MOLECULE_SYMBOL = 'Hugo_Symbol'
@@ -126,7 +126,8 @@ class MongoService(object):
         return df
 
     def get_collection_as_df_in_chunks(self, collection_name: str, chunk_size: int,
-                                       only_matching: bool = False) -> Iterator[pd.DataFrame]:
+                                       only_matching: bool = False,
+                                       rows: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
         """
         Gets a MongoDB collection as a DataFrame.
         NOTE: uses this kind of pagination as cursor is closed after 30 minutes by Mongo raising
@@ -135,8 +136,13 @@ class MongoService(object):
         @param chunk_size: Chunk size in which the collection is retrieved.
         @param only_matching: If True only returns the molecules that are equal in both columns MOLECULE_SYMBOL and
         STANDARD_SYMBOL.
+        @param rows: If specified, only these rows (STANDARD_SYMBOL values) are retrieved.
         @return: DataFrame with the collection data.
         """
+        if rows is not None:
+            yield from self.__get_rows_as_df_in_chunks(collection_name, chunk_size, only_matching, rows)
+            return
+
         last_id = None
         while True:
             # When it is first page doesn't apply filter
@@ -165,6 +171,36 @@ class MongoService(object):
 
             yield self.__process_batch(batch)
 
+    def __get_rows_as_df_in_chunks(self, collection_name: str, chunk_size: int, only_matching: bool,
+                                   rows: List[str]) -> Iterator[pd.DataFrame]:
+        """
+        Gets some rows of a MongoDB collection as a DataFrame. The list of rows is paginated so every query uses the
+        STANDARD_SYMBOL index.
+        @param collection_name: Collection's name.
+        @param chunk_size: Number of rows to retrieve in every query.
+        @param only_matching: If True only returns the molecules that are equal in both columns MOLECULE_SYMBOL and
+        STANDARD_SYMBOL.
+        @param rows: Rows (STANDARD_SYMBOL values) to retrieve.
+        @return: DataFrame with the collection data.
+        """
+        where = {'$where': f'this.{MOLECULE_SYMBOL} == this.{STANDARD_SYMBOL}'} if only_matching else {}
+        for start in range(0, len(rows), chunk_size):
+            cursor = self.db[collection_name].find(
+                {STANDARD_SYMBOL: {'$in': rows[start:start + chunk_size]}, **where},
+                self.default_non_used_fields_pagination
+            )
+
+            batch = list(cursor)
+            if batch:
+                yield self.__process_batch(batch)
+
+    def create_standard_symbol_index(self, collection_name: str):
+        """
+        Creates (if it does not exist) an index by STANDARD_SYMBOL in a collection to retrieve rows by their identifier.
+        @param collection_name: Collection's name.
+        """
+        self.db[collection_name].create_index(STANDARD_SYMBOL)
+
     def get_only_columns_names(self, collection_name: str, exclude_special_fields: bool = True) -> List[str]:
         """
         Gets a specific MongoDB collection's columns' names.
@@ -214,20 +250,11 @@ class MongoService(object):
         elif file_type == FileType.MIRNA:
             logging.warning('Retrieving data from Modulector')
 
+        # Aliases are retrieved from the local cache table and only the misses are requested to BioAPI/Modulector
         if is_for_bioapi:
-            data = global_mrna_service.get_bioapi_service_content(
-                'gene-symbols',
-                request_params={'gene_ids': molecules},
-                is_paginated=False,
-                method='post'
-            )
+            data = get_molecules_aliases(MoleculeAliasService.GENE_SYMBOLS, molecules)
         elif file_type == FileType.MIRNA:
-            data = global_mrna_service.get_modulector_service_content(
-                'mirna-codes',
-                request_params={'mirna_codes': molecules},
-                is_paginated=False,
-                method='post'
-            )
+            data = get_molecules_aliases(MoleculeAliasService.MIRNA_CODES, molecules)
         else:
             # In case of methylation, cBioPortal don't manage the methylation sites, so we don't need to use Modulector.
             # Generates a dummy dict with the same keys and values as the molecules list
@@ -235,10 +262,74 @@ class MongoService(object):
 
         return data
 
-    def insert_cgds_dataset(self, dataset_df: pd.DataFrame, table_name: str, file_type: FileType) -> bool:
+    def __get_cgds_documents(self, dataset_df: pd.DataFrame, file_type: FileType) -> Optional[List[Dict[str, Any]]]:
+        """
+        Generates the MongoDB documents of a chunk of a CGDS dataset adding the standard symbol of every molecule
+        (retrieved from Modulector/BioAPI).
+        @param dataset_df: DataFrame chunk to process.
+        @param file_type: File type to check which service needs to invoke.
+        @return: List of documents to insert. None if the standard IDs could not be retrieved.
         """
-        Inserts a CGDS dataset Pandas DataFrame in MongoDB
-        @param dataset_df: DataFrame to Insert
+        # Cast to Dict, then list
+        data_list: List[Dict[str, Any]] = dataset_df.to_dict("records")
+
+        # In case of clinical data there is not molecules nor aliases
+        if file_type == FileType.CLINICAL:
+            return data_list
+
+        # Gets standard IDs from Modulector/BioAPI
+        molecules = [elem[MOLECULE_SYMBOL] for elem in data_list]
+        molecules_std_ids = self.__get_standard_ids(file_type, molecules)
+        if molecules_std_ids is None:
+            logging.error(f'Could not retrieve Modulector/BioAPI data. Molecules of type ({file_type}):')
+            logging.error(molecules)
+            return None
+
+        # Appends the standard key to the data to be inserted
+        ambiguous_symbols: List[Dict[str, Any]] = []
+        for elem in data_list:
+            symbol = elem[MOLECULE_SYMBOL]
+            standard_symbols: Union[str, List[str]] = molecules_std_ids[symbol]
+            standard_symbol: str
+            if standard_symbols:
+                if file_type in [FileType.MRNA, FileType.CNA, FileType.METHYLATION]:
+                    len_results = len(standard_symbols)
+                    # In case of empty symbol, just uses the original one
+                    if len_results == 0:
+                        standard_symbol = symbol
+                    elif len_results == 1:
+                        # Uses the only returned standard symbol
+                        standard_symbol = standard_symbols[0]
+                    else:
+                        # In case of ambiguity, copies the element for all the aliases
+                        standard_symbol = symbol  # To prevent later addition
+
+                        # Clones the element and adds standard symbol. NOTE: a shallow copy is enough as all the
+                        # values of the document are scalars
+                        for aux_symbol in standard_symbols:
+                            # Omits the original symbol
+                            if aux_symbol != symbol:
+                                ambiguous_symbols.append({**elem, STANDARD_SYMBOL: aux_symbol})
+                else:
+                    # In case of miRNA, can be only one alias
+                    standard_symbol = standard_symbols if standard_symbols else symbol
+            else:
+                # In case of empty symbol, just uses the original one
+                standard_symbol = symbol
+
+            if standard_symbol is not None:
+                elem[STANDARD_SYMBOL] = standard_symbol
+
+        # Concatenates ambiguous elements
+        data_list.extend(ambiguous_symbols)
+        return data_list
+
+    def insert_cgds_dataset(self, dataset_chunks: Iterable[pd.DataFrame], table_name: str,
+                            file_type: FileType) -> bool:
+        """
+        Inserts a CGDS dataset in MongoDB chunk by chunk. Every chunk is standardized (Modulector/BioAPI) and inserted
+        with an unordered bulk insertion, so only one chunk is kept in memory at a time.
+        @param dataset_chunks: Iterable of DataFrames chunks to insert.
         @param table_name: Name of the MongoDB's collection where the DataFrame will be inserted
         @param file_type: File type to check which service needs to invoke.
         @return: True if everything gone well, False otherwise
@@ -246,64 +337,33 @@ class MongoService(object):
         # Gets experiment MongoDB Collection
         cgds_table = self.db[table_name]
 
-        # Cast to Dict, then list, and the adds the UEK
-        data_dict = dataset_df.to_dict("records")
-        data_list = list(data_dict)
+        start = time.time()
+        n_inserted = 0
+        for dataset_df in dataset_chunks:
+            # Prevents unnecessary requests to Modulector/BioAPI
+            if dataset_df.empty:
+                continue
 
-        # In case of clinical data there is not molecules nor aliases
-        if file_type != FileType.CLINICAL:
-            # Gets standard IDs from Modulector/BioAPI
-            molecules = [elem[MOLECULE_SYMBOL] for elem in data_list]
-            molecules_std_ids = self.__get_standard_ids(file_type, molecules)
-            if molecules_std_ids is None:
-                logging.error(f'Could not retrieve Modulector/BioAPI data. Molecules of type ({file_type}):')
-                logging.error(molecules)
+            data_list = self.__get_cgds_documents(dataset_df, file_type)
+            if data_list is None:
                 return False
 
-            # Appends the standard key to the data to be inserted
-            ambiguous_symbols: List[Dict[str, Any]] = []
-            for elem in data_list:
-                symbol = elem[MOLECULE_SYMBOL]
-                standard_symbols: Union[str, List[str]] = molecules_std_ids[symbol]
-                standard_symbol: str
-                if standard_symbols:
-                    if file_type in [FileType.MRNA, FileType.CNA, FileType.METHYLATION]:
-                        len_results = len(standard_symbols)
-                        # In case of empty symbol, just uses the original one
-                        if len_results == 0:
-                            standard_symbol = symbol
-                        elif len_results == 1:
-                            # Uses the only returned standard symbol
-                            standard_symbol = standard_symbols[0]
-                        else:
-                            # In case of ambiguity, copies the element for all the aliases
-                            standard_symbol = symbol  # To prevent later addition
-
-                            # Clones the element and adds standard symbol
-                            for aux_symbol in standard_symbols:
-                                # Omits the original symbol
-                                if aux_symbol != symbol:
-                                    new_elem = deepcopy(elem)
-                                    new_elem[STANDARD_SYMBOL] = aux_symbol
-                                    ambiguous_symbols.append(new_elem)
-                    else:
-                        # In case of miRNA, can be only one alias
-                        standard_symbol = standard_symbols if standard_symbols else symbol
-                else:
-                    # In case of empty symbol, just uses the original one
-                    standard_symbol = symbol
-
-                if standard_symbol is not None:
-                    elem[STANDARD_SYMBOL] = standard_symbol
+            # Inserts in DB. Unordered insertion lets MongoDB parallelize the batch
+            result = cgds_table.insert_many(data_list, ordered=False)
+            if len(result.inserted_ids) != len(data_list):
+                return False
 
-            # Concatenates ambiguous elements
-            data_list.extend(ambiguous_symbols)
+            n_inserted += len(data_list)
+            elapsed = time.time() - start
+            rows_per_second = n_inserted / elapsed if elapsed > 0 else n_inserted
+            logging.warning(f'{n_inserted} documents inserted in "{table_name}" ({rows_per_second:.2f} rows/second)')
 
-        # Inserts in DB
-        result = cgds_table.insert_many(data_list)
+        # Molecules are retrieved by their standardized symbol (e.g. filtered rows in correlation analyses)
+        if n_inserted > 0 and file_type != FileType.CLINICAL:
+            self.create_standard_symbol_index(table_name)
 
         # Returns the True if everything gone well
-        return len(result.inserted_ids) == len(data_list)
+        return True
 
     def drop_collection(self, collection_to_remove: str):
         """
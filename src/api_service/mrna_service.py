@@ -1,15 +1,36 @@
+import asyncio
+import hashlib
+import json
 import logging
+import threading
+import weakref
 from json.decoder import JSONDecodeError
-from typing import Any, Dict, Optional, Literal, Union
+from typing import Any, Dict, Optional, Literal, Union, Tuple
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import caches
 from django.http import QueryDict
-from requests.exceptions import ConnectionError
+from redis.exceptions import RedisError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ReadTimeout
+from urllib3.util.retry import Retry
+
+# Name of the Django cache (see settings.CACHES) where the Modulector/BioAPI responses are stored
+CACHE_NAME = 'mrna_service'
+
+# Status codes of Modulector/BioAPI responses which are retried
+RETRY_STATUS_CODES = (502, 503, 504)
 
 
 class MRNAService(object):
     url_modulector_prefix: str
     url_bioapi_prefix: str
+    session: requests.Session
+    timeouts: Tuple[float, float]
+    cache_hits: int
+    cache_misses: int
 
     def __init__(self):
         modulector_settings = settings.MODULECTOR_SETTINGS
@@ -18,6 +39,99 @@ class MRNAService(object):
         bioapi_settings = settings.BIOAPI_SETTINGS
         self.url_bioapi_prefix = self.__build_url(bioapi_settings)
 
+        self.session = self.__build_session()
+        self.timeouts = (settings.MRNA_SERVICE_CONNECTION_TIMEOUT, settings.MRNA_SERVICE_READ_TIMEOUT)
+
+        # Non-blocking clients (one per event loop) used by the async views, with the generators which close them
+        self.__async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+        # Cache metrics
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.__metrics_lock = threading.Lock()
+
+    @staticmethod
+    def __build_session() -> requests.Session:
+        """
+        Generates a Session with a pool of keep-alive connections which retries the failed requests (connection errors
+        and 502/503/504 status codes) with an exponential backoff.
+        @return: Session to make all the requests to Modulector/BioAPI.
+        """
+        retry = Retry(
+            total=settings.MRNA_SERVICE_MAX_RETRIES,
+            backoff_factor=settings.MRNA_SERVICE_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'POST']),  # POST services only retrieve data, so they're idempotent
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_maxsize=settings.MRNA_SERVICE_POOL_SIZE, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def __get_cache_key(method: str, url: str, request_params: Any) -> str:
+        """
+        Generates the key of a cached response from the request method, the URL and the params.
+        @param method: Request method (GET or POST).
+        @param url: URL of the service (including the query params in GET requests).
+        @param request_params: Body of the request (only used in POST requests).
+        @return: Cache key.
+        """
+        body = json.dumps(request_params, sort_keys=True, default=str) if method == 'post' else ''
+        return hashlib.sha256(f'{method}|{url}|{body}'.encode()).hexdigest()
+
+    def __get_cached_response(self, cache_key: str) -> Optional[Union[Dict, str]]:
+        """
+        Gets a response from the cache updating the hit/miss metrics.
+        @param cache_key: Key of the response.
+        @return: Cached response. None if it's not present or the cache is not available.
+        """
+        try:
+            cached = caches[CACHE_NAME].get(cache_key)
+        except RedisError as ex:
+            logging.warning(f'Modulector/BioAPI cache is not available: {ex}')
+            cached = None
+
+        with self.__metrics_lock:
+            if cached is not None:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+        return cached
+
+    @staticmethod
+    def __set_cached_response(cache_key: str, response: Union[Dict, str], response_size: int):
+        """
+        Stores a response in the cache if it's not bigger than settings.MRNA_SERVICE_CACHE_MAX_RESPONSE_SIZE.
+        @param cache_key: Key of the response.
+        @param response: Response to store.
+        @param response_size: Size (in bytes) of the response content.
+        """
+        if response_size > settings.MRNA_SERVICE_CACHE_MAX_RESPONSE_SIZE:
+            return
+
+        try:
+            caches[CACHE_NAME].set(cache_key, response, timeout=settings.MRNA_SERVICE_CACHE_TTL)
+        except RedisError as ex:
+            logging.warning(f'Modulector/BioAPI cache is not available: {ex}')
+
+    def get_cache_metrics(self) -> Dict[str, Union[int, float]]:
+        """
+        Gets the hit/miss metrics of the Modulector/BioAPI responses cache in the current process.
+        @return: Dict with the number of hits, misses and the hit ratio.
+        """
+        with self.__metrics_lock:
+            total = self.cache_hits + self.cache_misses
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'hit_ratio': self.cache_hits / total if total > 0 else 0.0
+            }
+
     @staticmethod
     def __build_url(settings: Dict[str, Any]) -> str:
         """
@@ -45,6 +159,81 @@ class MRNAService(object):
         """
         return '&'.join([f'{key}={value}' for (key, value) in get_request.items()])
 
+    @classmethod
+    def __build_service_url(
+            cls,
+            service_name: str,
+            request_params: QueryDict,
+            url_prefix: str,
+            method: Literal['get', 'post'],
+            append_slash: bool
+    ) -> str:
+        """
+        Generates the URL of a Modulector/BioAPI service.
+        @param service_name: Modulector/BioAPI service to consume
+        @param request_params: GET/POST request with query params to send to DRF backend
+        @param url_prefix: URL of the Modulector or BioAPI service
+        @param method: Request method (GET or POST)
+        @param append_slash: If True appends a slash to prevent issues with Django.
+        @return: URL of the service (including the query params in GET requests).
+        """
+        url = f'{url_prefix}/{service_name}'
+
+        if method == 'get':
+            params = cls.__generate_rest_query_params(request_params)
+            if params:
+                url += f'/?{params}'
+        else:
+            # Prevents issues with Django APPEND_SLASH option
+            if append_slash and not url.endswith('/'):
+                url += '/'
+
+        return url
+
+    @staticmethod
+    def __parse_response(
+            method: Literal['get', 'post'],
+            url: str,
+            data: Union[requests.Response, httpx.Response]
+    ) -> Optional[Union[Dict, str]]:
+        """
+        Gets the content of a Modulector/BioAPI response. Both requests and httpx responses are supported.
+        @param method: Request method (GET or POST)
+        @param url: Requested URL to log errors.
+        @param data: Response to parse.
+        @return: JSON data or text retrieved from the service. None if the status code is not 200 or the content type
+        is not supported.
+        @raise JSONDecodeError if the JSON content is invalid.
+        """
+        if data.status_code != 200:
+            logging.warning(f'{method.upper()} to {url} returned status_code {data.status_code} and '
+                            f'message: {data.content}')
+            return None
+
+        content_type = data.headers.get('Content-Type', '')
+        if 'application/json' in content_type:
+            return data.json()
+        elif 'text/plain' in content_type or 'text/html' in content_type:
+            return data.text
+        else:
+            return None
+
+    @staticmethod
+    def __get_error_response(is_paginated: bool) -> Optional[Dict]:
+        """
+        Generates the default response in case of error.
+        @param is_paginated: True if the expected response is paginated.
+        @return: An empty page if the expected response is paginated. None otherwise.
+        """
+        if is_paginated:
+            return {
+                'count': 0,
+                'next': '',
+                'previous': '',
+                'results': []
+            }
+        return None
+
     def __get_service_content(
             self,
             service_name: str,
@@ -55,7 +244,8 @@ class MRNAService(object):
             append_slash: bool
     ) -> Optional[Union[Dict, str]]:
         """
-        Generic function to make a request to a Modulector/BioAPI service
+        Generic function to make a request to a Modulector/BioAPI service. Successful responses are cached during
+        settings.MRNA_SERVICE_CACHE_TTL seconds
         @param service_name: Modulector/BioAPI service to consume
         @param request_params: GET/POST request with query params to send to DRF backend
         @param is_paginated: True if the expected response is paginated to generate a default response in case of error
@@ -64,47 +254,144 @@ class MRNAService(object):
         @param append_slash: If True appends a slash to prevent issues with Django.
         @return: JSON data retrieved from the Modulector service. None if response has 404 status code
         """
-        url = f'{url_prefix}/{service_name}'
+        url = self.__build_service_url(service_name, request_params, url_prefix, method, append_slash)
+
+        use_cache = settings.MRNA_SERVICE_CACHE_TTL > 0
+        cache_key = self.__get_cache_key(method, url, request_params)
+        if use_cache:
+            cached = self.__get_cached_response(cache_key)
+            if cached is not None:
+                return cached
 
         data = None  # Prevents Mypy warning
         try:
             if method == 'get':
-                params = self.__generate_rest_query_params(request_params)
-                if params:
-                    url += f'/?{params}'
-                data = requests.get(url)
-            else:
-                # Prevents issues with Django APPEND_SLASH option
-                if append_slash and not url.endswith('/'):
-                    url += '/'
-
-                data = requests.post(url, json=request_params)
-
-            if data.status_code != 200:
-                logging.warning(f'{method.upper()} to {url} returned status_code {data.status_code} and '
-                                f'message: {data.content}')
-                return None
-
-            content_type = data.headers.get('Content-Type', '')
-            if 'application/json' in content_type:
-                return data.json()
-            elif 'text/plain' in content_type or 'text/html' in content_type:
-                return data.text
+                data = self.session.get(url, timeout=self.timeouts)
             else:
-                return None
+                data = self.session.post(url, json=request_params, timeout=self.timeouts)
 
-        except (ConnectionError, JSONDecodeError) as ex:
+            response = self.__parse_response(method, url, data)
+            if use_cache and response is not None:
+                self.__set_cached_response(cache_key, response, len(data.content))
+            return response
+
+        except (ConnectionError, ReadTimeout, JSONDecodeError) as ex:
             logging.error(f'Received data from Modulector/BioAPI: {data}')
             logging.exception(ex)
+            return self.__get_error_response(is_paginated)
 
-            if is_paginated:
-                return {
-                    'count': 0,
-                    'next': '',
-                    'previous': '',
-                    'results': []
-                }
-            return None
+    async def __close_on_loop_shutdown(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        """
+        Async generator which is kept suspended while the event loop runs. The loop closes all its async generators
+        on shutdown (see loop.shutdown_asyncgens), so the client (and its connections) is closed there.
+        @param loop: Event loop of the client.
+        @param client: Client to close.
+        """
+        try:
+            yield
+        finally:
+            self.__async_clients.pop(loop, None)
+            await client.aclose()
+
+    async def __get_async_client(self) -> httpx.AsyncClient:
+        """
+        Gets the non-blocking HTTP client of the running event loop (creating it if needed). The client keeps a pool
+        of keep-alive connections, can only be used in the loop where it was created and is closed when the loop shuts
+        down.
+        @return: Async HTTP client.
+        """
+        loop = asyncio.get_running_loop()
+        client_and_closer = self.__async_clients.get(loop)
+        if client_and_closer is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.MRNA_SERVICE_READ_TIMEOUT,
+                                      connect=settings.MRNA_SERVICE_CONNECTION_TIMEOUT),
+                limits=httpx.Limits(max_keepalive_connections=settings.MRNA_SERVICE_POOL_SIZE)
+            )
+
+            # The generator is started to be registered in the loop and must be referenced until the loop shuts down
+            closer = self.__close_on_loop_shutdown(loop, client)
+            await closer.__anext__()
+            client_and_closer = (client, closer)
+            self.__async_clients[loop] = client_and_closer
+        return client_and_closer[0]
+
+    async def __async_request(
+            self,
+            method: Literal['get', 'post'],
+            url: str,
+            request_params: QueryDict
+    ) -> httpx.Response:
+        """
+        Makes a non-blocking request retrying the failed ones (connection errors and 502/503/504 status codes) with
+        the same exponential backoff used by the Session (see __build_session).
+        @param method: Request method (GET or POST)
+        @param url: URL of the service (including the query params in GET requests).
+        @param request_params: Body of the request (only used in POST requests).
+        @return: Last response received.
+        @raise httpx.TransportError if the last attempt failed with a network error.
+        """
+        client = await self.__get_async_client()
+        max_retries = settings.MRNA_SERVICE_MAX_RETRIES
+        attempt = 0
+        while True:
+            try:
+                if method == 'get':
+                    data = await client.get(url)
+                else:
+                    data = await client.post(url, json=request_params)
+
+                if data.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return data
+            except httpx.TransportError as ex:
+                if attempt >= max_retries:
+                    raise ex
+
+            attempt += 1
+            await asyncio.sleep(settings.MRNA_SERVICE_BACKOFF_FACTOR * (2 ** (attempt - 1)))
+
+    async def __async_get_service_content(
+            self,
+            service_name: str,
+            request_params: QueryDict,
+            is_paginated: bool,
+            url_prefix: str,
+            method: Literal['get', 'post'],
+            append_slash: bool
+    ) -> Optional[Union[Dict, str]]:
+        """
+        Async version of __get_service_content which doesn't block the event loop while waiting for Modulector/BioAPI.
+        The same cache is shared by both versions.
+        @param service_name: Modulector/BioAPI service to consume
+        @param request_params: GET/POST request with query params to send to DRF backend
+        @param is_paginated: True if the expected response is paginated to generate a default response in case of error
+        @param url_prefix: URL of the Modulector or BioAPI service
+        @param method: Request method (GET or POST)
+        @param append_slash: If True appends a slash to prevent issues with Django.
+        @return: JSON data retrieved from the Modulector service. None if response has 404 status code
+        """
+        url = self.__build_service_url(service_name, request_params, url_prefix, method, append_slash)
+
+        use_cache = settings.MRNA_SERVICE_CACHE_TTL > 0
+        cache_key = self.__get_cache_key(method, url, request_params)
+        if use_cache:
+            cached = await sync_to_async(self.__get_cached_response, thread_sensitive=False)(cache_key)
+            if cached is not None:
+                return cached
+
+        data = None  # Prevents Mypy warning
+        try:
+            data = await self.__async_request(method, url, request_params)
+            response = self.__parse_response(method, url, data)
+            if use_cache and response is not None:
+                await sync_to_async(self.__set_cached_response, thread_sensitive=False)(cache_key, response,
+                                                                                        len(data.content))
+            return response
+
+        except (httpx.TransportError, JSONDecodeError) as ex:
+            logging.error(f'Received data from Modulector/BioAPI: {data}')
+            logging.exception(ex)
+            return self.__get_error_response(is_paginated)
 
     def get_modulector_service_content(
             self,
@@ -142,5 +429,31 @@ class MRNAService(object):
         return self.__get_service_content(service_name, request_params, is_paginated, self.url_bioapi_prefix, method,
                                           append_slash=False)
 
+    async def async_get_modulector_service_content(
+            self,
+            service_name: str,
+            request_params: QueryDict,
+            is_paginated: bool,
+            method: Literal['get', 'post'] = 'get'
+    ) -> Optional[Dict]:
+        """
+        Makes a non-blocking request to a Modulector service. Same params as get_modulector_service_content.
+        """
+        return await self.__async_get_service_content(service_name, request_params, is_paginated,
+                                                      self.url_modulector_prefix, method, append_slash=True)
+
+    async def async_get_bioapi_service_content(
+            self,
+            service_name: str,
+            request_params: QueryDict,
+            is_paginated: bool,
+            method: Literal['get', 'post'] = 'get'
+    ) -> Optional[Any]:
+        """
+        Makes a non-blocking request to a BioAPI service. Same params as get_bioapi_service_content.
+        """
+        return await self.__async_get_service_content(service_name, request_params, is_paginated,
+                                                      self.url_bioapi_prefix, method, append_slash=False)
+
 
 global_mrna_service = MRNAService()
@@ -0,0 +1,408 @@
+import logging
+from typing import Tuple, List, Optional, Iterator
+import ggca
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata, t as t_distribution
+from common.functions import check_if_stopped
+from common.typing import AbortEvent
+from .exceptions import ExperimentStopped
+from .models_choices import CorrelationMethod, PValuesAdjustmentMethod
+
+# Maximum number of correlations computed at once (i.e. size of the matrix product of every block)
+BLOCK_SIZE = 1_000_000
+
+# Number of bins of the histogram used to count the pruned combinations' correlation bounds (see __prescreen_blocks)
+# and the combinations under the threshold of the pre-screened analyses
+PRESCREEN_HISTOGRAM_BINS = 10_000
+
+# Maximum number of rows of every source used to compute the pre-screen sketch basis
+PRESCREEN_SKETCH_SAMPLE_ROWS = 10_000
+
+# Margin added to the pre-screen bounds to prevent rounding errors from discarding combinations in the limit
+PRESCREEN_TOLERANCE = 1e-5
+
+# If the fraction of pairs of a block that passes the pre-screen is greater than this, the whole block is computed as a
+# matrix product (which is much faster per combination than computing the pairs one by one)
+PRESCREEN_DENSE_FRACTION = 0.05
+
+# Gene indexes, GEM indexes and correlations of a block of combinations
+CorrelationsBlock = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def __standardize(values: np.ndarray, correlation_method: CorrelationMethod) -> np.ndarray:
+    """
+    Centers every row and scales it to unit norm, so the dot product between two rows is their Pearson correlation. For
+    Spearman the rows are ranked first. Constant rows are filled with NaNs.
+    @param values: Matrix with molecules as rows and samples as columns.
+    @param correlation_method: Pearson or Spearman.
+    @return: Standardized matrix.
+    """
+    if correlation_method == CorrelationMethod.SPEARMAN:
+        values = rankdata(values, axis=1)
+
+    values = values - values.mean(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return values / np.sqrt((values ** 2).sum(axis=1, keepdims=True))
+
+
+def __all_vs_all_correlations(genes: np.ndarray, gems: np.ndarray,
+                              is_aborted: AbortEvent) -> Iterator[CorrelationsBlock]:
+    """
+    Computes the correlation between all the genes and all the GEMs as blocked matrix products.
+    @param genes: Standardized genes matrix.
+    @param gems: Standardized GEMs matrix.
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @return: Iterator of blocks of combinations.
+    """
+    rows_per_block = max(1, BLOCK_SIZE // max(1, gems.shape[0]))
+    for start in range(0, genes.shape[0], rows_per_block):
+        check_if_stopped(is_aborted, ExperimentStopped)
+        correlations = genes[start:start + rows_per_block] @ gems.T
+        genes_idx, gems_idx = np.indices(correlations.shape)
+        yield (genes_idx + start).ravel(), gems_idx.ravel(), correlations.ravel()
+
+
+def __pairs_correlations(genes: np.ndarray, gems: np.ndarray, genes_idx: np.ndarray, gems_idx: np.ndarray,
+                         is_aborted: AbortEvent) -> Iterator[CorrelationsBlock]:
+    """
+    Computes the correlation of specific pairs of genes and GEMs.
+    @param genes: Standardized genes matrix.
+    @param gems: Standardized GEMs matrix.
+    @param genes_idx: Gene index of every pair.
+    @param gems_idx: GEM index of every pair.
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @return: Iterator of blocks of combinations.
+    """
+    rows_per_block = max(1, BLOCK_SIZE // max(1, genes.shape[1]))
+    for start in range(0, genes_idx.size, rows_per_block):
+        check_if_stopped(is_aborted, ExperimentStopped)
+        block_genes_idx = genes_idx[start:start + rows_per_block]
+        block_gems_idx = gems_idx[start:start + rows_per_block]
+        correlations = np.einsum('ij,ij->i', genes[block_genes_idx], gems[block_gems_idx])
+        yield block_genes_idx, block_gems_idx, correlations
+
+
+def __matching_correlations(genes: np.ndarray, gems: np.ndarray, genes_names: pd.Index, gems_names: pd.Index,
+                            is_aborted: AbortEvent) -> Iterator[CorrelationsBlock]:
+    """
+    Computes the correlation between every GEM and the genes with the same name (the GEM's gene).
+    @param genes: Standardized genes matrix.
+    @param gems: Standardized GEMs matrix.
+    @param genes_names: Names of the genes' rows.
+    @param gems_names: Names of the GEMs' rows (i.e. their genes).
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @return: Iterator of blocks of combinations.
+    """
+    pairs = pd.DataFrame({'name': genes_names, 'gene_idx': np.arange(genes_names.size)}).merge(
+        pd.DataFrame({'name': gems_names, 'gem_idx': np.arange(gems_names.size)}),
+        on='name'
+    )
+    yield from __pairs_correlations(genes, gems, pairs['gene_idx'].to_numpy(), pairs['gem_idx'].to_numpy(),
+                                    is_aborted)
+
+
+def __get_sketch_basis(genes: np.ndarray, gems: np.ndarray, valid_genes_idx: np.ndarray, valid_gems_idx: np.ndarray,
+                       rank: int) -> np.ndarray:
+    """
+    Gets an orthonormal basis of the samples space with the top right singular vectors of (a random sample of) the rows
+    of both sources, i.e. the directions that capture most of their variance.
+    @param genes: Standardized genes matrix.
+    @param gems: Standardized GEMs matrix.
+    @param valid_genes_idx: Indexes of the non-constant genes.
+    @param valid_gems_idx: Indexes of the non-constant GEMs.
+    @param rank: Number of dimensions of the basis.
+    @return: Matrix of shape (samples, rank) with orthonormal columns.
+    """
+    rng = np.random.default_rng(0)
+    sample = [
+        values[np.sort(rng.choice(valid_idx, min(valid_idx.size, PRESCREEN_SKETCH_SAMPLE_ROWS), replace=False))]
+        for values, valid_idx in ((genes, valid_genes_idx), (gems, valid_gems_idx))
+    ]
+    _, _, right_singular_vectors = np.linalg.svd(np.concatenate(sample).astype(np.float64), full_matrices=False)
+    return right_singular_vectors[:rank].T
+
+
+def __sketch(values: np.ndarray, valid_idx: np.ndarray, basis: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Projects the rows onto the sketch basis (in double precision).
+    @param values: Standardized matrix.
+    @param valid_idx: Indexes of the rows to project.
+    @param basis: Orthonormal basis returned by __get_sketch_basis.
+    @return: Projected rows and the norm of their residuals (the part outside the basis).
+    """
+    projections = np.empty((valid_idx.size, basis.shape[1]))
+    residuals = np.empty(valid_idx.size)
+    rows_per_block = max(1, BLOCK_SIZE // max(1, values.shape[1]))
+    for start in range(0, valid_idx.size, rows_per_block):
+        block = slice(start, start + rows_per_block)
+        rows = values[valid_idx[block]].astype(np.float64)
+        projections[block] = rows @ basis
+        residuals[block] = np.sqrt(np.maximum((rows ** 2).sum(axis=1) - (projections[block] ** 2).sum(axis=1), 0.0))
+    return projections, residuals
+
+
+def __prescreen_blocks(
+        genes: np.ndarray,
+        gems: np.ndarray,
+        correlation_threshold: float,
+        rank: int,
+        residual_factor: float,
+        pruned_histogram: np.ndarray,
+        is_aborted: AbortEvent
+) -> Iterator[CorrelationsBlock]:
+    """
+    Computes the correlation between all the (non-constant) genes and GEMs discarding first the pairs that cannot reach
+    the threshold. Every row is projected onto a low-rank basis of the samples space and, by Cauchy-Schwarz, the
+    correlation of two rows is in the range [a - e1 * e2, a + e1 * e2], being a the dot product of their projections
+    and e1, e2 the norms of their residuals. Only the pairs with |a| + residual_factor * e1 * e2 >= threshold are
+    computed exactly, so with residual_factor = 1 no combination over the threshold is missed. Lower factors discard
+    more pairs (residuals are almost orthogonal in high dimensions) at the cost of missing some of them. The lower
+    bound of the absolute correlation of every discarded pair is counted in pruned_histogram to adjust the p-values.
+    @param genes: Standardized genes matrix.
+    @param gems: Standardized GEMs matrix.
+    @param correlation_threshold: Minimum absolute correlation to keep a combination.
+    @param rank: Number of dimensions of the sketch.
+    @param residual_factor: Factor of the residual bound in the range (0, 1].
+    @param pruned_histogram: Array of PRESCREEN_HISTOGRAM_BINS elements to count the discarded pairs (modified in
+    place).
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @return: Iterator of blocks of combinations that passed the pre-screen.
+    """
+    valid_genes_idx = np.flatnonzero(~np.isnan(genes).any(axis=1))
+    valid_gems_idx = np.flatnonzero(~np.isnan(gems).any(axis=1))
+    if valid_genes_idx.size == 0 or valid_gems_idx.size == 0:
+        return
+
+    basis = __get_sketch_basis(genes, gems, valid_genes_idx, valid_gems_idx, rank)
+    genes_sketch, genes_residuals = __sketch(genes, valid_genes_idx, basis)
+    gems_sketch, gems_residuals = __sketch(gems, valid_gems_idx, basis)
+
+    valid_gems = gems if valid_gems_idx.size == gems.shape[0] else gems[valid_gems_idx]
+    rows_per_block = max(1, BLOCK_SIZE // valid_gems_idx.size)
+    for start in range(0, valid_genes_idx.size, rows_per_block):
+        check_if_stopped(is_aborted, ExperimentStopped)
+        block = slice(start, start + rows_per_block)
+        approximations = np.abs(genes_sketch[block] @ gems_sketch.T)
+        residual_bounds = np.outer(genes_residuals[block], gems_residuals)
+        candidates = approximations + residual_factor * residual_bounds >= correlation_threshold - PRESCREEN_TOLERANCE
+
+        lower_bounds = approximations[~candidates] - residual_bounds[~candidates] - PRESCREEN_TOLERANCE
+        bins = np.clip(lower_bounds * PRESCREEN_HISTOGRAM_BINS, 0, PRESCREEN_HISTOGRAM_BINS - 1).astype(np.int64)
+        pruned_histogram += np.bincount(bins, minlength=PRESCREEN_HISTOGRAM_BINS)
+
+        genes_idx, gems_idx = np.nonzero(candidates)
+        if genes_idx.size > PRESCREEN_DENSE_FRACTION * candidates.size:
+            correlations = genes[valid_genes_idx[block]] @ valid_gems.T
+            yield valid_genes_idx[genes_idx + start], valid_gems_idx[gems_idx], correlations[candidates]
+        else:
+            yield from __pairs_correlations(genes, gems, valid_genes_idx[genes_idx + start], valid_gems_idx[gems_idx],
+                                            is_aborted)
+
+
+def __compute_p_values(correlations: np.ndarray, n_samples: int) -> np.ndarray:
+    """
+    Computes the two-sided p-values of the correlations with a t-test of n_samples - 2 degrees of freedom.
+    @param correlations: Correlations in the range [-1, 1].
+    @param n_samples: Number of samples used to compute the correlations.
+    @return: P-values.
+    """
+    degrees_of_freedom = n_samples - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_statistic = correlations * np.sqrt(degrees_of_freedom / ((1 - correlations) * (1 + correlations)))
+    return 2 * t_distribution.sf(np.abs(t_statistic), degrees_of_freedom)
+
+
+def harmonic_number(n: int) -> float:
+    """Computes 1 + 1/2 + ... + 1/n (with its asymptotic expansion for large values)."""
+    if n <= 10_000_000:
+        return float(np.sum(1.0 / np.arange(1, n + 1)))
+    return float(np.log(n) + np.euler_gamma + 1 / (2 * n) - 1 / (12 * n ** 2))
+
+
+def adjust_p_values(p_values: np.ndarray, adjustment_method: PValuesAdjustmentMethod,
+                    pruned_p_values: Optional[np.ndarray] = None,
+                    pruned_counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Adjusts the p-values for multiple comparisons. Combinations discarded by the pre-screen can be considered as groups
+    of p-values (with their count): as adjusted p-values never decrease when a p-value increases, using upper bounds of
+    the discarded p-values returns adjusted p-values greater than or equal to the exact ones.
+    @param p_values: P-values to adjust.
+    @param adjustment_method: Benjamini-Hochberg, Benjamini-Yekutieli or Bonferroni.
+    @param pruned_p_values: P-values (or upper bounds) of the groups of discarded combinations.
+    @param pruned_counts: Number of discarded combinations of every group.
+    @return: Adjusted p-values (in the same order).
+    """
+    if pruned_p_values is None:
+        pruned_p_values = np.empty(0)
+        pruned_counts = np.empty(0, dtype=np.int64)
+
+    n = p_values.size + int(pruned_counts.sum())
+    if adjustment_method == PValuesAdjustmentMethod.BONFERRONI:
+        return np.minimum(p_values * n, 1.0)
+
+    values = np.concatenate([p_values, pruned_p_values])
+    counts = np.concatenate([np.ones(p_values.size, dtype=np.int64), pruned_counts])
+    order = np.argsort(values, kind='stable')
+    ranks = np.cumsum(counts[order])
+    adjusted_sorted = values[order] * n / ranks
+    if adjustment_method == PValuesAdjustmentMethod.BENJAMINI_YEKUTIELI:
+        adjusted_sorted *= harmonic_number(n)
+
+    # Step-up procedure: every adjusted p-value is the minimum of the ones with greater or equal rank
+    adjusted_sorted = np.minimum.accumulate(adjusted_sorted[::-1])[::-1]
+    adjusted = np.empty(values.size)
+    adjusted[order] = np.minimum(adjusted_sorted, 1.0)
+    return adjusted[:p_values.size]
+
+
+def count_prescreen_discarded_pairs(genes_df: pd.DataFrame, gems_df: pd.DataFrame,
+                                    correlation_method: CorrelationMethod, correlation_threshold: float, rank: int,
+                                    residual_factor: float) -> Tuple[int, int]:
+    """
+    Counts the pairs that the pre-screen of an all-vs-all analysis discards (to benchmark it).
+    @param genes_df: Genes DataFrame with molecules as rows and samples as columns (without NaNs).
+    @param gems_df: GEMs DataFrame with the same samples.
+    @param correlation_method: Pearson or Spearman.
+    @param correlation_threshold: Minimum absolute correlation to keep a combination.
+    @param rank: Number of dimensions of the sketch.
+    @param residual_factor: Factor of the residual bound.
+    @return: Number of discarded pairs and number of pairs that passed the pre-screen.
+    """
+    genes = __standardize(genes_df.to_numpy(dtype=float), correlation_method)
+    gems = __standardize(gems_df.to_numpy(dtype=float), correlation_method)
+    pruned_histogram = np.zeros(PRESCREEN_HISTOGRAM_BINS, dtype=np.int64)
+    n_candidates = sum(correlations.size for _, _, correlations in __prescreen_blocks(
+        genes, gems, correlation_threshold, rank, residual_factor, pruned_histogram, is_aborted=lambda: False
+    ))
+    return int(pruned_histogram.sum()), n_candidates
+
+
+def correlate_in_memory(
+        genes_df: pd.DataFrame,
+        gems_df: pd.DataFrame,
+        correlation_method: CorrelationMethod,
+        correlation_threshold: float,
+        adjustment_method: PValuesAdjustmentMethod,
+        is_all_vs_all: bool,
+        gem_contains_cpg: bool,
+        keep_top_n: Optional[int],
+        use_float32: bool,
+        is_aborted: AbortEvent,
+        prescreen_rank: Optional[int] = None,
+        prescreen_residual_factor: float = 1.0
+) -> Tuple[List[ggca.CorResult], int, int]:
+    """
+    Computes the same analysis as GGCA (Pearson or Spearman) in memory with NumPy. Combinations with undefined
+    correlation (constant rows) are not evaluated. The p-values are adjusted considering all the evaluated combinations.
+    @param genes_df: Genes DataFrame with molecules as rows and samples as columns (without NaNs).
+    @param gems_df: GEMs DataFrame with the same samples. If gem_contains_cpg is True, its index contains the genes and
+    the first column the CpG Site IDs.
+    @param correlation_method: Pearson or Spearman.
+    @param correlation_threshold: Minimum absolute correlation to keep a combination.
+    @param adjustment_method: P-values adjustment method.
+    @param is_all_vs_all: True to evaluate all the genes with all the GEMs. Otherwise only matching genes/GEMs are
+    evaluated.
+    @param gem_contains_cpg: True to indicate that the first column in GEM dataset contains CpG Site IDs.
+    @param keep_top_n: To truncate results. None to keep all the resulting combinations.
+    @param use_float32: True to compute the matrix products in single precision (faster, less memory).
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @param prescreen_rank: If not None, the pairs of an all-vs-all analysis that cannot reach the threshold are
+    discarded with a sketch of this rank before computing them (see __prescreen_blocks). The discarded pairs are
+    considered as evaluated, and their p-values are bounded to adjust the rest of them conservatively. The evaluated
+    combinations under the threshold are also counted in the histogram instead of keeping their p-values, so the
+    memory does not grow with the number of combinations.
+    @param prescreen_residual_factor: Factor of the residual bound of the pre-screen. 1 to only discard the pairs that
+    provably cannot reach the threshold.
+    @return: A tuple with a list of CorResult (as GGCA), the number of combinations before truncating by 'keep_top_n'
+    parameter and the number of combinations evaluated.
+    """
+    cpg_site_ids: Optional[np.ndarray] = gems_df.iloc[:, 0].to_numpy(dtype=str) if gem_contains_cpg else None
+    gems_values_df = gems_df.iloc[:, 1:] if gem_contains_cpg else gems_df
+    n_samples = genes_df.shape[1]
+
+    dtype = np.float32 if use_float32 else np.float64
+    genes = __standardize(genes_df.to_numpy(dtype=float), correlation_method).astype(dtype)
+    gems = __standardize(gems_values_df.to_numpy(dtype=float), correlation_method).astype(dtype)
+
+    pruned_histogram = np.zeros(PRESCREEN_HISTOGRAM_BINS, dtype=np.int64)
+    use_prescreen = is_all_vs_all and prescreen_rank is not None
+    if use_prescreen:
+        blocks = __prescreen_blocks(genes, gems, correlation_threshold, prescreen_rank, prescreen_residual_factor,
+                                    pruned_histogram, is_aborted)
+    elif is_all_vs_all:
+        blocks = __all_vs_all_correlations(genes, gems, is_aborted)
+    else:
+        blocks = __matching_correlations(genes, gems, genes_df.index, gems_df.index, is_aborted)
+
+    # Keeps only the combinations over the threshold. The p-values of the rest are only needed to adjust the kept ones:
+    # they are kept for the exact adjustment, or counted in the histogram in pre-screened (huge) analyses
+    under_threshold_p_values: List[np.ndarray] = []
+    kept: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+    n_evaluated = 0
+    evaluated_histogram = np.zeros(PRESCREEN_HISTOGRAM_BINS, dtype=np.int64)
+    for genes_idx, gems_idx, correlations in blocks:
+        valid = ~np.isnan(correlations)
+        genes_idx, gems_idx = genes_idx[valid], gems_idx[valid]
+        correlations = np.clip(correlations[valid].astype(np.float64), -1.0, 1.0)
+
+        over_threshold = np.abs(correlations) >= correlation_threshold
+        over_correlations = correlations[over_threshold]
+        kept.append((genes_idx[over_threshold], gems_idx[over_threshold], over_correlations,
+                     __compute_p_values(over_correlations, n_samples)))
+
+        under_correlations = correlations[~over_threshold]
+        if use_prescreen:
+            bins = np.minimum(np.abs(under_correlations) * PRESCREEN_HISTOGRAM_BINS,
+                              PRESCREEN_HISTOGRAM_BINS - 1).astype(np.int64)
+            evaluated_histogram += np.bincount(bins, minlength=PRESCREEN_HISTOGRAM_BINS)
+        else:
+            under_threshold_p_values.append(__compute_p_values(under_correlations, n_samples))
+        n_evaluated += correlations.size
+
+    n_pruned = int(pruned_histogram.sum())
+    if use_prescreen:
+        logging.warning(f'Pre-screen discarded {n_pruned} of {n_evaluated + n_pruned} combinations')
+
+    if n_evaluated == 0:
+        return [], 0, n_pruned
+
+    # For a fixed number of samples the p-value decreases with the absolute correlation, so the combinations counted
+    # in a bin are represented by the p-value of its lower edge (an upper bound of all of them)
+    check_if_stopped(is_aborted, ExperimentStopped)
+    histogram = pruned_histogram + evaluated_histogram
+    histogram_bins = np.flatnonzero(histogram)
+    other_p_values = np.concatenate(under_threshold_p_values + [
+        __compute_p_values(histogram_bins / PRESCREEN_HISTOGRAM_BINS, n_samples)
+    ])
+    other_counts = np.concatenate([np.ones(other_p_values.size - histogram_bins.size, dtype=np.int64),
+                                   histogram[histogram_bins]])
+
+    genes_idx, gems_idx, correlations, p_values = (np.concatenate(values) for values in zip(*kept))
+    adjusted_p_values = adjust_p_values(p_values, adjustment_method, other_p_values, other_counts)
+    total_row_count = correlations.size
+
+    # Keeps the combinations with the highest absolute correlation
+    if keep_top_n is not None and total_row_count > keep_top_n:
+        top_idx = np.argpartition(-np.abs(correlations), keep_top_n - 1)[:keep_top_n]
+        genes_idx, gems_idx, correlations, p_values, adjusted_p_values = (
+            genes_idx[top_idx], gems_idx[top_idx], correlations[top_idx], p_values[top_idx],
+            adjusted_p_values[top_idx]
+        )
+
+    genes_names = genes_df.index.to_numpy(dtype=str)
+    gems_names = gems_df.index.to_numpy(dtype=str)
+    result = [
+        ggca.CorResult(
+            gene=genes_names[gene_idx],
+            gem=gems_names[gem_idx],
+            cpg_site_id=cpg_site_ids[gem_idx] if cpg_site_ids is not None else None,
+            correlation=float(correlation),
+            p_value=float(p_value),
+            adjusted_p_value=float(adjusted_p_value)
+        )
+        for gene_idx, gem_idx, correlation, p_value, adjusted_p_value in zip(genes_idx, gems_idx, correlations,
+                                                                             p_values, adjusted_p_values)
+    ]
+
+    return result, total_row_count, n_evaluated + n_pruned
@@ -0,0 +1,84 @@
+from django.db import connection
+
+# Combination tables. They are partitioned by LIST (experiment_id) with one partition by Experiment, so the result of
+# an experiment is queried from (and dropped with) a single table
+COMBINATIONS_TABLES = ['gene_mirna_combination', 'gene_cna_combination', 'gene_methylation_combination']
+
+
+def get_partition_name(table_name: str, experiment_pk: int) -> str:
+    """
+    Gets the name of the partition of a combinations table which stores the result of an experiment.
+    @param table_name: Combinations table name.
+    @param experiment_pk: Experiment's PK.
+    @return: Partition table name.
+    """
+    return f'{table_name}_{int(experiment_pk)}'
+
+
+def __is_attached(cursor, partition_name: str) -> bool:
+    """Checks if a partition table exists and is attached to its combinations table."""
+    cursor.execute('SELECT EXISTS(SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s))', [partition_name])
+    return cursor.fetchone()[0]
+
+
+def create_combinations_partition(table_name: str, experiment_pk: int):
+    """
+    Creates the partition of a combinations table for an experiment (if it doesn't exist). It's created as a standalone
+    table and then attached, as ATTACH PARTITION doesn't block the queries (nor the inserts) over the rest of the
+    partitions as CREATE TABLE ... PARTITION OF does. It must be called right before inserting the combinations and
+    outside any transaction (i.e. not when the experiment is created), as the combinations table is locked against
+    other attachments and detachments until the end of the transaction.
+    @param table_name: Combinations table name.
+    @param experiment_pk: Experiment's PK.
+    """
+    partition_name = get_partition_name(table_name, experiment_pk)
+    with connection.cursor() as cursor:
+        if __is_attached(cursor, partition_name):
+            return
+
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {partition_name} (LIKE {table_name} INCLUDING DEFAULTS)')
+        cursor.execute(f'ALTER TABLE {table_name} ATTACH PARTITION {partition_name} '
+                       f'FOR VALUES IN ({int(experiment_pk)})')
+
+
+def truncate_combinations_partition(table_name: str, experiment_pk: int):
+    """
+    Removes all the combinations of an experiment (e.g. the ones inserted by a previous interrupted attempt) in
+    constant time.
+    @param table_name: Combinations table name.
+    @param experiment_pk: Experiment's PK.
+    """
+    partition_name = get_partition_name(table_name, experiment_pk)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [partition_name])
+        if cursor.fetchone()[0]:
+            cursor.execute(f'TRUNCATE {partition_name}')
+
+
+def detach_combinations_partition(table_name: str, experiment_pk: int):
+    """
+    Detaches the partition of an experiment from its combinations table without blocking the queries over the rest of
+    the partitions, so the (standalone) table can be dropped later. DETACH PARTITION CONCURRENTLY can't run inside a
+    transaction, so in that case nothing is done and the partition is dropped directly (locking the combinations table
+    until the end of the transaction).
+    @param table_name: Combinations table name.
+    @param experiment_pk: Experiment's PK.
+    """
+    if connection.in_atomic_block:
+        return
+
+    partition_name = get_partition_name(table_name, experiment_pk)
+    with connection.cursor() as cursor:
+        if __is_attached(cursor, partition_name):
+            cursor.execute(f'ALTER TABLE {table_name} DETACH PARTITION {partition_name} CONCURRENTLY')
+
+
+def drop_combinations_partition(table_name: str, experiment_pk: int):
+    """
+    Drops the partition (attached or not) with all the combinations of an experiment in constant time.
+    @param table_name: Combinations table name.
+    @param experiment_pk: Experiment's PK.
+    """
+    partition_name = get_partition_name(table_name, experiment_pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {partition_name}')
@@ -11,7 +11,9 @@ import numpy as np
 import pandas as pd
 from django.conf import settings
 from django.db import connection
+from django.db.models import F, ExpressionWrapper, FloatField
 
+from common.checkpoints import TaskCheckpoint
 from common.constants import GEM_INDEX_NAME
 from common.functions import check_if_stopped
 from common.methylation import get_cpg_from_cpg_format_gem, get_gene_from_cpg_format_gem, \
@@ -20,6 +22,17 @@ from common.typing import AbortEvent
 from .exceptions import NoSamplesInCommon, ExperimentStopped, ExperimentFailed
 from .models import ExperimentSource, Experiment, GeneGEMCombination
 from .models_choices import CorrelationMethod, PValuesAdjustmentMethod
+from .numpy_correlation_service import correlate_in_memory
+from .partitions_service import create_combinations_partition, truncate_combinations_partition, get_partition_name
+
+# Stages of the correlation analyses stored in the task checkpoint (see settings.TASKS_CHECKPOINTS_DIR)
+COMMON_SAMPLES_STAGE = 'common_samples'
+PREPARED_DATASETS_STAGE = 'prepared_datasets'
+ENGINE_OUTPUT_STAGE = 'engine_output'
+PERSISTED_RESULT_STAGE = 'persisted_result'
+
+# Fields of the GGCA's CorResult to store the engine output in a checkpoint
+COR_RESULT_FIELDS = ['gene', 'gem', 'cpg_site_id', 'correlation', 'p_value', 'adjusted_p_value']
 
 
 def __get_correlation_method(value: CorrelationMethod) -> ggca.CorrelationMethod:
@@ -93,6 +106,22 @@ def __run_ggca(
     )
 
 
+def get_gem_row_identifier(gem: str, gem_platform: Optional[pd.DataFrame]) -> str:
+    """
+    Gets the identifier of a GEM's row in its source. GEMs of Methylation sources with CpG Site IDs are stored in the
+    results with the <gene> (<CpG>) format
+    @param gem: GEM of a combination
+    @param gem_platform: Methylation platform of the GEM source (None if there was no CpG mapping)
+    @return: Row's identifier in the GEM source
+    """
+    try:
+        return gem if gem_platform is None else get_cpg_from_cpg_format_gem(gem)
+    except KeyError:
+        # If KeyError is thrown is because user marked incorrectly the dataset as one that contains
+        # CpG Site IDs instead of Genes
+        return get_gene_from_cpg_format_gem(gem)
+
+
 def get_valid_data_from_sources(
         experiment: Experiment,
         gene_index: str,
@@ -131,13 +160,7 @@ def get_valid_data_from_sources(
     )
 
     # Checks if it's needed to parse the GEM (maybe is in <gene> (<CpG>) format)
-    gem_platform = gem_source.get_methylation_platform_df()
-    try:
-        gem_index = gem_index if gem_platform is None else get_cpg_from_cpg_format_gem(gem_index)
-    except KeyError:
-        # If KeyError is thrown is because user marked incorrectly the dataset as one that contains
-        # CpG Site IDs instead of Genes
-        gem_index = get_gene_from_cpg_format_gem(gem_index)
+    gem_index = get_gem_row_identifier(gem_index, gem_source.get_methylation_platform_df())
 
     # Retrieves specific row and the in common columns
     gene_values = gene_source.get_specific_row_and_columns(gene_index, idx_common_df1)
@@ -294,9 +317,9 @@ def __prepare_df(
     # TODO: implement in frontend to be selectable by row or column, for the moment only rows
     df = df.dropna(axis=0)
 
-    # Filter by Standard Deviation normalized (if needed)
+    # Filter by Standard Deviation normalized (if needed). Uses the sample std as the RowStatistics
     if minimum_std:
-        standard_deviation = df.std(axis=1)  # TODO: check ddof
+        standard_deviation = df.std(axis=1, ddof=1)
         # TODO: analyze if correspond to normalize in [0 - 1] range!!!
         # minimum = standard_deviation.min()
         # normalized = (standard_deviation - minimum) / (standard_deviation.max() - minimum)
@@ -352,35 +375,113 @@ def __save_result_in_db(combinations: List[ggca.CorResult], experiment: Experime
         logging.warning(f'INSERT execution time -> {time.time() - start} seconds')
 
 
+def __get_candidate_rows(source: ExperimentSource, n_common_samples: int, minimum_std: float) -> Optional[List[str]]:
+    """
+    Gets, from the RowStatistics computed at upload/synchronization time, the rows of a source that could pass the NaN
+    and std filters of __prepare_df, so the rest of them are not read. As the statistics are computed over all the
+    samples of the dataset, a row is discarded only if it has more NaNs than the not common samples or if the upper
+    bound of its std in the common samples (std * sqrt((n_valid - 1) / (n_common_samples - 1)), being n_valid the
+    number of non-NaN values of the row) is below minimum_std. The candidate rows are filtered by __prepare_df anyway.
+    @param source: Experiment's source.
+    @param n_common_samples: Number of samples in common between both sources.
+    @param minimum_std: Minimum standard deviation of the source's rows.
+    @return: List of candidate rows. None if all the rows must be read (there are no statistics for the source, or all
+    of them are candidates).
+    """
+    dataset = source.get_valid_source()
+    statistics = dataset.row_statistics.all()
+    n_rows = statistics.count()
+    if n_rows == 0 or n_common_samples < 2:
+        return None
+
+    # Rows need a non-NaN value for every common sample
+    n_samples = dataset.number_of_samples
+    candidates = statistics.filter(nan_count__lte=n_samples - n_common_samples)
+
+    if minimum_std:
+        # Compares squared values to prevent computing square roots in the DB. The tolerance prevents rounding errors
+        # from discarding rows in the limit
+        max_sum_of_squares = ExpressionWrapper(F('std') * F('std') * (n_samples - 1 - F('nan_count')),
+                                               output_field=FloatField())
+        min_sum_of_squares = (minimum_std ** 2) * (n_common_samples - 1) * (1 - 1e-9)
+        candidates = candidates.annotate(max_sum_of_squares=max_sum_of_squares).filter(
+            max_sum_of_squares__gte=min_sum_of_squares
+        )
+
+    rows: List[str] = list(candidates.values_list('row', flat=True))
+    logging.warning(f'{n_rows - len(rows)} of {n_rows} rows of dataset "{dataset}" discarded by their statistics')
+    if len(rows) == n_rows:
+        return None
+
+    # Removes duplicated rows keeping the order
+    return list(dict.fromkeys(rows))
+
+
+def __get_clean_chunks(
+        source: ExperimentSource,
+        common_samples: np.ndarray,
+        minimum_std: float,
+        index: str,
+        gem_platform_df: Optional[pd.DataFrame]
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads the source in chunks keeping only the common samples and the rows that pass the NaN and std filters
+    @param source: Experiment's source to retrieve data in chunks
+    @param common_samples: Common samples to filter and prepare dataset
+    @param minimum_std: Minimum standard deviation of the source's rows
+    @param index: Index to apply to the DataFrame to prevent some errors in Pandas
+    @param gem_platform_df: Methylation platform to map CpG Site IDs to genes. None if no mapping is needed
+    @return: Iterator of clean chunks
+    """
+    # Only reads the rows that could pass the filters
+    rows = __get_candidate_rows(source, common_samples.size, minimum_std)
+
+    for chunk in source.get_df_in_chunks(rows=rows):
+        chunk = __prepare_df(chunk, minimum_std, common_samples, index)
+
+        # CpG Site IDs mapping
+        if gem_platform_df is not None:
+            chunk = map_cpg_to_genes_df(chunk, gem_platform_df)
+
+        yield chunk
+
+
+def __get_gem_platform_df(experiment: Experiment, check_cpg_platform: bool) -> Optional[pd.DataFrame]:
+    """
+    Gets the Methylation platform to map the CpG Site IDs of the GEM source (if needed)
+    @param experiment: Experiment to retrieve the GEM source
+    @param check_cpg_platform: True to check if CpG mapping is needed (only applies for GEM in case of Methylation)
+    @return: Platform DataFrame or None if no mapping is needed
+    """
+    return None if not check_cpg_platform else experiment.gem_source.get_methylation_platform_df()
+
+
 def __generate_clean_temp_file(
         source: ExperimentSource,
         common_samples: np.ndarray,
         experiment: Experiment,
+        minimum_std: float,
         index: str,
         check_cpg_platform: bool,
+        file_path: Optional[str] = None
 ) -> Tuple[IO, int, bool]:
     """
     Creates a NamedTemporaryFile and adds all the information of source with needed format for Rust library (GGCA)
     @param source: Experiment's source to retrieve data in chunks
     @param common_samples: Common samples to filter and prepare dataset
     @param experiment: Experiment to retrieve some information
+    @param minimum_std: Minimum standard deviation of the source's rows
     @param index: Index to apply to the DataFrame to prevent some errors in Pandas
     @param check_cpg_platform: True to check if CpG mapping is needed (only applies for GEM in case of Methylation)
+    @param file_path: Path of the file to write (e.g. inside the task checkpoint) instead of a NamedTemporaryFile
     @return: Temp file object, number of rows saved in it and a boolean value indicating if there was CpG mapping
     """
-    # Checks if CpG Site ID mapping is needed
-    gem_platform_df = None if not check_cpg_platform else experiment.gem_source.get_methylation_platform_df()
+    gem_platform_df = __get_gem_platform_df(experiment, check_cpg_platform)
 
     # Delete is set to False to prevent errors in Rust
-    temp_file = tempfile.NamedTemporaryFile(mode='a', delete=False)
+    temp_file = tempfile.NamedTemporaryFile(mode='a', delete=False) if file_path is None else open(file_path, 'w')
     number_of_rows = 0
-    for chunk in source.get_df_in_chunks():
-        chunk = __prepare_df(chunk, experiment.minimum_std_gene, common_samples, index)
-
-        # CpG Site IDs mapping
-        if gem_platform_df is not None:
-            chunk = map_cpg_to_genes_df(chunk, gem_platform_df)
-
+    for chunk in __get_clean_chunks(source, common_samples, minimum_std, index, gem_platform_df):
         chunk.to_csv(temp_file, header=temp_file.tell() == 0, sep='\t', decimal='.', lineterminator='\n')
         number_of_rows += chunk.shape[0]
 
@@ -388,6 +489,80 @@ def __generate_clean_temp_file(
     return temp_file, number_of_rows, gem_platform_df is not None
 
 
+def __get_clean_df(
+        source: ExperimentSource,
+        common_samples: np.ndarray,
+        experiment: Experiment,
+        minimum_std: float,
+        index: str,
+        check_cpg_platform: bool,
+) -> Tuple[pd.DataFrame, bool]:
+    """
+    Same as __generate_clean_temp_file but keeping the clean source in memory (for the NumPy correlation engine)
+    @param source: Experiment's source to retrieve data in chunks
+    @param common_samples: Common samples to filter and prepare dataset
+    @param experiment: Experiment to retrieve some information
+    @param minimum_std: Minimum standard deviation of the source's rows
+    @param index: Index to apply to the DataFrame to prevent some errors in Pandas
+    @param check_cpg_platform: True to check if CpG mapping is needed (only applies for GEM in case of Methylation)
+    @return: Clean DataFrame and a boolean value indicating if there was CpG mapping
+    """
+    gem_platform_df = __get_gem_platform_df(experiment, check_cpg_platform)
+    chunks = list(__get_clean_chunks(source, common_samples, minimum_std, index, gem_platform_df))
+    df = pd.concat(chunks) if chunks else pd.DataFrame(columns=common_samples)
+    return df, gem_platform_df is not None
+
+
+def get_clean_subsample(
+        source: ExperimentSource,
+        common_samples: np.ndarray,
+        experiment: Experiment,
+        index: str,
+        check_cpg_platform: bool,
+        fraction: float,
+        time_limit: float
+) -> Tuple[pd.DataFrame, int, bool]:
+    """
+    Reads a random fraction of the rows of a source with the same cleaning as the analyses (except the std filter). If
+    the source has RowStatistics only the sampled rows are read, otherwise every read chunk is sampled
+    @param source: Experiment's source to retrieve data in chunks
+    @param common_samples: Samples to keep
+    @param experiment: Experiment to retrieve some information
+    @param index: Index to apply to the DataFrame to prevent some errors in Pandas
+    @param check_cpg_platform: True to check if CpG mapping is needed (only applies for GEM in case of Methylation)
+    @param fraction: Fraction of the rows to read
+    @param time_limit: Time (as returned by time.time()) from which no more chunks are read
+    @return: Clean DataFrame, number of rows sampled (before cleaning) and a boolean value indicating if there was CpG
+    mapping
+    """
+    gem_platform_df = __get_gem_platform_df(experiment, check_cpg_platform)
+    rng = np.random.default_rng(0)
+
+    rows: Optional[List[str]] = None
+    if fraction < 1:
+        all_rows = list(source.get_valid_source().row_statistics.values_list('row', flat=True))
+        if all_rows:
+            rows = list(rng.choice(all_rows, size=max(1, round(len(all_rows) * fraction)), replace=False))
+
+    chunks: List[pd.DataFrame] = []
+    number_of_sampled_rows = 0
+    for chunk in source.get_df_in_chunks(rows=rows):
+        if rows is None and fraction < 1:
+            chunk = chunk.sample(frac=fraction, random_state=rng)
+        number_of_sampled_rows += chunk.shape[0]
+
+        chunk = __prepare_df(chunk, 0.0, common_samples, index)
+        if gem_platform_df is not None:
+            chunk = map_cpg_to_genes_df(chunk, gem_platform_df)
+        chunks.append(chunk)
+
+        if time.time() > time_limit:
+            break
+
+    df = pd.concat(chunks) if chunks else pd.DataFrame(columns=common_samples)
+    return df, number_of_sampled_rows, gem_platform_df is not None
+
+
 def __concatenate_gene_and_cpg_as_gem(combinations: List[ggca.CorResult]) -> List[ggca.CorResult]:
     """
     Concatenates Gene and CpG Site ID for methylation results
@@ -399,6 +574,29 @@ def __concatenate_gene_and_cpg_as_gem(combinations: List[ggca.CorResult]) -> Lis
     return combinations
 
 
+def __combinations_to_df(combinations: List[ggca.CorResult]) -> pd.DataFrame:
+    """
+    Converts the engine output to a DataFrame to be stored in a checkpoint (GGCA's CorResult can't be pickled)
+    @param combinations: List of analysis result combinations
+    @return: DataFrame with a column for every CorResult field
+    """
+    return pd.DataFrame([[getattr(combination, field) for field in COR_RESULT_FIELDS] for combination in combinations],
+                        columns=COR_RESULT_FIELDS)
+
+
+def __df_to_combinations(df: pd.DataFrame) -> List[ggca.CorResult]:
+    """
+    Converts back a DataFrame generated by __combinations_to_df to the engine output
+    @param df: DataFrame with a column for every CorResult field
+    @return: List of analysis result combinations
+    """
+    return [
+        ggca.CorResult(gene=row.gene, gem=row.gem, cpg_site_id=row.cpg_site_id, correlation=row.correlation,
+                       p_value=row.p_value, adjusted_p_value=row.adjusted_p_value)
+        for row in df.itertuples(index=False)
+    ]
+
+
 def __should_collect_gem_dataset(gem_file_path: str) -> Optional[bool]:
     """
     Check if GEM dataset should be allocated to get the best analysis performance or, on the other hand, be computed
@@ -415,41 +613,148 @@ def __should_collect_gem_dataset(gem_file_path: str) -> Optional[bool]:
     return size_in_mb <= size_threshold_mb
 
 
-def __compute_correlation_and_p_values(
+def __should_use_numpy_engine(experiment: Experiment) -> bool:
+    """
+    Checks if the correlation analysis must be computed in memory with NumPy instead of GGCA. In 'auto' mode (see
+    settings.CORRELATION_ENGINE) it's used if the number of combinations to evaluate (estimated with the number of rows
+    of the sources) is not greater than settings.NUMPY_CORRELATION_MAX_COMBINATIONS. Kendall is only supported by GGCA
+    @param experiment: Experiment to compute
+    @return: True to use the NumPy engine, False to use GGCA
+    """
+    if experiment.correlation_method == CorrelationMethod.KENDALL or settings.CORRELATION_ENGINE == 'ggca':
+        return False
+
+    if settings.CORRELATION_ENGINE == 'numpy':
+        return True
+
+    n_genes = experiment.mRNA_source.number_of_rows
+    n_gems = experiment.gem_source.number_of_rows
+    n_combinations = n_genes * n_gems if experiment.correlate_with_all_genes else max(n_genes, n_gems)
+    return n_combinations <= settings.NUMPY_CORRELATION_MAX_COMBINATIONS
+
+
+def __should_prescreen(experiment: Experiment) -> bool:
+    """
+    Checks if the correlation analysis must be computed with the NumPy engine discarding first the pairs that cannot
+    reach the threshold (see settings.CORRELATION_PRESCREEN_MIN_COMBINATIONS). Only applies to all-vs-all Pearson and
+    Spearman analyses whose datasets fit in memory (see settings.CORRELATION_PRESCREEN_MAX_VALUES)
+    @param experiment: Experiment to compute
+    @return: True to use the pre-screen, False otherwise
+    """
+    min_combinations = settings.CORRELATION_PRESCREEN_MIN_COMBINATIONS
+    if not min_combinations or settings.CORRELATION_ENGINE == 'ggca' or not experiment.correlate_with_all_genes \
+            or experiment.correlation_method == CorrelationMethod.KENDALL \
+            or not experiment.minimum_coefficient_threshold:
+        return False
+
+    n_genes = experiment.mRNA_source.number_of_rows
+    n_gems = experiment.gem_source.number_of_rows
+    if n_genes * n_gems <= min_combinations:
+        return False
+
+    # The samples in common are at most the samples of the smallest dataset
+    n_samples = min(experiment.mRNA_source.number_of_samples, experiment.gem_source.number_of_samples)
+    if (n_genes + n_gems) * n_samples > settings.CORRELATION_PRESCREEN_MAX_VALUES:
+        logging.warning(f'Experiment {experiment.pk} is too big to be pre-screened in memory, GGCA is used instead')
+        return False
+
+    return True
+
+
+def __compute_with_numpy(
         experiment: Experiment,
         common_samples: np.ndarray,
-        combination_class: Type[GeneGEMCombination],
         result_limit_row_count: Optional[int],
-        is_aborted: AbortEvent
-) -> Tuple[int, int]:
+        is_aborted: AbortEvent,
+        checkpoint: Optional[TaskCheckpoint]
+) -> Tuple[List[ggca.CorResult], int, int, bool]:
     """
-    Compute Pearson correlation splitting DataFrames in chunks to avoid memory errors
-    @param experiment: Experiment to compute in chunks
+    Computes the correlation analysis in memory with NumPy
+    @param experiment: Experiment to compute
     @param common_samples: Numpy array with the samples in common
-    @param combination_class: Model class to create the bulk and insert
-    @param result_limit_row_count: Number of combinations to keep. If None, all combinations will be kept.
-    @param is_aborted: Method to call to check if the experiment has been stopped.
-    @return Number of evaluated combinations
+    @param result_limit_row_count: Number of combinations to keep. If None, all combinations will be kept
+    @param is_aborted: Method to call to check if the experiment has been stopped
+    @param checkpoint: Task checkpoint to store/resume the prepared datasets. None if checkpoints are disabled
+    @return: Resulting combinations, number of combinations before truncating, number of evaluated combinations and
+    a boolean value indicating if there was CpG mapping
     """
-    # Parameters to make the insert query
-    table_name = combination_class._meta.db_table
+    check_if_stopped(is_aborted, ExperimentStopped)
+    prepared_datasets = checkpoint.load(PREPARED_DATASETS_STAGE) if checkpoint is not None else None
+    if prepared_datasets is None:
+        genes_df, _ = __get_clean_df(experiment.mRNA_source, common_samples, experiment, experiment.minimum_std_gene,
+                                     'geneID', check_cpg_platform=False)
+        gems_df, is_cpg_analysis = __get_clean_df(experiment.gem_source, common_samples, experiment,
+                                                  experiment.minimum_std_gem, GEM_INDEX_NAME, check_cpg_platform=True)
+        if checkpoint is not None:
+            checkpoint.save(PREPARED_DATASETS_STAGE, (genes_df, gems_df, is_cpg_analysis))
+    else:
+        genes_df, gems_df, is_cpg_analysis = prepared_datasets
 
-    # Generates temp files to be consumed by Rust
     check_if_stopped(is_aborted, ExperimentStopped)
-    mrna_temp_file, mrna_number_of_rows, _ = __generate_clean_temp_file(experiment.mRNA_source, common_samples,
-                                                                        experiment, 'geneID',
-                                                                        check_cpg_platform=False)
-    gem_temp_file, gem_number_of_rows, is_cpg_analysis = __generate_clean_temp_file(
-        experiment.gem_source,
-        common_samples,
-        experiment,
-        GEM_INDEX_NAME,
-        check_cpg_platform=True
+    result_combinations, total_row_count, number_of_evaluated_combinations = correlate_in_memory(
+        genes_df,
+        gems_df,
+        correlation_method=experiment.correlation_method,
+        correlation_threshold=experiment.minimum_coefficient_threshold,
+        adjustment_method=experiment.p_values_adjustment_method,
+        is_all_vs_all=experiment.correlate_with_all_genes,
+        gem_contains_cpg=is_cpg_analysis,
+        keep_top_n=result_limit_row_count,
+        use_float32=settings.NUMPY_CORRELATION_FLOAT32,
+        is_aborted=is_aborted,
+        prescreen_rank=settings.CORRELATION_PRESCREEN_RANK if __should_prescreen(experiment) else None,
+        prescreen_residual_factor=settings.CORRELATION_PRESCREEN_RESIDUAL_FACTOR
     )
+    return result_combinations, total_row_count, number_of_evaluated_combinations, is_cpg_analysis
+
+
+def __compute_with_ggca(
+        experiment: Experiment,
+        common_samples: np.ndarray,
+        result_limit_row_count: Optional[int],
+        is_aborted: AbortEvent,
+        checkpoint: Optional[TaskCheckpoint]
+) -> Tuple[List[ggca.CorResult], int, int, bool]:
+    """
+    Computes the correlation analysis with GGCA through temp files
+    @param experiment: Experiment to compute
+    @param common_samples: Numpy array with the samples in common
+    @param result_limit_row_count: Number of combinations to keep. If None, all combinations will be kept
+    @param is_aborted: Method to call to check if the experiment has been stopped
+    @param checkpoint: Task checkpoint to store/resume the prepared files. None if checkpoints are disabled
+    @return: Resulting combinations, number of combinations before truncating, number of evaluated combinations and
+    a boolean value indicating if there was CpG mapping
+    """
+    # Generates temp files to be consumed by Rust (inside the checkpoint folder to be reused if the task is retried)
+    check_if_stopped(is_aborted, ExperimentStopped)
+    prepared_datasets = checkpoint.load(PREPARED_DATASETS_STAGE) if checkpoint is not None else None
+    if prepared_datasets is None:
+        mrna_temp_file, mrna_number_of_rows, _ = __generate_clean_temp_file(
+            experiment.mRNA_source,
+            common_samples,
+            experiment,
+            experiment.minimum_std_gene,
+            'geneID',
+            check_cpg_platform=False,
+            file_path=checkpoint.get_file_path('mrna.tsv') if checkpoint is not None else None
+        )
+        gem_temp_file, gem_number_of_rows, is_cpg_analysis = __generate_clean_temp_file(
+            experiment.gem_source,
+            common_samples,
+            experiment,
+            experiment.minimum_std_gem,
+            GEM_INDEX_NAME,
+            check_cpg_platform=True,
+            file_path=checkpoint.get_file_path('gem.tsv') if checkpoint is not None else None
+        )
+        mrna_file_path = mrna_temp_file.name
+        gem_file_path = gem_temp_file.name
+        if checkpoint is not None:
+            checkpoint.save(PREPARED_DATASETS_STAGE, (mrna_file_path, gem_file_path, is_cpg_analysis))
+    else:
+        mrna_file_path, gem_file_path, is_cpg_analysis = prepared_datasets
 
     # Computes correlation, p_values and adjusted_p_values
-    mrna_file_path = mrna_temp_file.name
-    gem_file_path = gem_temp_file.name
 
     # Checks if it should collect GEM dataset in memory
     collect_gem_dataset = __should_collect_gem_dataset(gem_file_path)
@@ -478,34 +783,115 @@ def __compute_correlation_and_p_values(
             logging.exception(ex)
             raise ExperimentFailed
 
+    # Deletes temp files (the ones in the checkpoint folder are removed with it)
+    if checkpoint is None:
+        os.unlink(mrna_file_path)
+        os.unlink(gem_file_path)
+
     result_combinations, total_row_count, number_of_evaluated_combinations = analysis_result
+    return result_combinations, total_row_count, number_of_evaluated_combinations, is_cpg_analysis
+
+
+def __compute_correlation_and_p_values(
+        experiment: Experiment,
+        common_samples: np.ndarray,
+        combination_class: Type[GeneGEMCombination],
+        result_limit_row_count: Optional[int],
+        is_aborted: AbortEvent,
+        checkpoint: Optional[TaskCheckpoint]
+) -> Tuple[int, int]:
+    """
+    Compute Pearson correlation splitting DataFrames in chunks to avoid memory errors
+    @param experiment: Experiment to compute in chunks
+    @param common_samples: Numpy array with the samples in common
+    @param combination_class: Model class to create the bulk and insert
+    @param result_limit_row_count: Number of combinations to keep. If None, all combinations will be kept.
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @param checkpoint: Task checkpoint to store/resume every stage. None if checkpoints are disabled.
+    @return Number of evaluated combinations
+    """
+    # Parameters to make the insert query
+    table_name = combination_class._meta.db_table
+
+    # Computes correlation, p_values and adjusted_p_values with the corresponding engine
+    engine_output = checkpoint.load(ENGINE_OUTPUT_STAGE) if checkpoint is not None else None
+    if engine_output is None:
+        if __should_prescreen(experiment) or __should_use_numpy_engine(experiment):
+            logging.warning(f'Computing experiment {experiment.pk} with the NumPy engine')
+            compute_function = __compute_with_numpy
+        else:
+            compute_function = __compute_with_ggca
+        result_combinations, total_row_count, number_of_evaluated_combinations, is_cpg_analysis = compute_function(
+            experiment,
+            common_samples,
+            result_limit_row_count,
+            is_aborted,
+            checkpoint
+        )
+
+        if checkpoint is not None:
+            check_if_stopped(is_aborted, ExperimentStopped)
+            checkpoint.save(ENGINE_OUTPUT_STAGE, (__combinations_to_df(result_combinations), total_row_count,
+                                                  number_of_evaluated_combinations, is_cpg_analysis))
+    else:
+        result_df, total_row_count, number_of_evaluated_combinations, is_cpg_analysis = engine_output
+        result_combinations = __df_to_combinations(result_df)
 
     # Concatenates Gene with CpG Site IDs (if needed)
     check_if_stopped(is_aborted, ExperimentStopped)
     if is_cpg_analysis:
         result_combinations = __concatenate_gene_and_cpg_as_gem(result_combinations)
 
-    # Saves in DB. It spawns a new Process to prevent high memory consumption
+    # Removes the combinations inserted by a previous attempt which was interrupted in the middle of the insertion
+    create_combinations_partition(table_name, experiment.pk)
+    if experiment.attempt > 1:
+        truncate_combinations_partition(table_name, experiment.pk)
+
+    # Saves in DB. The combinations are inserted directly in the experiment's partition to skip the tuple routing
     check_if_stopped(is_aborted, ExperimentStopped)
-    __save_result_in_db(result_combinations, experiment, table_name)
+    __save_result_in_db(result_combinations, experiment, get_partition_name(table_name, experiment.pk))
 
-    # Deletes temp files
-    os.unlink(mrna_file_path)
-    os.unlink(gem_file_path)
+    if checkpoint is not None:
+        checkpoint.save(PERSISTED_RESULT_STAGE, (total_row_count, number_of_evaluated_combinations))
 
     return total_row_count, number_of_evaluated_combinations
 
 
-def compute_correlation_experiment(experiment: Experiment, is_aborted: AbortEvent) -> Tuple[int, int, int]:
+def __get_common_samples_from_checkpoint(experiment: Experiment, checkpoint: Optional[TaskCheckpoint]) -> np.ndarray:
+    """
+    Gets the samples in common between both sources of an experiment (from the checkpoint if they were already
+    computed by a previous attempt)
+    @param experiment: Experiment to compute
+    @param checkpoint: Task checkpoint. None if checkpoints are disabled
+    @return: Numpy array with the samples in common
+    """
+    common_samples = checkpoint.load(COMMON_SAMPLES_STAGE) if checkpoint is not None else None
+    if common_samples is None:
+        common_samples = get_common_samples(experiment.mRNA_source, experiment.gem_source)
+        if checkpoint is not None:
+            checkpoint.save(COMMON_SAMPLES_STAGE, common_samples)
+    return common_samples
+
+
+def compute_correlation_experiment(experiment: Experiment, is_aborted: AbortEvent,
+                                   checkpoint: Optional[TaskCheckpoint] = None) -> Tuple[int, int, int]:
     """
     Computes a correlation analysis between all the rows from a Cartesian Product between two Dataframes.
     @param experiment: Experiment to compute.
     @param is_aborted: Method to call to check if the experiment has been stopped.
+    @param checkpoint: Task checkpoint to resume from the last stage completed by a previous attempt and store the new
+    ones. None to compute everything from scratch.
     @raise NoSamplesInCommon If there's not any sample in common between both sources.
     @return Total row count, the final row count (used in case it's truncated) and number of evaluated combinations.
     """
+    # If the combinations were already inserted by a previous attempt, only the counts are needed
+    persisted_result = checkpoint.load(PERSISTED_RESULT_STAGE) if checkpoint is not None else None
+    if persisted_result is not None:
+        total_row_count, number_of_evaluated_combinations = persisted_result
+        return total_row_count, experiment.combinations.count(), number_of_evaluated_combinations
+
     # First checks if there's any sample in common
-    common_samples = get_common_samples(experiment.mRNA_source, experiment.gem_source)
+    common_samples = __get_common_samples_from_checkpoint(experiment, checkpoint)
     if common_samples.size == 0:
         raise NoSamplesInCommon
 
@@ -525,7 +911,8 @@ def compute_correlation_experiment(experiment: Experiment, is_aborted: AbortEven
         common_samples,
         combination_class,
         result_limit_row_count,
-        is_aborted
+        is_aborted,
+        checkpoint
     )
     logging.warning(f'Total correlation execution time -> {time.time() - start} seconds')
 
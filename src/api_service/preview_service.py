@@ -0,0 +1,297 @@
+import datetime
+import math
+import time
+import uuid
+from typing import Dict, Any, Optional, Tuple, List
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from common.constants import GEM_INDEX_NAME
+from user_files.models import UserFile
+from .exceptions import NoSamplesInCommon
+from .models import Experiment, ExperimentSource, ExperimentClinicalSource, CorrelationPreview
+from .models_choices import PValuesAdjustmentMethod
+from .numpy_correlation_service import correlate_in_memory, harmonic_number
+from .pipelines import get_common_samples, get_clean_subsample
+
+# Name of the Django cache (see settings.CACHES) where the previews are stored
+CACHE_NAME = 'correlation_preview'
+
+# Adjusted p-value under which a combination is considered significant in the estimations
+SIGNIFICANCE_LEVEL = 0.05
+
+# Approximate size (in bytes) of a stored combination without its gene and GEM names (floats, FK and row header)
+COMBINATION_ROW_OVERHEAD_BYTES = 60
+
+# Fraction of settings.CORRELATION_PREVIEW_TIME_BUDGET to read the subsample. The rest is for the correlation, so a
+# reading stopped by its deadline still leaves time to correlate the rows read until then
+SAMPLING_TIME_BUDGET_FRACTION = 0.5
+
+
+def __get_cache_key(preview_id: str) -> str:
+    """Gets the cache key of a preview."""
+    return f'correlation_preview_{preview_id}'
+
+
+def __get_cached_preview(preview_id: Optional[str], user: User) -> Optional[Dict[str, Any]]:
+    """Gets a preview of the user from the cache. None if it doesn't exist (or has expired)."""
+    if not preview_id:
+        return None
+
+    preview: Optional[Dict[str, Any]] = caches[CACHE_NAME].get(__get_cache_key(preview_id))
+    if preview is None or preview['user_id'] != user.pk:
+        return None
+    return preview
+
+
+def get_preview_sources(
+        preview_id: Optional[str],
+        user: User
+) -> Optional[Tuple[ExperimentSource, ExperimentSource, Optional[ExperimentClinicalSource]]]:
+    """
+    Gets the sources prepared by a previous preview so a new preview, or the full analysis, can be submitted without
+    uploading/processing the datasets again.
+    @param preview_id: Preview identifier returned by run_preview.
+    @param user: User who submits the analysis.
+    @return: mRNA, GEM and clinical sources. None if the preview doesn't exist or any of its sources has been removed.
+    """
+    preview = __get_cached_preview(preview_id, user)
+    if preview is None:
+        return None
+
+    try:
+        mrna_source = ExperimentSource.objects.get(pk=preview['mrna_source_pk'])
+        gem_source = ExperimentSource.objects.get(pk=preview['gem_source_pk'])
+        clinical_source = ExperimentClinicalSource.objects.get(pk=preview['clinical_source_pk']) \
+            if preview['clinical_source_pk'] is not None else None
+    except (ExperimentSource.DoesNotExist, ExperimentClinicalSource.DoesNotExist):
+        return None
+
+    return mrna_source, gem_source, clinical_source
+
+
+def remove_preview(preview_id: Optional[str]):
+    """Removes a preview from the cache (once the full analysis is submitted, its sources belong to the experiment)."""
+    if preview_id:
+        caches[CACHE_NAME].delete(__get_cache_key(preview_id))
+        CorrelationPreview.objects.filter(preview_id=preview_id).delete()
+
+
+def remove_expired_previews():
+    """
+    Removes the sources saved by the previews that have expired without submitting the analysis, and the datasets
+    uploaded for them. Sources and datasets used by any experiment are kept.
+    """
+    expired_previews = CorrelationPreview.objects.filter(expiration_date__lte=timezone.now())
+    for preview in expired_previews:
+        with transaction.atomic():
+            sources = [source for source in (preview.mRNA_source, preview.gem_source, preview.clinical_source)
+                       if source is not None]
+            uploaded_files = list(preview.uploaded_files.all())
+            preview.delete()
+
+            for source in sources:
+                is_used = Experiment.objects.filter(
+                    Q(mRNA_source=source) | Q(gem_source=source) | Q(clinical_source=source)
+                ).exists()
+                if not is_used:
+                    source.delete()
+
+            # The rows statistics and the file are removed with the UserFile
+            for user_file in uploaded_files:
+                if not ExperimentSource.objects.filter(user_file=user_file).exists():
+                    user_file.delete()
+
+
+def __sample_sources(experiment: Experiment, time_limit: float) -> Dict[str, Any]:
+    """
+    Reads a random subsample of the rows/samples of both sources of an experiment, so the number of combinations to
+    evaluate is about settings.CORRELATION_PREVIEW_MAX_COMBINATIONS. In matching (not all-vs-all) analyses all the genes
+    are read to keep the matching GEMs.
+    @param experiment: Experiment (can be unsaved) to preview.
+    @param time_limit: Time (as returned by time.time()) from which no more chunks are read.
+    @raise NoSamplesInCommon If there's not any sample in common between both sources.
+    @return: Dict with the clean subsampled DataFrames, the fraction of rows read of every source, the number of samples
+    in common and the reading times.
+    """
+    common_samples = get_common_samples(experiment.mRNA_source, experiment.gem_source)
+    if common_samples.size == 0:
+        raise NoSamplesInCommon
+
+    samples = common_samples
+    if samples.size > settings.CORRELATION_PREVIEW_MAX_SAMPLES:
+        rng = np.random.default_rng(0)
+        samples = np.sort(rng.choice(samples, settings.CORRELATION_PREVIEW_MAX_SAMPLES, replace=False))
+
+    n_genes = max(1, experiment.mRNA_source.number_of_rows)
+    n_gems = max(1, experiment.gem_source.number_of_rows)
+    max_combinations = settings.CORRELATION_PREVIEW_MAX_COMBINATIONS
+    if experiment.correlate_with_all_genes:
+        genes_fraction = gems_fraction = min(1.0, math.sqrt(max_combinations / (n_genes * n_gems)))
+    else:
+        genes_fraction, gems_fraction = 1.0, min(1.0, max_combinations / n_gems)
+
+    start = time.time()
+    genes_df, n_sampled_genes, _ = get_clean_subsample(experiment.mRNA_source, samples, experiment, 'geneID',
+                                                       check_cpg_platform=False, fraction=genes_fraction,
+                                                       time_limit=time_limit)
+    genes_read_time = time.time() - start
+
+    start = time.time()
+    gems_df, n_sampled_gems, is_cpg_analysis = get_clean_subsample(experiment.gem_source, samples, experiment,
+                                                                   GEM_INDEX_NAME, check_cpg_platform=True,
+                                                                   fraction=gems_fraction, time_limit=time_limit)
+    gems_read_time = time.time() - start
+
+    return {
+        'genes_df': genes_df,
+        'gems_df': gems_df,
+        'is_cpg_analysis': is_cpg_analysis,
+        'genes_fraction': max(n_sampled_genes, 1) / n_genes,
+        'gems_fraction': max(n_sampled_gems, 1) / n_gems,
+        'number_of_samples': common_samples.size,
+        'genes_read_time': genes_read_time,
+        'gems_read_time': gems_read_time
+    }
+
+
+def __filter_by_std(df: pd.DataFrame, minimum_std: float, contains_cpg: bool) -> pd.DataFrame:
+    """Applies the std filter of the analyses (the first column of Methylation data contains the CpG Site IDs)."""
+    if not minimum_std or df.empty:
+        return df
+
+    values = df.iloc[:, 1:] if contains_cpg else df
+    return df[values.astype(float).std(axis=1, ddof=1) >= minimum_std]
+
+
+def estimate_full_result(p_values: np.ndarray, scale: float, n_combinations: float,
+                         adjustment_method: PValuesAdjustmentMethod) -> Tuple[float, float]:
+    """
+    Estimates the number of combinations over the threshold, and how many of them are significant, in the full
+    analysis from a subsample. Every subsample combination represents 'scale' combinations of the full analysis, so the
+    i-th lowest p-value is expected to be at rank i * scale when adjusting the p-values of all the combinations.
+    @param p_values: P-values of the subsample combinations over the threshold.
+    @param scale: Number of combinations of the full analysis represented by every subsample combination.
+    @param n_combinations: Estimated number of combinations to evaluate in the full analysis.
+    @param adjustment_method: P-values adjustment method of the analysis.
+    @return: Estimated number of combinations over the threshold and estimated number of significant combinations.
+    """
+    if p_values.size == 0:
+        return 0.0, 0.0
+
+    sorted_p_values = np.sort(p_values)
+    if adjustment_method == PValuesAdjustmentMethod.BONFERRONI:
+        adjusted = sorted_p_values * n_combinations
+    else:
+        adjusted = sorted_p_values * n_combinations / (np.arange(1, p_values.size + 1) * scale)
+        if adjustment_method == PValuesAdjustmentMethod.BENJAMINI_YEKUTIELI:
+            adjusted *= harmonic_number(max(1, round(n_combinations)))
+        adjusted = np.minimum.accumulate(adjusted[::-1])[::-1]
+
+    return p_values.size * scale, np.count_nonzero(adjusted <= SIGNIFICANCE_LEVEL) * scale
+
+
+def run_preview(experiment: Experiment, user: User, preview_id: Optional[str],
+                uploaded_files: List[UserFile]) -> Dict[str, Any]:
+    """
+    Runs a correlation analysis on a subsample of the rows (and samples) of the experiment's sources with the NumPy
+    engine, bounded by settings.CORRELATION_PREVIEW_TIME_BUDGET seconds (split between reading the subsample and
+    correlating it, see SAMPLING_TIME_BUDGET_FRACTION), and extrapolates the result of the full analysis. The subsample
+    is cached (with the experiment's sources) during settings.CORRELATION_PREVIEW_CACHE_TTL seconds, so new previews
+    with other parameters (e.g. the correlation threshold) don't read the datasets again and the full analysis can be
+    submitted without preparing the sources again. If the analysis is not submitted the sources, and the uploaded
+    datasets, are removed when the preview expires (see remove_expired_previews).
+    @param experiment: Experiment (unsaved) to preview. Its sources must be saved.
+    @param user: User who submits the analysis.
+    @param preview_id: Identifier of a previous preview with the same sources to reuse its subsample (if cached).
+    @param uploaded_files: New datasets uploaded by the user for this preview.
+    @raise NoSamplesInCommon If there's not any sample in common between both sources.
+    @raise ExperimentStopped If the time budget is exceeded.
+    @return: Dict with the preview identifier and the estimations to send to the frontend.
+    """
+    sampling_time_budget = settings.CORRELATION_PREVIEW_TIME_BUDGET * SAMPLING_TIME_BUDGET_FRACTION
+    correlation_time_budget = settings.CORRELATION_PREVIEW_TIME_BUDGET - sampling_time_budget
+
+    preview = __get_cached_preview(preview_id, user)
+    if preview is None or preview['mrna_source_pk'] != experiment.mRNA_source.pk \
+            or preview['gem_source_pk'] != experiment.gem_source.pk:
+        preview_id = uuid.uuid4().hex
+        CorrelationPreview.objects.create(
+            preview_id=preview_id,
+            mRNA_source=experiment.mRNA_source,
+            gem_source=experiment.gem_source,
+            clinical_source=experiment.clinical_source,
+            expiration_date=timezone.now() + datetime.timedelta(seconds=settings.CORRELATION_PREVIEW_CACHE_TTL)
+        ).uploaded_files.set(uploaded_files)
+        preview = {
+            'user_id': user.pk,
+            'mrna_source_pk': experiment.mRNA_source.pk,
+            'gem_source_pk': experiment.gem_source.pk,
+            'clinical_source_pk': experiment.clinical_source.pk if experiment.clinical_source is not None else None,
+            'data': __sample_sources(experiment, time.time() + sampling_time_budget)
+        }
+    else:
+        CorrelationPreview.objects.filter(preview_id=preview_id).update(
+            expiration_date=timezone.now() + datetime.timedelta(seconds=settings.CORRELATION_PREVIEW_CACHE_TTL)
+        )
+    caches[CACHE_NAME].set(__get_cache_key(preview_id), preview, timeout=settings.CORRELATION_PREVIEW_CACHE_TTL)
+
+    data = preview['data']
+    genes_df = __filter_by_std(data['genes_df'], experiment.minimum_std_gene, contains_cpg=False)
+    gems_df = __filter_by_std(data['gems_df'], experiment.minimum_std_gem, contains_cpg=data['is_cpg_analysis'])
+
+    start = time.time()
+    correlation_time_limit = start + correlation_time_budget
+    result, _, n_evaluated = correlate_in_memory(
+        genes_df,
+        gems_df,
+        correlation_method=experiment.correlation_method,
+        correlation_threshold=experiment.minimum_coefficient_threshold,
+        adjustment_method=experiment.p_values_adjustment_method,
+        is_all_vs_all=experiment.correlate_with_all_genes,
+        gem_contains_cpg=data['is_cpg_analysis'],
+        keep_top_n=None,
+        use_float32=settings.NUMPY_CORRELATION_FLOAT32,
+        is_aborted=lambda: time.time() > correlation_time_limit
+    )
+    correlation_time = time.time() - start
+
+    # Every evaluated combination represents the not sampled combinations of the full analysis
+    if experiment.correlate_with_all_genes:
+        scale = 1 / (data['genes_fraction'] * data['gems_fraction'])
+    else:
+        scale = 1 / data['gems_fraction']
+    n_combinations = n_evaluated * scale
+    n_over_threshold, n_significant = estimate_full_result(np.array([res.p_value for res in result]), scale,
+                                                           n_combinations, experiment.p_values_adjustment_method)
+
+    # Result size: rows stored in the DB (truncated as in the full analysis) with the average length of the names
+    result_rows = n_over_threshold
+    if settings.RESULT_DATAFRAME_LIMIT_ROWS:
+        result_rows = min(result_rows, settings.RESULT_DATAFRAME_LIMIT_ROWS)
+    names_length = np.mean([len(res.gene) + len(res.gem) + (len(res.cpg_site_id) + 3 if res.cpg_site_id else 0)
+                            for res in result]) if result else 0.0
+
+    # Runtime: reading times scaled by the fraction of rows read and correlation time by the number of combinations
+    # and samples
+    samples_ratio = data['number_of_samples'] / max(1, genes_df.shape[1])
+    estimated_runtime = data['genes_read_time'] / data['genes_fraction'] \
+        + data['gems_read_time'] / data['gems_fraction'] + correlation_time * scale * samples_ratio
+
+    return {
+        'preview_id': preview_id,
+        'sampled_genes': genes_df.shape[0],
+        'sampled_gems': gems_df.shape[0],
+        'sampled_samples': genes_df.shape[1],
+        'estimated_combinations': round(n_combinations),
+        'estimated_combinations_over_threshold': round(n_over_threshold),
+        'estimated_significant_combinations': round(n_significant),
+        'estimated_result_rows': round(result_rows),
+        'estimated_result_size_bytes': round(result_rows * (COMBINATION_ROW_OVERHEAD_BYTES + names_length)),
+        'estimated_runtime_seconds': round(estimated_runtime, 1)
+    }
@@ -1,9 +1,12 @@
+from typing import Optional
 from datasets_synchronization.serializers import SimpleCGDSDatasetSerializer
 from genes.serializers import GeneForResultTableSerializer
 from tags.serializers import TagSerializer
 from user_files.serializers import SimpleUserFileSerializer, UserFileSerializer
+from scheduling.fair_share_service import get_queue_position
 from .models import Experiment, ExperimentSource, GeneGEMCombination, GeneMiRNACombination, GeneCNACombination, \
     GeneMethylationCombination, ExperimentClinicalSource
+from .models_choices import ExperimentState
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
@@ -70,6 +73,14 @@ class ExperimentSerializer(serializers.ModelSerializer):
     gem_source = ExperimentSourceSerializer()
     user = LimitedUserSerializer()
     tag = TagSerializer()
+    queue_position = serializers.SerializerMethodField(method_name='get_queue_position')
+
+    def get_queue_position(self, ins: Experiment) -> Optional[int]:
+        """Gets the position of a waiting experiment in the fair-share dispatcher (None if it's not waiting)."""
+        if ins.state != ExperimentState.WAITING_FOR_QUEUE:
+            return None
+        positions_cache = self.context.setdefault('queue_positions', {})
+        return get_queue_position(ins, 'correlation_analysis', positions_cache)
 
     class Meta:
         model = Experiment
@@ -91,7 +102,8 @@ class ExperimentSerializer(serializers.ModelSerializer):
             'tag',
             'clinical_source_id',
             'is_public',
-            'user'
+            'user',
+            'queue_position'
         ]
 
 
@@ -7,7 +7,11 @@ from api_service.exceptions import ExperimentStopped, NoSamplesInCommon, Experim
 from api_service.models import Experiment
 from api_service.models_choices import ExperimentState
 from api_service.pipelines import compute_correlation_experiment
+from api_service.preview_service import remove_expired_previews
+from common.checkpoints import get_task_checkpoint
 from multiomics_intermediate.celery import app
+from scheduling.fair_share_service import schedule_task
+from statistical_properties.tasks import precompute_experiment_statistical_properties
 from celery.exceptions import SoftTimeLimitExceeded
 
 
@@ -26,11 +30,16 @@ def eval_mrna_gem_experiment(self, experiment_pk: int):
         logging.error(f'Experiment {experiment_pk} does not exist')
         return
 
+    # Stages completed by previous attempts (if any) are not computed again
+    checkpoint = get_task_checkpoint('correlation_analysis', experiment.pk)
+
     # Checks if the experiment has reached the limit of attempts
     if experiment.attempt >= 3:
         logging.warning(f'Experiment {experiment.pk} has reached attempts limit.')
         experiment.state = ExperimentState.REACHED_ATTEMPTS_LIMIT
         experiment.save(update_fields=['state'])
+        if checkpoint is not None:
+            checkpoint.remove()
         return
 
     experiment.attempt += 1
@@ -45,7 +54,8 @@ def eval_mrna_gem_experiment(self, experiment_pk: int):
         start = time.time()
         total_row_count, final_row_count, evaluated_combinations = compute_correlation_experiment(
             experiment,
-            self.is_aborted
+            self.is_aborted,
+            checkpoint
         )
         execution_time = time.time() - start
 
@@ -80,3 +90,21 @@ def eval_mrna_gem_experiment(self, experiment_pk: int):
 
     # Saves changes in DB
     experiment.save()
+
+    # The task has finished (successfully or not), so it won't be resumed
+    if checkpoint is not None:
+        checkpoint.remove()
+
+    # Precomputes the statistical properties of the best combinations in the background (if enabled). It goes through
+    # the fair-share dispatcher as it takes a slot of the 'stats' queue. The cost is the number of values read. It's an
+    # auxiliary task, so the experiment keeps the id of its own task
+    if experiment.state == ExperimentState.COMPLETED and settings.PRECOMPUTE_STATISTICAL_PROPERTIES_TOP_N > 0:
+        estimated_cost = settings.PRECOMPUTE_STATISTICAL_PROPERTIES_TOP_N * 2 * experiment.mRNA_source.number_of_samples
+        schedule_task(precompute_experiment_statistical_properties, (experiment.pk,), 'stats', experiment,
+                      experiment.user, estimated_cost, is_auxiliary=True)
+
+
+@app.task
+def remove_expired_correlation_previews():
+    """Removes the sources (and the uploaded datasets) of the correlation analysis previews that have expired."""
+    remove_expired_previews()
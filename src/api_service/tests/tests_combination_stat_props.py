@@ -1,6 +1,7 @@
 import os
 from django.test import TestCase
 from api_service.models import ExperimentSource, Experiment, GeneMiRNACombination
+from api_service.partitions_service import create_combinations_partition
 from api_service.pipelines import get_valid_data_from_sources, get_common_samples
 from genes.models import Gene
 from statistical_properties.statistics_utils import compute_source_statistical_properties, COMMON_DECIMAL_PLACES,\
@@ -66,6 +67,10 @@ class GeneGEMTestCase(TestCase):
         # Experiment
         self.mrna_mirna_experiment = create_toy_experiment(self.mrna_normal_source, self.mirna_normal_source, self.user)
 
+        # The partition is created by the pipeline right before inserting the combinations
+        create_combinations_partition(self.mrna_mirna_experiment.get_combinations_table(),
+                                      self.mrna_mirna_experiment.pk)
+
         gene_obj = Gene.objects.get(name='AADAT')  # Genes are loaded during DB migration
         self.mrna_mirna_combination = GeneMiRNACombination.objects.create(
             gene=gene_obj,
@@ -0,0 +1,154 @@
+import datetime
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from api_service.deduplication_service import get_experiment_fingerprint, get_reusable_experiment
+from api_service.models import Experiment, ExperimentSource, GeneMiRNACombination
+from api_service.models_choices import ExperimentType, CorrelationMethod, PValuesAdjustmentMethod, ExperimentState
+from api_service.numpy_correlation_service import correlate_in_memory
+from api_service.partitions_service import create_combinations_partition
+from common.functions import compute_fingerprint
+from common.tests_utils import create_toy_experiment
+from user_files.models import UserFile
+
+
+class DeduplicationServiceTestCase(SimpleTestCase):
+    @staticmethod
+    def __get_experiment(upload_date: datetime.datetime, threshold: float = 0.7) -> Experiment:
+        """Creates an unsaved Experiment with two UserFiles sources."""
+        def get_source(pk: int) -> ExperimentSource:
+            user_file = UserFile(pk=pk, upload_date=upload_date, decimal_separator='.', is_cpg_site_id=False)
+            user_file.file_obj.name = f'uploads/file_{pk}.tsv'
+            return ExperimentSource(user_file=user_file)
+
+        return Experiment(
+            mRNA_source=get_source(1),
+            gem_source=get_source(2),
+            type=ExperimentType.MIRNA,
+            correlation_method=CorrelationMethod.PEARSON,
+            p_values_adjustment_method=PValuesAdjustmentMethod.BENJAMINI_HOCHBERG,
+            minimum_coefficient_threshold=threshold,
+            minimum_std_gene=0.0,
+            minimum_std_gem=0.0,
+            correlate_with_all_genes=True
+        )
+
+    def test_compute_fingerprint(self):
+        """Tests that the fingerprint doesn't depend on the keys order"""
+        fingerprint = compute_fingerprint({'a': 1, 'b': {'c': [1, 2], 'd': None}})
+        self.assertEqual(fingerprint, compute_fingerprint({'b': {'d': None, 'c': [1, 2]}, 'a': 1}))
+        self.assertNotEqual(fingerprint, compute_fingerprint({'a': 1, 'b': {'c': [2, 1], 'd': None}}))
+        self.assertEqual(len(fingerprint), 64)
+
+    def test_experiment_fingerprint(self):
+        """
+        Tests that only the experiments with the same datasets versions and parameters get the same fingerprint. The
+        correlation threshold is not considered as it only filters the result
+        """
+        upload_date = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        fingerprint = get_experiment_fingerprint(self.__get_experiment(upload_date))
+        self.assertEqual(fingerprint, get_experiment_fingerprint(self.__get_experiment(upload_date)))
+        self.assertEqual(fingerprint, get_experiment_fingerprint(self.__get_experiment(upload_date, threshold=0.9)))
+
+        # Other parameters
+        experiment = self.__get_experiment(upload_date)
+        experiment.correlation_method = CorrelationMethod.SPEARMAN
+        self.assertNotEqual(fingerprint, get_experiment_fingerprint(experiment))
+
+        # Other version of the datasets
+        new_upload_date = upload_date + datetime.timedelta(days=1)
+        self.assertNotEqual(fingerprint, get_experiment_fingerprint(self.__get_experiment(new_upload_date)))
+
+    def test_higher_threshold_is_a_filter(self):
+        """
+        Tests that the result of an analysis with a higher threshold is the result of the lower one filtered, with the
+        same (adjusted) p-values, as the experiments reusing a previous result assume
+        """
+        rng = np.random.default_rng(0)
+        genes_df = pd.DataFrame(rng.normal(size=(30, 20)), index=[f'G{i}' for i in range(30)])
+        gems_df = pd.DataFrame(rng.normal(size=(40, 20)), index=[f'M{i}' for i in range(40)])
+        for adjustment_method in PValuesAdjustmentMethod:
+            with self.subTest(adjustment_method=adjustment_method):
+                results = []
+                for threshold in [0.2, 0.5]:
+                    result, _, _ = correlate_in_memory(genes_df, gems_df, correlation_method=CorrelationMethod.PEARSON,
+                                                       correlation_threshold=threshold,
+                                                       adjustment_method=adjustment_method, is_all_vs_all=True,
+                                                       gem_contains_cpg=False, keep_top_n=None, use_float32=False,
+                                                       is_aborted=lambda: False)
+                    results.append({(res.gene, res.gem): (res.p_value, res.adjusted_p_value) for res in result})
+
+                lower, higher = results
+                self.assertGreater(len(higher), 0)
+                self.assertLess(len(higher), len(lower))
+                for key, p_values in higher.items():
+                    self.assertEqual(p_values, lower[key])
+
+
+class ReusableExperimentTestCase(TestCase):
+    user: User
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@test.com', password='test')
+
+    def __create_experiment(self, threshold: float, state: ExperimentState = ExperimentState.COMPLETED,
+                            correlations: Optional[List[float]] = None,
+                            total_row_count: Optional[int] = None) -> Experiment:
+        """
+        Creates an experiment with the same fingerprint as the others. If correlations are specified it's stored as
+        computed with those combinations (truncated if total_row_count is greater than their number).
+        """
+        experiment = create_toy_experiment(ExperimentSource.objects.create(), ExperimentSource.objects.create(),
+                                           self.user)
+        experiment.fingerprint = 'fingerprint'
+        experiment.minimum_coefficient_threshold = threshold
+        experiment.state = state
+        if correlations is not None:
+            create_combinations_partition(experiment.get_combinations_table(), experiment.pk)
+            for i, correlation in enumerate(correlations):
+                GeneMiRNACombination.objects.create(gene_id=f'GENE{i}', gem=f'hsa-mir-{i}', correlation=correlation,
+                                                    p_value=0.01, adjusted_p_value=0.02, experiment=experiment)
+            experiment.result_final_row_count = len(correlations)
+            experiment.result_total_row_count = total_row_count if total_row_count is not None else len(correlations)
+        experiment.save()
+        return experiment
+
+    def __get_reusable(self, threshold: float) -> Optional[Experiment]:
+        """Gets the reusable experiment for a new experiment with the given threshold."""
+        experiment = self.__create_experiment(threshold, state=ExperimentState.WAITING_FOR_QUEUE)
+        return get_reusable_experiment(experiment, Experiment.objects.all())
+
+    def test_lower_threshold_is_reused(self):
+        """Tests that only completed experiments with a lower or equal threshold are reused, preferring the highest"""
+        self.__create_experiment(0.5, correlations=[0.9, -0.6])
+        closest = self.__create_experiment(0.6, correlations=[0.9, -0.6])
+        self.__create_experiment(0.7, state=ExperimentState.FINISHED_WITH_ERROR)
+        self.__create_experiment(0.8, correlations=[0.9])
+
+        self.assertEqual(self.__get_reusable(0.7), closest)
+        self.assertEqual(self.__get_reusable(0.6), closest)
+        self.assertIsNone(self.__get_reusable(0.4))
+
+    def test_truncated_result(self):
+        """
+        Tests that a truncated result is reused only if the new threshold is greater than the lowest stored
+        correlation, as the combinations under it could have been discarded
+        """
+        truncated = self.__create_experiment(0.5, correlations=[0.95, -0.8], total_row_count=10)
+
+        self.assertEqual(self.__get_reusable(0.85), truncated)
+        self.assertIsNone(self.__get_reusable(0.8))
+        self.assertIsNone(self.__get_reusable(0.7))
+
+    def test_unknown_result_size(self):
+        """Tests that experiments without the number of stored combinations are not reused"""
+        self.__create_experiment(0.5)
+        self.assertIsNone(self.__get_reusable(0.7))
+
+    @override_settings(REUSE_IDENTICAL_EXPERIMENTS_RESULTS=False)
+    def test_reuse_disabled(self):
+        """Tests that no experiment is reused if it's disabled in settings"""
+        self.__create_experiment(0.5, correlations=[0.9])
+        self.assertIsNone(self.__get_reusable(0.7))
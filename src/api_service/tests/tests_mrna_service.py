@@ -0,0 +1,171 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from api_service.mrna_service import MRNAService, CACHE_NAME
+import logging
+
+# Disables to prevent correct errors logging
+logging.disable(logging.CRITICAL)
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Simulates a BioAPI service returning the requested path and body. Fails with a 503 status code the number of
+    times indicated by the server."""
+    server: 'StubServer'
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def __respond(self, body: bytes):
+        time.sleep(self.server.delay)
+        self.server.requested_paths.append(self.path)
+        self.server.client_ports.add(self.client_address[1])
+
+        if self.server.remaining_failures > 0:
+            self.server.remaining_failures -= 1
+            status, content = 503, b'Service unavailable'
+        else:
+            status, content = 200, json.dumps({'path': self.path, 'body': body.decode()}).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json' if status == 200 else 'text/plain')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.__respond(b'')
+
+    def do_POST(self):
+        self.__respond(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local HTTP server to test the requests to BioAPI/Modulector."""
+    requested_paths: List[str]
+    client_ports: set
+    remaining_failures: int
+    delay: float
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubRequestHandler)
+        self.requested_paths = []
+        self.client_ports = set()
+        self.remaining_failures = 0
+        self.delay = 0.0
+
+
+@override_settings(
+    CACHES={'mrna_service': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}},
+    MRNA_SERVICE_MAX_RETRIES=2,
+    MRNA_SERVICE_BACKOFF_FACTOR=0,
+    MRNA_SERVICE_CACHE_TTL=60
+)
+class MRNAServiceTestCase(SimpleTestCase):
+    server: StubServer
+    service: MRNAService
+
+    def setUp(self):
+        caches[CACHE_NAME].clear()
+        self.server = StubServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        stub_settings = {'host': '127.0.0.1', 'port': self.server.server_address[1], 'protocol': 'http'}
+        with self.settings(BIOAPI_SETTINGS=stub_settings, MODULECTOR_SETTINGS=stub_settings):
+            self.service = MRNAService()
+
+    def tearDown(self):
+        self.service.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_responses_are_cached(self):
+        """Tests that equal requests are served from the cache and different ones are sent to the service"""
+        first = self.service.get_bioapi_service_content('information-of-genes', {'gene': 'BRCA1'},
+                                                        is_paginated=False)
+        second = self.service.get_bioapi_service_content('information-of-genes', {'gene': 'BRCA1'},
+                                                         is_paginated=False)
+        self.assertEqual(first, second)
+        self.assertEqual(first['path'], '/information-of-genes/?gene=BRCA1')
+        self.assertEqual(len(self.server.requested_paths), 1)
+
+        # POST requests are cached by body
+        for gene_ids in [['TP53'], ['TP53'], ['EGFR']]:
+            self.service.get_bioapi_service_content('gene-symbols', {'gene_ids': gene_ids}, is_paginated=False,
+                                                    method='post')
+        self.assertEqual(len(self.server.requested_paths), 3)
+        self.assertEqual(self.service.get_cache_metrics(), {'hits': 2, 'misses': 3, 'hit_ratio': 0.4})
+
+    def test_connections_are_reused(self):
+        """Tests that all the requests use the same keep-alive connection"""
+        for gene in ['BRCA1', 'BRCA2', 'TP53']:
+            self.service.get_bioapi_service_content('information-of-genes', {'gene': gene}, is_paginated=False)
+        self.assertEqual(len(self.server.requested_paths), 3)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_failed_requests_are_retried(self):
+        """Tests that 503 responses are retried and errors are not cached"""
+        self.server.remaining_failures = 2
+        response = self.service.get_bioapi_service_content('gene-symbols', {'gene_ids': ['TP53']},
+                                                           is_paginated=False, method='post')
+        self.assertIsNotNone(response)
+        self.assertEqual(len(self.server.requested_paths), 3)
+
+        # Exceeds the number of retries
+        self.server.remaining_failures = 3
+        response = self.service.get_modulector_service_content('mirna-codes', {'mirna_codes': ['hsa-miR-21']},
+                                                               is_paginated=False, method='post')
+        self.assertIsNone(response)
+        self.server.requested_paths.clear()
+        response = self.service.get_modulector_service_content('mirna-codes', {'mirna_codes': ['hsa-miR-21']},
+                                                               is_paginated=False, method='post')
+        self.assertIsNotNone(response)
+        self.assertEqual(self.server.requested_paths, ['/mirna-codes/'])
+
+    @override_settings(MRNA_SERVICE_CACHE_MAX_RESPONSE_SIZE=10)
+    def test_big_responses_are_not_cached(self):
+        """Tests that responses bigger than the maximum size are not cached"""
+        for _ in range(2):
+            self.service.get_bioapi_service_content('information-of-genes', {'gene': 'BRCA1'}, is_paginated=False)
+        self.assertEqual(len(self.server.requested_paths), 2)
+
+    async def test_async_requests(self):
+        """Tests that the async version retries, shares the cache and can make concurrent requests"""
+        self.server.remaining_failures = 1
+        response = await self.service.async_get_bioapi_service_content('gene-symbols', {'gene_ids': ['TP53']},
+                                                                       is_paginated=False, method='post')
+        self.assertEqual(response['body'], '{"gene_ids": ["TP53"]}')
+        self.assertEqual(len(self.server.requested_paths), 2)
+
+        sync_response = self.service.get_bioapi_service_content('gene-symbols', {'gene_ids': ['TP53']},
+                                                                is_paginated=False, method='post')
+        self.assertEqual(sync_response, response)
+        self.assertEqual(len(self.server.requested_paths), 2)
+
+        # Requests are made concurrently
+        self.server.delay = 0.5
+        start = time.time()
+        responses = await asyncio.gather(*[
+            self.service.async_get_bioapi_service_content(f'genes-of-its-group/GENE{i}', {}, is_paginated=False)
+            for i in range(5)
+        ])
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual([response['path'] for response in responses],
+                         [f'/genes-of-its-group/GENE{i}' for i in range(5)])
+
+    def test_async_clients_are_closed(self):
+        """Tests that the async client of an event loop is closed when the loop shuts down"""
+        clients = []
+
+        async def request():
+            await self.service.async_get_bioapi_service_content('genes-of-its-group/TP53', {}, is_paginated=False)
+            clients.append(await self.service._MRNAService__get_async_client())
+
+        asyncio.run(request())
+        self.assertEqual(len(clients), 1)
+        self.assertTrue(clients[0].is_closed)
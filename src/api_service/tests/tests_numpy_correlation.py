@@ -0,0 +1,149 @@
+import os
+import tempfile
+from typing import Dict, Tuple
+import ggca
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from api_service.models_choices import CorrelationMethod, PValuesAdjustmentMethod
+from api_service.numpy_correlation_service import correlate_in_memory, adjust_p_values, \
+    count_prescreen_discarded_pairs
+
+# GGCA enums for every method
+GGCA_CORRELATION_METHODS = {
+    CorrelationMethod.PEARSON: ggca.CorrelationMethod.Pearson,
+    CorrelationMethod.SPEARMAN: ggca.CorrelationMethod.Spearman
+}
+GGCA_ADJUSTMENT_METHODS = {
+    PValuesAdjustmentMethod.BENJAMINI_HOCHBERG: ggca.AdjustmentMethod.BenjaminiHochberg,
+    PValuesAdjustmentMethod.BENJAMINI_YEKUTIELI: ggca.AdjustmentMethod.BenjaminiYekutieli,
+    PValuesAdjustmentMethod.BONFERRONI: ggca.AdjustmentMethod.Bonferroni
+}
+
+
+class NumpyCorrelationTestCase(SimpleTestCase):
+    genes_df: pd.DataFrame
+    gems_df: pd.DataFrame
+    folder: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        samples = [f'sample_{i}' for i in range(30)]
+        self.genes_df = pd.DataFrame(rng.normal(size=(40, 30)), index=[f'G{i}' for i in range(40)], columns=samples)
+        self.genes_df.iloc[1] = 1.0  # Constant rows are not evaluated
+
+        # Some GEMs correlated with the genes they are named after (for the matching mode)
+        self.gems_df = pd.DataFrame(rng.normal(size=(25, 30)), index=[f'G{i}' for i in range(25)], columns=samples)
+        self.gems_df.iloc[:10] += self.genes_df.iloc[:10].to_numpy() * np.linspace(0.1, 2, 10)[:, None]
+        self.gems_df.iloc[2] = self.gems_df.iloc[2].round(0)  # Ties for Spearman
+
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def __run_ggca(self, correlation_method: CorrelationMethod, adjustment_method: PValuesAdjustmentMethod,
+                   is_all_vs_all: bool, keep_top_n: int) -> Tuple[Dict, int, int]:
+        """Runs GGCA with the same data through TSV files (as the pipeline does)."""
+        genes_path = os.path.join(self.folder.name, 'genes.tsv')
+        gems_path = os.path.join(self.folder.name, 'gems.tsv')
+        self.genes_df.rename_axis('geneID').to_csv(genes_path, sep='\t')
+        self.gems_df.rename_axis('gem').to_csv(gems_path, sep='\t')
+
+        result, total_row_count, n_evaluated = ggca.correlate(
+            genes_path,
+            gems_path,
+            correlation_method=GGCA_CORRELATION_METHODS[correlation_method],
+            correlation_threshold=0.2,
+            sort_buf_size=1000,
+            adjustment_method=GGCA_ADJUSTMENT_METHODS[adjustment_method],
+            is_all_vs_all=is_all_vs_all,
+            gem_contains_cpg=False,
+            collect_gem_dataset=None,
+            keep_top_n=keep_top_n
+        )
+        return {(res.gene, res.gem): res for res in result}, total_row_count, n_evaluated
+
+    def test_same_result_as_ggca(self):
+        """Tests that the NumPy engine returns the same combinations, statistics and counts as GGCA"""
+        for correlation_method in GGCA_CORRELATION_METHODS:
+            for adjustment_method in GGCA_ADJUSTMENT_METHODS:
+                for is_all_vs_all in [True, False]:
+                    with self.subTest(correlation_method=correlation_method, adjustment_method=adjustment_method,
+                                      is_all_vs_all=is_all_vs_all):
+                        expected, expected_total, expected_evaluated = self.__run_ggca(
+                            correlation_method, adjustment_method, is_all_vs_all, keep_top_n=10_000
+                        )
+                        result, total_row_count, n_evaluated = correlate_in_memory(
+                            self.genes_df,
+                            self.gems_df,
+                            correlation_method=correlation_method,
+                            correlation_threshold=0.2,
+                            adjustment_method=adjustment_method,
+                            is_all_vs_all=is_all_vs_all,
+                            gem_contains_cpg=False,
+                            keep_top_n=10_000,
+                            use_float32=False,
+                            is_aborted=lambda: False
+                        )
+
+                        self.assertEqual(total_row_count, expected_total)
+                        self.assertEqual(n_evaluated, expected_evaluated)
+                        self.assertEqual({(res.gene, res.gem) for res in result}, set(expected.keys()))
+                        for res in result:
+                            expected_res = expected[(res.gene, res.gem)]
+                            self.assertAlmostEqual(res.correlation, expected_res.correlation, places=8)
+                            self.assertAlmostEqual(res.p_value, expected_res.p_value, places=8)
+                            self.assertAlmostEqual(res.adjusted_p_value, expected_res.adjusted_p_value, places=8)
+
+    def test_keep_top_n(self):
+        """Tests that only the combinations with the highest absolute correlation are kept"""
+        result, total_row_count, _ = correlate_in_memory(self.genes_df, self.gems_df, CorrelationMethod.PEARSON, 0.0,
+                                                         PValuesAdjustmentMethod.BENJAMINI_HOCHBERG, True, False,
+                                                         keep_top_n=5, use_float32=True, is_aborted=lambda: False)
+        expected, _, _ = self.__run_ggca(CorrelationMethod.PEARSON, PValuesAdjustmentMethod.BENJAMINI_HOCHBERG,
+                                         is_all_vs_all=True, keep_top_n=5)
+        self.assertEqual(total_row_count, 39 * 25)
+        self.assertEqual({(res.gene, res.gem) for res in result}, set(expected.keys()))
+
+    def test_prescreen(self):
+        """
+        Tests that the pre-screen discards pairs without missing any combination over the threshold (with residual
+        factor 1) and that the adjusted p-values are bounded by the exhaustive ones
+        """
+        rng = np.random.default_rng(1)
+        samples = [f'sample_{i}' for i in range(50)]
+        factors = rng.normal(size=(3, 50))
+        genes_df = pd.DataFrame(rng.normal(size=(60, 3)) @ factors + rng.normal(size=(60, 50)) * 0.5, columns=samples)
+        gems_df = pd.DataFrame(rng.normal(size=(80, 3)) @ factors + rng.normal(size=(80, 50)) * 0.5, columns=samples)
+        genes_df.iloc[0] = 1.0
+        n_discarded, _ = count_prescreen_discarded_pairs(genes_df, gems_df, CorrelationMethod.PEARSON, 0.6, 3, 1.0)
+        self.assertGreater(n_discarded, 0)
+
+        for adjustment_method in GGCA_ADJUSTMENT_METHODS:
+            with self.subTest(adjustment_method=adjustment_method):
+                params = [genes_df, gems_df, CorrelationMethod.PEARSON, 0.6, adjustment_method, True, False, None,
+                          False, lambda: False]
+                expected, expected_total, expected_evaluated = correlate_in_memory(*params)
+                result, total_row_count, n_evaluated = correlate_in_memory(*params, prescreen_rank=3)
+
+                self.assertEqual(total_row_count, expected_total)
+                self.assertEqual(n_evaluated, expected_evaluated)
+                expected_adjusted = {(res.gene, res.gem): res.adjusted_p_value for res in expected}
+                self.assertEqual({(res.gene, res.gem) for res in result}, expected_adjusted.keys())
+                for res in result:
+                    self.assertGreaterEqual(res.adjusted_p_value, expected_adjusted[(res.gene, res.gem)] - 1e-12)
+
+    def test_adjust_pruned_p_values(self):
+        """Tests that groups of pruned p-values are adjusted as if they were all present"""
+        rng = np.random.default_rng(2)
+        p_values = rng.uniform(0, 0.1, size=20)
+        pruned_p_values = np.array([0.2, 0.5, 0.9])
+        pruned_counts = np.array([3, 10, 1])
+        all_p_values = np.concatenate([p_values, np.repeat(pruned_p_values, pruned_counts)])
+        for adjustment_method in GGCA_ADJUSTMENT_METHODS:
+            with self.subTest(adjustment_method=adjustment_method):
+                np.testing.assert_allclose(
+                    adjust_p_values(p_values, adjustment_method, pruned_p_values, pruned_counts),
+                    adjust_p_values(all_p_values, adjustment_method)[:p_values.size]
+                )
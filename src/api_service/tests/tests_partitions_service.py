@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from api_service.deduplication_service import clone_experiment_results
+from api_service.models import Experiment, ExperimentSource, GeneMiRNACombination
+from api_service.models_choices import ExperimentState
+from api_service.partitions_service import create_combinations_partition, truncate_combinations_partition, \
+    get_partition_name
+from common.tests_utils import create_toy_experiment
+
+# Combinations table of the toy experiments (miRNA)
+TABLE_NAME = 'gene_mirna_combination'
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class PartitionsServiceTestCase(TransactionTestCase):
+    """DETACH PARTITION CONCURRENTLY can't run inside a transaction, so these tests don't run inside one."""
+    user: User
+    experiment: Experiment
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@test.com', password='test')
+        self.experiment = self.__create_experiment()
+
+    def __create_experiment(self) -> Experiment:
+        """Creates a miRNA experiment with empty sources."""
+        return create_toy_experiment(ExperimentSource.objects.create(), ExperimentSource.objects.create(), self.user)
+
+    @staticmethod
+    def __add_combinations(experiment: Experiment, correlations: list):
+        """Creates the partition of an experiment and inserts a combination for every correlation."""
+        create_combinations_partition(TABLE_NAME, experiment.pk)
+        for i, correlation in enumerate(correlations):
+            GeneMiRNACombination.objects.create(gene_id=f'GENE{i}', gem=f'hsa-mir-{i}', correlation=correlation,
+                                                p_value=0.01, adjusted_p_value=0.02, experiment=experiment)
+
+    @staticmethod
+    def __is_attached(experiment_pk: int) -> bool:
+        """Checks if the partition of an experiment exists and is attached to the combinations table."""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT EXISTS(SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s))',
+                           [get_partition_name(TABLE_NAME, experiment_pk)])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def __partition_exists(experiment_pk: int) -> bool:
+        """Checks if the partition table of an experiment exists (attached or not)."""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [get_partition_name(TABLE_NAME, experiment_pk)])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def __count_partition_rows(experiment: Experiment) -> int:
+        """Counts the combinations stored in the partition of an experiment."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {get_partition_name(TABLE_NAME, experiment.pk)}')
+            return cursor.fetchone()[0]
+
+    def test_create_partition(self):
+        """Tests that the partition is created when the combinations are inserted (not with the experiment)"""
+        self.assertFalse(self.__partition_exists(self.experiment.pk))
+
+        self.__add_combinations(self.experiment, [0.8, -0.9])
+        create_combinations_partition(TABLE_NAME, self.experiment.pk)  # It can be called again (e.g. on retries)
+
+        self.assertTrue(self.__is_attached(self.experiment.pk))
+        self.assertEqual(self.__count_partition_rows(self.experiment), 2)
+        self.assertEqual(self.experiment.combinations.count(), 2)
+
+    def test_truncate_on_retry(self):
+        """Tests that the combinations of a previous attempt are removed without affecting other experiments"""
+        other_experiment = self.__create_experiment()
+        self.__add_combinations(self.experiment, [0.8, -0.9])
+        self.__add_combinations(other_experiment, [0.7])
+
+        truncate_combinations_partition(TABLE_NAME, self.experiment.pk)
+
+        self.assertTrue(self.__is_attached(self.experiment.pk))
+        self.assertEqual(self.experiment.combinations.count(), 0)
+        self.assertEqual(other_experiment.combinations.count(), 1)
+
+        # Experiments without partition (e.g. the first attempt failed before inserting) are ignored
+        truncate_combinations_partition(TABLE_NAME, self.__create_experiment().pk)
+
+    def test_delete_experiment(self):
+        """Tests that the partition is detached and dropped when the experiment is deleted"""
+        other_experiment = self.__create_experiment()
+        self.__add_combinations(self.experiment, [0.8, -0.9])
+        self.__add_combinations(other_experiment, [0.7])
+
+        experiment_pk = self.experiment.pk
+        self.experiment.delete()
+
+        self.assertFalse(self.__partition_exists(experiment_pk))
+        self.assertFalse(GeneMiRNACombination.objects.filter(experiment_id=experiment_pk).exists())
+        self.assertEqual(other_experiment.combinations.count(), 1)
+
+        # Inside a transaction the partition can't be detached concurrently, so it's dropped directly
+        other_experiment_pk = other_experiment.pk
+        with transaction.atomic():
+            other_experiment.delete()
+        self.assertFalse(self.__partition_exists(other_experiment_pk))
+
+    def test_clone_experiment_results(self):
+        """Tests that the reused results are copied into the partition of the new experiment"""
+        self.__add_combinations(self.experiment, [0.75, -0.9, 0.95])
+        self.experiment.state = ExperimentState.COMPLETED
+        self.experiment.result_total_row_count = 3
+        self.experiment.save()
+
+        new_experiment = self.__create_experiment()
+        new_experiment.minimum_coefficient_threshold = 0.8
+        new_experiment.save()
+        clone_experiment_results(self.experiment, new_experiment)
+
+        self.assertTrue(self.__is_attached(new_experiment.pk))
+        self.assertEqual(self.__count_partition_rows(new_experiment), 2)
+        self.assertEqual(new_experiment.result_final_row_count, 2)
+        self.assertEqual(self.experiment.combinations.count(), 3)
@@ -0,0 +1,156 @@
+import datetime
+import os
+import time
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from api_service import preview_service
+from api_service.models import CorrelationPreview, ExperimentSource, Experiment
+from api_service.models_choices import PValuesAdjustmentMethod, CorrelationMethod, ExperimentType
+from api_service.numpy_correlation_service import adjust_p_values
+from api_service.pipelines import get_clean_subsample
+from api_service.preview_service import estimate_full_result, SIGNIFICANCE_LEVEL, remove_expired_previews, \
+    run_preview
+from common.tests_utils import create_user_file, create_experiment_source, create_toy_experiment
+from user_files.models import UserFile
+from user_files.models_choices import FileType
+
+
+class PreviewServiceTestCase(SimpleTestCase):
+    p_values: np.ndarray
+
+    def setUp(self):
+        # Some small p-values (correlated pairs) among uniform ones
+        rng = np.random.default_rng(0)
+        self.p_values = np.concatenate([10 ** -rng.uniform(3, 12, size=5_000), rng.uniform(0, 1, size=98_000)])
+
+    def test_estimation_without_subsampling(self):
+        """Tests that the estimation is exact when all the combinations are evaluated"""
+        for adjustment_method in PValuesAdjustmentMethod:
+            with self.subTest(adjustment_method=adjustment_method):
+                over_threshold = self.p_values[self.p_values < 0.01]
+                n_over_threshold, n_significant = estimate_full_result(over_threshold, 1.0, self.p_values.size,
+                                                                       adjustment_method)
+                adjusted = adjust_p_values(self.p_values, adjustment_method)
+                self.assertEqual(n_over_threshold, over_threshold.size)
+                self.assertEqual(n_significant, np.count_nonzero(adjusted <= SIGNIFICANCE_LEVEL))
+
+    def test_estimation_from_subsample(self):
+        """Tests that the estimation from a random 10% of the combinations is close to the real values"""
+        subsample = np.random.default_rng(1).choice(self.p_values, size=self.p_values.size // 10, replace=False)
+        for adjustment_method in PValuesAdjustmentMethod:
+            with self.subTest(adjustment_method=adjustment_method):
+                expected = np.count_nonzero(adjust_p_values(self.p_values, adjustment_method) <= SIGNIFICANCE_LEVEL)
+                _, n_significant = estimate_full_result(subsample[subsample < 0.01], 10.0, self.p_values.size,
+                                                        adjustment_method)
+                self.assertAlmostEqual(n_significant / expected, 1.0, delta=0.15)
+
+
+class ExpiredPreviewsTestCase(TestCase):
+    user: User
+    uploaded_file: UserFile
+    existing_file: UserFile
+    mrna_source: ExperimentSource
+    gem_source: ExperimentSource
+
+    @staticmethod
+    def __get_file_path(filename: str) -> str:
+        """Gets a File's path from a filename in the "tests_files" directory"""
+        return os.path.join(os.path.dirname(__file__), f'tests_files/{filename}')
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@test.com', password='test')
+
+        # The mRNA dataset is uploaded for the preview, the miRNA one was already uploaded by the user
+        self.uploaded_file = create_user_file(self.__get_file_path('mRNA_normal.csv'), 'mRNA', FileType.MRNA,
+                                              self.user)
+        self.existing_file = create_user_file(self.__get_file_path('miRNA_normal.csv'), 'miRNA', FileType.MIRNA,
+                                              self.user)
+        self.mrna_source = create_experiment_source(self.uploaded_file)
+        self.gem_source = create_experiment_source(self.existing_file)
+
+    def __create_preview(self, expires_in: int):
+        """Registers a preview with both sources which expires in the given number of seconds."""
+        preview = CorrelationPreview.objects.create(
+            preview_id='preview',
+            mRNA_source=self.mrna_source,
+            gem_source=self.gem_source,
+            expiration_date=timezone.now() + datetime.timedelta(seconds=expires_in)
+        )
+        preview.uploaded_files.set([self.uploaded_file])
+
+    def test_expired_preview(self):
+        """Tests that the sources and the uploaded datasets of an expired preview are removed"""
+        self.__create_preview(expires_in=-1)
+        uploaded_file_path = self.uploaded_file.file_obj.path
+
+        remove_expired_previews()
+
+        self.assertFalse(CorrelationPreview.objects.exists())
+        self.assertFalse(ExperimentSource.objects.filter(pk__in=[self.mrna_source.pk, self.gem_source.pk]).exists())
+        self.assertFalse(UserFile.objects.filter(pk=self.uploaded_file.pk).exists())
+        self.assertFalse(os.path.isfile(uploaded_file_path))
+        self.assertTrue(UserFile.objects.filter(pk=self.existing_file.pk).exists())
+
+    def test_not_expired_preview(self):
+        """Tests that the sources of a preview are kept until it expires"""
+        self.__create_preview(expires_in=60)
+
+        remove_expired_previews()
+
+        self.assertTrue(CorrelationPreview.objects.exists())
+        self.assertEqual(ExperimentSource.objects.filter(pk__in=[self.mrna_source.pk, self.gem_source.pk]).count(), 2)
+        self.assertTrue(UserFile.objects.filter(pk=self.uploaded_file.pk).exists())
+
+    def test_sources_used_by_an_experiment(self):
+        """Tests that the sources (and datasets) of an expired preview are kept if an experiment uses them"""
+        self.__create_preview(expires_in=-1)
+        create_toy_experiment(self.mrna_source, self.gem_source, self.user)
+
+        remove_expired_previews()
+
+        self.assertFalse(CorrelationPreview.objects.exists())
+        self.assertEqual(ExperimentSource.objects.filter(pk__in=[self.mrna_source.pk, self.gem_source.pk]).count(), 2)
+        self.assertTrue(UserFile.objects.filter(pk=self.uploaded_file.pk).exists())
+
+
+@override_settings(CORRELATION_PREVIEW_TIME_BUDGET=1,
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                           'correlation_preview': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PreviewTimeBudgetTestCase(TestCase):
+    experiment: Experiment
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@test.com', password='test')
+        mrna_file = create_user_file(os.path.join(os.path.dirname(__file__), 'tests_files/mRNA_normal.csv'), 'mRNA',
+                                     FileType.MRNA, self.user)
+        mirna_file = create_user_file(os.path.join(os.path.dirname(__file__), 'tests_files/miRNA_normal.csv'),
+                                      'miRNA', FileType.MIRNA, self.user)
+        self.experiment = Experiment(
+            name='Preview',
+            mRNA_source=create_experiment_source(mrna_file),
+            gem_source=create_experiment_source(mirna_file),
+            minimum_coefficient_threshold=0.5,
+            minimum_std_gene=0.0,
+            minimum_std_gem=0.0,
+            correlation_method=CorrelationMethod.PEARSON,
+            p_values_adjustment_method=PValuesAdjustmentMethod.BENJAMINI_HOCHBERG,
+            user=self.user,
+            type=ExperimentType.MIRNA,
+            correlate_with_all_genes=True
+        )
+
+    def test_reading_stopped_by_its_deadline(self):
+        """Tests that the preview is computed even when the reading of the subsample exhausts its time budget"""
+        def slow_subsample(*args, time_limit: float, **kwargs):
+            time.sleep(max(0.0, time_limit - time.time()))
+            return get_clean_subsample(*args, time_limit=float('inf'), **kwargs)
+
+        with mock.patch.object(preview_service, 'get_clean_subsample', side_effect=slow_subsample):
+            result = run_preview(self.experiment, self.user, preview_id=None, uploaded_files=[])
+
+        self.assertGreater(result['sampled_genes'], 0)
+        self.assertGreater(result['sampled_gems'], 0)
+        self.assertTrue(CorrelationPreview.objects.filter(preview_id=result['preview_id']).exists())
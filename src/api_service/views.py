@@ -39,18 +39,22 @@ from user_files.utils import get_invalid_format_response
 from user_files.views import get_an_user_file
 from .enums import CorrelationType
 from .enums import SourceType, CorrelationGraphStatusErrorCode, CommonSamplesStatusErrorCode
+from .exceptions import NoSamplesInCommon, ExperimentStopped
 from .models import Experiment, GeneMiRNACombination, GeneGEMCombination, ExperimentClinicalSource
 from .models_choices import ExperimentType, ExperimentState, CorrelationMethod, PValuesAdjustmentMethod
 from .mrna_service import global_mrna_service
 from .ordering import CustomExperimentResultCombinationsOrdering, annotate_by_correlation
 from .permissions import ExperimentIsNotRunning
+from .deduplication_service import get_experiment_fingerprint, get_reusable_experiment, clone_experiment_results
+from .preview_service import get_preview_sources, remove_preview, run_preview
 from .serializers import ExperimentSerializer, ExperimentSerializerDetail, \
     GeneMiRNACombinationSerializer, GeneCNACombinationSerializer, GeneMethylationCombinationSerializer, \
     ExperimentClinicalSourceSerializer, LimitedUserSerializer
-from .tasks import eval_mrna_gem_experiment
+from .tasks import eval_mrna_gem_experiment, remove_expired_correlation_previews
 from .utils import get_experiment_source, file_type_to_experiment_type, get_cgds_dataset
 from institutions.models import Institution
 from institutions.serializers import InstitutionSimpleSerializer, InstitutionSerializer
+from scheduling.fair_share_service import schedule_task, cancel_scheduled_task
 
 
 class CorrelationAnalysis(APIView):
@@ -96,23 +100,40 @@ class CorrelationAnalysis(APIView):
             PValuesAdjustmentMethod.BENJAMINI_HOCHBERG
         )
 
-        # Get source types
-        mrna_source_type = int(request.POST.get('mRNAType'))
-        gem_source_type = int(request.POST.get('gemType'))
+        # Preview params. If a previous preview is specified its sources are reused
+        is_preview = request_bool_to_python_bool(request.POST.get('preview'))
+        preview_id = request.POST.get('previewId')
+        preview_sources = get_preview_sources(preview_id, request.user)
 
         # Instantiates the User's files
+        uploaded_files: List[UserFile] = []
         with transaction.atomic():
-            # mRNA
-            mrna_source, mrna_clinical = get_experiment_source(
-                mrna_source_type, request, FileType.MRNA, 'mRNA')
-            if mrna_source is None:
-                return JsonResponse(get_invalid_format_response(), safe=False)
-
-            # GEM
-            gem_source, gem_clinical = get_experiment_source(
-                gem_source_type, request, file_type_enum, 'gem')
-            if gem_source is None:
-                return JsonResponse(get_invalid_format_response(), safe=False)
+            if preview_sources is not None:
+                mrna_source, gem_source, clinical_source = preview_sources
+            else:
+                # Get source types
+                mrna_source_type = int(request.POST.get('mRNAType'))
+                gem_source_type = int(request.POST.get('gemType'))
+
+                # mRNA
+                mrna_source, mrna_clinical = get_experiment_source(
+                    mrna_source_type, request, FileType.MRNA, 'mRNA')
+                if mrna_source is None:
+                    return JsonResponse(get_invalid_format_response(), safe=False)
+
+                # GEM
+                gem_source, gem_clinical = get_experiment_source(
+                    gem_source_type, request, file_type_enum, 'gem')
+                if gem_source is None:
+                    return JsonResponse(get_invalid_format_response(), safe=False)
+
+                clinical_source = mrna_clinical if mrna_clinical is not None else gem_clinical
+
+                # New datasets are removed if the preview expires without submitting the analysis
+                if mrna_source_type == SourceType.NEW_DATASET.value:
+                    uploaded_files.append(mrna_source.user_file)
+                if gem_source_type == SourceType.NEW_DATASET.value:
+                    uploaded_files.append(gem_source.user_file)
 
             # If selected, gets Tag
             if tag_id is not None:
@@ -129,7 +150,7 @@ class CorrelationAnalysis(APIView):
                 description=description,
                 mRNA_source=mrna_source,
                 gem_source=gem_source,
-                clinical_source=mrna_clinical if mrna_clinical is not None else gem_clinical,
+                clinical_source=clinical_source,
                 correlation_method=correlation_method,
                 p_values_adjustment_method=p_values_adjustment_method,
                 minimum_std_gene=minimum_std_gene,
@@ -141,18 +162,39 @@ class CorrelationAnalysis(APIView):
                 tag=tag,
                 correlate_with_all_genes=correlate_with_all_genes
             )
-            experiment.save(force_insert=True)
-
-        # Adds the experiment to the TaskQueue and gets Task id
-        async_res: AbortableAsyncResult = eval_mrna_gem_experiment.apply_async((experiment.pk,),
-                                                                               queue='correlation_analysis')
 
-        experiment.task_id = async_res.task_id
-        experiment.save(update_fields=['task_id'])
+            # Previews are not stored, they run on a subsample of the data within a time budget
+            if not is_preview:
+                experiment.fingerprint = get_experiment_fingerprint(experiment)
+                experiment.save(force_insert=True)
+
+        # The preview runs once the sources are committed, so no transaction is kept open while reading and
+        # correlating the data
+        if is_preview:
+            return CorrelationAnalysis.__preview(experiment, request.user, preview_id, uploaded_files)
+
+        # The sources now belong to the experiment
+        remove_preview(preview_id)
+
+        # If an identical experiment (or one with a lower threshold) was already computed, its results are filtered
+        # instead of computing them again
+        accessible_experiments = ExperimentList.get_experiments_shared_with_user(request.user)
+        reusable_experiment = get_reusable_experiment(experiment, accessible_experiments)
+        if reusable_experiment is not None:
+            clone_experiment_results(reusable_experiment, experiment)
+            response = {
+                'status': ResponseStatus(
+                    ResponseCode.SUCCESS,
+                    message='Experiment results reused from a previous experiment'
+                ).to_json(),
+            }
+            return Response(response)
 
-        # Calls forget to release resources.
-        # Read more in https://docs.celeryq.dev/en/latest/getting-started/first-steps-with-celery.html#keeping-results
-        async_res.forget()
+        # Adds the experiment to the fair-share dispatcher of the queue. The cost is the number of evaluated values
+        estimated_cost = experiment.mRNA_source.number_of_rows * experiment.gem_source.number_of_rows * \
+            experiment.mRNA_source.number_of_samples
+        schedule_task(eval_mrna_gem_experiment, (experiment.pk,), 'correlation_analysis', experiment, request.user,
+                      estimated_cost)
 
         response = {
             'status': ResponseStatus(ResponseCode.SUCCESS, message='Experiment added to the queue').to_json(),
@@ -160,6 +202,42 @@ class CorrelationAnalysis(APIView):
 
         return Response(response)
 
+    @staticmethod
+    def __preview(experiment: Experiment, user: User, preview_id: Optional[str],
+                  uploaded_files: List[UserFile]) -> Response:
+        """
+        Runs a preview of an experiment and returns the estimations of the full analysis.
+        @param experiment: Unsaved experiment to preview.
+        @param user: User who submits the analysis.
+        @param preview_id: Identifier of a previous preview to reuse its subsample.
+        @param uploaded_files: New datasets uploaded by the user for the preview.
+        @return: Response with the preview data or the error.
+        """
+        # Removes the sources of the preview if the analysis is not submitted before it expires
+        remove_expired_correlation_previews.apply_async(countdown=settings.CORRELATION_PREVIEW_CACHE_TTL + 1,
+                                                        queue='correlation_analysis')
+
+        try:
+            response = {
+                'status': ResponseStatus(ResponseCode.SUCCESS).to_json(),
+                'data': run_preview(experiment, user, preview_id, uploaded_files)
+            }
+        except NoSamplesInCommon:
+            response = {
+                'status': ResponseStatus(ResponseCode.ERROR,
+                                         message='The datasets have no samples in common').to_json()
+            }
+        except ExperimentStopped:
+            response = {
+                'status': ResponseStatus(
+                    ResponseCode.ERROR,
+                    message=f'The preview exceeded the time budget of {settings.CORRELATION_PREVIEW_TIME_BUDGET} '
+                            f'seconds'
+                ).to_json()
+            }
+
+        return Response(response)
+
 
 class ExperimentList(generics.ListAPIView):
     """REST endpoint: list for Experiment model with pagination"""
@@ -1279,7 +1357,8 @@ def stop_experiment_action(request):
 
             logging.warning(f'Aborting experiment {experiment_id}')
 
-            # Sends the signal to abort it
+            # Sends the signal to abort it (or removes it from the dispatcher if it's still waiting)
+            cancel_scheduled_task(experiment)
             if experiment.task_id:
                 abortable_async_result = AbortableAsyncResult(
                     experiment.task_id)
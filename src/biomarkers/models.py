@@ -96,6 +96,11 @@ class Biomarker(models.Model):
         """Gets the number of Methylations in this Biomarker"""
         return self.methylations.count()
 
+    @property
+    def number_of_molecules(self) -> int:
+        """Gets the number of molecules (of all the types) in this Biomarker"""
+        return self.number_of_mrnas + self.number_of_mirnas + self.number_of_cnas + self.number_of_methylations
+
     def all_molecules(self, molecule_type: Optional[MoleculeType]) -> QuerySetSequence:
         """Returns a QuerySetSequence with all the molecules in this Biomarker."""
         if molecule_type is None:
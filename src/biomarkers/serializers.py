@@ -1,7 +1,10 @@
+from typing import Optional
 from rest_framework import serializers
 from genes.serializers import GeneGEMWithType
+from scheduling.fair_share_service import get_queue_position
 from user_files.models_choices import MoleculeType
-from .models import Biomarker, MRNAIdentifier, MethylationIdentifier, CNAIdentifier, MiRNAIdentifier, MoleculeIdentifier
+from .models import Biomarker, MRNAIdentifier, MethylationIdentifier, CNAIdentifier, MiRNAIdentifier, \
+    MoleculeIdentifier, BiomarkerState
 from tags.serializers import TagSerializer
 from drf_writable_nested import WritableNestedModelSerializer
 
@@ -65,6 +68,7 @@ class BiomarkerSimpleSerializer(WritableNestedModelSerializer):
     number_of_cnas = serializers.SerializerMethodField(method_name='get_number_of_cnas')
     number_of_methylations = serializers.SerializerMethodField(method_name='get_number_of_methylations')
     has_fs_experiment = serializers.SerializerMethodField(method_name='get_has_fs_experiment')
+    queue_position = serializers.SerializerMethodField(method_name='get_queue_position')
 
     origin = serializers.IntegerField(required=False)
     state = serializers.IntegerField(required=False)
@@ -100,6 +104,16 @@ class BiomarkerSimpleSerializer(WritableNestedModelSerializer):
         """Gets if the current Biomarker was created from a Feature Selection experiment"""
         return ins.has_fs_experiment
 
+    def get_queue_position(self, ins: Biomarker) -> Optional[int]:
+        """
+        Gets the position of the waiting Feature Selection experiment of this Biomarker in the fair-share dispatcher
+        (None if it's not waiting).
+        """
+        if ins.state != BiomarkerState.WAITING_FOR_QUEUE or not ins.has_fs_experiment:
+            return None
+        positions_cache = self.context.setdefault('queue_positions', {})
+        return get_queue_position(ins.fs_experiment, 'feature_selection', positions_cache)
+
 
 class BiomarkerSimpleUpdateSerializer(serializers.ModelSerializer):
     """
@@ -119,6 +133,7 @@ class BiomarkerSerializer(WritableNestedModelSerializer):
     number_of_methylations = serializers.SerializerMethodField(method_name='get_number_of_methylations')
     has_fs_experiment = serializers.SerializerMethodField(method_name='get_has_fs_experiment')
     was_already_used = serializers.SerializerMethodField(method_name='get_was_already_used')
+    queue_position = serializers.SerializerMethodField(method_name='get_queue_position')
 
     mrnas = MRNAIdentifierSerializer(many=True, required=False)
     mirnas = MiRNAIdentifierSerializer(many=True, required=False)
@@ -165,6 +180,16 @@ class BiomarkerSerializer(WritableNestedModelSerializer):
         This avoids the user to edit a Biomarker that was already used and generate inconsistencies.
         """
         return ins.was_already_used
+
+    def get_queue_position(self, ins: Biomarker) -> Optional[int]:
+        """
+        Gets the position of the waiting Feature Selection experiment of this Biomarker in the fair-share dispatcher
+        (None if it's not waiting).
+        """
+        if ins.state != BiomarkerState.WAITING_FOR_QUEUE or not ins.has_fs_experiment:
+            return None
+        positions_cache = self.context.setdefault('queue_positions', {})
+        return get_queue_position(ins.fs_experiment, 'feature_selection', positions_cache)
     
     
 class BiomarkerFromCorrelationAnalysisSerializer(serializers.Serializer):
@@ -17,6 +17,8 @@ from biomarkers.serializers import BiomarkerFromCorrelationAnalysisSerializer, B
     BiomarkerSimpleSerializer, BiomarkerSimpleUpdateSerializer
 from common.pagination import StandardResultsSetPagination
 from common.response import generate_json_response_or_404
+from genes.aliases_service import get_molecules_aliases
+from genes.models import MoleculeAliasService
 from django.db.models import QuerySet, Q
 
 
@@ -137,14 +139,11 @@ def biomarkers_action(request):
     })
 
 
-def get_gene_aliases(genes_ids: List[str]) -> Optional[Dict]:
-    """Get the aliases for a list of genes from BioAPI"""
-    return global_mrna_service.get_bioapi_service_content(
-        'gene-symbols',
-        request_params={'gene_ids': genes_ids},
-        is_paginated=False,
-        method='post'
-    )
+def get_gene_aliases(genes_ids: Optional[List[str]]) -> Optional[Dict]:
+    """Get the aliases for a list of genes from the local aliases table or BioAPI"""
+    if genes_ids is None:
+        return None
+    return get_molecules_aliases(MoleculeAliasService.GENE_SYMBOLS, genes_ids)
 
 
 def find_genes_from_request(request: Request) -> List[Dict]:
@@ -181,14 +180,11 @@ class MiRNACodes(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def __get_mirna_aliases(mirna_codes: List[str]) -> Optional[Dict]:
-        """Get the aliases for a list of miRNAs through Modulector"""
-        return global_mrna_service.get_modulector_service_content(
-            'mirna-codes',
-            request_params={'mirna_codes': mirna_codes},
-            is_paginated=False,
-            method='post'
-        )
+    def __get_mirna_aliases(mirna_codes: Optional[List[str]]) -> Optional[Dict]:
+        """Get the aliases for a list of miRNAs from the local aliases table or Modulector"""
+        if mirna_codes is None:
+            return None
+        return get_molecules_aliases(MoleculeAliasService.MIRNA_CODES, mirna_codes)
 
     def get(self, request):
         """Generates a query to search miRNAs through Modulector"""
@@ -219,14 +215,11 @@ class MethylationSites(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def __get_methylation_sites_aliases(methylation_sites: List[str]) -> Optional[Dict]:
-        """Get the aliases for a list of Methylation sites through Modulector"""
-        return global_mrna_service.get_modulector_service_content(
-            'methylation-sites',
-            request_params={'methylation_sites': methylation_sites},
-            is_paginated=False,
-            method='post'
-        )
+    def __get_methylation_sites_aliases(methylation_sites: Optional[List[str]]) -> Optional[Dict]:
+        """Get the aliases for a list of Methylation sites from the local aliases table or Modulector"""
+        if methylation_sites is None:
+            return None
+        return get_molecules_aliases(MoleculeAliasService.METHYLATION_SITES, methylation_sites)
 
     def get(self, request: Request):
         """Generates a query to search Methylation sites through Modulector"""
@@ -0,0 +1,74 @@
+import logging
+import os
+import pickle
+import shutil
+from typing import Optional, Any
+from django.conf import settings
+
+
+class TaskCheckpoint:
+    """
+    Stores the result of every completed stage of a long-running Celery task in a folder shared by all the workers
+    (settings.TASKS_CHECKPOINTS_DIR), so a task redelivered after a worker loss (acks_late + reject_on_worker_lost)
+    resumes from the last completed stage.
+    """
+    def __init__(self, task_name: str, instance_pk: int):
+        self.directory = os.path.join(settings.TASKS_CHECKPOINTS_DIR, f'{task_name}_{instance_pk}')
+
+    def get_file_path(self, file_name: str) -> str:
+        """
+        Gets the path of a file inside the checkpoint folder (e.g. a prepared dataset), creating the folder if needed.
+        @param file_name: Name of the file.
+        @return: Absolute path of the file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, file_name)
+
+    def load(self, stage: str) -> Optional[Any]:
+        """
+        Gets the data stored by a completed stage.
+        @param stage: Stage name.
+        @return: Stored data or None if the stage wasn't completed (or its file is corrupted).
+        """
+        stage_path = os.path.join(self.directory, f'{stage}.pkl')
+        if not os.path.exists(stage_path):
+            return None
+
+        try:
+            with open(stage_path, 'rb') as fp:
+                data = pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError) as ex:
+            logging.warning(f'Checkpoint {stage_path} could not be read: {ex}')
+            return None
+
+        logging.warning(f'Resuming from checkpoint {stage_path}')
+        return data
+
+    def save(self, stage: str, data: Any):
+        """
+        Stores the data of a completed stage. The file is written atomically so a worker loss in the middle doesn't
+        leave a corrupted checkpoint.
+        @param stage: Stage name.
+        @param data: Picklable data to store.
+        """
+        stage_path = self.get_file_path(f'{stage}.pkl')
+        temp_path = f'{stage_path}.tmp'
+        with open(temp_path, 'wb') as fp:
+            pickle.dump(data, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, stage_path)
+
+    def remove(self):
+        """Removes all the checkpoints (and files) of the task."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def get_task_checkpoint(task_name: str, instance_pk: int) -> Optional[TaskCheckpoint]:
+    """
+    Gets the checkpoint of a task.
+    @param task_name: Name of the task (e.g. 'correlation_analysis').
+    @param instance_pk: PK of the instance (Experiment, FSExperiment, etc.) processed by the task.
+    @return: TaskCheckpoint instance or None if checkpoints are disabled in settings.
+    """
+    if not settings.TASKS_CHECKPOINTS_DIR:
+        return None
+    return TaskCheckpoint(task_name, instance_pk)
@@ -1,5 +1,4 @@
 import os
-import tempfile
 import numpy as np
 from typing import Union, Optional, cast, List, Literal, Tuple, Any
 import pandas as pd
@@ -99,97 +98,83 @@ def __is_numerical(value: Any) -> bool:
     return res
 
 
-def generate_clinical_file(experiment: ExperimentObjType, samples_in_common: np.ndarray,
-                           survival_tuple: Union[SurvivalColumnsTupleCGDSDataset, SurvivalColumnsTupleUserFile]) -> str:
+def generate_clinical_dataframe(
+        experiment: ExperimentObjType,
+        samples_in_common: np.ndarray,
+        survival_tuple: Union[SurvivalColumnsTupleCGDSDataset, SurvivalColumnsTupleUserFile]
+) -> pd.DataFrame:
     """
-    Generates the clinical DataFrame for a specific instance with the samples in common and saves it in disk.
+    Generates the clinical DataFrame for a specific instance with the samples in common.
     @param experiment: Instance to get the sources from.
     @param samples_in_common: Samples in common between all the sources.
     @param survival_tuple: Tuple with the event and time column names to retrieve.
-    @return: Clinical file path saved in disk.
+    @return: Clinical DataFrame with the event (bool) and time (float) columns (in that order).
     """
-    with tempfile.NamedTemporaryFile(mode='w', delete=False) as temp_file:
-        clinical_temp_file_path = temp_file.name
+    # Gets DataFrame
+    clinical_source = experiment.clinical_source
+    clinical_df: pd.DataFrame = clinical_source.get_df()
 
-        # Gets DataFrame
-        clinical_source = experiment.clinical_source
-        clinical_df: pd.DataFrame = clinical_source.get_df()
+    event_column = survival_tuple.event_column
+    time_column = survival_tuple.time_column
 
-        event_column = survival_tuple.event_column
-        time_column = survival_tuple.time_column
+    # Keeps only the survival tuple and samples in common
+    clinical_df = clinical_df[[event_column, time_column]]
+    clinical_df = clinical_df.loc[samples_in_common]
 
-        # Keeps only the survival tuple and samples in common
-        clinical_df = clinical_df[[event_column, time_column]]
-        clinical_df = clinical_df.loc[samples_in_common]
+    # Replaces str values of CGDS for booleans values
+    clinical_df[event_column] = clinical_df[event_column].apply(
+        replace_event_col_for_booleans
+    ).astype(bool)
 
-        # Replaces str values of CGDS for booleans values
-        clinical_df[event_column] = clinical_df[event_column].apply(
-            replace_event_col_for_booleans
-        )
+    # Cast time column to numerical and removes invalid rows.
+    # cBioPortal datasets have some studies with the time as a string or values as '[Not Available]'
+    try:
+        clinical_df[time_column] = clinical_df[time_column].astype(float)
+    except ValueError:
+        clinical_df = clinical_df[clinical_df[time_column].apply(__is_numerical)]
+        clinical_df[time_column] = clinical_df[time_column].astype(float)
 
-        # Cast time column to numerical and removes invalid rows.
-        # cBioPortal datasets have some studies with the time as a string or values as '[Not Available]'
-        try:
-            clinical_df[time_column] = clinical_df[time_column].astype(float)
-        except ValueError:
-            clinical_df = clinical_df[clinical_df[time_column].apply(__is_numerical)]
-            clinical_df[time_column] = clinical_df[time_column].astype(float)
+    return clinical_df
 
-        # Saves in disk
-        clinical_df.to_csv(temp_file, sep='\t', decimal='.')
 
-    return clinical_temp_file_path
+def __to_float_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts all the values of a molecules DataFrame to float. Non-numerical values are converted to NaN (as they
+    cannot be used in the models) to be removed later.
+    @param df: DataFrame to cast.
+    @return: DataFrame with float values.
+    """
+    try:
+        return df.astype(float)
+    except (ValueError, TypeError):
+        return df.apply(pd.to_numeric, errors='coerce').astype(float)
 
 
 def generate_molecules_dataframe(experiment: ExperimentObjType, samples_in_common: np.ndarray) -> pd.DataFrame:
     """
-    Generates the molecules DataFrame for a specific InferenceExperiment, FSExperiment or StatisticalValidation
-    with the samples in common.
+    Generates the molecules DataFrame for a specific InferenceExperiment, FSExperiment, StatisticalValidation or
+    TrainedModel with the samples in common. All the chunks are kept in memory with float values, so the models can
+    use them without writing and parsing text files.
     @param experiment: Instance to get the sources from.
     @param samples_in_common: Samples in common between all the sources.
-    @return: Molecules Pandas DataFrame.
+    @return: Molecules Pandas DataFrame with molecules as rows and samples as columns.
     """
     chunks: List[pd.DataFrame] = []
     for source, molecules, file_type in experiment.get_sources_and_molecules():
+        source = cast(Optional[ExperimentSource], source)
         if source is None:
             continue
 
         only_matching = file_type in [FileType.MRNA, FileType.CNA]  # Only genes must be disambiguated
         chunks.extend([
-            __process_chunk(chunk, file_type, molecules, samples_in_common)
-            for chunk in source.get_df_in_chunks(only_matching)
+            __to_float_matrix(__process_chunk(chunk, file_type, molecules, samples_in_common))
+            for chunk in source.get_df_in_chunks(only_matching=only_matching)
         ])
 
     # Concatenates all the chunks for all the molecules
     return pd.concat(chunks, axis=0, sort=False)
 
 
-def generate_molecules_file(experiment: ExperimentObjType, samples_in_common: np.ndarray) -> str:
-    """
-    Generates the molecules DataFrame for a specific InferenceExperiment, FSExperiment or StatisticalValidation
-    with the samples in common and saves it in disk.
-    @param experiment: Instance to get the sources from.
-    @param samples_in_common: Samples in common between all the sources.
-    @return: Molecules file path saved in disk.
-    """
-    with tempfile.NamedTemporaryFile(mode='a', delete=False) as temp_file:
-        molecules_temp_file_path = temp_file.name
-
-        for source, molecules, file_type in experiment.get_sources_and_molecules():
-            source = cast(Optional[ExperimentSource], source)
-            if source is None:
-                continue
-
-            only_matching = file_type in [FileType.MRNA, FileType.CNA]  # Only genes must be disambiguated
-            for chunk in source.get_df_in_chunks(only_matching=only_matching):
-                chunk = __process_chunk(chunk, file_type, molecules, samples_in_common)
-
-                # Saves in disk
-                chunk.to_csv(temp_file, header=temp_file.tell() == 0, sep='\t', decimal='.', lineterminator='\n')
-
-    return molecules_temp_file_path
-
-
 def clean_dataset(df: pd.DataFrame, axis: Axis) -> pd.DataFrame:
     """
     Removes NaN and Inf values.
@@ -217,22 +202,18 @@ def clinical_df_to_struct_array(clinical_df: pd.DataFrame) -> np.ndarray:
     return clinical_data
 
 
-def format_data(molecules_temp_file_path: str, clinical_temp_file_path: str,
+def format_data(molecules_df: pd.DataFrame, clinical_df: pd.DataFrame,
                 is_regression: bool) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray]:
     """
-    Reads both molecules and clinical data and formats them to be used in the models: replaces NaNs values, removes
-    0 values (if needed), and removes inconsistencies where the event occurred but there's no time data. Always keeping
+    Formats both molecules and clinical data to be used in the models: replaces NaNs values, removes 0 values
+    (if needed), and removes inconsistencies where the event occurred but there's no time data. Always keeping
     the samples in common after filtering.
-    @param molecules_temp_file_path: Molecular data file path.
-    @param clinical_temp_file_path: Clinical data file path.
+    @param molecules_df: Molecular data with molecules as rows and samples as columns.
+    @param clinical_df: Clinical data with the event and time columns (in that order).
     @param is_regression: Whether the experiment is a regression or not. In case it's a regression task, removes the
     samples with time == 0.
     @return: Molecules as Pandas DataFrame and the clinical data as a Pandas DataFrame and as a Numpy structured array.
     """
-    # Gets molecules and clinical DataFrames
-    molecules_df = pd.read_csv(molecules_temp_file_path, sep='\t', decimal='.', index_col=0)
-    clinical_df = pd.read_csv(clinical_temp_file_path, sep='\t', decimal='.', index_col=0)
-
     # NOTE: The event and time columns are ALWAYS the first and second one at this point
     event_column, time_column = clinical_df.columns.tolist()
 
@@ -1,7 +1,8 @@
 # This file contains multiple functions used in different Django apps
+import hashlib
 import json
 from enum import Enum
-from typing import Optional, Dict, Type, Union, Iterable, cast
+from typing import Optional, Dict, Type, Union, Iterable, cast, Any
 from django.db import models, connection
 from django.http import JsonResponse
 from common.response import ResponseStatus
@@ -107,3 +108,14 @@ def check_if_stopped(is_aborted: AbortEvent, exception: Type[Exception]):
     """
     if is_aborted():
         raise exception
+
+
+def compute_fingerprint(data: Dict[str, Any]) -> str:
+    """
+    Computes a canonical fingerprint (SHA-256 of the JSON with sorted keys) of the data that defines an experiment, so
+    identical submissions get the same value.
+    @param data: Dict with the sources identities and the parameters of the experiment.
+    @return: Hexadecimal fingerprint (64 characters).
+    """
+    canonical_json = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical_json.encode('utf-8')).hexdigest()
@@ -0,0 +1,357 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple, Iterator, IO
+import requests
+from django.conf import settings
+from requests.exceptions import ConnectionError, ReadTimeout, ChunkedEncodingError
+from common.exceptions import ExperimentStopped
+from common.functions import check_if_stopped
+from common.typing import AbortEvent
+
+# Extensions of the files stored in the download cache
+COMPLETED_EXTENSION = '.tar'
+PARTIAL_EXTENSION = '.part'
+METADATA_EXTENSION = '.json'
+LOCK_EXTENSION = '.lock'
+
+# Seconds to wait between attempts to get the lock of a cache entry which is being downloaded by another worker
+LOCK_POLL_INTERVAL = 1
+
+
+class CorruptedStudyFile(Exception):
+    """Raised when a downloaded study file does not pass the integrity checks"""
+    pass
+
+
+def __get_cache_dir() -> str:
+    """Gets (and creates if needed) the folder where the downloaded studies are cached."""
+    cache_dir = settings.CGDS_DOWNLOAD_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def __get_timeouts() -> Tuple[float, float]:
+    """Gets the connection and read timeouts to make the requests to cBioPortal."""
+    return float(settings.CGDS_CONNECTION_TIMEOUT), float(settings.CGDS_READ_TIMEOUT)
+
+
+def __get_remote_file_info(url: str) -> Tuple[Optional[str], Optional[int], bool]:
+    """
+    Makes a HEAD request to get the info of the remote file.
+    @param url: URL of the file.
+    @return: A tuple with the ETag (None if not present), the Content-Length (None if not present) and a boolean
+    indicating if the server supports HTTP Range requests.
+    """
+    response = requests.head(url, allow_redirects=True, timeout=__get_timeouts())
+    if response.status_code != 200:
+        # Some servers don't support HEAD requests, the file will be downloaded without cache validators
+        logging.warning(f'HEAD to {url} returned status_code {response.status_code}')
+        return None, None, False
+
+    etag = response.headers.get('ETag')
+    content_length = response.headers.get('Content-Length')
+    size = int(content_length.strip()) if content_length else None
+    accepts_ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    return etag, size, accepts_ranges
+
+
+def __get_cache_key(url: str, etag: Optional[str], size: Optional[int]) -> str:
+    """Generates the key of a cache entry from the URL of the file, its ETag and its Content-Length."""
+    return hashlib.sha256(f'{url}|{etag}|{size}'.encode()).hexdigest()
+
+
+def __read_metadata(metadata_path: str) -> Optional[Dict[str, Any]]:
+    """Reads the metadata of a cache entry. None if it doesn't exist or is invalid."""
+    try:
+        with open(metadata_path) as metadata_file:
+            return json.load(metadata_file)
+    except (OSError, ValueError):
+        return None
+
+
+def __write_metadata(metadata_path: str, metadata: Dict[str, Any]):
+    """Writes the metadata of a cache entry atomically, so other workers never read a half-written file."""
+    tmp_path = f'{metadata_path}.tmp'
+    with open(tmp_path, 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+    os.replace(tmp_path, metadata_path)
+
+
+def __try_lock_entry(cache_dir: str, key: str, operation: int) -> Optional[IO]:
+    """
+    Tries to get the lock of a cache entry without blocking.
+    @param cache_dir: Cache folder.
+    @param key: Key of the entry.
+    @param operation: fcntl.LOCK_EX or fcntl.LOCK_SH.
+    @return: The lock file (the lock is released when it's closed) or None if the entry is locked by another worker
+    or its lock file was removed (with the entry) while getting it.
+    """
+    lock_path = os.path.join(cache_dir, f'{key}{LOCK_EXTENSION}')
+    lock_file = open(lock_path, 'a')
+    try:
+        fcntl.flock(lock_file, operation | fcntl.LOCK_NB)
+        if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+            return lock_file
+    except (BlockingIOError, FileNotFoundError):
+        pass
+
+    lock_file.close()
+    return None
+
+
+@contextmanager
+def __lock_entry(cache_dir: str, key: str, is_aborted: AbortEvent) -> Iterator[IO]:
+    """
+    Gets the exclusive lock of a cache entry, waiting (and checking if the process was aborted) while another worker
+    is downloading the same file.
+    @param cache_dir: Cache folder.
+    @param key: Key of the entry.
+    @param is_aborted: AbortEvent to check if the process was aborted.
+    @return: The lock file.
+    """
+    while True:
+        check_if_stopped(is_aborted, ExperimentStopped)
+        lock_file = __try_lock_entry(cache_dir, key, fcntl.LOCK_EX)
+        if lock_file is not None:
+            break
+        time.sleep(LOCK_POLL_INTERVAL)
+
+    try:
+        yield lock_file
+    finally:
+        lock_file.close()
+
+
+def __remove_entry(cache_dir: str, key: str):
+    """Removes all the files of a cache entry. The caller must hold its exclusive lock."""
+    for extension in [COMPLETED_EXTENSION, PARTIAL_EXTENSION, METADATA_EXTENSION, LOCK_EXTENSION]:
+        file_path = os.path.join(cache_dir, f'{key}{extension}')
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def __remove_entry_if_unlocked(cache_dir: str, key: str) -> bool:
+    """
+    Removes a cache entry only if no other worker is downloading or reading it.
+    @return: True if the entry was removed, False otherwise.
+    """
+    lock_file = __try_lock_entry(cache_dir, key, fcntl.LOCK_EX)
+    if lock_file is None:
+        return False
+
+    with lock_file:
+        __remove_entry(cache_dir, key)
+    return True
+
+
+def __remove_stale_entries(cache_dir: str, url: str, current_key: str):
+    """
+    Removes the cache entries of the same URL whose ETag/Content-Length has changed (i.e. cBioPortal has published a
+    new file). Then, keeps only the settings.CGDS_DOWNLOAD_CACHE_MAX_FILES most recently used completed files. Entries
+    which are being downloaded or read by other workers are never removed, nor the ones used (or whose metadata was
+    written) in the last settings.CGDS_DOWNLOAD_CACHE_GRACE_PERIOD seconds, except for old versions of the same file.
+    """
+    grace_limit = time.time() - settings.CGDS_DOWNLOAD_CACHE_GRACE_PERIOD
+    completed_entries = []
+    for filename in os.listdir(cache_dir):
+        key, extension = os.path.splitext(filename)
+        if extension != METADATA_EXTENSION or key == current_key:
+            continue
+
+        metadata_path = os.path.join(cache_dir, filename)
+        completed_path = os.path.join(cache_dir, f'{key}{COMPLETED_EXTENSION}')
+        try:
+            last_use = max(os.path.getmtime(path) for path in [metadata_path, completed_path]
+                           if os.path.exists(path))
+        except (OSError, ValueError):
+            continue  # Removed by another worker
+
+        metadata = __read_metadata(metadata_path)
+        if metadata is not None and metadata['url'] == url:
+            __remove_entry_if_unlocked(cache_dir, key)
+        elif last_use >= grace_limit:
+            continue
+        elif metadata is None:
+            # Invalid entry (e.g. its worker was killed). Recent ones are skipped as they could be being written
+            __remove_entry_if_unlocked(cache_dir, key)
+        elif os.path.exists(completed_path):
+            completed_entries.append((last_use, key))
+
+    # Leaves a place for the current entry
+    max_files = max(settings.CGDS_DOWNLOAD_CACHE_MAX_FILES - 1, 0)
+    completed_entries.sort(reverse=True)
+    for _, key in completed_entries[max_files:]:
+        __remove_entry_if_unlocked(cache_dir, key)
+
+
+def __verify_tar_file(file_path: str):
+    """
+    Checks that the downloaded file is a valid (and complete) tar/tar.gz file reading all its members. In case of
+    gzip files, the CRC is checked when the end of the stream is reached.
+    @param file_path: Path of the file to check.
+    @raise CorruptedStudyFile if the file is not valid.
+    """
+    try:
+        with tarfile.open(file_path, 'r:*') as tar_file:
+            tar_file.getmembers()
+    except (tarfile.TarError, EOFError, OSError) as e:
+        raise CorruptedStudyFile(f'File {file_path} is not a valid tar file: {e}')
+
+
+def __download_to_partial_file(url: str, partial_path: str, size: Optional[int], etag: Optional[str],
+                               accepts_ranges: bool, study_name: str, is_aborted: AbortEvent):
+    """
+    Downloads (or resumes the download of) a file. If the partial file exists and the server supports Range requests,
+    only the remaining bytes are requested. Otherwise, the file is downloaded from the beginning.
+    @param url: URL of the file.
+    @param partial_path: Path of the partial file.
+    @param size: Expected size of the file (None if unknown).
+    @param etag: ETag of the file to send in the If-Range header.
+    @param accepts_ranges: True if the server supports HTTP Range requests.
+    @param study_name: Name of the study to log the download progress.
+    @param is_aborted: AbortEvent to check if the process was aborted.
+    """
+    downloaded_bytes = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    if size is not None:
+        if downloaded_bytes == size:
+            # The download was interrupted after receiving all the bytes
+            return
+
+        if downloaded_bytes > size:
+            downloaded_bytes = 0
+
+    headers = {}
+    if downloaded_bytes > 0 and accepts_ranges:
+        headers['Range'] = f'bytes={downloaded_bytes}-'
+        if etag is not None:
+            # If the file has changed the server returns the entire file with a 200 status code
+            headers['If-Range'] = etag
+
+    with requests.get(url, stream=True, headers=headers, timeout=__get_timeouts()) as req:
+        req.raise_for_status()
+
+        if req.status_code == 206:
+            logging.warning(f'Resuming {study_name} download from byte {downloaded_bytes}')
+            mode = 'ab'
+        else:
+            downloaded_bytes = 0
+            mode = 'wb'
+
+        if size is None:
+            content_length = req.headers.get('Content-Length')
+            size = downloaded_bytes + int(content_length.strip()) if content_length else None
+
+        with open(partial_path, mode=mode) as out_file:
+            # Reads in chunks and logs the progress
+            chunk_size = int(settings.CGDS_CHUNK_SIZE)
+            for chunk in req.iter_content(chunk_size=chunk_size):
+                check_if_stopped(is_aborted, ExperimentStopped)
+                out_file.write(chunk)
+
+                # Logs the progress status
+                downloaded_bytes += len(chunk)
+                if size:
+                    downloaded_bytes_percentage = (100 * downloaded_bytes) // size
+                    logging.warning(f'{study_name} downloaded at -> {downloaded_bytes_percentage}%')
+
+
+def __get_completed_file(url: str, cache_dir: str, key: str, etag: Optional[str], size: Optional[int],
+                         accepts_ranges: bool, study_name: str, is_aborted: AbortEvent) -> str:
+    """
+    Gets the completed file of a cache entry downloading it if needed. The caller must hold the entry's exclusive
+    lock. The rest of the parameters are the same as download_study_file().
+    @return: Path of the completed file in the cache.
+    """
+    completed_path = os.path.join(cache_dir, f'{key}{COMPLETED_EXTENSION}')
+    partial_path = os.path.join(cache_dir, f'{key}{PARTIAL_EXTENSION}')
+    metadata_path = os.path.join(cache_dir, f'{key}{METADATA_EXTENSION}')
+
+    # Checks if the file was already downloaded. Completed files are only moved to the cache after checking their
+    # integrity, and the key includes the ETag/Content-Length, so they are not checked again. Without ETag nor
+    # Content-Length it's not possible to check if the cached file is up-to-date, so it's downloaded again
+    has_validators = etag is not None or size is not None
+    if has_validators and __read_metadata(metadata_path) is not None and os.path.exists(completed_path):
+        if size is None or os.path.getsize(completed_path) == size:
+            logging.warning(f'{study_name} file was already downloaded. Using cached file {completed_path}')
+            os.utime(completed_path)  # Marks it as recently used
+            return completed_path
+
+        logging.warning(f'Cached file of {study_name} is corrupted. Downloading it again')
+        os.remove(completed_path)
+
+    __write_metadata(metadata_path, {'url': url, 'etag': etag, 'size': size})
+
+    # Downloads the file resuming it in case of network errors
+    logging.warning(f'Starting {study_name} downloading')
+    max_retries = settings.CGDS_DOWNLOAD_MAX_RETRIES
+    attempt = 0
+    while True:
+        check_if_stopped(is_aborted, ExperimentStopped)
+        try:
+            __download_to_partial_file(url, partial_path, size, etag, accepts_ranges, study_name, is_aborted)
+            break
+        except (ConnectionError, ReadTimeout, ChunkedEncodingError) as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise e
+
+            wait_seconds = 2 ** attempt
+            logging.warning(f'Error downloading {study_name} (attempt {attempt}/{max_retries}): {e}. '
+                            f'Retrying in {wait_seconds} seconds')
+            time.sleep(wait_seconds)
+
+    logging.warning(f'{study_name} downloading finished')
+
+    # Checks the integrity of the downloaded file
+    check_if_stopped(is_aborted, ExperimentStopped)
+    downloaded_size = os.path.getsize(partial_path)
+    if size is not None and downloaded_size != size:
+        __remove_entry(cache_dir, key)
+        raise CorruptedStudyFile(f'Downloaded file has {downloaded_size} bytes, expected {size}')
+
+    try:
+        __verify_tar_file(partial_path)
+    except CorruptedStudyFile as e:
+        __remove_entry(cache_dir, key)
+        raise e
+
+    # Marks the file as completed
+    os.replace(partial_path, completed_path)
+    return completed_path
+
+
+@contextmanager
+def download_study_file(url: str, study_name: str, is_aborted: AbortEvent) -> Iterator[str]:
+    """
+    Downloads a CGDSStudy file using a local cache keyed by URL + ETag/Content-Length. Completed files are kept to be
+    reused by later synchronizations (retries of failed datasets, new versions, etc.) and interrupted downloads are
+    resumed with HTTP Range requests (retrying up to settings.CGDS_DOWNLOAD_MAX_RETRIES times). The integrity of the
+    file is checked once, before moving it to the cache. The file can't be removed from the cache by other workers
+    until the context is exited.
+    @param url: URL of the file to download.
+    @param study_name: Name of the study to log the download progress.
+    @param is_aborted: AbortEvent to check if the process was aborted.
+    @return: Path of the downloaded file in the cache.
+    @raise CorruptedStudyFile if the downloaded file does not pass the integrity checks.
+    """
+    check_if_stopped(is_aborted, ExperimentStopped)
+    etag, size, accepts_ranges = __get_remote_file_info(url)
+
+    cache_dir = __get_cache_dir()
+    key = __get_cache_key(url, etag, size)
+
+    # Only one worker downloads the same file at a time, the rest wait to use the cached file
+    with __lock_entry(cache_dir, key, is_aborted) as lock_file:
+        __remove_stale_entries(cache_dir, url, key)
+        completed_path = __get_completed_file(url, cache_dir, key, etag, size, accepts_ranges, study_name, is_aborted)
+
+        # Downgrades to a shared lock to let other workers read the same file while it's being used. The entry can't
+        # be evicted meanwhile as it was just used
+        fcntl.flock(lock_file, fcntl.LOCK_SH)
+        yield completed_path
@@ -10,7 +10,7 @@ from api_service.websocket_functions import send_update_cgds_studies_command
 from common.methylation import MethylationPlatform
 from feature_selection.models import TrainedModel
 from statistical_properties.models import StatisticalValidation
-from user_files.models import UserFile
+from user_files.models import UserFile, RowStatistics, save_row_statistics
 from user_files.models_choices import FileType
 from pandas import DataFrame
 
@@ -58,6 +58,7 @@ class CGDSDataset(models.Model):
     mrna_dataset: 'ExperimentSource'
     survival_columns: QuerySet['ExperimentSource']
     cgds_dataset: QuerySet['ExperimentSource']
+    row_statistics: QuerySet[RowStatistics]
 
     file_path: str = models.CharField(max_length=150)  # File name inside extracted study folder
     observation: Optional[str] = models.CharField(max_length=300, blank=True, null=True)
@@ -131,17 +132,19 @@ class CGDSDataset(models.Model):
         """
         return global_mongo_service.get_collection_as_df(self.mongo_collection_name, use_standard_column, only_matching)
 
-    def get_df_in_chunks(self, only_matching: bool = False) -> Iterable[DataFrame]:
+    def get_df_in_chunks(self, only_matching: bool = False, rows: Optional[List[str]] = None) -> Iterable[DataFrame]:
         """
         Returns an Iterator of a DataFrame in divided in chunks from a CGDSDataset's MongoDB collection
         @param only_matching: If True only returns the molecules that are equal in both columns MOLECULE_SYMBOL and
         STANDARD_SYMBOL.
+        @param rows: If specified, only these rows are retrieved.
         @return: A DataFrame Iterator with the data to work
         """
         return global_mongo_service.get_collection_as_df_in_chunks(
             self.mongo_collection_name,
             chunk_size=settings.EXPERIMENT_CHUNK_SIZE,
-            only_matching=only_matching
+            only_matching=only_matching,
+            rows=rows
         )
 
     def get_row_indexes(self) -> List[str]:
@@ -163,6 +166,10 @@ class CGDSDataset(models.Model):
         # Saves again with the new computed fields
         super().save(update_fields=['number_of_rows', 'number_of_samples'])
 
+        # Computes the rows' statistics used to filter them in correlation analyses
+        if self.file_type != FileType.CLINICAL:
+            save_row_statistics(self)
+
     def get_column_names(self) -> List[str]:
         """
         Gets a specific MongoDB collection's columns' names
@@ -1,19 +1,21 @@
 import logging
 import os.path
+import shutil
 import tarfile
 import tempfile
 import pandas as pd
-from os import listdir
-from os.path import isfile
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import List, Optional, Set, Iterator, Tuple, Dict, IO
 from urllib.parse import urlparse
+from django.conf import settings
 from django.utils import timezone
 from pymongo.errors import InvalidName
 from api_service.mongo_service import global_mongo_service, MOLECULE_SYMBOL
 from common.constants import PATIENT_ID_COLUMN, TCGA_CONVENTION, SAMPLE_ID_COLUMN
 from common.datasets_utils import clean_dataset
 from common.exceptions import ExperimentStopped
-from common.functions import check_if_stopped
+from common.functions import check_if_stopped, close_db_connection
 from common.typing import AbortEvent
 from user_files.models_choices import FileType
 from .models import CGDSStudy, CGDSDataset, CGDSDatasetSynchronizationState
@@ -27,21 +29,206 @@ class SkipRowsIsIncorrect(Exception):
     pass
 
 
-def __get_files_of_directory(dir_path: str) -> List[str]:
+class StudyArchive(object):
     """
-    Gets a list of files (excludes directories) of a specific directory path.
-    @param dir_path: Directory path to check.
-    @return: List of file names in the directory.
+    Needed members of a CGDSStudy tar file. Those members are extracted in a single pass over the (usually huge and
+    compressed) tar file to a temporary folder, so they can be read several times (header, duplicated molecules,
+    chunks) without decompressing the archive again, and the rest of the members are never extracted.
     """
-    return sorted([filename for filename in listdir(dir_path) if isfile(os.path.join(dir_path, filename))])
+    members: Dict[str, str]  # Dataset's file path -> path of the extracted file
+    file_names: List[str]  # Names of all the scanned files (useful to log errors)
+    __tmp_dir: tempfile.TemporaryDirectory
+
+    def __init__(self, tar_file_path: str, mode: str, needed_file_paths: List[str], is_aborted: AbortEvent):
+        """
+        Scans the tar file extracting the needed members. The scan stops as soon as all the needed members are
+        found. Handles the case of studies with all the files inside a sub folder.
+        @param tar_file_path: Path of the tar file.
+        @param mode: Mode to open the tar file.
+        @param needed_file_paths: List of dataset's file paths to find.
+        @param is_aborted: AbortEvent to check if the process was aborted.
+        """
+        self.members = {}
+        self.file_names = []
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+
+        try:
+            self.__extract_members(tar_file_path, mode, needed_file_paths, is_aborted)
+        except Exception as e:
+            self.close()
+            raise e
+
+    def __extract_member(self, tar_file: tarfile.TarFile, member: tarfile.TarInfo) -> str:
+        """Extracts a member of the tar file to the temporary folder. Returns the path of the extracted file."""
+        extracted_path = os.path.join(self.__tmp_dir.name, str(len(os.listdir(self.__tmp_dir.name))))
+        with tar_file.extractfile(member) as member_file, open(extracted_path, 'wb') as extracted_file:
+            shutil.copyfileobj(member_file, extracted_file)
+        return extracted_path
+
+    def __extract_members(self, tar_file_path: str, mode: str, needed_file_paths: List[str], is_aborted: AbortEvent):
+        """Extracts the needed members in a single pass over the tar file. Parameters are the same as __init__."""
+        nested_members: Dict[str, str] = {}
+        pending = set(needed_file_paths)
+        with tarfile.open(tar_file_path, mode) as tar_file:
+            for member in tar_file:
+                check_if_stopped(is_aborted, ExperimentStopped)
+                if not member.isfile():
+                    continue
+
+                name = member.name[2:] if member.name.startswith('./') else member.name
+                self.file_names.append(name)
+
+                # Some CGDS studies have a sub folder in its tar file
+                sub_path = name.split('/', maxsplit=1)[1] if '/' in name else None
+                if name in pending:
+                    self.members[name] = self.__extract_member(tar_file, member)
+                    pending.remove(name)
+                elif sub_path in pending and sub_path not in nested_members:
+                    nested_members[sub_path] = self.__extract_member(tar_file, member)
+
+                if not pending or pending.issubset(nested_members):
+                    break
+
+        for file_path, extracted_path in nested_members.items():
+            self.members.setdefault(file_path, extracted_path)
+
+    def __enter__(self) -> 'StudyArchive':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Removes the extracted members."""
+        self.__tmp_dir.cleanup()
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator[IO[bytes]]:
+        """
+        Opens an extracted member of the tar file to be streamed. Every call opens its own file object so it's safe to
+        read different members from different threads.
+        @param file_path: Dataset's file path to open.
+        @return: File object of the member.
+        @raise FileNotFoundError if the file does not exist in the tar file.
+        """
+        extracted_path = self.members.get(file_path)
+        if extracted_path is None:
+            raise FileNotFoundError(file_path)
+
+        with open(extracted_path, 'rb') as member_file:
+            yield member_file
+
+
+def __get_duplicated_molecules(dataset: CGDSDataset, archive: StudyArchive, skip_rows: int) -> Set[str]:
+    """
+    Gets the duplicated molecules (if any) of a molecules dataset reading only the MOLECULE_SYMBOL column. This is
+    necessary because some datasets have duplicated due to discontinued molecules identifiers. cBioPortal contains some
+    duplicated identifiers in different cases (upper and lower) so the comparison is made in upper case.
+    @param dataset: Dataset to get the separator.
+    @param archive: StudyArchive to stream the dataset file.
+    @param skip_rows: Number of rows to skip.
+    @return: Set of duplicated molecules in upper case.
+    """
+    with archive.open(dataset.file_path) as dataset_file:
+        symbols: pd.Series = pd.read_csv(
+            dataset_file,
+            sep=dataset.separator,
+            skiprows=skip_rows,
+            usecols=[MOLECULE_SYMBOL],
+            dtype={MOLECULE_SYMBOL: str}
+        )[MOLECULE_SYMBOL].str.upper()
+
+    return set(symbols[symbols.duplicated(keep=False)].dropna())
+
+
+def __process_dataset_chunk(dataset_chunk: pd.DataFrame, file_type: FileType,
+                            duplicated_molecules: Set[str]) -> pd.DataFrame:
+    """
+    Processes a chunk of a CGDSDataset file to be inserted in MongoDB.
+    @param dataset_chunk: Chunk to process.
+    @param file_type: Type of the dataset.
+    @param duplicated_molecules: Set of duplicated molecules (in upper case) to remove.
+    @return: Processed chunk.
+    """
+    # Replaces '.' with '_dot_' to prevent MongoDB errors
+    dataset_chunk.columns = dataset_chunk.columns.str.replace(".", "_dot_")
+
+    # Replaces TCGA suffix: '-01' (primary tumor), -06 (metastatic) and '-11' (normal) from samples
+    # to avoid breaking df join. There's also '-03' suffix in some Firehose Legacy studies
+    if file_type == FileType.CLINICAL:
+        # Clinical data has a PATIENT_ID or SAMPLE_ID column. In the samples file (data_clinical_sample.txt)
+        # there is a SAMPLE_ID column that has the TCGA suffix. In the patients file
+        # (data_clinical_patient.txt) there's not, so we have to check if it's that file and replaces the
+        # suffix in the PATIENT_ID column
+        if SAMPLE_ID_COLUMN in dataset_chunk.columns and PATIENT_ID_COLUMN in dataset_chunk.columns:
+            dataset_chunk[PATIENT_ID_COLUMN] = dataset_chunk[PATIENT_ID_COLUMN].str.replace(
+                TCGA_CONVENTION, '', regex=True
+            )
+    else:
+        # Samples in molecules datasets are in the header (as columns)
+        dataset_chunk.columns = dataset_chunk.columns.str.replace(TCGA_CONVENTION, '', regex=True)
+
+        # Removes the duplicated molecules (computed in a first pass over the whole file)
+        if duplicated_molecules:
+            is_duplicated = dataset_chunk[MOLECULE_SYMBOL].str.upper().isin(duplicated_molecules)
+            dataset_chunk = dataset_chunk[~is_duplicated]
+
+        # Removes NaNs values to prevent errors in JSON sent to BioAPI/Modulector
+        dataset_chunk = clean_dataset(dataset_chunk, axis='index')
+
+    return dataset_chunk
+
+
+def __read_dataset_in_chunks(dataset: CGDSDataset, archive: StudyArchive, skip_rows: int,
+                             is_aborted: AbortEvent) -> Iterator[pd.DataFrame]:
+    """
+    Streams a CGDSDataset file from the study tar file in chunks of settings.CGDS_SYNC_CHUNK_SIZE rows, processing
+    every chunk to be inserted in MongoDB.
+    @param dataset: Dataset to read.
+    @param archive: StudyArchive to stream the dataset file.
+    @param skip_rows: Number of rows to skip.
+    @param is_aborted: AbortEvent to check if the process was aborted.
+    @return: Iterator of processed chunks.
+    """
+    file_type = dataset.file_type
+    is_clinical = file_type == FileType.CLINICAL
+
+    chunk_size = settings.CGDS_SYNC_CHUNK_SIZE
+
+    # Clinical files are small and have mixed types columns, so they are read in one pass to infer the same type for
+    # every chunk of a column (otherwise, the same attribute could be stored with different types in MongoDB)
+    if is_clinical:
+        with archive.open(dataset.file_path) as dataset_file:
+            clinical_df = pd.read_csv(dataset_file, sep=dataset.separator, skiprows=skip_rows)
+
+        for start in range(0, len(clinical_df), chunk_size):
+            check_if_stopped(is_aborted, ExperimentStopped)
+            yield __process_dataset_chunk(clinical_df.iloc[start:start + chunk_size].copy(), file_type, set())
+        return
+
+    # Duplicated molecules must be computed over the entire file
+    duplicated_molecules = __get_duplicated_molecules(dataset, archive, skip_rows)
+
+    with archive.open(dataset.file_path) as dataset_file:
+        with pd.read_csv(
+            dataset_file,
+            sep=dataset.separator,
+            skiprows=skip_rows,
+            dtype={MOLECULE_SYMBOL: str},
+            chunksize=chunk_size
+        ) as reader:
+            for dataset_chunk in reader:
+                check_if_stopped(is_aborted, ExperimentStopped)
+                yield __process_dataset_chunk(dataset_chunk, file_type, duplicated_molecules)
 
 
-def __sync_dataset(dataset: CGDSDataset, extract_path: str, only_failed: bool,
+def __sync_dataset(dataset: CGDSDataset, archive: StudyArchive, only_failed: bool,
                    check_patient_column: bool, is_aborted: AbortEvent):
     """
-    Synchronizes a CGDS Dataset from a compressed file downloaded in 'sync_study' method.
+    Synchronizes a CGDS Dataset from a compressed file downloaded in 'sync_study' method. The file is processed in
+    chunks end to end (reading, standardization and insertion) to keep the memory usage bounded.
     @param dataset: Dataset to synchronize.
-    @param extract_path: System path where the extracted files will be temporarily stored.
+    @param archive: StudyArchive to stream the dataset file from the downloaded tar file.
     @param only_failed: If True, only synchronizes the dataset if It's not synchronized yet.
     @param check_patient_column: If True it checks that the patient id column is present (useful for clinical).
     @param is_aborted: AbortEvent to check if the process was aborted.
@@ -53,70 +240,30 @@ def __sync_dataset(dataset: CGDSDataset, extract_path: str, only_failed: bool,
             logging.warning(f'Dataset "{dataset}" is already synchronized and only_failed is True. Ignoring it.')
             return
 
-        # Gets file
         check_if_stopped(is_aborted, ExperimentStopped)
-        dataset_file_path = os.path.join(extract_path, dataset.file_path)
         skip_rows = dataset.header_row_index if dataset.header_row_index else 0
 
-        dataset_content: Optional[pd.DataFrame] = None
+        columns: List[str] = []
         sync_went_fine = False
         try:
+            # Reads only the header to check the columns before removing the current data
             check_if_stopped(is_aborted, ExperimentStopped)
-            dataset_content = pd.read_csv(
-                dataset_file_path,
-                sep=dataset.separator,
-                skiprows=skip_rows
-            )
+            with archive.open(dataset.file_path) as dataset_file:
+                columns = pd.read_csv(dataset_file, sep=dataset.separator, skiprows=skip_rows,
+                                      nrows=0).columns.tolist()
 
             # Checks, in case of clinical datasets that PATIENT_ID_COLUMN is present
-            if check_patient_column and PATIENT_ID_COLUMN not in dataset_content.columns:
+            if check_patient_column and PATIENT_ID_COLUMN not in columns:
                 raise SkipRowsIsIncorrect
 
-            # Replaces '.' with '_dot_' to prevent MongoDB errors
-            check_if_stopped(is_aborted, ExperimentStopped)
-            dataset_content.columns = dataset_content.columns.str.replace(".", "_dot_")
-
-            # Replaces TCGA suffix: '-01' (primary tumor), -06 (metastatic) and '-11' (normal) from samples
-            # to avoid breaking df join. There's also '-03' suffix in some Firehose Legacy studies
-            check_if_stopped(is_aborted, ExperimentStopped)
-            if dataset.file_type == FileType.CLINICAL:
-                # Clinical data has a PATIENT_ID or SAMPLE_ID column. In the samples file (data_clinical_sample.txt)
-                # there is a SAMPLE_ID column that has the TCGA suffix. In the patients file
-                # (data_clinical_patient.txt) there's not, so we have to check if it's that file and replaces the
-                # suffix in the PATIENT_ID column
-                if SAMPLE_ID_COLUMN in dataset_content.columns and PATIENT_ID_COLUMN in dataset_content.columns:
-                    dataset_content[PATIENT_ID_COLUMN] = dataset_content[PATIENT_ID_COLUMN].str.replace(
-                        TCGA_CONVENTION, '', regex=True
-                    )
-            else:
-                # Samples in molecules datasets are in the header (as columns)
-                dataset_content.columns = dataset_content.columns.str.replace(TCGA_CONVENTION, '', regex=True)
-
-                # Removes the duplicated molecules (if any). This is necessary because some datasets have
-                # duplicated due to discontinued molecules identifiers.
-                # First, generates a column with all the values of the MOLECULE_SYMBOL column as upper case as
-                # cBioPortal contains some duplicated identifiers in different cases (upper and lower)
-                check_if_stopped(is_aborted, ExperimentStopped)
-                upper_col = f'{MOLECULE_SYMBOL}_upper'
-                dataset_content[upper_col] = dataset_content[MOLECULE_SYMBOL].str.upper()
-
-                # Removes duplicated molecules and the generated column
-                check_if_stopped(is_aborted, ExperimentStopped)
-                dataset_content = dataset_content.drop_duplicates(subset=[upper_col], keep=False)
-                dataset_content = dataset_content.drop(columns=[upper_col])
-
-                # Removes NaNs values to prevent errors in JSON sent to BioAPI/Modulector
-                check_if_stopped(is_aborted, ExperimentStopped)
-                dataset_content = clean_dataset(dataset_content, axis='index')
-
             # Removes the collection
             check_if_stopped(is_aborted, ExperimentStopped)
             global_mongo_service.drop_collection(dataset.mongo_collection_name)
 
-            # Inserts the documents in the collection
+            # Inserts the documents in the collection chunk by chunk
             check_if_stopped(is_aborted, ExperimentStopped)
             inserted_successfully = global_mongo_service.insert_cgds_dataset(
-                dataset_content,
+                __read_dataset_in_chunks(dataset, archive, skip_rows, is_aborted),
                 dataset.mongo_collection_name,
                 dataset.file_type
             )
@@ -130,7 +277,6 @@ def __sync_dataset(dataset: CGDSDataset, extract_path: str, only_failed: bool,
             else:
                 dataset.state = CGDSDatasetSynchronizationState.COULD_NOT_SAVE_IN_MONGO
         except SkipRowsIsIncorrect:
-            columns = dataset_content.columns.tolist() if dataset_content else []
             logging.error(f"The dataset '{dataset}' seems to have an invalid skiprows parameter as it does not "
                           f"contains '{PATIENT_ID_COLUMN}' column. Columns with current skiprows "
                           f"value ({dataset.header_row_index}) are: {columns}")
@@ -140,8 +286,15 @@ def __sync_dataset(dataset: CGDSDataset, extract_path: str, only_failed: bool,
             dataset.state = CGDSDatasetSynchronizationState.COULD_NOT_SAVE_IN_MONGO
         except FileNotFoundError:
             logging.error(f"The file '{dataset.file_path}' does not exist in the tar.gz of the dataset '{dataset}'")
-            logging.error(f'Possible files to select in dataset: {__get_files_of_directory(extract_path)}')
+            logging.error(f'Possible files to select in dataset: {sorted(archive.file_names)}')
             dataset.state = CGDSDatasetSynchronizationState.FILE_DOES_NOT_EXIST
+        except ExperimentStopped:
+            # Data could be partially inserted, so it's marked as an error and the stop is propagated to
+            # mark the CGDSStudy as STOPPED
+            logging.warning(f'Synchronization of dataset "{dataset}" was stopped')
+            dataset.state = CGDSDatasetSynchronizationState.FINISHED_WITH_ERROR
+            dataset.save()
+            raise
         except Exception as e:
             logging.error(
                 f"The CGDS dataset '{dataset}' had a sync problem: {e}"
@@ -162,28 +315,53 @@ def __sync_dataset(dataset: CGDSDataset, extract_path: str, only_failed: bool,
             raise Exception(msg)
 
 
-def __detect_sub_folder(dir_path: str) -> Optional[str]:
+def __sync_dataset_and_close_connection(dataset: CGDSDataset, archive: StudyArchive, only_failed: bool,
+                                        check_patient_column: bool, is_aborted: AbortEvent):
+    """Calls __sync_dataset() closing the DB connection at the end as it's run inside a ThreadPoolExecutor."""
+    try:
+        __sync_dataset(dataset, archive, only_failed, check_patient_column, is_aborted)
+    finally:
+        close_db_connection()
+
+
+def __sync_datasets_in_parallel(datasets_to_sync: List[Tuple[Optional[CGDSDataset], bool]], archive: StudyArchive,
+                                only_failed: bool, is_aborted: AbortEvent):
     """
-    Detects if there is a sub folder and not files in a specific directory path. This prevents errors
-    on CGDS studies which has a sub folder in its tar.gz file
-    @param dir_path: Directory path to check
-    @return: The name of sub folder if detected, None otherwise
+    Synchronizes the datasets of a CGDSStudy concurrently using settings.CGDS_SYNC_MAX_WORKERS threads. The failure
+    policy is the same as the sequential synchronization: when a dataset fails, the datasets that have not started
+    yet are not synchronized and the first exception is raised. An ExperimentStopped exception (the user has aborted
+    the synchronization) has precedence over any other exception.
+    @param datasets_to_sync: List of tuples with the dataset to synchronize and the check_patient_column parameter.
+    @param archive: StudyArchive to stream the datasets files from the downloaded tar file.
+    @param only_failed: If True, only synchronizes the datasets that are not synchronized yet.
+    @param is_aborted: AbortEvent to check if the process was aborted.
     """
-    there_are_files = False
-    directory: Optional[str] = None
-    for filename in listdir(dir_path):
-        if isfile(os.path.join(dir_path, filename)):
-            there_are_files = True
-        elif directory is None:
-            directory = filename
+    first_exception: Optional[Exception] = None
+    with ThreadPoolExecutor(max_workers=settings.CGDS_SYNC_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(__sync_dataset_and_close_connection, dataset, archive, only_failed,
+                            check_patient_column, is_aborted)
+            for dataset, check_patient_column in datasets_to_sync
+            if dataset is not None
+        ]
+
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+
+            exception = future.exception()
+            if exception is None:
+                continue
 
-        if directory is not None and there_are_files:
-            # In this case it has all the needed information
-            break
+            # Prevents the synchronization of the datasets that have not started yet
+            for pending_future in futures:
+                pending_future.cancel()
 
-    if directory is not None and not there_are_files:
-        return directory
-    return None
+            if first_exception is None or isinstance(exception, ExperimentStopped):
+                first_exception = exception
+
+    if first_exception is not None:
+        raise first_exception
 
 
 def __copy_dataset(dataset: Optional[CGDSDataset], new_version: int,
@@ -269,8 +447,8 @@ def generate_study_new_version(study: CGDSStudy) -> CGDSStudy:
 def extract_file_and_sync_datasets(cgds_study: CGDSStudy, tar_file_path: str, only_failed: bool,
                                    is_aborted: AbortEvent):
     """
-    Extracts the recently downloaded tar file of a CGDSStudy and syncs its CGDSDataset which
-    are inside the tar file
+    Syncs the CGDSDatasets of a CGDSStudy extracting only their files from the recently downloaded tar file (the
+    rest of the members are never extracted)
     @param cgds_study: CGDSStudy to gets the reading mode of the tar file
     @param tar_file_path: Path of downloaded tar file to decompress it
     @param only_failed: If True, only synchronizes the datasets that are not synchronized yet.
@@ -282,32 +460,26 @@ def extract_file_and_sync_datasets(cgds_study: CGDSStudy, tar_file_path: str, on
     ext = os.path.splitext(path)[1]
     mode = "r:gz" if ext == ".gz" else "r:"
 
-    # Creates a temp dir
-    with tempfile.TemporaryDirectory() as extract_path:
-        # Open the tar/tar.gz file into the temp dir
-        check_if_stopped(is_aborted, ExperimentStopped)
-        with tarfile.open(tar_file_path, mode) as downloaded_tar_file:
-            downloaded_tar_file.extractall(extract_path)
-
-        # Checks if there is a sub folder and concatenates its name
-        check_if_stopped(is_aborted, ExperimentStopped)
-        sub_folder_name = __detect_sub_folder(extract_path)
-        if sub_folder_name is not None:
-            extract_path = os.path.join(extract_path, sub_folder_name)
+    datasets_to_sync = [
+        (cgds_study.mrna_dataset, False),
+        (cgds_study.mirna_dataset, False),
+        (cgds_study.cna_dataset, False),
+        (cgds_study.methylation_dataset, False),
+        (cgds_study.clinical_patient_dataset, True),
+        (cgds_study.clinical_sample_dataset, True)
+    ]
 
+    # Locates the needed members in the tar file
+    check_if_stopped(is_aborted, ExperimentStopped)
+    needed_file_paths = [dataset.file_path for dataset, _ in datasets_to_sync if dataset is not None]
+    with StudyArchive(tar_file_path, mode, needed_file_paths, is_aborted) as archive:
         # Syncs CGDS study's datasets
-        __sync_dataset(cgds_study.mrna_dataset, extract_path, only_failed, check_patient_column=False,
-                       is_aborted=is_aborted)
-        __sync_dataset(cgds_study.mirna_dataset, extract_path, only_failed, check_patient_column=False,
-                       is_aborted=is_aborted)
-        __sync_dataset(cgds_study.cna_dataset, extract_path, only_failed, check_patient_column=False,
-                       is_aborted=is_aborted)
-        __sync_dataset(cgds_study.methylation_dataset, extract_path, only_failed, check_patient_column=False,
-                       is_aborted=is_aborted)
-        __sync_dataset(cgds_study.clinical_patient_dataset, extract_path, only_failed,
-                       check_patient_column=True, is_aborted=is_aborted)
-        __sync_dataset(cgds_study.clinical_sample_dataset, extract_path, only_failed,
-                       check_patient_column=True, is_aborted=is_aborted)
+        if settings.CGDS_SYNC_MAX_WORKERS > 1:
+            __sync_datasets_in_parallel(datasets_to_sync, archive, only_failed, is_aborted)
+        else:
+            for dataset, check_patient_column in datasets_to_sync:
+                __sync_dataset(dataset, archive, only_failed, check_patient_column=check_patient_column,
+                               is_aborted=is_aborted)
 
 
 def all_dataset_finished_correctly(cgds_study: CGDSStudy) -> bool:
@@ -1,17 +1,16 @@
 import logging
-import os
 import tarfile
-import tempfile
 import requests
 from urllib.error import URLError
 from billiard.exceptions import SoftTimeLimitExceeded
 from celery.contrib.abortable import AbortableTask
 from django.conf import settings
 from django.utils import timezone
-from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectionError, HTTPError
 from common.exceptions import ExperimentStopped
 from common.functions import check_if_stopped
 from multiomics_intermediate.celery import app
+from .download_service import download_study_file, CorruptedStudyFile
 from .models import CGDSStudy, CGDSStudySynchronizationState
 from .synchronization_service import extract_file_and_sync_datasets, all_dataset_finished_correctly
 
@@ -38,35 +37,9 @@ def sync_study(self, cgds_study_pk: int, only_failed: bool):
 
     # Gets the tar.gz file
     try:
-        # Downloads the file in a temporary file
-        logging.warning(f'Starting {cgds_study.name} downloading')
+        # Downloads the file (or gets it from the download cache)
         check_if_stopped(self.is_aborted, ExperimentStopped)
-
-        # Creates a temporary file to store the downloaded file. Uses this instead of NamedTemporaryFile
-        # to prevent issues on Windows (read more at https://stackoverflow.com/q/23212435/7058363)
-        downloaded_path = os.path.join(tempfile.gettempdir(), os.urandom(24).hex())
-        with open(downloaded_path, mode='wb') as out_file:
-            # Sets the variables to logs the download progress
-            check_if_stopped(self.is_aborted, ExperimentStopped)
-            connection_timeout = float(settings.CGDS_CONNECTION_TIMEOUT)
-            read_timeout = float(settings.CGDS_READ_TIMEOUT)
-            req = requests.get(cgds_study.url, stream=True, timeout=(connection_timeout, read_timeout))
-            size = int(req.headers['Content-Length'].strip())
-            downloaded_bytes = 0
-
-            # Reads in chunks and logs the progress
-            chunk_size = int(settings.CGDS_CHUNK_SIZE)
-            for chunk in req.iter_content(chunk_size=chunk_size):
-                check_if_stopped(self.is_aborted, ExperimentStopped)
-                out_file.write(chunk)
-
-                # Logs the progress status
-                downloaded_bytes += len(chunk)
-                downloaded_bytes_percentage = (100 * downloaded_bytes) // size
-                logging.warning(f'{cgds_study.name} downloaded at -> {downloaded_bytes_percentage}%')
-
-            logging.warning(f'{cgds_study.name} downloading finished')
-
+        with download_study_file(cgds_study.url, cgds_study.name, self.is_aborted) as downloaded_path:
             # Extracts and synchronizes the CGDSStudy's Datasets
             check_if_stopped(self.is_aborted, ExperimentStopped)
             extract_file_and_sync_datasets(cgds_study, downloaded_path, only_failed, self.is_aborted)
@@ -78,10 +51,10 @@ def sync_study(self, cgds_study_pk: int, only_failed: bool):
             cgds_study.date_last_synchronization = timezone.now()
         else:
             cgds_study.state = CGDSStudySynchronizationState.FINISHED_WITH_ERROR
-    except (ConnectionError, URLError, ValueError) as e:
+    except (ConnectionError, URLError, ValueError, HTTPError) as e:
         logging.error(f'The URL {cgds_study.url} of study with pk {cgds_study.pk} was not found: {e}')
         cgds_study.state = CGDSStudySynchronizationState.URL_ERROR
-    except tarfile.ReadError as e:
+    except (tarfile.ReadError, CorruptedStudyFile) as e:
         logging.error(f'Error reading {cgds_study}: {e}')
         cgds_study.state = CGDSStudySynchronizationState.FINISHED_WITH_ERROR
     except requests.exceptions.ConnectTimeout as e:
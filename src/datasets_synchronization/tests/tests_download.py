@@ -0,0 +1,167 @@
+import io
+import os
+import tarfile
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+from django.test import SimpleTestCase, override_settings
+from requests.exceptions import ChunkedEncodingError
+from datasets_synchronization.download_service import download_study_file, CorruptedStudyFile
+import logging
+
+# Disables to prevent correct errors logging
+logging.disable(logging.CRITICAL)
+
+
+class StudyFileRequestHandler(BaseHTTPRequestHandler):
+    """Serves the content of the server's study file supporting HEAD, ETag and Range requests."""
+    server: 'StudyFileServer'
+
+    def log_message(self, *args):
+        pass
+
+    def __send_headers(self, status: int, length: int, content_range: Optional[str] = None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        if content_range is not None:
+            self.send_header('Content-Range', content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.__send_headers(200, len(self.server.content))
+
+    def do_GET(self):
+        self.server.requested_ranges.append(self.headers.get('Range'))
+        content = self.server.content
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header is not None and self.headers.get('If-Range', self.server.etag) == self.server.etag:
+            start = int(range_header.replace('bytes=', '').split('-')[0])
+            self.__send_headers(206, len(content) - start, f'bytes {start}-{len(content) - 1}/{len(content)}')
+        else:
+            self.__send_headers(200, len(content))
+
+        # Simulates a network error in the middle of the file
+        end = len(content)
+        if self.server.fail_at is not None and start < self.server.fail_at:
+            end = self.server.fail_at
+            self.server.fail_at = None
+        self.wfile.write(content[start:end])
+
+
+class StudyFileServer(ThreadingHTTPServer):
+    """Local HTTP server to test the downloads of CGDS studies."""
+    content: bytes
+    etag: str
+    fail_at: Optional[int]
+
+    def __init__(self, content: bytes):
+        super().__init__(('127.0.0.1', 0), StudyFileRequestHandler)
+        self.content = content
+        self.etag = '"v1"'
+        self.fail_at = None
+        self.requested_ranges = []
+
+
+def generate_tar_gz_content(file_content: bytes) -> bytes:
+    """Generates a tar.gz file in memory with a single data file."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar_file:
+        info = tarfile.TarInfo('data_mrna.txt')
+        info.size = len(file_content)
+        tar_file.addfile(info, io.BytesIO(file_content))
+    return buffer.getvalue()
+
+
+class DownloadStudyFileTestCase(SimpleTestCase):
+    server: StudyFileServer
+    url: str
+    cache_dir: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        # Random content to prevent a high compression ratio
+        self.server = StudyFileServer(generate_tar_gz_content(os.urandom(200_000)))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/study.tar.gz'
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(CGDS_DOWNLOAD_CACHE_DIR=self.cache_dir.name,
+                                                   CGDS_DOWNLOAD_MAX_RETRIES=1, CGDS_CHUNK_SIZE=8192)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache_dir.cleanup()
+
+    def __download(self, url: Optional[str] = None) -> str:
+        with download_study_file(url or self.url, 'Test study', lambda: False) as downloaded_path:
+            return downloaded_path
+
+    def __assert_resumed(self, fail_at: int):
+        """Checks that the second request was a Range request from the last byte written to disk"""
+        self.assertEqual(len(self.server.requested_ranges), 2)
+        self.assertIsNone(self.server.requested_ranges[0])
+        range_start = int(self.server.requested_ranges[1].replace('bytes=', '').rstrip('-'))
+        self.assertTrue(0 < range_start <= fail_at)
+
+    def test_download_is_cached(self):
+        """Tests that a completed download is reused while the ETag doesn't change"""
+        downloaded_path = self.__download()
+        with open(downloaded_path, 'rb') as downloaded_file:
+            self.assertEqual(downloaded_file.read(), self.server.content)
+
+        self.assertEqual(self.__download(), downloaded_path)
+        self.assertEqual(len(self.server.requested_ranges), 1)
+
+        # A new file version must be downloaded again replacing the old one
+        self.server.etag = '"v2"'
+        new_downloaded_path = self.__download()
+        self.assertNotEqual(new_downloaded_path, downloaded_path)
+        self.assertFalse(os.path.exists(downloaded_path))
+        self.assertEqual(len(self.server.requested_ranges), 2)
+
+    def test_used_files_are_not_evicted(self):
+        """Tests that the LRU eviction doesn't remove files which are being read by other workers"""
+        with override_settings(CGDS_DOWNLOAD_CACHE_MAX_FILES=1, CGDS_DOWNLOAD_CACHE_GRACE_PERIOD=0):
+            with download_study_file(self.url, 'Test study', lambda: False) as downloaded_path:
+                other_path = self.__download(f'{self.url}?other')
+                self.assertTrue(os.path.exists(downloaded_path))
+
+            # Once released, it can be evicted
+            self.__download(f'{self.url}?another')
+            self.assertFalse(os.path.exists(downloaded_path))
+            self.assertFalse(os.path.exists(other_path))
+
+    def test_interrupted_download_is_resumed(self):
+        """Tests that an interrupted download is resumed with a Range request"""
+        fail_at = len(self.server.content) // 2
+        self.server.fail_at = fail_at
+        downloaded_path = self.__download()
+
+        with open(downloaded_path, 'rb') as downloaded_file:
+            self.assertEqual(downloaded_file.read(), self.server.content)
+        self.__assert_resumed(fail_at)
+
+    def test_interrupted_download_without_retries(self):
+        """Tests that a partial download is kept to be resumed in the next synchronization"""
+        fail_at = len(self.server.content) // 3
+        self.server.fail_at = fail_at
+        with override_settings(CGDS_DOWNLOAD_MAX_RETRIES=0):
+            with self.assertRaises(ChunkedEncodingError):
+                self.__download()
+
+        downloaded_path = self.__download()
+        with open(downloaded_path, 'rb') as downloaded_file:
+            self.assertEqual(downloaded_file.read(), self.server.content)
+        self.__assert_resumed(fail_at)
+
+    def test_corrupted_file(self):
+        """Tests that an invalid file is not returned nor cached"""
+        self.server.content = self.server.content[:-100]
+        with self.assertRaises(CorruptedStudyFile):
+            self.__download()
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
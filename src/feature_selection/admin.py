@@ -8,7 +8,8 @@ from django_object_actions import DjangoObjectActions
 from biomarkers.models import BiomarkerState
 from feature_selection.models import FSExperiment, SVMParameters, ClusteringParameters, TrainedModel, \
     ClusterLabelsSet, ClusterLabel, SVMTimesRecord, RFTimesRecord, ClusteringTimesRecord, RFParameters, \
-    CoxRegressionParameters, BBHAParameters, GeneticAlgorithmsParameters
+    CoxRegressionParameters, BBHAParameters, GeneticAlgorithmsParameters, UnivariateScreeningParameters, \
+    SearchCandidateRecord
 
 
 class Echo:
@@ -51,11 +52,18 @@ class TrainedModelAdmin(admin.ModelAdmin):
     def biomarker(obj: TrainedModel) -> Optional[str]:
         return obj.biomarker.name if obj.biomarker else None
 
-    list_display = ('name', 'description', 'biomarker', 'state', 'fitness_function', 'best_fitness_value')
-    list_filter = ('state', 'fitness_function')
+    list_display = ('name', 'description', 'biomarker', 'state', 'fitness_function', 'search_strategy',
+                    'best_fitness_value')
+    list_filter = ('state', 'fitness_function', 'search_strategy')
     search_fields = ('name', 'description', 'biomarker__name')
 
 
+class SearchCandidateRecordAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'trained_model', 'parameters', 'iteration', 'number_of_samples', 'mean_score',
+                    'mean_fit_time', 'mean_score_time')
+    search_fields = ('trained_model__name',)
+
+
 common_time_record_fields = ('pk', 'number_of_features', 'number_of_samples', 'execution_time', 'fitness')
 
 
@@ -154,7 +162,7 @@ class ClusteringTimesRecordAdmin(DjangoObjectActions, admin.ModelAdmin):
 
 
 class BBHAParametersAdmin(admin.ModelAdmin):
-    list_display = ('n_stars', 'n_iterations', 'version_used', 'fs_experiment')
+    list_display = ('n_stars', 'n_iterations', 'version_used', 'pre_filter_top_n', 'fs_experiment')
     list_filter = ('version_used',)
 
 
@@ -162,6 +170,11 @@ class CoxRegressionParametersAdmin(admin.ModelAdmin):
     list_display = ('top_n',)
 
 
+class UnivariateScreeningParametersAdmin(admin.ModelAdmin):
+    list_display = ('top_n', 'method', 'fs_experiment')
+    list_filter = ('method',)
+
+
 admin.site.register(FSExperiment, FSExperimentAdmin)
 admin.site.register(SVMParameters)
 admin.site.register(RFParameters)
@@ -175,3 +188,5 @@ admin.site.register(RFTimesRecord, RFTimesRecordAdmin)
 admin.site.register(ClusteringTimesRecord, ClusteringTimesRecordAdmin)
 admin.site.register(BBHAParameters, BBHAParametersAdmin)
 admin.site.register(CoxRegressionParameters, CoxRegressionParametersAdmin)
+admin.site.register(UnivariateScreeningParameters, UnivariateScreeningParametersAdmin)
+admin.site.register(SearchCandidateRecord, SearchCandidateRecordAdmin)
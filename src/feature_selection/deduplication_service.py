@@ -0,0 +1,129 @@
+import logging
+import time
+from typing import Dict, Any, Optional
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models import Q
+from biomarkers.models import Biomarker, BiomarkerState, TrainedModelState, MRNAIdentifier, MiRNAIdentifier, \
+    CNAIdentifier, MethylationIdentifier
+from common.functions import compute_fingerprint
+from .models import FSExperiment, FitnessFunction, TrainedModel, SVMParameters, RFParameters, \
+    ClusteringParameters, BBHAParameters, CoxRegressionParameters, GeneticAlgorithmsParameters, \
+    UnivariateScreeningParameters
+
+# Molecules identifiers classes, they are copied from the reused experiment's Biomarker
+IDENTIFIERS_CLASSES = [MRNAIdentifier, MiRNAIdentifier, CNAIdentifier, MethylationIdentifier]
+
+# Parameters classes related to the TrainedModel and to the FSExperiment
+MODEL_PARAMETERS_CLASSES = [SVMParameters, RFParameters, ClusteringParameters]
+ALGORITHM_PARAMETERS_CLASSES = [BBHAParameters, CoxRegressionParameters, GeneticAlgorithmsParameters,
+                                UnivariateScreeningParameters]
+
+
+def get_fs_experiment_fingerprint(experiment: FSExperiment, fit_fun_enum: FitnessFunction,
+                                  fitness_function_parameters: Dict[str, Any], algorithm_parameters: Dict[str, Any],
+                                  cross_validation_parameters: Dict[str, Any]) -> str:
+    """
+    Computes the fingerprint of a Feature Selection experiment: the molecules of the origin Biomarker, the identity
+    (and version) of its datasets and all the submitted parameters.
+    @param experiment: FSExperiment to compute.
+    @param fit_fun_enum: Selected fitness function.
+    @param fitness_function_parameters: Parameters of the fitness function.
+    @param algorithm_parameters: Parameters of the FS algorithm.
+    @param cross_validation_parameters: Parameters of the CrossValidation process.
+    @return: Fingerprint of the experiment.
+    """
+    biomarker = experiment.origin_biomarker
+    return compute_fingerprint({
+        'mrnas': sorted(biomarker.mrnas.values_list('identifier', flat=True)),
+        'mirnas': sorted(biomarker.mirnas.values_list('identifier', flat=True)),
+        'cnas': sorted(biomarker.cnas.values_list('identifier', flat=True)),
+        'methylations': sorted(biomarker.methylations.values_list('identifier', flat=True)),
+        'clinical_source': experiment.clinical_source.get_identity() if experiment.clinical_source else None,
+        'mrna_source': experiment.mrna_source.get_identity() if experiment.mrna_source else None,
+        'mirna_source': experiment.mirna_source.get_identity() if experiment.mirna_source else None,
+        'cna_source': experiment.cna_source.get_identity() if experiment.cna_source else None,
+        'methylation_source': experiment.methylation_source.get_identity() if experiment.methylation_source else None,
+        'algorithm': experiment.algorithm,
+        'fitness_function': int(fit_fun_enum),
+        'fitness_function_parameters': fitness_function_parameters,
+        'algorithm_parameters': algorithm_parameters,
+        'cross_validation_parameters': cross_validation_parameters
+    })
+
+
+def get_reusable_fs_experiment(experiment: FSExperiment, user: User) -> Optional[FSExperiment]:
+    """
+    Gets the latest completed FSExperiment with the same fingerprint whose resulting Biomarker is accessible to the user
+    (own, public or shared with one of its institutions).
+    @param experiment: New FSExperiment (with its fingerprint computed).
+    @param user: User who submitted the new experiment.
+    @return: FSExperiment whose results can be reused or None if there isn't any (or reusing is disabled in settings).
+    """
+    if not settings.REUSE_IDENTICAL_EXPERIMENTS_RESULTS or not experiment.fingerprint:
+        return None
+
+    return FSExperiment.objects.filter(
+        Q(user=user) |
+        Q(created_biomarker__is_public=True) |
+        Q(created_biomarker__shared_institutions__institutionadministration__user=user),
+        fingerprint=experiment.fingerprint,
+        created_biomarker__state=BiomarkerState.COMPLETED,
+        best_model__state=TrainedModelState.COMPLETED
+    ).exclude(pk=experiment.pk).order_by('-pk').first()
+
+
+def __copy_instance(instance: models.Model, **fields) -> models.Model:
+    """Saves a copy of a model instance (as a new row) replacing the specified fields."""
+    instance.pk = None
+    instance.id = None
+    instance._state.adding = True
+    for field, value in fields.items():
+        setattr(instance, field, value)
+    instance.save()
+    return instance
+
+
+def clone_fs_experiment_results(original: FSExperiment, experiment: FSExperiment):
+    """
+    Copies the result of a FSExperiment to another one: the molecules of the created Biomarker, the best TrainedModel
+    (which shares the model dump file with the original one, as they are never modified) with its parameters and the
+    FS algorithm parameters. The times records are not copied as the experiment was not computed.
+    @param original: Completed FSExperiment to copy its results.
+    @param experiment: New FSExperiment with the same fingerprint.
+    """
+    start = time.time()
+    new_biomarker: Biomarker = experiment.created_biomarker
+    with transaction.atomic():
+        for identifier_class in IDENTIFIERS_CLASSES:
+            identifier_class.objects.bulk_create(
+                identifier_class(identifier=identifier, biomarker=new_biomarker)
+                for identifier in identifier_class.objects.filter(
+                    biomarker=original.created_biomarker
+                ).values_list('identifier', flat=True)
+            )
+
+        original_model: TrainedModel = original.best_model
+        original_model_pk = original_model.pk
+        trained_model = __copy_instance(
+            original_model,
+            name=f'From FS for biomarker {new_biomarker.name}',
+            biomarker=new_biomarker,
+            fs_experiment=experiment,
+            task_id=None
+        )
+        for parameters_class in MODEL_PARAMETERS_CLASSES:
+            for parameters in parameters_class.objects.filter(trained_model_id=original_model_pk):
+                __copy_instance(parameters, trained_model=trained_model)
+
+        for parameters_class in ALGORITHM_PARAMETERS_CLASSES:
+            for parameters in parameters_class.objects.filter(fs_experiment=original):
+                __copy_instance(parameters, fs_experiment=experiment)
+
+        experiment.execution_time = round(time.time() - start)
+        experiment.save(update_fields=['execution_time'])
+        new_biomarker.state = BiomarkerState.COMPLETED
+        new_biomarker.save(update_fields=['state'])
+
+    logging.warning(f'FSExperiment {experiment.pk} results copied from identical FSExperiment {original.pk}')
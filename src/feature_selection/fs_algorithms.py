@@ -8,7 +8,7 @@ from math import tanh
 from django.conf import settings
 from lifelines.exceptions import ConvergenceError
 from sklearn import clone
-from typing import Iterable, List, Callable, Tuple, Union, Optional, cast
+from typing import Iterable, List, Callable, Tuple, Union, Optional, cast, Dict, Any
 from lifelines import CoxPHFitter
 from scipy.special import factorial
 from sklearn.model_selection import StratifiedKFold, GridSearchCV
@@ -16,10 +16,11 @@ from sksurv.ensemble import RandomSurvivalForest
 from sksurv.exceptions import NoComparablePairException
 from sksurv.linear_model import CoxnetSurvivalAnalysis
 from sksurv.svm import FastKernelSurvivalSVM
+from common.checkpoints import TaskCheckpoint
 from common.exceptions import ExperimentFailed
 from common.utils import get_subset_of_features
 from feature_selection.fs_models import ClusteringModels
-from feature_selection.models import ClusteringScoringMethod
+from feature_selection.models import ClusteringScoringMethod, UnivariateScreeningMethod
 from feature_selection.utils import get_random_subset_of_features_bbha, get_best_bbha
 from sklearn.exceptions import FitFailedWarning
 from sklearn.pipeline import make_pipeline
@@ -44,6 +45,9 @@ FSResult = Tuple[Optional[List[str]], Optional[SurvModel], Optional[float]]
 # Result of Cox net analysis
 CoxNetAnalysisResult = Tuple[Optional[List[str]], Optional[SurvModel], List[float]]
 
+# Stage of the metaheuristics stored in the task checkpoint after every iteration (see settings.TASKS_CHECKPOINTS_DIR)
+SEARCH_STATE_STAGE = 'search_state'
+
 
 def __all_combinations(any_list: List) -> Iterable[List]:
     """
@@ -259,6 +263,34 @@ def __compute_fitness_function(classifier: SurvModel, subset: pd.DataFrame, clin
     return current_mean_score, current_best_model
 
 
+def __save_search_state(checkpoint: Optional[TaskCheckpoint], **state):
+    """
+    Stores the state of a metaheuristic (with the state of the random generators) after an iteration so the search can
+    be resumed if the task is retried.
+    @param checkpoint: Task checkpoint. If None, nothing is stored.
+    @param state: Variables of the metaheuristic.
+    """
+    if checkpoint is None:
+        return
+
+    state['random_state'] = random.getstate()
+    state['numpy_random_state'] = np.random.get_state()
+    checkpoint.save(SEARCH_STATE_STAGE, state)
+
+
+def __load_search_state(checkpoint: Optional[TaskCheckpoint]) -> Optional[Dict[str, Any]]:
+    """
+    Gets the state of a metaheuristic stored by a previous attempt and restores the state of the random generators.
+    @param checkpoint: Task checkpoint. If None, the search starts from scratch.
+    @return: Variables of the metaheuristic or None if there isn't any stored state.
+    """
+    state = checkpoint.load(SEARCH_STATE_STAGE) if checkpoint is not None else None
+    if state is not None:
+        random.setstate(state['random_state'])
+        np.random.set_state(state['numpy_random_state'])
+    return state
+
+
 def binary_black_hole_sequential(
         classifier: SurvModel,
         molecules_df: pd.DataFrame,
@@ -272,6 +304,7 @@ def binary_black_hole_sequential(
         binary_threshold: Optional[float] = 0.6,
         coeff_1: float = 2.2,
         coeff_2: float = 0.1,
+        checkpoint: Optional[TaskCheckpoint] = None
 ) -> FSResult:
     """
     Computes the metaheuristic Binary Black Hole Algorithm. Taken from the paper
@@ -292,6 +325,7 @@ def binary_black_hole_sequential(
     @param binary_threshold: Binary threshold to set 1 or 0 the feature. If None it'll be computed randomly.
     @param coeff_1: Coefficient 1 to compute the new position of the stars. Only used if is_improved_version is True.
     @param coeff_2: Coefficient 2 to compute the new position of the stars. Only used if is_improved_version is True.
+    @param checkpoint: Task checkpoint to store the state of the stars after every iteration and resume from it.
     @return: The combination of features with the highest fitness score and the highest fitness score achieved by
     any combination of features.
     """
@@ -329,30 +363,47 @@ def binary_black_hole_sequential(
     # For the moment there is no model that needs to be minimized
     more_is_better = True
 
-    # Initializes the stars with their subsets and their fitness values
-    for i in range(n_stars):
-        random_features_to_select = get_random_subset_of_features_bbha(n_features)
-        stars_subsets[i] = random_features_to_select  # Initialize 'Population'
-
-        subset_to_predict = get_subset_of_features(molecules_df, combination=stars_subsets[i])
-        mean_score, initial_best_model = __compute_fitness_function(classifier, subset_to_predict,
-                                                                    clinical_data, is_clustering,
-                                                                    clustering_score_method,
-                                                                    cross_validation_folds, more_is_better)
-
-        stars_fitness_values[i] = mean_score
-        stars_model[i] = initial_best_model
-
-        # Best fitness and position
-        stars_best_subset[i] = stars_subsets[i]
-        stars_best_fitness_values[i] = stars_fitness_values[i]
-
-    # The star with the best fitness is the Black Hole
-    black_hole_idx, best_features, best_mean_score = get_best_bbha(stars_subsets, stars_fitness_values, more_is_better)
-    best_model: SurvModel = cast(SurvModel, stars_model[black_hole_idx])
+    state = __load_search_state(checkpoint)
+    if state is None:
+        # Initializes the stars with their subsets and their fitness values
+        for i in range(n_stars):
+            random_features_to_select = get_random_subset_of_features_bbha(n_features)
+            stars_subsets[i] = random_features_to_select  # Initialize 'Population'
+
+            subset_to_predict = get_subset_of_features(molecules_df, combination=stars_subsets[i])
+            mean_score, initial_best_model = __compute_fitness_function(classifier, subset_to_predict,
+                                                                        clinical_data, is_clustering,
+                                                                        clustering_score_method,
+                                                                        cross_validation_folds, more_is_better)
+
+            stars_fitness_values[i] = mean_score
+            stars_model[i] = initial_best_model
+
+            # Best fitness and position
+            stars_best_subset[i] = stars_subsets[i]
+            stars_best_fitness_values[i] = stars_fitness_values[i]
+
+        # The star with the best fitness is the Black Hole
+        black_hole_idx, best_features, best_mean_score = get_best_bbha(stars_subsets, stars_fitness_values,
+                                                                       more_is_better)
+        best_model: SurvModel = cast(SurvModel, stars_model[black_hole_idx])
+        first_iteration = 0
+    else:
+        # Resumes the search from the last completed iteration of a previous attempt
+        stars_subsets, stars_best_subset = state['stars_subsets'], state['stars_best_subset']
+        stars_fitness_values, stars_best_fitness_values = state['stars_fitness_values'], \
+            state['stars_best_fitness_values']
+        black_hole_idx, best_features = state['black_hole_idx'], state['best_features']
+        best_mean_score, best_model = state['best_mean_score'], state['best_model']
+        first_iteration = state['iteration']
 
     # Iterations
-    for i in range(n_iterations):
+    for i in range(first_iteration, n_iterations):
+        __save_search_state(checkpoint, iteration=i, stars_subsets=stars_subsets, stars_best_subset=stars_best_subset,
+                            stars_fitness_values=stars_fitness_values,
+                            stars_best_fitness_values=stars_best_fitness_values, black_hole_idx=black_hole_idx,
+                            best_features=best_features, best_mean_score=best_mean_score, best_model=best_model)
+
         for a in range(n_stars):
             # If it's the black hole, skips the computation
             if a == black_hole_idx:
@@ -519,6 +570,116 @@ def select_top_cox_regression(molecules_df: pd.DataFrame, clinical_data: np.ndar
     return best_features, None, best_features_coeff
 
 
+def __get_risk_sets(clinical_data: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sorts the samples by descending time and groups the tied times. As the samples are sorted in descending order, the
+    risk set of a group (all the samples with time >= the group's time) is the prefix of the sorted samples that ends
+    in the last sample of the group.
+    @param clinical_data: Numpy structured array with the time and event columns.
+    @return: Indexes to sort the samples, events (as float) in that order, index of the first sample of every group
+    and index of the last sample of every group.
+    """
+    times = clinical_data['time'].astype(float)
+    order = np.argsort(-times, kind='stable')
+    sorted_times = times[order]
+    sorted_events = clinical_data['event'][order].astype(float)
+
+    groups_starts = np.flatnonzero(np.r_[True, sorted_times[1:] != sorted_times[:-1]])
+    groups_ends = np.r_[groups_starts[1:], len(sorted_times)] - 1
+    return order, sorted_events, groups_starts, groups_ends
+
+
+def __cox_score_statistics(x: np.ndarray, events: np.ndarray, groups_starts: np.ndarray,
+                           groups_ends: np.ndarray) -> np.ndarray:
+    """
+    Computes the score (Rao) test statistic of a univariate Cox model at beta = 0 for every feature at once (Breslow
+    method for ties). U = sum(x_i - mean(x in risk set)) and I = sum(var(x in risk set)) over the events.
+    @param x: Matrix with samples (sorted by descending time) as rows and features as columns.
+    @param events: Events of the sorted samples.
+    @param groups_starts: Index of the first sample of every group of tied times.
+    @param groups_ends: Index of the last sample of every group of tied times.
+    @return: Chi-squared statistic (1 degree of freedom) of every feature.
+    """
+    # Sums of x and x^2 over the risk set of every group of tied times
+    n_at_risk = (groups_ends + 1).astype(float)[:, np.newaxis]
+    risk_mean = np.cumsum(x, axis=0)[groups_ends] / n_at_risk
+    risk_var = np.cumsum(x ** 2, axis=0)[groups_ends] / n_at_risk - risk_mean ** 2
+
+    # Number of events and sum of x of the samples with an event in every group
+    n_events = np.add.reduceat(events, groups_starts)[:, np.newaxis]
+    events_x_sum = np.add.reduceat(x * events[:, np.newaxis], groups_starts, axis=0)
+
+    u = np.sum(events_x_sum - n_events * risk_mean, axis=0)
+    i = np.sum(n_events * np.maximum(risk_var, 0.0), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(i > 0, u ** 2 / i, 0.0)
+
+
+def __log_rank_statistics(x: np.ndarray, events: np.ndarray, groups_starts: np.ndarray,
+                          groups_ends: np.ndarray) -> np.ndarray:
+    """
+    Computes the log-rank test statistic for every feature at once splitting the samples in two groups by the median
+    expression of the feature (high vs low expression).
+    @param x: Matrix with samples (sorted by descending time) as rows and features as columns.
+    @param events: Events of the sorted samples.
+    @param groups_starts: Index of the first sample of every group of tied times.
+    @param groups_ends: Index of the last sample of every group of tied times.
+    @return: Chi-squared statistic (1 degree of freedom) of every feature.
+    """
+    high_expression = (x > np.median(x, axis=0)).astype(float)
+
+    n_at_risk = (groups_ends + 1).astype(float)[:, np.newaxis]
+    n_high_at_risk = np.cumsum(high_expression, axis=0)[groups_ends]
+    n_events = np.add.reduceat(events, groups_starts)[:, np.newaxis]
+    n_high_events = np.add.reduceat(high_expression * events[:, np.newaxis], groups_starts, axis=0)
+
+    # Observed - expected events in the high expression group and its variance (hypergeometric)
+    high_proportion = n_high_at_risk / n_at_risk
+    observed_minus_expected = np.sum(n_high_events - n_events * high_proportion, axis=0)
+    variance = np.sum(
+        n_events * high_proportion * (1 - high_proportion) * (n_at_risk - n_events) / np.maximum(n_at_risk - 1, 1),
+        axis=0
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(variance > 0, observed_minus_expected ** 2 / variance, 0.0)
+
+
+def compute_univariate_survival_statistics(molecules_df: pd.DataFrame, clinical_data: np.ndarray,
+                                           method: UnivariateScreeningMethod) -> pd.Series:
+    """
+    Computes a univariate survival statistic for every molecule at once using vectorized operations over the
+    samples x molecules matrix (no model is fitted).
+    @param molecules_df: DataFrame with all the molecules' data (molecules as rows and samples as columns).
+    @param clinical_data: Numpy structured array with the time and event columns.
+    @param method: Statistic to compute: Cox score test or log-rank test.
+    @return: Series with the chi-squared statistic of every molecule sorted in descending order.
+    """
+    order, events, groups_starts, groups_ends = __get_risk_sets(clinical_data)
+    x = molecules_df.to_numpy(dtype=float).T[order]
+
+    if method == UnivariateScreeningMethod.LOG_RANK:
+        statistics = __log_rank_statistics(x, events, groups_starts, groups_ends)
+    else:
+        # Centers the features to reduce the floating point error in the risk sets variances
+        statistics = __cox_score_statistics(x - x.mean(axis=0), events, groups_starts, groups_ends)
+
+    return pd.Series(statistics, index=molecules_df.index).sort_values(ascending=False, kind='stable')
+
+
+def select_top_univariate_survival(molecules_df: pd.DataFrame, clinical_data: np.ndarray,
+                                   method: UnivariateScreeningMethod, top_n: int) -> CoxNetAnalysisResult:
+    """
+    Gets the top N features ranked by a univariate survival statistic (see compute_univariate_survival_statistics).
+    @param molecules_df: DataFrame with all the molecules' data.
+    @param clinical_data: Numpy array with the time and event columns.
+    @param method: Statistic to rank the features.
+    @param top_n: Top N features to keep.
+    @return: The top N features, None as no model is fitted and the statistic of every selected feature.
+    """
+    statistics = compute_univariate_survival_statistics(molecules_df, clinical_data, method).iloc[:top_n]
+    return statistics.index.tolist(), None, statistics.tolist()
+
+
 def genetic_algorithms_sequential(
         classifier: SurvModel,
         molecules_df: pd.DataFrame,
@@ -529,19 +690,26 @@ def genetic_algorithms_sequential(
         is_clustering: bool,
         clustering_score_method: Optional[ClusteringScoringMethod],
         cross_validation_folds: int,
+        checkpoint: Optional[TaskCheckpoint] = None
 ) -> FSResult:
     # Even in case of Log-likelihood (only used in clustering) it has to be maximized:
     # https://github.com/CamDavidsonPilon/lifelines/issues/1545
     # For the moment there is no model that needs to be minimized
     more_is_better = True
 
-    # Initialize population randomly
+    # Initialize population randomly (or resumes the search from the last completed iteration of a previous attempt)
     n_molecules = molecules_df.shape[0]
-    population = np.random.randint(2, size=(population_size, n_molecules))
+    state = __load_search_state(checkpoint)
+    if state is None:
+        population = np.random.randint(2, size=(population_size, n_molecules))
+        fitness_scores = np.empty((population_size, 2))
+        first_iteration = 0
+    else:
+        population, fitness_scores, first_iteration = state['population'], state['fitness_scores'], state['iteration']
 
-    fitness_scores = np.empty((population_size, 2))
+    for iteration in range(first_iteration, n_iterations):
+        __save_search_state(checkpoint, iteration=iteration, population=population, fitness_scores=fitness_scores)
 
-    for _iteration in range(n_iterations):
         # Calculate fitness scores for each solution
         fitness_scores = np.array([
             __compute_fitness_function(classifier, get_subset_of_features(molecules_df, combination=solution),
@@ -1,6 +1,9 @@
 from typing import Literal, Union, Optional
+import numpy as np
 from django.conf import settings
 from sklearn.cluster import KMeans, SpectralClustering, BisectingKMeans, AgglomerativeClustering
+from sklearn.metrics import pairwise_distances_argmin
+from sklearn.neighbors import KNeighborsClassifier
 from sksurv.ensemble import RandomSurvivalForest
 from sksurv.svm import FastKernelSurvivalSVM
 from .models import ClusteringAlgorithm
@@ -11,6 +14,54 @@ SVMKernelOptions = Literal["linear", "poly", "rbf", "sigmoid", "cosine", "precom
 # Available options for the SVM optimizer
 SVMOptimizerOptions = Literal["avltree", "rbtree"]
 
+# Number of neighbors used to assign new samples to the clusters of a SpectralClustering model
+SPECTRAL_ASSIGNER_N_NEIGHBORS = 5
+
+
+class WardClustering(AgglomerativeClustering):
+    """
+    AgglomerativeClustering (Ward linkage) which stores the centroid of every cluster during fit() to assign new
+    samples to the nearest centroid in predict() (O(n * k)) without refitting the model. As Ward linkage minimizes the
+    within-cluster variance, the nearest centroid is consistent with the fitted clusters.
+    """
+    cluster_centers_: np.ndarray
+
+    def fit(self, X, y=None):
+        super().fit(X, y)
+        x = np.asarray(X, dtype=float)
+        self.cluster_centers_ = np.vstack([x[self.labels_ == cluster_id].mean(axis=0)
+                                          for cluster_id in range(self.n_clusters_)])
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        """Assigns every sample to the cluster of the nearest centroid."""
+        return pairwise_distances_argmin(np.asarray(X, dtype=float), self.cluster_centers_)
+
+
+class SpectralClusteringWithAssigner(SpectralClustering):
+    """
+    SpectralClustering which fits a nearest-neighbors classifier with the training samples and their labels to assign
+    new samples in predict() without refitting the model (spectral clusters may not be convex, so centroids are not
+    enough).
+    """
+    assigner_: KNeighborsClassifier
+
+    def fit(self, X, y=None):
+        super().fit(X, y)
+        x = np.asarray(X, dtype=float)
+        n_neighbors = min(SPECTRAL_ASSIGNER_N_NEIGHBORS, x.shape[0])
+        self.assigner_ = KNeighborsClassifier(n_neighbors=n_neighbors).fit(x, self.labels_)
+
+        # The affinity matrix (n_samples x n_samples) is not needed to assign new samples, removes it to keep the
+        # model dump small
+        del self.affinity_matrix_
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        """Assigns every sample to the most common cluster among its nearest training samples."""
+        return self.assigner_.predict(np.asarray(X, dtype=float))
+
+
 # Available models for clustering
 ClusteringModels = Union[KMeans, SpectralClustering, BisectingKMeans, AgglomerativeClustering]
 
@@ -27,9 +78,9 @@ def get_clustering_model(clustering_algorithm: ClusteringAlgorithm,
     if clustering_algorithm == ClusteringAlgorithm.K_MEANS:
         return KMeans(n_clusters=number_of_clusters, random_state=random_state, n_init='auto')
     elif clustering_algorithm == ClusteringAlgorithm.SPECTRAL:
-        return SpectralClustering(n_clusters=number_of_clusters, random_state=random_state)
+        return SpectralClusteringWithAssigner(n_clusters=number_of_clusters, random_state=random_state)
     elif clustering_algorithm == ClusteringAlgorithm.WARD:
-        return AgglomerativeClustering(n_clusters=number_of_clusters, linkage='ward')
+        return WardClustering(n_clusters=number_of_clusters, linkage='ward')
     elif clustering_algorithm == ClusteringAlgorithm.BK_MEANS:
         return BisectingKMeans(n_clusters=number_of_clusters, random_state=random_state)
 
@@ -1,41 +1,47 @@
-from typing import Dict, Tuple, Any
+from typing import Dict, Tuple, Any, Optional
 import numpy as np
+import pandas as pd
 from django.conf import settings
 from biomarkers.models import BiomarkerState, TrainedModelState
-from common.datasets_utils import get_common_samples, generate_molecules_file, format_data, generate_clinical_file, \
-    check_sample_classes
+from common.checkpoints import TaskCheckpoint
+from common.datasets_utils import get_common_samples, generate_molecules_dataframe, format_data, \
+    generate_clinical_dataframe, check_sample_classes
 from common.exceptions import ExperimentStopped
 from common.functions import check_if_stopped
 from common.typing import AbortEvent
 from common.utils import limit_between_min_max
 from .fs_algorithms import blind_search_sequential, binary_black_hole_sequential, select_top_cox_regression, \
-    genetic_algorithms_sequential
+    genetic_algorithms_sequential, select_top_univariate_survival, compute_univariate_survival_statistics
 from .fs_algorithms_spark import binary_black_hole_spark
 from .models import FSExperiment, FitnessFunction, FeatureSelectionAlgorithm, TrainedModel, \
-    BBHAParameters, CoxRegressionParameters, GeneticAlgorithmsParameters, BBHAVersion
+    BBHAParameters, CoxRegressionParameters, GeneticAlgorithmsParameters, BBHAVersion, UnivariateScreeningMethod, \
+    UnivariateScreeningParameters
 from .utils import save_model_dump_and_best_score, create_models_parameters_and_classifier, save_molecule_identifiers
 
 # Common event values
 COMMON_INTEREST_VALUES = ['DEAD', 'DECEASE', 'DEATH']
 
+# Stage of the FS experiments stored in the task checkpoint (see settings.TASKS_CHECKPOINTS_DIR)
+PREPARED_DATA_STAGE = 'prepared_data'
+
 
 def __generate_df_molecules_and_clinical(experiment: FSExperiment,
-                                         samples_in_common: np.ndarray) -> Tuple[str, str]:
+                                         samples_in_common: np.ndarray) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Generates two DataFrames: one with all the selected molecules, and other with the selected clinical data.
     @param experiment: FSExperiment instance to extract molecules and clinical data from its sources.
     @param samples_in_common: Samples in common to extract from the datasets.
-    @return: Both DataFrames paths.
+    @return: Both DataFrames.
     """
     # Generates clinical DataFrame
     # TODO: implement the selection of the survival tuple from the frontend
     survival_tuple = experiment.clinical_source.get_survival_columns().first()
-    clinical_temp_file_path = generate_clinical_file(experiment, samples_in_common, survival_tuple)
+    clinical_df = generate_clinical_dataframe(experiment, samples_in_common, survival_tuple)
 
     # Generates molecules DataFrame
-    molecules_temp_file_path = generate_molecules_file(experiment, samples_in_common)
+    molecules_df = generate_molecules_dataframe(experiment, samples_in_common)
 
-    return molecules_temp_file_path, clinical_temp_file_path
+    return molecules_df, clinical_df
 
 
 def __should_run_in_spark(n_agents: int, n_iterations: int) -> bool:
@@ -49,23 +55,68 @@ def __should_run_in_spark(n_agents: int, n_iterations: int) -> bool:
     return n_agents * n_iterations >= settings.MIN_COMBINATIONS_SPARK
 
 
-def __compute_fs_experiment(experiment: FSExperiment, molecules_temp_file_path: str,
-                            clinical_temp_file_path: str, fit_fun_enum: FitnessFunction,
+def __apply_univariate_pre_filter(molecules_df: pd.DataFrame, clinical_data: np.ndarray,
+                                  metaheuristic_parameters: Dict[str, Any]) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    Keeps only the top N molecules ranked by the univariate Cox score statistic to shrink the search space of a
+    metaheuristic. N is limited to keep at least settings.MIN_FEATURES_METAHEURISTICS molecules.
+    @param molecules_df: DataFrame with the molecule expressions.
+    @param clinical_data: Numpy structured array with the time and event columns.
+    @param metaheuristic_parameters: Parameters of the metaheuristic with the optional 'preFilterTopN' key.
+    @return: Filtered molecules DataFrame and the number of molecules kept (None if no filter was applied).
+    """
+    pre_filter_top_n = metaheuristic_parameters.get('preFilterTopN')
+    if not pre_filter_top_n:
+        return molecules_df, None
+
+    n_molecules = len(molecules_df.index)
+    top_n = limit_between_min_max(int(pre_filter_top_n), settings.MIN_FEATURES_METAHEURISTICS, n_molecules)
+    if top_n >= n_molecules:
+        return molecules_df, None
+
+    statistics = compute_univariate_survival_statistics(molecules_df, clinical_data,
+                                                        UnivariateScreeningMethod.COX_SCORE)
+    return molecules_df.loc[statistics.index[:top_n]], top_n
+
+
+def __remove_previous_attempt_result(experiment: FSExperiment):
+    """
+    Removes the instances created by a previous attempt of the experiment (interrupted by a worker loss) as they are
+    created again.
+    @param experiment: FSExperiment instance.
+    """
+    TrainedModel.objects.filter(fs_experiment=experiment).delete()
+    for parameters_class in [BBHAParameters, CoxRegressionParameters, GeneticAlgorithmsParameters,
+                             UnivariateScreeningParameters]:
+        parameters_class.objects.filter(fs_experiment=experiment).delete()
+
+    biomarker = experiment.created_biomarker
+    for molecules in [biomarker.mrnas, biomarker.mirnas, biomarker.cnas, biomarker.methylations]:
+        molecules.all().delete()
+
+
+def __compute_fs_experiment(experiment: FSExperiment, molecules_df: pd.DataFrame,
+                            clinical_df: pd.DataFrame, fit_fun_enum: FitnessFunction,
                             fitness_function_parameters: Dict[str, Any],
                             algorithm_parameters: Dict[str, Any],
-                            cross_validation_parameters: Dict[str, Any], is_aborted: AbortEvent) -> bool:
+                            cross_validation_parameters: Dict[str, Any], is_aborted: AbortEvent,
+                            checkpoint: Optional[TaskCheckpoint]) -> bool:
     """
     Computes the Feature Selection experiment using the params defined by the user.
     @param experiment: FSExperiment instance.
-    @param molecules_temp_file_path: Path of the DataFrame with the molecule expressions.
-    @param clinical_temp_file_path: Path of the DataFrame with the clinical data.
+    @param molecules_df: DataFrame with the molecule expressions.
+    @param clinical_df: DataFrame with the clinical data.
     @param fit_fun_enum: Selected fitness function to compute.
     @param fitness_function_parameters: Parameters of the fitness function to compute.
     @param algorithm_parameters: Parameters of the FS algorithm (Blind Search, BBHA, PSO, etc.) to compute.
     @param cross_validation_parameters: Parameters of the CrossValidation process.
     @param is_aborted: Method to call to check if the experiment has been stopped.
+    @param checkpoint: Task checkpoint to store/resume the state of the metaheuristics. None if disabled.
     @return A flag to indicate whether the experiment is running in spark
     """
+    if experiment.attempt > 1:
+        __remove_previous_attempt_result(experiment)
+
     # Creates TrainedModel instance
     cross_validation_folds = int(cross_validation_parameters['folds'])
     cross_validation_folds = limit_between_min_max(cross_validation_folds, min_value=3, max_value=10)
@@ -86,8 +137,7 @@ def __compute_fs_experiment(experiment: FSExperiment, molecules_temp_file_path:
 
     # Gets data in the correct format
     check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_df, clinical_df, clinical_data = format_data(molecules_temp_file_path, clinical_temp_file_path,
-                                                           is_regression)
+    molecules_df, clinical_df, clinical_data = format_data(molecules_df, clinical_df, is_regression)
 
     # Checks if there are fewer samples than splits in the CV to prevent ValueError
     check_if_stopped(is_aborted, ExperimentStopped)
@@ -110,13 +160,15 @@ def __compute_fs_experiment(experiment: FSExperiment, molecules_temp_file_path:
         coeff_1 = float(bbha_parameters['coeff1'])
         coeff_2 = float(bbha_parameters['coeff2'])
         use_spark = bbha_parameters['useSpark']
+        molecules_df, pre_filter_top_n = __apply_univariate_pre_filter(molecules_df, clinical_data, bbha_parameters)
 
         # Creates an instance of BBHAParameters
         BBHAParameters.objects.create(
             fs_experiment=experiment,
             n_stars=n_stars,
             n_iterations=ga_iterations,
-            version_used=bbha_version
+            version_used=bbha_version,
+            pre_filter_top_n=pre_filter_top_n
         )
 
         if settings.ENABLE_AWS_EMR_INTEGRATION and use_spark and \
@@ -156,7 +208,8 @@ def __compute_fs_experiment(experiment: FSExperiment, molecules_temp_file_path:
                 coeff_1=coeff_1,
                 coeff_2=coeff_2,
                 clustering_score_method=clustering_scoring_method,
-                cross_validation_folds=trained_model.cross_validation_folds
+                cross_validation_folds=trained_model.cross_validation_folds,
+                checkpoint=checkpoint
             )
     elif experiment.algorithm == FeatureSelectionAlgorithm.COX_REGRESSION:
         check_if_stopped(is_aborted, ExperimentStopped)
@@ -187,12 +240,15 @@ def __compute_fs_experiment(experiment: FSExperiment, molecules_temp_file_path:
         ga_iterations = int(genetic_algorithms_parameters['numberOfIterations'])
         population_size = int(genetic_algorithms_parameters['populationSize'])
         mutation_rate = float(genetic_algorithms_parameters['mutationRate'])
+        molecules_df, pre_filter_top_n = __apply_univariate_pre_filter(molecules_df, clinical_data,
+                                                                       genetic_algorithms_parameters)
 
         GeneticAlgorithmsParameters.objects.create(
             fs_experiment=experiment,
             n_iterations=ga_iterations,
             population_size=population_size,
             mutation_rate=mutation_rate,
+            pre_filter_top_n=pre_filter_top_n
         )
 
         best_features, best_model, best_score = genetic_algorithms_sequential(
@@ -204,7 +260,31 @@ def __compute_fs_experiment(experiment: FSExperiment, molecules_temp_file_path:
             clinical_data=clinical_data,
             is_clustering=is_clustering,
             clustering_score_method=clustering_scoring_method,
-            cross_validation_folds=trained_model.cross_validation_folds
+            cross_validation_folds=trained_model.cross_validation_folds,
+            checkpoint=checkpoint
+        )
+    elif experiment.algorithm == FeatureSelectionAlgorithm.UNIVARIATE_SCREENING:
+        check_if_stopped(is_aborted, ExperimentStopped)
+
+        univariate_screening_parameters = algorithm_parameters['univariateScreening']
+        top_n = int(univariate_screening_parameters['topN'])
+        top_n = limit_between_min_max(top_n, 1, len(molecules_df.index))
+        method = UnivariateScreeningMethod(
+            int(univariate_screening_parameters.get('method', UnivariateScreeningMethod.COX_SCORE))
+        )
+
+        # Creates an instance of UnivariateScreeningParameters
+        UnivariateScreeningParameters.objects.create(
+            fs_experiment=experiment,
+            top_n=top_n,
+            method=method
+        )
+
+        best_features, best_model, best_score = select_top_univariate_survival(
+            molecules_df,
+            clinical_data,
+            method=method,
+            top_n=top_n
         )
     else:
 
@@ -233,7 +313,8 @@ def prepare_and_compute_fs_experiment(experiment: FSExperiment, fit_fun_enum: Fi
                                       fitness_function_parameters: Dict[str, Any],
                                       algorithm_parameters: Dict[str, Any],
                                       cross_validation_parameters: Dict[str, Any],
-                                      is_aborted: AbortEvent) -> Tuple[str, str, bool]:
+                                      is_aborted: AbortEvent,
+                                      checkpoint: Optional[TaskCheckpoint] = None) -> bool:
     """
     Gets samples in common, generates needed DataFrames and finally computes the Feature Selection experiment.
     @param experiment: FSExperiment instance.
@@ -242,22 +323,24 @@ def prepare_and_compute_fs_experiment(experiment: FSExperiment, fit_fun_enum: Fi
     @param algorithm_parameters: Parameters of the FS algorithm (Blind Search, BBHA, PSO, etc.) to compute.
     @param cross_validation_parameters: Parameters of the CrossValidation process.
     @param is_aborted: Method to call to check if the experiment has been stopped.
-    @return Both molecules and clinical files paths.
+    @param checkpoint: Task checkpoint to resume from the last stage completed by a previous attempt and store the new
+    ones. None to compute everything from scratch.
+    @return A flag to indicate whether the experiment is running in spark.
     """
-    # Get samples in common
-    check_if_stopped(is_aborted, ExperimentStopped)
-    samples_in_common = get_common_samples(experiment)
+    prepared_data = checkpoint.load(PREPARED_DATA_STAGE) if checkpoint is not None else None
+    if prepared_data is None:
+        # Get samples in common
+        check_if_stopped(is_aborted, ExperimentStopped)
+        samples_in_common = get_common_samples(experiment)
 
-    # Generates needed DataFrames
-    check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_temp_file_path, clinical_temp_file_path = __generate_df_molecules_and_clinical(
-        experiment,
-        samples_in_common
-    )
+        # Generates needed DataFrames
+        check_if_stopped(is_aborted, ExperimentStopped)
+        molecules_df, clinical_df = __generate_df_molecules_and_clinical(experiment, samples_in_common)
+        if checkpoint is not None:
+            checkpoint.save(PREPARED_DATA_STAGE, (molecules_df, clinical_df))
+    else:
+        molecules_df, clinical_df = prepared_data
 
     check_if_stopped(is_aborted, ExperimentStopped)
-    running_in_spark = __compute_fs_experiment(experiment, molecules_temp_file_path, clinical_temp_file_path,
-                                               fit_fun_enum, fitness_function_parameters,
-                                               algorithm_parameters, cross_validation_parameters, is_aborted)
-
-    return molecules_temp_file_path, clinical_temp_file_path, running_in_spark
+    return __compute_fs_experiment(experiment, molecules_df, clinical_df, fit_fun_enum, fitness_function_parameters,
+                                   algorithm_parameters, cross_validation_parameters, is_aborted, checkpoint)
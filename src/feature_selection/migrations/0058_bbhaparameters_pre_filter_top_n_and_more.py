@@ -0,0 +1,41 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_selection', '0057_alter_clusteringparameters_algorithm_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bbhaparameters',
+            name='pre_filter_top_n',
+            field=models.PositiveIntegerField(blank=True, help_text='Top N features kept by the univariate screening before running the metaheuristic. None if no pre-filter was used', null=True),
+        ),
+        migrations.AddField(
+            model_name='geneticalgorithmsparameters',
+            name='pre_filter_top_n',
+            field=models.PositiveIntegerField(blank=True, help_text='Top N features kept by the univariate screening before running the metaheuristic. None if no pre-filter was used', null=True),
+        ),
+        migrations.AlterField(
+            model_name='fsexperiment',
+            name='algorithm',
+            field=models.IntegerField(choices=[(1, 'Blind Search'), (2, 'Cox Regression'), (3, 'Bbha'), (4, 'Pso'), (5, 'Ga'), (6, 'Univariate Screening')]),
+        ),
+        migrations.CreateModel(
+            name='UnivariateScreeningParameters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('top_n', models.PositiveIntegerField()),
+                ('method', models.IntegerField(choices=[(1, 'Cox Score'), (2, 'Log Rank')], default=1)),
+                ('fs_experiment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='feature_selection.fsexperiment')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
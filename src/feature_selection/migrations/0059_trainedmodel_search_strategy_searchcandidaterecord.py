@@ -0,0 +1,32 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_selection', '0058_bbhaparameters_pre_filter_top_n_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainedmodel',
+            name='search_strategy',
+            field=models.IntegerField(choices=[(1, 'Grid Search'), (2, 'Successive Halving')], default=1),
+        ),
+        migrations.CreateModel(
+            name='SearchCandidateRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parameters', models.JSONField()),
+                ('iteration', models.PositiveSmallIntegerField(default=0)),
+                ('number_of_samples', models.IntegerField()),
+                ('mean_score', models.FloatField(blank=True, null=True)),
+                ('mean_fit_time', models.FloatField()),
+                ('mean_score_time', models.FloatField()),
+                ('trained_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_candidates', to='feature_selection.trainedmodel')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_selection', '0059_trainedmodel_search_strategy_searchcandidaterecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fsexperiment',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Canonical fingerprint of the sources and parameters to reuse the results of identical experiments', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,98 @@
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple, Iterable
+import joblib
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+# Cache key: path of the model dump and its modification time (to discard stale entries if the file changes)
+CacheKey = Tuple[str, float]
+
+# Deserialized models with their approximate size in bytes. The least recently used are at the beginning
+__cache: 'OrderedDict[CacheKey, Tuple[Any, int]]' = OrderedDict()
+__cache_size = 0
+__cache_lock = threading.Lock()
+
+
+def serialize_model(model: Any) -> ContentFile:
+    """
+    Serializes a model with joblib. If settings.TRAINED_MODELS_DUMP_COMPRESSION is 0, large Numpy arrays (e.g. the
+    fit_X_ of the kernel SVMs) are stored raw so they can be memory-mapped when loaded.
+    @param model: Model instance to serialize.
+    @return: ContentFile to store in a FileField.
+    """
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer, compress=settings.TRAINED_MODELS_DUMP_COMPRESSION)
+    return ContentFile(buffer.getvalue())
+
+
+def __load_model(model_path: str) -> Any:
+    """
+    Loads a model dump memory-mapping its Numpy arrays in read-only mode, so the OS pages them in on demand and shares
+    them between processes. Compressed dumps and the ones generated with pickle (before joblib was used) are loaded
+    entirely in memory.
+    """
+    return joblib.load(model_path, mmap_mode='r')
+
+
+def __add_to_cache(key: CacheKey, model: Any, size: int):
+    """Adds a model to the cache removing the least recently used ones to keep the size limit."""
+    global __cache_size
+    max_size = settings.TRAINED_MODELS_CACHE_MAX_SIZE_MB * 1024 * 1024
+    if size > max_size:
+        return
+
+    with __cache_lock:
+        if key in __cache:
+            return
+
+        __cache[key] = (model, size)
+        __cache_size += size
+        while __cache_size > max_size:
+            _key, (_model, evicted_size) = __cache.popitem(last=False)
+            __cache_size -= evicted_size
+
+
+def get_model(model_path: str) -> Any:
+    """
+    Gets a deserialized model from the process-local LRU cache, loading it from disk if needed. The cache size is
+    bounded by settings.TRAINED_MODELS_CACHE_MAX_SIZE_MB (the size of the dump on disk is used as an approximation).
+    The returned instance is shared, so it must NOT be modified (e.g. fitted).
+    @param model_path: Absolute path of the model dump.
+    @return: Model instance.
+    """
+    key = (model_path, os.path.getmtime(model_path))
+    with __cache_lock:
+        if key in __cache:
+            __cache.move_to_end(key)
+            return __cache[key][0]
+
+    model = __load_model(model_path)
+    __add_to_cache(key, model, os.path.getsize(model_path))
+    return model
+
+
+def warm_up_cache(model_paths: Iterable[str]):
+    """
+    Loads a list of model dumps in the cache. Non-existing or invalid files are ignored.
+    @param model_paths: Absolute paths of the model dumps.
+    """
+    n_loaded = 0
+    for model_path in model_paths:
+        try:
+            get_model(model_path)
+            n_loaded += 1
+        except Exception as e:
+            logging.warning(f'Could not load model dump {model_path} in the cache: {e}')
+    logging.warning(f'{n_loaded} trained models loaded in the cache')
+
+
+def clear_cache():
+    """Removes all the models from the cache."""
+    global __cache_size
+    with __cache_lock:
+        __cache.clear()
+        __cache_size = 0
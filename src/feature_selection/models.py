@@ -1,5 +1,5 @@
+import copy
 import os
-import pickle
 from typing import Optional, Union
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -8,6 +8,7 @@ from django.db import models
 from django.db.models import QuerySet
 from biomarkers.models import TrainedModelState
 from api_service.websocket_functions import send_update_trained_models_command, send_update_cluster_label_set_command
+from feature_selection.model_dump_service import get_model
 from inferences.models import InferenceExperiment
 from statistical_properties.models import StatisticalValidation
 from user_files.models_choices import FileType
@@ -20,6 +21,7 @@ class FeatureSelectionAlgorithm(models.IntegerChoices):
     BBHA = 3
     PSO = 4
     GA = 5
+    UNIVARIATE_SCREENING = 6
 
 
 class FitnessFunction(models.IntegerChoices):
@@ -62,6 +64,18 @@ class SVMTask(models.IntegerChoices):
     REGRESSION = 2
 
 
+class UnivariateScreeningMethod(models.IntegerChoices):
+    """Univariate survival statistic used to rank the features in the Univariate Screening algorithm."""
+    COX_SCORE = 1
+    LOG_RANK = 2
+
+
+class SearchStrategy(models.IntegerChoices):
+    """Strategy used to search the best hyperparameters of a TrainedModel."""
+    GRID_SEARCH = 1
+    SUCCESSIVE_HALVING = 2
+
+
 class BBHAVersion(models.IntegerChoices):
     """Version of the BBHA algorithm used."""
     ORIGINAL = 1
@@ -134,6 +148,10 @@ class FSExperiment(models.Model):
     app_name = models.CharField(max_length=100, null=True, blank=True, help_text='Spark app name to get the results')
     emr_job_id = models.CharField(max_length=100, null=True, blank=True, help_text='Job ID in the Spark cluster')
 
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, db_index=True,
+                                   help_text='Canonical fingerprint of the sources and parameters to reuse the results '
+                                             'of identical experiments')
+
     def get_all_sources(self):
         """Returns a list with all the sources."""
         return [
@@ -172,6 +190,12 @@ class BBHAParameters(AlgorithmParameters):
     n_stars = models.PositiveSmallIntegerField()
     n_iterations = models.PositiveSmallIntegerField()
     version_used = models.IntegerField(choices=BBHAVersion.choices)
+    pre_filter_top_n = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Top N features kept by the univariate screening before running the metaheuristic. '
+                  'None if no pre-filter was used'
+    )
 
 
 class CoxRegressionParameters(AlgorithmParameters):
@@ -184,6 +208,19 @@ class GeneticAlgorithmsParameters(AlgorithmParameters):
     n_iterations = models.PositiveSmallIntegerField()
     population_size = models.PositiveSmallIntegerField(default=50)
     mutation_rate = models.FloatField(default=0.01)
+    pre_filter_top_n = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Top N features kept by the univariate screening before running the metaheuristic. '
+                  'None if no pre-filter was used'
+    )
+
+
+class UnivariateScreeningParameters(AlgorithmParameters):
+    """Parameters for the Univariate Screening FS algorithm."""
+    top_n = models.PositiveIntegerField()
+    method = models.IntegerField(choices=UnivariateScreeningMethod.choices,
+                                 default=UnivariateScreeningMethod.COX_SCORE)
 
 
 def user_directory_path_for_trained_models(instance, filename: str):
@@ -217,6 +254,7 @@ class TrainedModel(models.Model):
                                                                                       MaxValueValidator(10)])
     # Indicates if the cross validation folds were modified to be stratified
     cv_folds_modified = models.BooleanField(default=False)
+    search_strategy = models.IntegerField(choices=SearchStrategy.choices, default=SearchStrategy.GRID_SEARCH)
 
     # Sources
     clinical_source = models.ForeignKey('api_service.ExperimentClinicalSource', on_delete=models.CASCADE, null=True,
@@ -306,14 +344,20 @@ class TrainedModel(models.Model):
         return f'Trained model ({self.pk}) for Biomarker "{self.biomarker.name}"'
 
     def get_model_instance(self):
-        """Deserializes the model dump and return the model instance (SurvModel)."""
+        """
+        Returns the model instance (SurvModel) from the process-local cache of deserialized models. The instance is
+        shared with other callers, so it must not be fitted again. The only exception are the models without a
+        predict() method (Spectral/Ward models trained before the out-of-sample assignment was added) which are
+        refitted on every use, a copy is returned for them.
+        """
         # Prevents OS error for non-existing file
         if not self.model_dump:
             return None
 
         model_path = os.path.join(settings.MEDIA_ROOT, self.model_dump.name)
-        with open(model_path, "rb") as fp:
-            model = pickle.load(fp)
+        model = get_model(model_path)
+        if not hasattr(model, 'predict'):
+            model = copy.deepcopy(model)
         return model
 
     def get_model_parameter(self) -> Optional[TrainedModelParameters]:
@@ -442,3 +486,14 @@ class ClusteringTimesRecord(TimesRecord):
     algorithm = models.IntegerField(choices=ClusteringAlgorithm.choices)
     scoring_method = models.IntegerField(choices=ClusteringScoringMethod.choices)
     fs_experiment = models.ForeignKey(FSExperiment, on_delete=models.CASCADE, related_name='clustering_times_records')
+
+
+class SearchCandidateRecord(models.Model):
+    """Score and times of every hyperparameters candidate evaluated during the training of a TrainedModel."""
+    trained_model = models.ForeignKey(TrainedModel, on_delete=models.CASCADE, related_name='search_candidates')
+    parameters = models.JSONField()
+    iteration = models.PositiveSmallIntegerField(default=0)  # Successive halving iteration (always 0 in Grid Search)
+    number_of_samples = models.IntegerField()  # Number of samples used to evaluate the candidate
+    mean_score = models.FloatField(null=True, blank=True)
+    mean_fit_time = models.FloatField()  # Mean fit time in seconds among all the CV folds
+    mean_score_time = models.FloatField()  # Mean score time in seconds among all the CV folds
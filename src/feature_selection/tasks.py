@@ -1,11 +1,11 @@
 import logging
-import os
 import time
-from typing import Optional, Any, Dict
+from typing import Any, Dict
 from celery.contrib.abortable import AbortableTask
 from django.conf import settings
 from pymongo.errors import ServerSelectionTimeoutError
 from biomarkers.models import Biomarker, BiomarkerState, TrainedModelState
+from common.checkpoints import get_task_checkpoint
 from common.exceptions import NumberOfSamplesFewerThanCVFolds, ExperimentStopped, NoSamplesInCommon, ExperimentFailed
 from feature_selection.fs_service import prepare_and_compute_fs_experiment
 from feature_selection.models import FSExperiment, FitnessFunction
@@ -39,11 +39,16 @@ def eval_feature_selection_experiment(self, experiment_pk: int, fit_fun_enum: Fi
     # NOTE: the created_biomarker is created BEFORE calling this task
     biomarker: Biomarker = experiment.created_biomarker
 
+    # Stages completed by previous attempts (if any) are not computed again
+    checkpoint = get_task_checkpoint('feature_selection', experiment.pk)
+
     # Checks if the experiment has reached the limit of attempts
     if experiment.attempt >= 3:
         logging.warning(f'FSExperiment {experiment.pk} has reached attempts limit.')
         biomarker.state = BiomarkerState.REACHED_ATTEMPTS_LIMIT
         biomarker.save(update_fields=['state'])
+        if checkpoint is not None:
+            checkpoint.remove()
         return
 
     # Increments the attempt and sets the state of the biomarker to IN_PROCESS
@@ -53,16 +58,14 @@ def eval_feature_selection_experiment(self, experiment_pk: int, fit_fun_enum: Fi
     biomarker.save(update_fields=['state'])
 
     # Computes the experiment
-    molecules_temp_file_path: Optional[str] = None
-    clinical_temp_file_path: Optional[str] = None
     try:
         logging.warning(f'ID FSExperiment -> {experiment.pk}')
 
         # Computes Feature Selection experiment
         start = time.time()
-        molecules_temp_file_path, clinical_temp_file_path, running_in_spark = prepare_and_compute_fs_experiment(
+        running_in_spark = prepare_and_compute_fs_experiment(
             experiment, fit_fun_enum, fitness_function_parameters, algorithm_parameters,
-            cross_validation_parameters, self.is_aborted
+            cross_validation_parameters, self.is_aborted, checkpoint
         )
         total_execution_time = time.time() - start
         logging.warning(f'FSExperiment {experiment.pk} total time -> {total_execution_time} seconds')
@@ -103,18 +106,15 @@ def eval_feature_selection_experiment(self, experiment_pk: int, fit_fun_enum: Fi
         logging.exception(e)
         logging.warning(f'Setting BiomarkerState.FINISHED_WITH_ERROR to biomarker {biomarker.pk}')
         biomarker.state = BiomarkerState.FINISHED_WITH_ERROR
-    finally:
-        # Removes the temporary files
-        if molecules_temp_file_path is not None:
-            os.unlink(molecules_temp_file_path)
-
-        if clinical_temp_file_path is not None:
-            os.unlink(clinical_temp_file_path)
 
     # Saves changes in DB
     biomarker.save()
     experiment.save()
 
+    # The task has finished (successfully or not), so it won't be resumed
+    if checkpoint is not None:
+        checkpoint.remove()
+
     # Maybe the experiment didn't find any feature. NOTE: needs to be checked after saving the experiment
     # Checks if experiment has best_model prop
     if hasattr(experiment, 'best_model') and experiment.best_model.state == TrainedModelState.NO_FEATURES_FOUND:
@@ -0,0 +1,78 @@
+import random
+import tempfile
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from common.checkpoints import get_task_checkpoint
+from feature_selection.fs_algorithms import genetic_algorithms_sequential, binary_black_hole_sequential
+from feature_selection.fs_models import get_clustering_model
+from feature_selection.models import ClusteringAlgorithm, ClusteringScoringMethod
+
+
+class MetaheuristicsCheckpointTestCase(SimpleTestCase):
+    molecules_df: pd.DataFrame
+    clinical_data: np.ndarray
+    folder: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n_samples, n_molecules = 60, 8
+        times = rng.integers(1, 40, n_samples).astype(float)
+        events = rng.random(n_samples) < 0.6
+        values = rng.normal(size=(n_molecules, n_samples))
+        values[0] -= 0.05 * times  # Molecule associated with the survival
+
+        self.molecules_df = pd.DataFrame(values, index=[f'molecule_{i}' for i in range(n_molecules)])
+        self.clinical_data = np.array(list(zip(events, times)), dtype=[('event', bool), ('time', float)])
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def __assert_resumed_search_is_equal(self, run_search):
+        """
+        Runs a metaheuristic from scratch and then resumes it from the state stored before its last iteration (with
+        other seed, as a new worker would do) checking that the result is the same.
+        """
+        with override_settings(TASKS_CHECKPOINTS_DIR=self.folder.name):
+            random.seed(0)
+            np.random.seed(0)
+            checkpoint = get_task_checkpoint('feature_selection', 1)
+            expected_features, _, expected_score = run_search(checkpoint)
+
+            random.seed(1)
+            np.random.seed(1)
+            resumed_features, _, resumed_score = run_search(checkpoint)
+
+        self.assertEqual(resumed_features, expected_features)
+        self.assertEqual(resumed_score, expected_score)
+
+    def test_genetic_algorithms(self):
+        """Tests that a GA search resumed from a checkpoint returns the same result"""
+        self.__assert_resumed_search_is_equal(lambda checkpoint: genetic_algorithms_sequential(
+            get_clustering_model(ClusteringAlgorithm.K_MEANS, number_of_clusters=2, random_state=0),
+            self.molecules_df,
+            population_size=6,
+            mutation_rate=0.1,
+            n_iterations=3,
+            clinical_data=self.clinical_data,
+            is_clustering=True,
+            clustering_score_method=ClusteringScoringMethod.C_INDEX,
+            cross_validation_folds=3,
+            checkpoint=checkpoint
+        ))
+
+    def test_binary_black_hole(self):
+        """Tests that a BBHA search resumed from a checkpoint returns the same result"""
+        self.__assert_resumed_search_is_equal(lambda checkpoint: binary_black_hole_sequential(
+            get_clustering_model(ClusteringAlgorithm.K_MEANS, number_of_clusters=2, random_state=0),
+            self.molecules_df,
+            n_stars=5,
+            n_iterations=3,
+            clinical_data=self.clinical_data,
+            is_clustering=True,
+            clustering_score_method=ClusteringScoringMethod.C_INDEX,
+            cross_validation_folds=3,
+            is_improved_version=True,
+            checkpoint=checkpoint
+        ))
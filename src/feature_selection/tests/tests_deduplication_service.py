@@ -0,0 +1,132 @@
+import os
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from api_service.models import ExperimentSource
+from biomarkers.models import Biomarker, BiomarkerOrigin, BiomarkerState, TrainedModelState, MRNAIdentifier
+from common.tests_utils import create_user_file, create_experiment_source
+from feature_selection.deduplication_service import get_fs_experiment_fingerprint, get_reusable_fs_experiment, \
+    clone_fs_experiment_results
+from feature_selection.models import FSExperiment, FeatureSelectionAlgorithm, FitnessFunction, TrainedModel, \
+    SVMParameters, SVMKernel, SVMTask, BBHAParameters, BBHAVersion
+from user_files.models_choices import FileType
+
+# Parameters submitted for all the experiments
+ALGORITHM_PARAMETERS = {'nStars': 10, 'nIterations': 5, 'version': 2, 'preFilterTopN': None}
+FITNESS_FUNCTION_PARAMETERS = {'svmParameters': {'kernel': 1, 'task': 1, 'maxIterations': 100, 'randomState': 0}}
+CROSS_VALIDATION_PARAMETERS = {'folds': 10}
+
+
+class FSDeduplicationServiceTestCase(TestCase):
+    user: User
+    mrna_source: ExperimentSource
+    origin_biomarker: Biomarker
+    original: FSExperiment
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@test.com', password='test')
+        mrna_file = create_user_file(
+            os.path.join(os.path.dirname(__file__), '../../api_service/tests/tests_files/mRNA_normal.csv'),
+            'mRNA', FileType.MRNA, self.user
+        )
+        self.mrna_source = create_experiment_source(mrna_file)
+
+        self.origin_biomarker = Biomarker.objects.create(name='Origin', origin=BiomarkerOrigin.MANUAL,
+                                                         state=BiomarkerState.COMPLETED, user=self.user)
+        for gene in ['A2ML1', 'AADAC', 'AADAT']:
+            MRNAIdentifier.objects.create(identifier=gene, biomarker=self.origin_biomarker)
+
+        self.original = self.__create_fs_experiment(self.user)
+        self.__finish(self.original)
+
+    def __create_fs_experiment(self, user: User, fitness_function: FitnessFunction = FitnessFunction.SVM) \
+            -> FSExperiment:
+        """Creates a submitted FSExperiment (with its fingerprint) from the origin Biomarker, as the view does."""
+        created_biomarker = Biomarker.objects.create(name=f'Created by {user.username}',
+                                                     origin=BiomarkerOrigin.FEATURE_SELECTION,
+                                                     state=BiomarkerState.IN_PROCESS, user=user)
+        experiment = FSExperiment.objects.create(origin_biomarker=self.origin_biomarker,
+                                                 algorithm=FeatureSelectionAlgorithm.BBHA,
+                                                 created_biomarker=created_biomarker, user=user,
+                                                 mrna_source=self.mrna_source)
+        experiment.fingerprint = get_fs_experiment_fingerprint(experiment, fitness_function,
+                                                               FITNESS_FUNCTION_PARAMETERS, ALGORITHM_PARAMETERS,
+                                                               CROSS_VALIDATION_PARAMETERS)
+        experiment.save(update_fields=['fingerprint'])
+        return experiment
+
+    @staticmethod
+    def __finish(experiment: FSExperiment):
+        """Stores the results of a computed FSExperiment: the molecules, the best model and the parameters."""
+        biomarker = experiment.created_biomarker
+        for gene in ['A2ML1', 'AADAT']:
+            MRNAIdentifier.objects.create(identifier=gene, biomarker=biomarker)
+
+        trained_model = TrainedModel.objects.create(name='Best model', biomarker=biomarker, fs_experiment=experiment,
+                                                    state=TrainedModelState.COMPLETED,
+                                                    fitness_function=FitnessFunction.SVM, best_fitness_value=0.8,
+                                                    task_id='original-task')
+        trained_model.model_dump.name = 'uploads/user_1/trained_models/model.pkl'
+        trained_model.save(update_fields=['model_dump'])
+        SVMParameters.objects.create(trained_model=trained_model, kernel=SVMKernel.LINEAR, task=SVMTask.REGRESSION,
+                                     max_iterations=100, random_state=0)
+        BBHAParameters.objects.create(fs_experiment=experiment, n_stars=10, n_iterations=5,
+                                      version_used=BBHAVersion.IMPROVED)
+
+        biomarker.state = BiomarkerState.COMPLETED
+        biomarker.save(update_fields=['state'])
+
+    def test_identical_experiment_is_cloned(self):
+        """Tests that an identical experiment is detected and its results are copied to the new one"""
+        experiment = self.__create_fs_experiment(self.user)
+        self.assertEqual(experiment.fingerprint, self.original.fingerprint)
+
+        reusable_experiment = get_reusable_fs_experiment(experiment, self.user)
+        self.assertEqual(reusable_experiment, self.original)
+        clone_fs_experiment_results(reusable_experiment, experiment)
+        experiment.refresh_from_db()
+
+        # Molecules
+        new_biomarker = experiment.created_biomarker
+        self.assertEqual(new_biomarker.state, BiomarkerState.COMPLETED)
+        self.assertEqual(sorted(new_biomarker.mrnas.values_list('identifier', flat=True)), ['A2ML1', 'AADAT'])
+        self.assertEqual(self.original.created_biomarker.mrnas.count(), 2)
+
+        # Best model: a new row which shares the model dump
+        original_model = self.original.best_model
+        trained_model = experiment.best_model
+        self.assertNotEqual(trained_model.pk, original_model.pk)
+        self.assertEqual(trained_model.biomarker, new_biomarker)
+        self.assertEqual(trained_model.state, TrainedModelState.COMPLETED)
+        self.assertEqual(trained_model.best_fitness_value, original_model.best_fitness_value)
+        self.assertEqual(trained_model.model_dump.name, original_model.model_dump.name)
+        self.assertIsNone(trained_model.task_id)
+
+        # Parameters
+        self.assertNotEqual(trained_model.svm_parameters.pk, original_model.svm_parameters.pk)
+        self.assertEqual(trained_model.svm_parameters.kernel, SVMKernel.LINEAR)
+        self.assertEqual(BBHAParameters.objects.get(fs_experiment=experiment).n_stars, 10)
+        self.assertEqual(BBHAParameters.objects.get(fs_experiment=self.original).fs_experiment, self.original)
+
+    def test_different_experiment_is_not_reused(self):
+        """Tests that experiments with other parameters or not completed are not reused"""
+        experiment = self.__create_fs_experiment(self.user, fitness_function=FitnessFunction.RF)
+        self.assertIsNone(get_reusable_fs_experiment(experiment, self.user))
+
+        self.original.best_model.state = TrainedModelState.FINISHED_WITH_ERROR
+        self.original.best_model.save(update_fields=['state'])
+        self.assertIsNone(get_reusable_fs_experiment(self.__create_fs_experiment(self.user), self.user))
+
+    def test_only_accessible_experiments_are_reused(self):
+        """Tests that the results of other users are reused only if the created Biomarker is public"""
+        other_user = User.objects.create_user(username='other_user', email='other@test.com', password='test')
+        experiment = self.__create_fs_experiment(other_user)
+        self.assertIsNone(get_reusable_fs_experiment(experiment, other_user))
+
+        self.original.created_biomarker.is_public = True
+        self.original.created_biomarker.save(update_fields=['is_public'])
+        self.assertEqual(get_reusable_fs_experiment(experiment, other_user), self.original)
+
+    @override_settings(REUSE_IDENTICAL_EXPERIMENTS_RESULTS=False)
+    def test_reuse_disabled(self):
+        """Tests that no experiment is reused if it's disabled in settings"""
+        self.assertIsNone(get_reusable_fs_experiment(self.__create_fs_experiment(self.user), self.user))
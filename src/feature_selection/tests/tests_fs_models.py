@@ -0,0 +1,23 @@
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn import clone
+from sklearn.datasets import make_blobs
+from feature_selection.fs_models import get_clustering_model
+from feature_selection.models import ClusteringAlgorithm
+
+
+class ClusteringOutOfSampleAssignmentTestCase(SimpleTestCase):
+    def __assert_predict_matches_fit(self, clustering_algorithm: ClusteringAlgorithm):
+        """Checks that the training samples are assigned to the same cluster they got during fit()"""
+        x, _ = make_blobs(n_samples=150, centers=3, cluster_std=0.5, random_state=0)
+        model = clone(get_clustering_model(clustering_algorithm, number_of_clusters=3, random_state=0))
+        labels = model.fit_predict(x)
+        np.testing.assert_array_equal(model.predict(x), labels)
+
+    def test_ward(self):
+        """Tests that Ward models assign new samples to the nearest centroid"""
+        self.__assert_predict_matches_fit(ClusteringAlgorithm.WARD)
+
+    def test_spectral(self):
+        """Tests that Spectral models assign new samples with their nearest neighbors"""
+        self.__assert_predict_matches_fit(ClusteringAlgorithm.SPECTRAL)
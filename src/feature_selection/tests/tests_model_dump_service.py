@@ -0,0 +1,51 @@
+import os
+import tempfile
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from sklearn.cluster import KMeans
+from feature_selection.model_dump_service import serialize_model, get_model, clear_cache
+
+
+class ModelDumpServiceTestCase(SimpleTestCase):
+    folder: tempfile.TemporaryDirectory
+
+    def setUp(self):
+        clear_cache()
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        clear_cache()
+        self.folder.cleanup()
+
+    def __save_model(self, filename: str, n_clusters: int = 2) -> str:
+        model = KMeans(n_clusters=n_clusters, n_init=1).fit(np.random.rand(50, 3))
+        model_path = os.path.join(self.folder.name, filename)
+        with open(model_path, 'wb') as model_file:
+            model_file.write(serialize_model(model).read())
+        return model_path
+
+    def test_model_is_cached(self):
+        """Tests that the same instance is returned while the dump does not change"""
+        model_path = self.__save_model('model.joblib')
+        model = get_model(model_path)
+        self.assertIsInstance(model.cluster_centers_, np.memmap)
+        self.assertIs(get_model(model_path), model)
+
+        # A new dump must be loaded again
+        self.__save_model('model.joblib', n_clusters=3)
+        os.utime(model_path, (0, os.path.getmtime(model_path) + 10))
+        new_model = get_model(model_path)
+        self.assertIsNot(new_model, model)
+        self.assertEqual(new_model.n_clusters, 3)
+
+    def test_least_recently_used_is_evicted(self):
+        """Tests that the cache keeps its size limit evicting the least recently used models"""
+        first_path = self.__save_model('first.joblib')
+        second_path = self.__save_model('second.joblib')
+        max_size_mb = (os.path.getsize(first_path) * 1.5) / (1024 * 1024)
+
+        with override_settings(TRAINED_MODELS_CACHE_MAX_SIZE_MB=max_size_mb):
+            first_model = get_model(first_path)
+            second_model = get_model(second_path)
+            self.assertIs(get_model(second_path), second_model)
+            self.assertIsNot(get_model(first_path), first_model)
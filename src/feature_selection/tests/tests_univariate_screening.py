@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from lifelines.statistics import logrank_test
+from feature_selection.fs_algorithms import compute_univariate_survival_statistics, select_top_univariate_survival
+from feature_selection.models import UnivariateScreeningMethod
+
+
+def cox_score_statistic_loop(x: np.ndarray, times: np.ndarray, events: np.ndarray) -> float:
+    """Computes the univariate Cox score statistic (Breslow ties) iterating over the event times."""
+    u = 0.0
+    i = 0.0
+    for time in np.unique(times[events]):
+        events_at_time = (times == time) & events
+        at_risk = times >= time
+        n_events = np.count_nonzero(events_at_time)
+        u += x[events_at_time].sum() - n_events * x[at_risk].mean()
+        i += n_events * x[at_risk].var()
+    return u ** 2 / i
+
+
+class UnivariateScreeningTestCase(SimpleTestCase):
+    molecules_df: pd.DataFrame
+    clinical_data: np.ndarray
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n_samples, n_molecules = 120, 50
+
+        # Integer times to have ties
+        self.times = rng.integers(1, 40, n_samples).astype(float)
+        self.events = rng.random(n_samples) < 0.6
+        values = rng.normal(size=(n_molecules, n_samples))
+        values[0] -= 0.05 * self.times  # Molecule associated with the survival
+
+        self.molecules_df = pd.DataFrame(values, index=[f'molecule_{i}' for i in range(n_molecules)])
+        self.clinical_data = np.array(list(zip(self.events, self.times)), dtype=[('event', bool), ('time', float)])
+
+    def test_cox_score(self):
+        """Tests that the vectorized Cox score statistics are the same as the computed one by one"""
+        statistics = compute_univariate_survival_statistics(self.molecules_df, self.clinical_data,
+                                                            UnivariateScreeningMethod.COX_SCORE)
+        for molecule, row in self.molecules_df.iterrows():
+            expected = cox_score_statistic_loop(row.to_numpy(), self.times, self.events)
+            self.assertAlmostEqual(statistics[molecule], expected, places=6)
+
+    def test_log_rank(self):
+        """Tests that the vectorized log-rank statistics are the same as the lifelines ones"""
+        statistics = compute_univariate_survival_statistics(self.molecules_df, self.clinical_data,
+                                                            UnivariateScreeningMethod.LOG_RANK)
+        for molecule, row in self.molecules_df.iterrows():
+            high = row.to_numpy() > row.median()
+            expected = logrank_test(self.times[high], self.times[~high], self.events[high],
+                                    self.events[~high]).test_statistic
+            self.assertAlmostEqual(statistics[molecule], expected, places=6)
+
+    def test_top_n(self):
+        """Tests that the top N features are sorted by their statistic"""
+        features, model, scores = select_top_univariate_survival(self.molecules_df, self.clinical_data,
+                                                                 UnivariateScreeningMethod.COX_SCORE, top_n=5)
+        self.assertEqual(len(features), 5)
+        self.assertEqual(features[0], 'molecule_0')
+        self.assertIsNone(model)
+        self.assertEqual(scores, sorted(scores, reverse=True))
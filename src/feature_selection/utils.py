@@ -1,11 +1,10 @@
-import pickle
 import random
 from typing import Optional, Union, List, Tuple, Dict
 import numpy as np
-from django.core.files.base import ContentFile
 from rest_framework.exceptions import ValidationError
 from biomarkers.models import Biomarker, MRNAIdentifier, MiRNAIdentifier, CNAIdentifier, MethylationIdentifier
 from common.utils import limit_between_min_max
+from feature_selection.model_dump_service import serialize_model
 from feature_selection.fs_models import SVMKernelOptions, get_survival_svm_model, get_rf_model, get_clustering_model
 from feature_selection.models import SVMKernel, TrainedModel, FitnessFunction, ClusteringScoringMethod, SVMParameters, \
     SVMTask, ClusteringParameters, RFParameters
@@ -157,12 +156,10 @@ def create_models_parameters_and_classifier(
 
 
 def save_model_dump_and_best_score(trained_model: TrainedModel, best_model: 'SurvModel', best_score: float):
-    """Saves a model instance and best score in a TrainedModel instance."""
-    trained_content = pickle.dumps(best_model)
-    trained_content_as_file = ContentFile(trained_content)
+    """Saves a model instance (serialized with joblib) and best score in a TrainedModel instance."""
     trained_model.model_dump.save(
-        f'{trained_model.pk}_trained_model_dump.pkl',
-        trained_content_as_file,
+        f'{trained_model.pk}_trained_model_dump.joblib',
+        serialize_model(best_model),
         save=False
     )
     trained_model.best_fitness_value = best_score
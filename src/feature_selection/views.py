@@ -22,8 +22,11 @@ from api_service.utils import get_experiment_source
 from biomarkers.models import Biomarker, BiomarkerState, TrainedModelState, BiomarkerOrigin
 from common.utils import get_source_pk
 from feature_selection.models import FSExperiment, FitnessFunction, SVMTimesRecord, TrainedModel, ClusteringTimesRecord, \
-    ClusteringAlgorithm, RFTimesRecord, ClusteringScoringMethod, SVMKernel
+    ClusteringAlgorithm, RFTimesRecord, ClusteringScoringMethod, SVMKernel, FeatureSelectionAlgorithm
+from feature_selection.deduplication_service import get_fs_experiment_fingerprint, get_reusable_fs_experiment, \
+    clone_fs_experiment_results
 from feature_selection.utils import save_molecule_identifiers, get_svm_kernel_enum, save_model_dump_and_best_score
+from scheduling.fair_share_service import schedule_task, cancel_scheduled_task
 from user_files.models_choices import FileType
 
 
@@ -72,6 +75,27 @@ class FeatureSelectionSubmit(APIView):
         fs_experiment.created_biomarker = new_biomarker
         fs_experiment.save()
 
+    @staticmethod
+    def __get_estimated_cost(fs_experiment: FSExperiment, algorithm_parameters: Dict[str, Any]) -> float:
+        """
+        Estimates the cost of a FSExperiment as the number of molecules by the number of samples, multiplied by the
+        number of agents and iterations in the metaheuristics.
+        """
+        cost = fs_experiment.origin_biomarker.number_of_molecules * fs_experiment.clinical_source.number_of_samples
+
+        # Invalid parameters are reported by the task
+        try:
+            if fs_experiment.algorithm == FeatureSelectionAlgorithm.BBHA:
+                bbha_parameters = algorithm_parameters['BBHA']
+                cost *= int(bbha_parameters['numberOfStars']) * int(bbha_parameters['numberOfIterations'])
+            elif fs_experiment.algorithm == FeatureSelectionAlgorithm.GA:
+                ga_parameters = algorithm_parameters['GA']
+                cost *= int(ga_parameters['populationSize']) * int(ga_parameters['numberOfIterations'])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        return cost
+
     def post(self, request: Request):
         with transaction.atomic():
             # Gets Biomarker instance
@@ -152,12 +176,28 @@ class FeatureSelectionSubmit(APIView):
             # Adds Feature Selection experiment to the ThreadPool
             self.__create_target_biomarker(fs_experiment)
 
-        async_res: AbortableAsyncResult = eval_feature_selection_experiment.apply_async(
-            (fs_experiment.pk, fit_fun_enum, fitness_function_parameters, algorithm_parameters,
-             cross_validation_parameters), queue='feature_selection')
+            fs_experiment.fingerprint = get_fs_experiment_fingerprint(
+                fs_experiment, fit_fun_enum, fitness_function_parameters, algorithm_parameters,
+                cross_validation_parameters
+            )
+            fs_experiment.save(update_fields=['fingerprint'])
 
-        fs_experiment.task_id = async_res.task_id
-        fs_experiment.save(update_fields=['task_id'])
+            # If an identical experiment was already computed, its results are copied instead of computing them again
+            reusable_experiment = get_reusable_fs_experiment(fs_experiment, request.user)
+            if reusable_experiment is not None:
+                clone_fs_experiment_results(reusable_experiment, fs_experiment)
+                return Response({'ok': True})
+
+        # Adds the experiment to the fair-share dispatcher of the queue
+        schedule_task(
+            eval_feature_selection_experiment,
+            (fs_experiment.pk, fit_fun_enum, fitness_function_parameters, algorithm_parameters,
+             cross_validation_parameters),
+            'feature_selection',
+            fs_experiment,
+            request.user,
+            self.__get_estimated_cost(fs_experiment, algorithm_parameters)
+        )
 
         return Response({'ok': True})
 
@@ -483,7 +523,8 @@ class StopFSExperiment(APIView):
 
                 logging.warning(f'Aborting FSExperiment {biomarker_id}')
 
-                # Sends the signal to abort it
+                # Sends the signal to abort it (or removes it from the dispatcher if it's still waiting)
+                cancel_scheduled_task(experiment)
                 if experiment.task_id:
                     abortable_async_result = AbortableAsyncResult(experiment.task_id)
                     abortable_async_result.abort()
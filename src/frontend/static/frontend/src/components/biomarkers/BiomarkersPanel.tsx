@@ -5,7 +5,7 @@ import { DjangoCGDSStudy, DjangoSurvivalColumnsTupleSimple, DjangoTag, DjangoUse
 import ky, { Options } from 'ky'
 import { getDjangoHeader, alertGeneralError, formatDateLocale, cleanRef, getFilenameFromSource, makeSourceAndAppend, getDefaultSource } from '../../utils/util_functions'
 import { NameOfCGDSDataset, Nullable, CustomAlert, CustomAlertTypes, SourceType, OkResponse, ConfirmModal } from '../../utils/interfaces'
-import { Biomarker, BiomarkerType, BiomarkerOrigin, FormBiomarkerData, MoleculesSectionData, MoleculesTypeOfSelection, SaveBiomarkerStructure, SaveMoleculeStructure, FeatureSelectionPanelData, SourceStateBiomarker, FeatureSelectionAlgorithm, FitnessFunction, FitnessFunctionParameters, BiomarkerState, AdvancedAlgorithm as AdvancedAlgorithmParameters, BBHAVersion, BiomarkerSimple, CrossValidationParameters } from './types'
+import { Biomarker, BiomarkerType, BiomarkerOrigin, FormBiomarkerData, MoleculesSectionData, MoleculesTypeOfSelection, SaveBiomarkerStructure, SaveMoleculeStructure, FeatureSelectionPanelData, SourceStateBiomarker, FeatureSelectionAlgorithm, FitnessFunction, FitnessFunctionParameters, BiomarkerState, AdvancedAlgorithm as AdvancedAlgorithmParameters, BBHAVersion, UnivariateScreeningMethod, BiomarkerSimple, CrossValidationParameters } from './types'
 import { ManualForm } from './modalContentBiomarker/manualForm/ManualForm'
 import { PaginatedTable, PaginationCustomFilter } from '../common/PaginatedTable'
 import { TableCellWithTitle } from '../common/TableCellWithTitle'
@@ -213,17 +213,24 @@ export class BiomarkersPanel extends React.Component<unknown, BiomarkersPanelSta
             numberOfIterations: 10,
             BBHAVersion: BBHAVersion.ORIGINAL,
             coeff1: 2.2,
-            coeff2: 0.1
+            coeff2: 0.1,
+            preFilterTopN: null
         },
         GA: {
             useSpark: true,
             numberOfIterations: 10,
             populationSize: 50,
-            mutationRate: 0.01
+            mutationRate: 0.01,
+            preFilterTopN: null
         },
         coxRegression: {
             useSpark: true,
             topN: 5
+        },
+        univariateScreening: {
+            useSpark: false,
+            topN: 5,
+            method: UnivariateScreeningMethod.COX_SCORE
         }
     })
 
@@ -1659,7 +1666,7 @@ export class BiomarkersPanel extends React.Component<unknown, BiomarkersPanelSta
                                 <TableCellWithTitle value={biomarker.name} />
                                 <TableCellWithTitle value={biomarker.description} />
                                 <Table.Cell><TagLabel tag={biomarker.tag} /></Table.Cell>
-                                <Table.Cell textAlign='center'><BiomarkerStateLabel biomarkerState={biomarker.state} /></Table.Cell>
+                                <Table.Cell textAlign='center'><BiomarkerStateLabel biomarkerState={biomarker.state} queuePosition={biomarker.queue_position} /></Table.Cell>
                                 <Table.Cell><BiomarkerOriginLabel biomarkerOrigin={biomarker.origin} /></Table.Cell>
                                 <TableCellWithTitle value={formatDateLocale(biomarker.upload_date as string, 'L')} />
                                 <Table.Cell>{showNumberOfMolecules ? biomarker.number_of_mrnas : '-'}</Table.Cell>
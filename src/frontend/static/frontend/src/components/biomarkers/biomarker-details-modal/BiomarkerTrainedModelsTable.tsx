@@ -267,7 +267,7 @@ export const BiomarkerTrainedModelsTable = (props: BiomarkerTrainedModelsPanelPr
                             <TableCellWithTitle value={trainedModel.description ?? ''} />
                             <Table.Cell textAlign='center'>
                                 {/* NOTE: trained models have the same states as Biomarker */}
-                                <TrainedModelStateLabel trainedModelStateState={trainedModel.state} cvFoldsWereModified={trainedModel.cv_folds_modified} />
+                                <TrainedModelStateLabel trainedModelStateState={trainedModel.state} cvFoldsWereModified={trainedModel.cv_folds_modified} queuePosition={trainedModel.queue_position} />
                             </Table.Cell>
                             <Table.Cell><FitnessFunctionLabel fitnessFunction={trainedModel.fitness_function} /></Table.Cell>
                             <TableCellWithTitle value={formatDateLocale(trainedModel.created as string, 'L')} />
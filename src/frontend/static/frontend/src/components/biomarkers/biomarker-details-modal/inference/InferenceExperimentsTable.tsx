@@ -199,7 +199,7 @@ export const InferenceExperimentsTable = (props: InferenceExperimentsTableProps)
                             <TableCellWithTitle value={inferenceExperiment.description ?? ''} />
                             <Table.Cell textAlign='center'>
                                 {/* NOTE: inference experiments have the same states as Biomarker */}
-                                <BiomarkerStateLabel biomarkerState={inferenceExperiment.state} />
+                                <BiomarkerStateLabel biomarkerState={inferenceExperiment.state} queuePosition={inferenceExperiment.queue_position} />
                             </Table.Cell>
                             <Table.Cell><FitnessFunctionLabel fitnessFunction={inferenceExperiment.model} /></Table.Cell>
                             <TableCellWithTitle value={formatDateLocale(inferenceExperiment.created as string, 'L')} />
@@ -201,7 +201,7 @@ export const StatisticalValidationsTable = (props: StatisticalValidationsTablePr
                             <TableCellWithTitle value={statisticalValidation.description ?? ''} />
                             <Table.Cell textAlign='center'>
                                 {/* NOTE: statistical validations have the same states as Biomarker */}
-                                <BiomarkerStateLabel biomarkerState={statisticalValidation.state} />
+                                <BiomarkerStateLabel biomarkerState={statisticalValidation.state} queuePosition={statisticalValidation.queue_position} />
                             </Table.Cell>
                             <Table.Cell textAlign='center'>
                                 <FitnessFunctionLabel fitnessFunction={statisticalValidation.fitness_function} />
@@ -6,7 +6,10 @@ import { alertGeneralError } from '../../../../../utils/util_functions'
 import { ResultPlaceholder } from './ResultPlaceholder'
 import { Heatmap } from '../heatmap/Heatmap'
 
-declare const urlStatisticalValidationHeatMap: string
+declare const urlStatisticalValidationHeatMapCompact: string
+
+/** Heatmap width in pixels. More samples than pixels are downsampled in the backend. */
+const HEATMAP_WIDTH = 1000
 
 /** StatisticalValidationResultHeatMap props. */
 interface StatisticalValidationResultHeatMapProps {
@@ -43,8 +46,8 @@ export const StatisticalValidationResultHeatMap = (props: StatisticalValidationR
     const getStatValidationHeatMap = () => {
         setLoading(true)
 
-        const searchParams = { statistical_validation_pk: props.selectedStatisticalValidation.id }
-        ky.get(urlStatisticalValidationHeatMap, { searchParams, timeout: 60000, signal: abortController.current.signal }).then((response) => {
+        const searchParams = { statistical_validation_pk: props.selectedStatisticalValidation.id, max_columns: HEATMAP_WIDTH }
+        ky.get(urlStatisticalValidationHeatMapCompact, { searchParams, timeout: 60000, signal: abortController.current.signal }).then((response) => {
             response.json().then((headMapData: MoleculesExpressions) => {
                 setHeatMapData(headMapData)
             }).catch((err) => {
@@ -63,11 +66,11 @@ export const StatisticalValidationResultHeatMap = (props: StatisticalValidationR
     }
 
     const data = heatMapData
-        ? Object.entries(heatMapData.data).flatMap(([moleculeName, samples]) => Object.entries(samples).map(([sampleName, expression]) => {
+        ? heatMapData.rows.flatMap((moleculeName, rowIdx) => heatMapData.columns.map((sampleName, columnIdx) => {
             return {
                 x: sampleName,
                 y: moleculeName,
-                value: expression
+                value: heatMapData.values[rowIdx * heatMapData.columns.length + columnIdx]
             }
         }))
         : []
@@ -79,7 +82,7 @@ export const StatisticalValidationResultHeatMap = (props: StatisticalValidationR
             }
 
             {(!loading && heatMapData !== null) &&
-                <Heatmap data={data} width={1000} height={550} min={heatMapData.min} max={heatMapData.max} />
+                <Heatmap data={data} width={HEATMAP_WIDTH} height={550} min={heatMapData.min} max={heatMapData.max} />
             }
         </>
     )
@@ -1,5 +1,5 @@
 import React, { useState } from 'react'
-import { Biomarker, FitnessFunction, ClusteringParameters, SVMParameters, SourceStateBiomarker, RFParameters, CrossValidationParameters } from '../../types'
+import { Biomarker, FitnessFunction, ClusteringParameters, SVMParameters, SourceStateBiomarker, RFParameters, CrossValidationParameters, SearchStrategy } from '../../types'
 import { Button, Form, Grid, Header, Icon, InputOnChangeData, Modal, Segment, Select, Step } from 'semantic-ui-react'
 import { fitnessFunctionsOptions, getDefaultClusteringParameters, getDefaultRFParameters, getDefaultSvmParameters } from '../../utils'
 import { Nullable, OkResponse, Source, SourceType } from '../../../../utils/interfaces'
@@ -36,6 +36,8 @@ type NewTrainedModelData = {
     description: Nullable<string>,
     selectedFitnessFunction: Nullable<FitnessFunction>,
     crossValidationParameters: CrossValidationParameters,
+    /** Strategy used to search the best hyperparameters. */
+    searchStrategy: SearchStrategy,
     /** TrainedModel instance. */
     modelParameters: ModelParameters,
     /** Clinical source. */
@@ -65,6 +67,7 @@ const getDefaultNewTrainedModelData = (): NewTrainedModelData => ({
     description: null,
     selectedFitnessFunction: null,
     crossValidationParameters: { folds: 10 },
+    searchStrategy: SearchStrategy.GRID_SEARCH,
     modelParameters: getDefaultModelParameters(),
     clinicalSource: getDefaultSource(),
     mRNASource: getDefaultSource(),
@@ -348,6 +351,7 @@ export const NewTrainedModelModal = (props: NewTrainedModelModalProps) => {
         formData.append('description', form.description ?? 'null')
         formData.append('fitnessFunction', (form.selectedFitnessFunction as FitnessFunction).toString())
         formData.append('crossValidationFolds', form.crossValidationParameters.folds.toString())
+        formData.append('searchStrategy', form.searchStrategy.toString())
         formData.append('biomarkerPk', (props.selectedBiomarker.id as number).toString())
         formData.append('modelParameters', JSON.stringify(form.modelParameters))
 
@@ -459,6 +463,27 @@ export const NewTrainedModelModal = (props: NewTrainedModelModalProps) => {
                                     value={form.crossValidationParameters.folds}
                                     onChange={(_, { name, value }) => { handleCVParametersChange(name, value as any) }}
                                 />
+
+                                <Form.Select
+                                    fluid
+                                    label={
+                                        <InputLabel label='Hyperparameters search'>
+                                            <InfoPopup
+                                                content='Grid search evaluates every combination of hyperparameters with all the samples. Successive halving evaluates all of them with a subset of the samples and keeps only the best ones for the next iterations with more samples, which is faster when there are many combinations to evaluate.'
+                                                onTop={false}
+                                                onEvent='hover'
+                                                noBorder
+                                                extraClassName='pull-right'
+                                            />
+                                        </InputLabel>
+                                    }
+                                    options={[
+                                        { key: SearchStrategy.GRID_SEARCH, text: 'Grid search', value: SearchStrategy.GRID_SEARCH },
+                                        { key: SearchStrategy.SUCCESSIVE_HALVING, text: 'Successive halving', value: SearchStrategy.SUCCESSIVE_HALVING }
+                                    ]}
+                                    value={form.searchStrategy}
+                                    onChange={(_, { value }) => { setForm({ ...form, searchStrategy: value as SearchStrategy }) }}
+                                />
                             </Grid.Column>
                         </Grid.Row>
                     </Grid>
@@ -1,12 +1,15 @@
 import React from 'react'
 import { Icon } from 'semantic-ui-react'
-import { StateIconInfo } from '../../../utils/interfaces'
+import { Nullable, StateIconInfo } from '../../../utils/interfaces'
+import { getWaitingForQueueTitle } from '../../../utils/util_functions'
 import { BiomarkerState } from '../types'
 
 /** BiomarkerStateLabel props. */
 interface BiomarkerStateLabelProps {
     /** Biomarker's state. */
-    biomarkerState: BiomarkerState
+    biomarkerState: BiomarkerState,
+    /** Position in the queue if it's waiting to be processed. */
+    queuePosition?: Nullable<number>
 }
 
 /**
@@ -39,7 +42,7 @@ export const BiomarkerStateLabel = (props: BiomarkerStateLabelProps) => {
                 iconName: 'wait',
                 color: 'yellow',
                 loading: false,
-                title: 'The process of this experiment will start soon'
+                title: getWaitingForQueueTitle('The process of this experiment will start soon', props.queuePosition)
             }
             break
         case BiomarkerState.NO_SAMPLES_IN_COMMON:
@@ -1,6 +1,7 @@
 import React from 'react'
 import { Icon } from 'semantic-ui-react'
-import { StateIconInfo } from '../../../utils/interfaces'
+import { Nullable, StateIconInfo } from '../../../utils/interfaces'
+import { getWaitingForQueueTitle } from '../../../utils/util_functions'
 import { TrainedModelState } from '../types'
 
 /** TrainedModelStateLabel props. */
@@ -8,7 +9,9 @@ interface TrainedModelStateLabelProps {
     /** TrainedModel's state. */
     trainedModelStateState: TrainedModelState,
     /** Indicates if the cross validation folds were modified to be stratified. */
-    cvFoldsWereModified: boolean
+    cvFoldsWereModified: boolean,
+    /** Position in the queue if it's waiting to be processed. */
+    queuePosition?: Nullable<number>
 }
 
 /**
@@ -41,7 +44,7 @@ export const TrainedModelStateLabel = (props: TrainedModelStateLabelProps) => {
                 iconName: 'wait',
                 color: 'yellow',
                 loading: false,
-                title: 'The process of this experiment will start soon'
+                title: getWaitingForQueueTitle('The process of this experiment will start soon', props.queuePosition)
             }
             break
         case TrainedModelState.NO_SAMPLES_IN_COMMON:
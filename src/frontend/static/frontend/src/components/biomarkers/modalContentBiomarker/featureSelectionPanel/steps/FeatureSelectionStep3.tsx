@@ -7,6 +7,7 @@ import { BBHAAdvanced } from './advancedMode/BBHAAdvanced'
 import { CoxRegressionAdvanced } from './advancedMode/CoxRegressionAdvanced'
 import { getNumberOfMoleculesOfBiomarker } from '../../../utils'
 import { GAAdvanced } from './advancedMode/GAAdvanced'
+import { UnivariateScreeningAdvanced } from './advancedMode/UnivariateScreeningAdvanced'
 
 declare const maxFeaturesBlindSearch: number
 declare const minFeaturesMetaheuristics: number
@@ -75,6 +76,7 @@ export const FeatureSelectionStep3 = (props: FeatureSelectionStep3Props) => {
                     />
                 )
             case FeatureSelectionAlgorithm.COX_REGRESSION:
+            case FeatureSelectionAlgorithm.UNIVARIATE_SCREENING:
                 return (
                     null
                 )
@@ -123,6 +125,13 @@ export const FeatureSelectionStep3 = (props: FeatureSelectionStep3Props) => {
 
                     />
                 )
+            case FeatureSelectionAlgorithm.UNIVARIATE_SCREENING:
+                return (
+                    <UnivariateScreeningAdvanced
+                        advancedData={featureSelection.advancedAlgorithmParameters.univariateScreening}
+                        handleChangeAdvanceAlgorithm={handleChangeAdvanceAlgorithm}
+                    />
+                )
             case FeatureSelectionAlgorithm.PSO:
                 return (
                     <></>
@@ -165,6 +174,11 @@ export const FeatureSelectionStep3 = (props: FeatureSelectionStep3Props) => {
                             text: 'Cox Regression',
                             value: FeatureSelectionAlgorithm.COX_REGRESSION
                         },
+                        {
+                            key: FeatureSelectionAlgorithm.UNIVARIATE_SCREENING,
+                            text: 'Univariate Screening',
+                            value: FeatureSelectionAlgorithm.UNIVARIATE_SCREENING
+                        },
                         {
                             key: FeatureSelectionAlgorithm.PSO,
                             text: 'PSO',
@@ -5,6 +5,7 @@ import './../../featureSelection.css'
 import { advanceBBHAOptions, improvedBBHACoeff1Options, improvedBBHACoeff2Options } from '../../../../utils'
 import { AdvancedBBHA, BBHAVersion } from '../../../../types'
 import { ExternalLink } from '../../../../../common/ExternalLink'
+import { PreFilterTopNInput } from './PreFilterTopNInput'
 
 declare const sparkIntegrationIsEnabled: boolean
 declare const minIterationsMetaheuristics: number
@@ -166,6 +167,12 @@ export const BBHAAdvanced = (props: BBHAAdvancedProps) => {
                 </>
             }
 
+            <PreFilterTopNInput
+                advanceAlgorithm='BBHA'
+                preFilterTopN={advancedData.preFilterTopN}
+                handleChangeAdvanceAlgorithm={handleChangeAdvanceAlgorithm}
+            />
+
             {/* Apache Spark optimization */}
             {sparkIntegrationIsEnabled &&
                 <Grid.Row columns={2}>
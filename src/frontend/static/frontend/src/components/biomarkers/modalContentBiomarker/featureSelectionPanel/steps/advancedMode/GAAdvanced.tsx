@@ -4,6 +4,7 @@ import { InfoPopup } from '../../../../../pipeline/experiment-result/gene-gem-de
 import './../../featureSelection.css'
 import { AdvancedGA } from '../../../../types'
 import { ExternalLink } from '../../../../../common/ExternalLink'
+import { PreFilterTopNInput } from './PreFilterTopNInput'
 
 declare const sparkIntegrationIsEnabled: boolean
 declare const minIterationsMetaheuristics: number
@@ -117,6 +118,12 @@ export const GAAdvanced = (props: GAAdvancedProps) => {
                 </Grid.Column>
             </Grid.Row>
 
+            <PreFilterTopNInput
+                advanceAlgorithm='GA'
+                preFilterTopN={advancedData.preFilterTopN}
+                handleChangeAdvanceAlgorithm={handleChangeAdvanceAlgorithm}
+            />
+
             {/* Apache Spark optimization */}
             {sparkIntegrationIsEnabled &&
                 <Grid.Row columns={2}>
@@ -0,0 +1,58 @@
+import React from 'react'
+import { Form, Grid } from 'semantic-ui-react'
+import { InfoPopup } from '../../../../../pipeline/experiment-result/gene-gem-details/InfoPopup'
+import './../../featureSelection.css'
+
+declare const minFeaturesMetaheuristics: number
+
+/** PreFilterTopNInput props. */
+interface PreFilterTopNInputProps {
+    /** Key of the metaheuristic in the advanced algorithm parameters. */
+    advanceAlgorithm: 'BBHA' | 'GA',
+    preFilterTopN: number | null,
+    handleChangeAdvanceAlgorithm: (advanceAlgorithm: string, name: string, value: any) => void,
+}
+
+/**
+ * Renders an input to set the number of features kept by the univariate pre-filter of a metaheuristic.
+ * @param props Component props.
+ * @returns Component.
+ */
+export const PreFilterTopNInput = (props: PreFilterTopNInputProps) => {
+    const { advanceAlgorithm, preFilterTopN, handleChangeAdvanceAlgorithm } = props
+    return (
+        <Grid.Row columns={2}>
+            <Grid.Column width={14}>
+                <Form.Input
+                    fluid
+                    label='Univariate pre-filter (top N)'
+                    placeholder='Empty to use all the features'
+                    type='number'
+                    step={1}
+                    min={minFeaturesMetaheuristics}
+                    name='preFilterTopN'
+                    value={preFilterTopN ?? ''}
+                    onChange={(_, { name, value }) => {
+                        if (value === '') {
+                            handleChangeAdvanceAlgorithm(advanceAlgorithm, name, null)
+                            return
+                        }
+
+                        const numVal = Number(value)
+                        if (numVal < 1 || isNaN(numVal)) {
+                            return
+                        }
+
+                        handleChangeAdvanceAlgorithm(advanceAlgorithm, name, numVal)
+                    }}
+                />
+            </Grid.Column>
+            <Grid.Column width={2} className='advance-center-container'>
+                <InfoPopup
+                    content='If set, only the top N features ranked by their univariate Cox score test against the clinical data are kept before running the metaheuristic, which reduces the search space and the execution time. If this value is left empty, all the features are used'
+                    onTop={false}
+                />
+            </Grid.Column>
+        </Grid.Row>
+    )
+}
@@ -0,0 +1,78 @@
+import React from 'react'
+import { Form, Grid } from 'semantic-ui-react'
+import { InfoPopup } from '../../../../../pipeline/experiment-result/gene-gem-details/InfoPopup'
+import './../../featureSelection.css'
+import { AdvancedUnivariateScreening, UnivariateScreeningMethod } from '../../../../types'
+
+/** Available univariate survival statistics to rank the features. */
+const univariateScreeningMethodOptions = [
+    { key: UnivariateScreeningMethod.COX_SCORE, text: 'Cox score test', value: UnivariateScreeningMethod.COX_SCORE },
+    { key: UnivariateScreeningMethod.LOG_RANK, text: 'Log-rank test', value: UnivariateScreeningMethod.LOG_RANK }
+]
+
+/** UnivariateScreeningAdvanced props. */
+interface UnivariateScreeningAdvancedProps {
+    advancedData: AdvancedUnivariateScreening,
+    handleChangeAdvanceAlgorithm: (advanceAlgorithm: string, name: string, value: any) => void,
+}
+
+/**
+ * Renders a form to set some advanced parameters for the Univariate Screening algorithm.
+ * @param props Component props.
+ * @returns Component.
+ */
+export const UnivariateScreeningAdvanced = (props: UnivariateScreeningAdvancedProps) => {
+    const { advancedData, handleChangeAdvanceAlgorithm } = props
+    return (
+        <Grid>
+            <Grid.Row columns={2}>
+                <Grid.Column width={14}>
+                    <Form.Input
+                        fluid
+                        label='Keep top N'
+                        placeholder='An integer number'
+                        type='number'
+                        step={1}
+                        min={1}
+                        name='topN'
+                        value={advancedData.topN}
+                        onChange={(_, { name, value }) => {
+                            const numVal = Number(value)
+
+                            if (numVal < 1 || isNaN(numVal)) {
+                                return
+                            }
+
+                            handleChangeAdvanceAlgorithm('univariateScreening', name, numVal)
+                        }}
+                    />
+                </Grid.Column>
+                <Grid.Column width={2} className='advance-center-container'>
+                    <InfoPopup
+                        content='Number of features to be retained. The features are ranked by their univariate survival statistic against the clinical data, keeping the most significant ones first'
+                        onTop={false}
+                        onEvent='hover'
+                    />
+                </Grid.Column>
+            </Grid.Row>
+            <Grid.Row columns={2}>
+                <Grid.Column width={14}>
+                    <Form.Select
+                        label='Ranking statistic'
+                        className='selection-select'
+                        options={univariateScreeningMethodOptions}
+                        value={advancedData.method}
+                        onChange={(_, { value }) => handleChangeAdvanceAlgorithm('univariateScreening', 'method', Number(value))}
+                    />
+                </Grid.Column>
+                <Grid.Column width={2} className='advance-center-container'>
+                    <InfoPopup
+                        content='Univariate survival statistic computed for every feature to rank them. The Cox score test is the score statistic of a univariate Cox model, the Log-rank test compares the survival of the samples split by the median of the feature'
+                        onTop={false}
+                        onEvent='hover'
+                    />
+                </Grid.Column>
+            </Grid.Row>
+        </Grid>
+    )
+}
@@ -88,7 +88,9 @@ interface BiomarkerSimple {
     origin: BiomarkerOrigin,
     state: BiomarkerState,
     contains_nan_values: boolean,
-    column_used_as_index: string
+    column_used_as_index: string,
+    /** Position in the fair-share queue while waiting to be processed. */
+    queue_position?: Nullable<number>
 }
 
 /** Django Biomarker model. */
@@ -188,7 +190,8 @@ enum FeatureSelectionAlgorithm {
     COX_REGRESSION = 2,
     BBHA = 3,
     PSO = 4,
-    GA = 5
+    GA = 5,
+    UNIVARIATE_SCREENING = 6
 }
 
 /** Available fitness functions. TODO: rename to ModelUsed */
@@ -311,6 +314,8 @@ interface AdvancedBBHA extends AdvancedMode {
     BBHAVersion: BBHAVersion;
     coeff1: 2.2 | 2.35;
     coeff2: 0.1 | 0.2 | 0.3;
+    /** Top N features kept by the univariate screening before running the metaheuristic. Null to use all of them. */
+    preFilterTopN: number | null;
 }
 
 /** Advanced GA properties */
@@ -318,6 +323,20 @@ interface AdvancedGA extends AdvancedMode {
     numberOfIterations: number;
     populationSize: number;
     mutationRate: number;
+    /** Top N features kept by the univariate screening before running the metaheuristic. Null to use all of them. */
+    preFilterTopN: number | null;
+}
+
+/** Univariate survival statistic used to rank the features in the Univariate Screening algorithm. */
+enum UnivariateScreeningMethod {
+    COX_SCORE = 1,
+    LOG_RANK = 2
+}
+
+/** Advanced Univariate Screening properties */
+interface AdvancedUnivariateScreening extends AdvancedMode {
+    topN: number,
+    method: UnivariateScreeningMethod
 }
 
 /** CV parameters. */
@@ -325,12 +344,19 @@ interface CrossValidationParameters {
     folds: number
 }
 
+/** Strategy used to search the best hyperparameters of a TrainedModel. */
+enum SearchStrategy {
+    GRID_SEARCH = 1,
+    SUCCESSIVE_HALVING = 2
+}
+
 /** Advanced algorithm parameters to make Feature selection */
 interface AdvancedAlgorithm {
     isActive: boolean,
     BBHA: AdvancedBBHA,
     GA: AdvancedGA,
-    coxRegression: AdvancedCoxRegression
+    coxRegression: AdvancedCoxRegression,
+    univariateScreening: AdvancedUnivariateScreening
 }
 
 /** Structure for the Feature Selection panel. */
@@ -410,7 +436,9 @@ interface TrainedModelForTable {
     cna_source: Nullable<DjangoExperimentSource>,
     mirna_source: Nullable<DjangoExperimentSource>,
     fitness_metric: Nullable<string>,
-    best_fitness_value: Nullable<number>
+    best_fitness_value: Nullable<number>,
+    /** Position in the fair-share queue while waiting to be processed. */
+    queue_position?: Nullable<number>
 }
 
 /**
@@ -444,6 +472,8 @@ interface StatisticalValidationForTable extends BasicStatisticalValidation {
     mrna_source: Nullable<DjangoExperimentSource>,
     cna_source: Nullable<DjangoExperimentSource>,
     mirna_source: Nullable<DjangoExperimentSource>,
+    /** Position in the fair-share queue while waiting to be processed. */
+    queue_position?: Nullable<number>
 }
 
 /** A statistical validation of a Biomarker. */
@@ -479,6 +509,8 @@ interface InferenceExperimentForTable {
     mrna_source: Nullable<DjangoExperimentSource>,
     cna_source: Nullable<DjangoExperimentSource>,
     mirna_source: Nullable<DjangoExperimentSource>,
+    /** Position in the fair-share queue while waiting to be processed. */
+    queue_position?: Nullable<number>
 }
 
 /** Django MoleculeWithCoefficient model. */
@@ -489,16 +521,18 @@ interface MoleculeWithCoefficient {
     type: MoleculeType
 }
 
-/** Dict from the backend with all the molecules expressions for all the samples. */
+/** Compact struct from the backend with all the molecules expressions for all the samples. */
 interface MoleculesExpressions {
-    /** Object with the molecule's name as key. The value is an object with the sample as key, and the expression as value. */
-    data: {
-        [moleculeName: string]: {
-            [sampleName: string]: number // This number is the expression
-        }
-    },
+    /** Molecules names (rows of the matrix). */
+    rows: string[],
+    /** Samples names (columns of the matrix). */
+    columns: string[],
+    /** Flat (row-major) array of expressions. The expression of row `i` and column `j` is `values[i * columns.length + j]`. */
+    values: number[],
     min: number,
-    max: number
+    max: number,
+    /** Number of samples before the downsampling made in the backend. */
+    n_columns_total: number
 }
 
 /** Common struct for `SampleAndCluster` and `SampleAndTime`. */
@@ -597,6 +631,8 @@ export {
     AdvancedCoxRegression,
     AdvancedBBHA,
     AdvancedGA,
+    AdvancedUnivariateScreening,
+    UnivariateScreeningMethod,
     BBHAVersion,
     AdvancedAlgorithm,
     SVMKernel,
@@ -605,6 +641,7 @@ export {
     ClusteringParameters,
     FitnessFunctionParameters,
     CrossValidationParameters,
+    SearchStrategy,
     FitnessFunction,
     FeatureSelectionAlgorithm,
     ClusteringMetric,
@@ -189,7 +189,7 @@ export class AllExperimentsView extends React.Component<AllExperimentsViewProps,
                     urlToRetrieveData={urlUserExperiments}
                     mapFunction={(experiment: DjangoExperiment) => {
                         // Generates Experiment's state info
-                        const experimentState = getExperimentStateObj(experiment.state)
+                        const experimentState = getExperimentStateObj(experiment.state, experiment.queue_position)
 
                         const isInProcess = experiment.state === ExperimentState.IN_PROCESS ||
                             experiment.state === ExperimentState.WAITING_FOR_QUEUE
@@ -508,7 +508,8 @@ class GeneGemDetailsModal extends React.Component<GeneGemDetailsModalProps, Gene
             const url = `${urlGetStatisticalProperties}/${this.props.selectedRow?.id}/`
 
             const searchParams = {
-                experiment_type: this.props.experiment.type
+                experiment_type: this.props.experiment.type,
+                experiment_id: this.props.experiment.id
             }
 
             ky.get(url, { signal: this.abortController.signal, searchParams, timeout: 60000 }).then((response) => {
@@ -32,7 +32,7 @@ interface LastExperimentCardProps {
  */
 export const LastExperimentCard = (props: LastExperimentCardProps) => {
     const experiment = props.experiment // For a short reference
-    const experimentState = getExperimentStateObj(experiment.state)
+    const experimentState = getExperimentStateObj(experiment.state, experiment.queue_position)
 
     // If the result was truncated due to a larger size than the specified in settings.py, it alerts to the user
     let trunc_alert
@@ -290,7 +290,9 @@ interface DjangoExperiment {
     type: ExperimentType,
     clinical_source_id: Nullable<number>,
     is_public: boolean,
-    user: { id: number, username: string }
+    user: { id: number, username: string },
+    /** Position in the fair-share queue while waiting to be processed. */
+    queue_position?: Nullable<number>
 }
 
 /** A reduced structure of Gene model */
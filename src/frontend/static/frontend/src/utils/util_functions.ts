@@ -157,12 +157,23 @@ const copyObject = <T>(anObject: T): T => {
     return Object.assign({}, anObject)
 }
 
+/**
+ * Gets the description of a waiting Experiment, Biomarker, etc. with its position in the queue (if known)
+ * @param title Description of the waiting state
+ * @param queuePosition Position in the queue
+ * @returns Description to show
+ */
+const getWaitingForQueueTitle = (title: string, queuePosition?: Nullable<number>): string => {
+    return queuePosition ? `${title} (position in the queue: ${queuePosition})` : title
+}
+
 /**
  * Gets info about the state of a specific Experiment to display in the card
  * @param state Experiment state
+ * @param queuePosition Position of the experiment in the queue (if it's waiting)
  * @returns The corresponding info of the current experiment's state
  */
-const getExperimentStateObj = (state: ExperimentState): StateIconInfo => {
+const getExperimentStateObj = (state: ExperimentState, queuePosition?: Nullable<number>): StateIconInfo => {
     let stateIcon: StateIconInfo
 
     switch (state) {
@@ -187,7 +198,7 @@ const getExperimentStateObj = (state: ExperimentState): StateIconInfo => {
                 iconName: 'wait',
                 color: 'yellow',
                 loading: false,
-                title: 'The process of this analysis will start soon'
+                title: getWaitingForQueueTitle('The process of this analysis will start soon', queuePosition)
             }
             break
         case ExperimentState.NO_SAMPLES_IN_COMMON:
@@ -777,6 +788,7 @@ export {
     parseValue,
     copyObject,
     getExperimentStateObj,
+    getWaitingForQueueTitle,
     getExperimentTypeObj,
     getDefaultExperimentTableControl,
     formatDateLocale,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Gene
+from .models import Gene, MoleculeAlias
 
 
 class GeneAdmin(admin.ModelAdmin):
@@ -8,4 +8,11 @@ class GeneAdmin(admin.ModelAdmin):
     search_fields = ('name', 'type', 'description')
 
 
+class MoleculeAliasAdmin(admin.ModelAdmin):
+    list_display = ('molecule', 'service', 'aliases', 'last_update')
+    list_filter = ('service', )
+    search_fields = ('molecule', )
+
+
 admin.site.register(Gene, GeneAdmin)
+admin.site.register(MoleculeAlias, MoleculeAliasAdmin)
@@ -0,0 +1,121 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+from django.conf import settings
+from django.utils import timezone
+from api_service.mrna_service import global_mrna_service
+from .models import MoleculeAlias, MoleculeAliasService
+
+# Number of molecules used in every "IN" query to the local aliases table
+LOCAL_QUERY_CHUNK_SIZE = 5000
+
+
+def __get_chunks(molecules: List[str], chunk_size: int) -> Iterator[List[str]]:
+    """Yields successive chunks of a list of molecules."""
+    for i in range(0, len(molecules), chunk_size):
+        yield molecules[i:i + chunk_size]
+
+
+def __get_from_upstream(service: MoleculeAliasService, molecules: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Gets the aliases of a list of molecules from the corresponding BioAPI/Modulector service.
+    @param service: Service to request.
+    @param molecules: List of molecules to send.
+    @return: Dict with the aliases of every molecule. None if the request failed.
+    """
+    if service == MoleculeAliasService.GENE_SYMBOLS:
+        return global_mrna_service.get_bioapi_service_content(
+            'gene-symbols',
+            request_params={'gene_ids': molecules},
+            is_paginated=False,
+            method='post'
+        )
+
+    if service == MoleculeAliasService.MIRNA_CODES:
+        return global_mrna_service.get_modulector_service_content(
+            'mirna-codes',
+            request_params={'mirna_codes': molecules},
+            is_paginated=False,
+            method='post'
+        )
+
+    return global_mrna_service.get_modulector_service_content(
+        'methylation-sites',
+        request_params={'methylation_sites': molecules},
+        is_paginated=False,
+        method='post'
+    )
+
+
+def __get_from_local_table(service: MoleculeAliasService, molecules: List[str]) -> Dict[str, Any]:
+    """
+    Gets the non-expired aliases (see settings.MOLECULES_ALIASES_TTL) of a list of molecules from the local table.
+    @param service: Service to filter.
+    @param molecules: List of molecules to retrieve.
+    @return: Dict with the aliases of every molecule found.
+    """
+    min_last_update = timezone.now() - timedelta(seconds=settings.MOLECULES_ALIASES_TTL)
+    result: Dict[str, Any] = {}
+    for chunk in __get_chunks(molecules, LOCAL_QUERY_CHUNK_SIZE):
+        cached = MoleculeAlias.objects.filter(
+            service=service,
+            molecule__in=chunk,
+            last_update__gte=min_last_update
+        ).values_list('molecule', 'aliases')
+        result.update(cached)
+    return result
+
+
+def save_molecules_aliases(service: MoleculeAliasService, aliases: Dict[str, Any]):
+    """
+    Inserts (or updates if they already exist) the aliases of a set of molecules in the local table.
+    @param service: Service which the aliases were retrieved from.
+    @param aliases: Dict with the aliases of every molecule.
+    """
+    now = timezone.now()
+    MoleculeAlias.objects.bulk_create(
+        [
+            MoleculeAlias(service=service, molecule=molecule, aliases=molecule_aliases, last_update=now)
+            for molecule, molecule_aliases in aliases.items()
+        ],
+        batch_size=settings.INSERT_CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=['service', 'molecule'],
+        update_fields=['aliases', 'last_update']
+    )
+
+
+def get_molecules_aliases(service: MoleculeAliasService, molecules: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Gets the aliases of a list of molecules. The local table is consulted first and only the misses are requested to
+    BioAPI/Modulector in batches of settings.MOLECULES_ALIASES_BATCH_SIZE molecules, with at most
+    settings.MOLECULES_ALIASES_MAX_CONCURRENT_REQUESTS concurrent requests. The retrieved aliases are stored in the
+    local table.
+    @param service: Service to get the aliases from.
+    @param molecules: Molecules to get their aliases.
+    @return: Dict with the aliases of every molecule (same structure as the BioAPI/Modulector response). None if
+    any of the requests to BioAPI/Modulector failed.
+    """
+    unique_molecules = list(dict.fromkeys(molecules))
+    result = __get_from_local_table(service, unique_molecules)
+
+    misses = [molecule for molecule in unique_molecules if molecule not in result]
+    logging.warning(f'Molecules aliases ({service.label}): {len(result)} found locally, {len(misses)} requested '
+                    f'to BioAPI/Modulector')
+    if not misses:
+        return result
+
+    batches = list(__get_chunks(misses, settings.MOLECULES_ALIASES_BATCH_SIZE))
+    max_workers = min(settings.MOLECULES_ALIASES_MAX_CONCURRENT_REQUESTS, len(batches))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(lambda batch: __get_from_upstream(service, batch), batches))
+
+    if any(not isinstance(response, dict) for response in responses):
+        return None
+
+    for response in responses:
+        save_molecules_aliases(service, response)
+        result.update(response)
+
+    return result
@@ -0,0 +1,39 @@
+import json
+from itertools import islice
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from genes.aliases_service import save_molecules_aliases
+from genes.models import MoleculeAliasService
+
+
+class Command(BaseCommand):
+    help = ('Loads a full dump of molecules aliases (a JSON object with the same structure as the BioAPI/Modulector '
+            'response) into the local aliases table')
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', type=str, help='Path of the JSON dump')
+        parser.add_argument(
+            '--service',
+            type=str,
+            required=True,
+            choices=[service.name.lower() for service in MoleculeAliasService],
+            help='Service which the dump was retrieved from'
+        )
+
+    def handle(self, *args, **options):
+        service = MoleculeAliasService[options['service'].upper()]
+        try:
+            with open(options['file_path']) as dump_file:
+                aliases = json.load(dump_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Error reading dump file: {e}')
+
+        if not isinstance(aliases, dict):
+            raise CommandError('The dump must be a JSON object with the aliases of every molecule')
+
+        # Inserts in chunks to prevent building all the model instances at once
+        items = iter(aliases.items())
+        while chunk := dict(islice(items, settings.INSERT_CHUNK_SIZE)):
+            save_molecules_aliases(service, chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'{len(aliases)} {service.label} aliases loaded'))
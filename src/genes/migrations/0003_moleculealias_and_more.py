@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-19 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('genes', '0002_auto_20210114_2331'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoleculeAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.IntegerField(choices=[(1, 'Gene Symbols'), (2, 'Mirna Codes'), (3, 'Methylation Sites')])),
+                ('molecule', models.TextField()),
+                ('aliases', models.JSONField(blank=True, null=True)),
+                ('last_update', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='moleculealias',
+            constraint=models.UniqueConstraint(fields=('service', 'molecule'), name='unique_molecule_alias_by_service'),
+        ),
+    ]
@@ -12,3 +12,30 @@ class Gene(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class MoleculeAliasService(models.IntegerChoices):
+    """BioAPI/Modulector services used to get the standard identifiers of molecules"""
+    GENE_SYMBOLS = 1  # BioAPI 'gene-symbols' service
+    MIRNA_CODES = 2  # Modulector 'mirna-codes' service
+    METHYLATION_SITES = 3  # Modulector 'methylation-sites' service
+
+
+class MoleculeAlias(models.Model):
+    """
+    Local cache of the standard identifiers of a molecule retrieved from BioAPI/Modulector. The 'aliases' field keeps
+    the value returned by the service for the molecule as is (a list of symbols for genes and methylation sites, a
+    string or null for miRNAs).
+    """
+    service = models.IntegerField(choices=MoleculeAliasService.choices)
+    molecule = models.TextField()
+    aliases = models.JSONField(blank=True, null=True)
+    last_update = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'molecule'], name='unique_molecule_alias_by_service')
+        ]
+
+    def __str__(self):
+        return f'{self.molecule} ({self.get_service_display()}) -> {self.aliases}'
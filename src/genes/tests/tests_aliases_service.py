@@ -0,0 +1,72 @@
+from datetime import timedelta
+from typing import List, Dict, Any
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api_service.mrna_service import global_mrna_service
+from genes.aliases_service import get_molecules_aliases
+from genes.models import MoleculeAlias, MoleculeAliasService
+import logging
+
+# Disables to prevent correct errors logging
+logging.disable(logging.CRITICAL)
+
+
+@override_settings(MOLECULES_ALIASES_TTL=3600, MOLECULES_ALIASES_BATCH_SIZE=2,
+                   MOLECULES_ALIASES_MAX_CONCURRENT_REQUESTS=2)
+class MoleculesAliasesTestCase(TestCase):
+    requested_molecules: List[List[str]]
+
+    def setUp(self):
+        self.requested_molecules = []
+        self.patcher = mock.patch.object(global_mrna_service, 'get_bioapi_service_content',
+                                         side_effect=self.__stub_gene_symbols)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def __stub_gene_symbols(self, _service_name: str, request_params: Dict[str, Any], **_kwargs) -> Dict[str, Any]:
+        """Simulates the BioAPI 'gene-symbols' service returning the gene in upper case as its alias."""
+        molecules = request_params['gene_ids']
+        self.requested_molecules.append(molecules)
+        return {molecule: [molecule.upper()] for molecule in molecules}
+
+    def __get_aliases(self, molecules: List[str]) -> Dict[str, Any]:
+        return get_molecules_aliases(MoleculeAliasService.GENE_SYMBOLS, molecules)
+
+    def test_misses_are_requested_in_batches(self):
+        """Tests that only the molecules not found locally are requested (in batches) and then stored"""
+        MoleculeAlias.objects.create(service=MoleculeAliasService.GENE_SYMBOLS, molecule='brca1', aliases=['BRCA1'],
+                                     last_update=timezone.now())
+
+        aliases = self.__get_aliases(['brca1', 'tp53', 'egfr', 'myc', 'tp53'])
+        self.assertEqual(aliases, {'brca1': ['BRCA1'], 'tp53': ['TP53'], 'egfr': ['EGFR'], 'myc': ['MYC']})
+        self.assertEqual(sorted(map(sorted, self.requested_molecules)), [['egfr', 'tp53'], ['myc']])
+        self.assertEqual(MoleculeAlias.objects.count(), 4)
+
+    def test_hits_are_not_requested(self):
+        """Tests that a second call is answered entirely from the local table"""
+        self.__get_aliases(['tp53', 'egfr'])
+        self.requested_molecules.clear()
+
+        self.assertEqual(self.__get_aliases(['egfr', 'tp53']), {'tp53': ['TP53'], 'egfr': ['EGFR']})
+        self.assertEqual(self.requested_molecules, [])
+
+    def test_expired_aliases_are_requested_again(self):
+        """Tests that the aliases older than the TTL are requested again and refreshed"""
+        expired_date = timezone.now() - timedelta(seconds=7200)
+        MoleculeAlias.objects.create(service=MoleculeAliasService.GENE_SYMBOLS, molecule='tp53', aliases=['OLD'],
+                                     last_update=expired_date)
+
+        self.assertEqual(self.__get_aliases(['tp53']), {'tp53': ['TP53']})
+        self.assertEqual(self.requested_molecules, [['tp53']])
+
+        alias = MoleculeAlias.objects.get(service=MoleculeAliasService.GENE_SYMBOLS, molecule='tp53')
+        self.assertEqual(alias.aliases, ['TP53'])
+        self.assertGreater(alias.last_update, expired_date)
+
+    def test_long_molecules(self):
+        """Tests that a molecule longer than any valid identifier (e.g. user input) doesn't raise a DB error"""
+        long_molecule = 'x' * 500
+        self.assertEqual(self.__get_aliases([long_molecule]), {long_molecule: [long_molecule.upper()]})
@@ -1,6 +1,12 @@
+import csv
+import io
+import logging
+from typing import Iterator, Tuple, Type, Union
 import numpy as np
 import pandas as pd
-from common.datasets_utils import get_common_samples, generate_molecules_file, clean_dataset, \
+from django.conf import settings
+from django.db import connection
+from common.datasets_utils import get_common_samples, generate_molecules_dataframe, clean_dataset, \
     check_molecules_and_samples_number_or_exception
 from common.exceptions import ExperimentStopped
 from common.functions import check_if_stopped
@@ -11,12 +17,57 @@ from feature_selection.models import TrainedModel
 from inferences.models import InferenceExperiment, SampleAndClusterPrediction, SampleAndTimePrediction
 
 
-def __compute_inference_experiment(experiment: InferenceExperiment, molecules_temp_file_path: str,
+def __predict_in_chunks(classifier: SurvModel, molecules_df: pd.DataFrame,
+                        is_aborted: AbortEvent) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Makes the predictions of settings.INFERENCE_PREDICTION_CHUNK_SIZE samples at a time.
+    @param classifier: Trained model.
+    @param molecules_df: DataFrame with samples as rows and molecules as columns.
+    @param is_aborted: Method to call to check if the experiment has been stopped.
+    @return: Iterator of tuples with the samples of the chunk and their predictions.
+    """
+    # Spectral/Ward models trained before the out-of-sample assignment was added have to be refitted with all the
+    # samples
+    if not hasattr(classifier, 'predict'):
+        yield molecules_df.index.to_numpy(), classifier.fit_predict(molecules_df.values)
+        return
+
+    chunk_size = settings.INFERENCE_PREDICTION_CHUNK_SIZE
+    for start in range(0, molecules_df.shape[0], chunk_size):
+        check_if_stopped(is_aborted, ExperimentStopped)
+        chunk = molecules_df.iloc[start:start + chunk_size]
+        yield chunk.index.to_numpy(), classifier.predict(chunk.values)
+
+
+def __copy_predictions(model: Type[Union[SampleAndClusterPrediction, SampleAndTimePrediction]], value_column: str,
+                       experiment: InferenceExperiment, samples: np.ndarray, values: np.ndarray):
+    """
+    Inserts the predictions of a chunk of samples using a Postgres COPY statement, which is much faster than INSERTs
+    for a large number of rows.
+    @param model: Model of the predictions table.
+    @param value_column: Column where the predicted values are stored.
+    @param experiment: InferenceExperiment instance.
+    @param samples: Samples of the chunk.
+    @param values: Predictions of the samples.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((sample, value, experiment.pk) for sample, value in zip(samples, values.tolist()))
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {model._meta.db_table} (sample, {value_column}, experiment_id) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+
+
+def __compute_inference_experiment(experiment: InferenceExperiment, molecules_df: pd.DataFrame,
                                    is_aborted: AbortEvent):
     """
     Computes the Feature Selection experiment using the params defined by the user.
     @param experiment: InferenceExperiment instance.
-    @param molecules_temp_file_path: Path of the DataFrame with the molecule expressions.
+    @param molecules_df: DataFrame with the molecule expressions.
     @param is_aborted: Method to call to check if the experiment has been stopped.
     """
     check_if_stopped(is_aborted, ExperimentStopped)
@@ -24,11 +75,6 @@ def __compute_inference_experiment(experiment: InferenceExperiment, molecules_te
     classifier: SurvModel = trained_model.get_model_instance()
     is_clustering = hasattr(trained_model, 'clustering_parameters')
 
-    # TODO: refactor this retrieval of data as it's repeated in the fs_service
-    # Gets molecules and clinical DataFrames
-    check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_df = pd.read_csv(molecules_temp_file_path, sep='\t', decimal='.', index_col=0)
-
     # Computes general metrics
     # Gets all the molecules in the needed order. It's necessary to call get_subset_of_features to fix the
     # structure of data
@@ -42,56 +88,35 @@ def __compute_inference_experiment(experiment: InferenceExperiment, molecules_te
     # Checks if the number of molecules is valid
     check_molecules_and_samples_number_or_exception(classifier, molecules_df)
 
-    # Gets a list of samples
-    check_if_stopped(is_aborted, ExperimentStopped)
-    samples = np.array(molecules_df.index.tolist())
+    # Removes the predictions stored by a previous attempt (interrupted by a worker loss) as they are stored again
+    if experiment.attempt > 1:
+        experiment.samples_and_clusters.all().delete()
+        experiment.samples_and_time.all().delete()
 
-    if is_clustering:
-        # Gets the groups
-        check_if_stopped(is_aborted, ExperimentStopped)
-        clustering_result = classifier.predict(molecules_df.values)
-
-        # Retrieves the data for every group and stores the survival function
-        for cluster_id in range(classifier.n_clusters):
-            # Gets the samples in the current cluster
-            check_if_stopped(is_aborted, ExperimentStopped)
-            current_samples = samples[np.where(clustering_result == cluster_id)]
-
-            # Stores the prediction and the samples
-            check_if_stopped(is_aborted, ExperimentStopped)
-            SampleAndClusterPrediction.objects.bulk_create([
-                SampleAndClusterPrediction(
-                    sample=sample_id,
-                    cluster=cluster_id,
-                    experiment=experiment
-                )
-                for sample_id in current_samples
-            ])
-    else:
-        # If it's not a clustering model, it's an SVM or RF
+    # Makes the predictions by chunks of samples (to bound the memory used by the models, e.g. the kernel matrix of
+    # the SVMs) and stores them with COPY statements
+    n_samples = molecules_df.shape[0]
+    n_predicted = 0
+    for samples, predictions in __predict_in_chunks(classifier, molecules_df, is_aborted):
         check_if_stopped(is_aborted, ExperimentStopped)
-        regression_result = np.round(classifier.predict(molecules_df.values), 4)
+        if is_clustering:
+            __copy_predictions(SampleAndClusterPrediction, 'cluster', experiment, samples, predictions)
+        else:
+            # If it's not a clustering model, it's an SVM or RF
+            __copy_predictions(SampleAndTimePrediction, 'prediction', experiment, samples, np.round(predictions, 4))
 
-        # Stores the prediction and the samples
-        check_if_stopped(is_aborted, ExperimentStopped)
-        SampleAndTimePrediction.objects.bulk_create([
-            SampleAndTimePrediction(
-                sample=sample_id,
-                prediction=predicted_time,
-                experiment=experiment
-            )
-            for sample_id, predicted_time in zip(samples, regression_result)
-        ])
+        n_predicted += len(samples)
+        logging.warning(f'InferenceExperiment {experiment.pk}: {n_predicted}/{n_samples} samples predicted '
+                        f'({(100 * n_predicted) // n_samples}%)')
 
     experiment.save()
 
 
-def prepare_and_compute_inference_experiment(experiment: InferenceExperiment, is_aborted: AbortEvent) -> str:
+def prepare_and_compute_inference_experiment(experiment: InferenceExperiment, is_aborted: AbortEvent):
     """
     Gets samples in common, generates needed DataFrames and finally computes the Feature Selection experiment.
     @param experiment: InferenceExperiment instance.
     @param is_aborted: Method to call to check if the experiment has been stopped.
-    @return Trained model instance if everything was ok. None if no best features were found.
     """
     # Get samples in common
     check_if_stopped(is_aborted, ExperimentStopped)
@@ -99,9 +124,7 @@ def prepare_and_compute_inference_experiment(experiment: InferenceExperiment, is
 
     # Generates needed DataFrames
     check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_temp_file_path = generate_molecules_file(experiment, samples_in_common)
+    molecules_df = generate_molecules_dataframe(experiment, samples_in_common)
 
     check_if_stopped(is_aborted, ExperimentStopped)
-    __compute_inference_experiment(experiment, molecules_temp_file_path, is_aborted)
-
-    return molecules_temp_file_path
+    __compute_inference_experiment(experiment, molecules_df, is_aborted)
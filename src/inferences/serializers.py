@@ -1,11 +1,13 @@
-from typing import Union
+from typing import Union, Optional
 from django.db.models import Q, OuterRef
 from rest_framework import serializers
 from rest_framework.generics import get_object_or_404
 
 from api_service.serializers import ExperimentSourceSerializer
+from biomarkers.models import BiomarkerState
 from feature_selection.fs_algorithms import FitnessFunction
 from feature_selection.models import ClusterLabelsSet, ClusterLabel, PredictionRangeLabelsSet, PredictionRangeLabel
+from scheduling.fair_share_service import get_queue_position
 from .models import InferenceExperiment, SampleAndClusterPrediction, SampleAndTimePrediction
 
 
@@ -19,6 +21,7 @@ def generate_prediction_condition(predicted_time: Union[float, OuterRef]) -> Q:
 class InferenceExperimentSerializer(serializers.ModelSerializer):
     """Serializer for InferenceExperiment model."""
     model = serializers.SerializerMethodField(method_name='get_model')
+    queue_position = serializers.SerializerMethodField(method_name='get_queue_position')
     trained_model = serializers.PrimaryKeyRelatedField(read_only=True)
 
     clinical_source = ExperimentSourceSerializer()
@@ -30,13 +33,21 @@ class InferenceExperimentSerializer(serializers.ModelSerializer):
     class Meta:
         model = InferenceExperiment
         fields = ['id', 'name', 'description', 'created', 'model', 'state', 'trained_model',
-                  'clinical_source', 'mrna_source', 'mirna_source', 'cna_source', 'methylation_source']
+                  'clinical_source', 'mrna_source', 'mirna_source', 'cna_source', 'methylation_source',
+                  'queue_position']
 
     @staticmethod
     def get_model(ins: InferenceExperiment) -> FitnessFunction:
         """Gets the type of model used for training/testing (SVM/RF/Clustering)."""
         return ins.trained_model.fitness_function
 
+    def get_queue_position(self, ins: InferenceExperiment) -> Optional[int]:
+        """Gets the position of a waiting inference in the fair-share dispatcher (None if it's not waiting)."""
+        if ins.state != BiomarkerState.WAITING_FOR_QUEUE:
+            return None
+        positions_cache = self.context.setdefault('queue_positions', {})
+        return get_queue_position(ins, 'inference', positions_cache)
+
 
 class SampleAndClusterPredictionSerializer(serializers.ModelSerializer):
     """SampleAndClusterPrediction serializer."""
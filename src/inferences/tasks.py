@@ -1,7 +1,5 @@
 import logging
-import os
 import time
-from typing import Optional
 from billiard.exceptions import SoftTimeLimitExceeded
 from celery.contrib.abortable import AbortableTask
 from django.conf import settings
@@ -41,13 +39,12 @@ def eval_inference_experiment(self, experiment_pk: int):
     experiment.save(update_fields=['attempt', 'state'])
 
     # Computes the experiment
-    molecules_temp_file_path: Optional[str] = None
     try:
         logging.warning(f'ID InferenceExperiment -> {experiment.pk}')
 
         # Computes Feature Selection experiment
         start = time.time()
-        molecules_temp_file_path = prepare_and_compute_inference_experiment(experiment, self.is_aborted)
+        prepare_and_compute_inference_experiment(experiment, self.is_aborted)
         total_execution_time = time.time() - start
         logging.warning(f'InferenceExperiment {experiment.pk} total time -> {total_execution_time} seconds')
 
@@ -86,10 +83,6 @@ def eval_inference_experiment(self, experiment_pk: int):
         logging.exception(e)
         logging.warning(f'Setting BiomarkerState.FINISHED_WITH_ERROR to experiment {experiment.pk}')
         experiment.state = BiomarkerState.FINISHED_WITH_ERROR
-    finally:
-        # Removes the temporary files
-        if molecules_temp_file_path is not None:
-            os.unlink(molecules_temp_file_path)
 
     # Saves changes in DB
     experiment.save()
\ No newline at end of file
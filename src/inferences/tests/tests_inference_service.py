@@ -0,0 +1,103 @@
+from typing import List
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from sklearn.cluster import KMeans
+from biomarkers.models import Biomarker, BiomarkerOrigin, BiomarkerState, TrainedModelState
+from feature_selection.models import TrainedModel, FitnessFunction, ClusteringParameters
+from inferences import inference_service
+from inferences.inference_service import prepare_and_compute_inference_experiment
+from inferences.models import InferenceExperiment, SampleAndTimePrediction
+
+# Number of samples and molecules of the generated dataset
+N_SAMPLES = 30
+N_MOLECULES = 4
+
+
+class ChunkRecorderModel:
+    """Regression model that predicts the sum of the features and records the size of every predicted chunk."""
+    n_features_in_ = N_MOLECULES
+
+    def __init__(self):
+        self.chunk_sizes: List[int] = []
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        self.chunk_sizes.append(x.shape[0])
+        return x.sum(axis=1)
+
+
+@override_settings(INFERENCE_PREDICTION_CHUNK_SIZE=7,
+                   CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class InferenceServiceTestCase(TestCase):
+    experiment: InferenceExperiment
+
+    def setUp(self):
+        user = User.objects.create(username='test')
+        biomarker = Biomarker.objects.create(name='Biomarker', origin=BiomarkerOrigin.MANUAL,
+                                             state=BiomarkerState.COMPLETED, user=user)
+        trained_model = TrainedModel.objects.create(name='Model', biomarker=biomarker,
+                                                    state=TrainedModelState.COMPLETED,
+                                                    fitness_function=FitnessFunction.SVM)
+        self.experiment = InferenceExperiment.objects.create(name='Inference', biomarker=biomarker,
+                                                             trained_model=trained_model,
+                                                             state=BiomarkerState.IN_PROCESS)
+
+        # Molecules as rows and samples as columns, as they are retrieved from the sources
+        rng = np.random.default_rng(0)
+        self.molecules_df = pd.DataFrame(rng.normal(size=(N_MOLECULES, N_SAMPLES)),
+                                         index=[f'gene_{i}' for i in range(N_MOLECULES)],
+                                         columns=[f'sample_{i}' for i in range(N_SAMPLES)])
+
+        self.patchers = [
+            mock.patch.object(inference_service, 'get_common_samples', return_value=self.molecules_df.columns.values),
+            mock.patch.object(inference_service, 'generate_molecules_dataframe', return_value=self.molecules_df)
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def __compute(self, classifier):
+        """Computes the InferenceExperiment using the given trained classifier."""
+        with mock.patch.object(TrainedModel, 'get_model_instance', return_value=classifier):
+            prepare_and_compute_inference_experiment(self.experiment, is_aborted=lambda: False)
+
+    def test_time_predictions_are_stored_by_chunks(self):
+        """Tests that all the samples are predicted in chunks and every prediction is stored"""
+        classifier = ChunkRecorderModel()
+        self.__compute(classifier)
+
+        self.assertEqual(classifier.chunk_sizes, [7, 7, 7, 7, 2])
+
+        expected = self.molecules_df.sum(axis=0).round(4).to_dict()
+        stored = dict(self.experiment.samples_and_time.values_list('sample', 'prediction'))
+        self.assertEqual(stored.keys(), expected.keys())
+        for sample, prediction in stored.items():
+            self.assertAlmostEqual(prediction, expected[sample], places=4)
+
+    def test_cluster_predictions(self):
+        """Tests that clustering models store the cluster of every sample (the same for any chunk size)"""
+        ClusteringParameters.objects.create(trained_model=self.experiment.trained_model, n_clusters=3)
+        classifier = KMeans(n_clusters=3, n_init=10, random_state=0).fit(self.molecules_df.T.values)
+        self.__compute(classifier)
+
+        expected = dict(zip(self.molecules_df.columns, classifier.predict(self.molecules_df.T.values).tolist()))
+        stored = dict(self.experiment.samples_and_clusters.values_list('sample', 'cluster'))
+        self.assertEqual(stored, expected)
+        self.assertFalse(self.experiment.samples_and_time.exists())
+
+    def test_retry_replaces_previous_predictions(self):
+        """Tests that a retried experiment doesn't keep the predictions stored by the interrupted attempt"""
+        SampleAndTimePrediction.objects.bulk_create(
+            SampleAndTimePrediction(sample=sample, prediction=0.0, experiment=self.experiment)
+            for sample in self.molecules_df.columns[:10]
+        )
+        self.experiment.attempt = 2
+        self.__compute(ChunkRecorderModel())
+
+        self.assertEqual(self.experiment.samples_and_time.count(), N_SAMPLES)
+        self.assertFalse(self.experiment.samples_and_time.filter(prediction=0.0).exists())
@@ -28,6 +28,7 @@ from inferences.models import InferenceExperiment, SampleAndClusterPrediction, S
 from inferences.serializers import InferenceExperimentSerializer, SampleAndClusterPredictionSerializer, \
     SampleAndTimePredictionSerializer, generate_prediction_condition
 from user_files.models_choices import FileType
+from scheduling.fair_share_service import schedule_task, cancel_scheduled_task
 from .tasks import eval_inference_experiment
 
 
@@ -145,12 +146,12 @@ class PredictionExperimentSubmit(APIView):
                 methylation_source=methylation_source,
             )
 
-        # Adds the experiment to the TaskQueue and gets Task id
-        async_res: AbortableAsyncResult = eval_inference_experiment.apply_async((inference_experiment.pk,),
-                                                                                queue='inference')
-
-        inference_experiment.task_id = async_res.task_id
-        inference_experiment.save(update_fields=['task_id'])
+        # Adds the experiment to the fair-share dispatcher of the queue
+        samples_source = next((source for source in [mrna_source, mirna_source, cna_source, methylation_source]
+                               if source is not None), None)
+        number_of_samples = samples_source.number_of_samples if samples_source is not None else 1
+        schedule_task(eval_inference_experiment, (inference_experiment.pk,), 'inference', inference_experiment,
+                      request.user, biomarker.number_of_molecules * number_of_samples)
 
         return Response({'ok': True})
 
@@ -179,7 +180,8 @@ class StopInferenceExperiment(APIView):
 
                 logging.warning(f'Aborting InferenceExperiment {inference_experiment_id}')
 
-                # Sends the signal to abort it
+                # Sends the signal to abort it (or removes it from the dispatcher if it's still waiting)
+                cancel_scheduled_task(experiment)
                 if experiment.task_id:
                     abortable_async_result = AbortableAsyncResult(experiment.task_id)
                     abortable_async_result.abort()
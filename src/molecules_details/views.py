@@ -1,31 +1,63 @@
 from typing import cast, Any
-
-from django.http import HttpRequest
-from rest_framework import permissions
-from rest_framework.response import Response
-from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from api_service.mrna_service import global_mrna_service
 
 
-class GeneInformation(APIView):
+class AsyncMoleculesDetailsView(View):
+    """
+    Base async view for the molecules details services. Views only wait for BioAPI/Modulector without blocking a
+    worker thread, so a single ASGI process can serve many concurrent requests.
+    """
+    http_method_names = ['get']
+
+    @staticmethod
+    def __is_authenticated(request: HttpRequest) -> bool:
+        """
+        Authenticates the request with the same authentication classes (session, basic auth, etc.) as the DRF views.
+        @param request: Django request.
+        @return: True if the user is authenticated.
+        @raise APIException if the request has invalid credentials.
+        """
+        authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        user = Request(request, authenticators=authenticators).user
+        return user is not None and user.is_authenticated
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs):
+        # Same response as the IsAuthenticated permission of DRF. User is retrieved from DB, so it's checked in a thread
+        try:
+            is_authenticated = await sync_to_async(self.__is_authenticated)(request)
+        except APIException as ex:
+            return JsonResponse({'detail': ex.detail}, status=ex.status_code)
+
+        if not is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class GeneInformation(AsyncMoleculesDetailsView):
     """
     Retrieves general data of a gene from BioAPI 'information-of-genes' service.
     Examples:
     http://localhost:8000/molecules/gene-information?gene=BRCA1
     http://localhost:8000/molecules/gene-information?gene=MSH3,BRCA1
     """
-    permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
 
         if gene:
             gene = gene.split(',')
         else:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             'information-of-genes',
             request_params={
                 'gene_ids': gene
@@ -34,12 +66,12 @@ class GeneInformation(APIView):
             method='post'
         )
 
-        return Response({
+        return JsonResponse({
             'data': data if data else None
         })
 
 
-class GeneGroups(APIView):
+class GeneGroups(AsyncMoleculesDetailsView):
     """
     Gets the identifier of a gene, validates it and then returns the group of genes to which
     it belongs according to HGNC, and all the other genes that belong to the same group.
@@ -48,26 +80,24 @@ class GeneGroups(APIView):
     http://localhost:8000/molecules/gene-groups?gene=SACS
     """
 
-    permission_classes = [permissions.IsAuthenticated]
-
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
         if not gene:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             f'/genes-of-its-group/{gene}',
             request_params={},  # No params needed
             is_paginated=False,
             method='get'
         )
-        return Response({
+        return JsonResponse({
             'data': data if data else None
         })
 
 
-class PathwaysInformation(APIView):
+class PathwaysInformation(AsyncMoleculesDetailsView):
     """
     Retrieves general data of a gene from BioAPI 'pathways-in-common' service.
     The service is used with a single gene to bring from the databases all the information
@@ -77,18 +107,16 @@ class PathwaysInformation(APIView):
     http://localhost:8000/molecules/pathways-information?gene=BRCA1,BRCA2
     """
 
-    permission_classes = [permissions.IsAuthenticated]
-
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
 
         if gene:
             gene = gene.split(',')
         else:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             'pathways-in-common',
             request_params={
                 'gene_ids': gene
@@ -97,12 +125,12 @@ class PathwaysInformation(APIView):
             method='post'
         )
 
-        return Response({
+        return JsonResponse({
             'data': data['pathways'] if data and 'pathways' in data else None
         })
 
 
-class MetabolicPathwaysInformation(APIView):
+class MetabolicPathwaysInformation(AsyncMoleculesDetailsView):
     """
     Retrieves genes from BioAPI '/pathway-genes/<source>/<external_id>' service.
     This service gets all genes of a metabolic pathway for a source database and an identifier
@@ -112,40 +140,37 @@ class MetabolicPathwaysInformation(APIView):
     http://localhost:8000/molecules/metabolic-pathways-information?source=KEGG&id=hsa05224
     """
 
-    permission_classes = [permissions.IsAuthenticated]
-
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         source = request.GET.get('source', '').strip()
         if not source:
-            return Response(status=400, data={"error": "Param 'source' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'source' is mandatory"})
 
         pathway_id = request.GET.get('id', '').strip()
         if not pathway_id:
-            return Response(status=400, data={"error": "Param 'id' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'id' is mandatory"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             f'/pathway-genes/{source}/{pathway_id}',
             request_params={},  # No params needed
             is_paginated=False,
             method='get'
         )
-        return Response({
+        return JsonResponse({
             'data': data['genes'] if data and 'genes' in data else None
         })
 
 
-class GeneOntologyTermsOfGene(APIView):
+class GeneOntologyTermsOfGene(AsyncMoleculesDetailsView):
     """
     Gets the list of related terms for a gene.
     Examples:
     http://localhost:8000/molecules/gene-ontology-gene-terms?gene=TP53&filter_type=enrichment&p_value_threshold=0.09&correction_method=analytical
     http://localhost:8000/molecules/gene-ontology-gene-terms?gene=TP53&filter_type=union&relation_type=enables,involved_in&ontology_type=biological_process,molecular_function
     """
-    permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
         filter_type = request.GET.get('filter_type', '').strip()
         p_value_threshold = request.GET.get('p_value_threshold', '').strip()
@@ -156,22 +181,22 @@ class GeneOntologyTermsOfGene(APIView):
         if gene:
             gene = gene.split(',')
         else:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
 
         if not filter_type:
             filter_type = 'intersection'
 
         if filter_type not in ["intersection", "union", "enrichment"]:
-            return Response(status=400, data={"error": "The 'filter_type' parameter must be one of the following "
-                                                       "options: 'intersection', 'union' or 'enrichment'"})
+            return JsonResponse(status=400, data={"error": "The 'filter_type' parameter must be one of the following "
+                                                           "options: 'intersection', 'union' or 'enrichment'"})
         else:
             if filter_type == 'enrichment':
                 if not p_value_threshold:
-                    return Response(status=400, data={"error": "The 'p_value_threshold' parameter is mandatory if "
-                                                               "'filter_type' is 'enrichment'"})
+                    return JsonResponse(status=400, data={"error": "The 'p_value_threshold' parameter is mandatory if "
+                                                                   "'filter_type' is 'enrichment'"})
                 if not correction_method:
-                    return Response(status=400, data={"error": "The 'correction_method' parameter is mandatory if "
-                                                               "'filter_type' is 'enrichment'"})
+                    return JsonResponse(status=400, data={"error": "The 'correction_method' parameter is mandatory if "
+                                                                   "'filter_type' is 'enrichment'"})
             else:
                 if not relation_type:
                     relation_type = ["enables", "involved_in",
@@ -180,10 +205,10 @@ class GeneOntologyTermsOfGene(APIView):
                     relation_type = relation_type.split(',')
                     for relation in relation_type:
                         if relation not in ["enables", "involved_in", "part_of", "located_in"]:
-                            return Response(status=400, data={"error": "The 'relation_type' parameter must be a "
-                                                                       "combination of the following options: "
-                                                                       "'enables', 'involved_in', 'part_of' and "
-                                                                       "'located_in'"})
+                            return JsonResponse(status=400, data={"error": "The 'relation_type' parameter must be a "
+                                                                           "combination of the following options: "
+                                                                           "'enables', 'involved_in', 'part_of' and "
+                                                                           "'located_in'"})
         if not ontology_type:
             ontology_type = ["biological_process",
                              "molecular_function", "cellular_component"]
@@ -191,11 +216,12 @@ class GeneOntologyTermsOfGene(APIView):
             ontology_type = ontology_type.split(',')
             for type_elem in ontology_type:
                 if type_elem not in ["biological_process", "molecular_function", "cellular_component"]:
-                    return Response(status=400, data={"error": "The 'ontology_type' parameter must be a combination of "
-                                                               "the following options: 'biological_process', "
-                                                               "'molecular_function' and 'cellular_component'"})
+                    return JsonResponse(status=400, data={"error": "The 'ontology_type' parameter must be a "
+                                                                   "combination of the following options: "
+                                                                   "'biological_process', 'molecular_function' "
+                                                                   "and 'cellular_component'"})
         if filter_type in ["intersection", "union"]:
-            data = global_mrna_service.get_bioapi_service_content(
+            data = await global_mrna_service.async_get_bioapi_service_content(
                 'genes-to-terms',
                 # request_params={
                 #     'gene_ids': [gene],
@@ -211,7 +237,7 @@ class GeneOntologyTermsOfGene(APIView):
                 method='post'
             )
         else:  # filter_type == "enrichment"
-            data = global_mrna_service.get_bioapi_service_content(
+            data = await global_mrna_service.async_get_bioapi_service_content(
                 'genes-to-terms',
                 request_params={
                     'gene_ids': gene,
@@ -224,19 +250,18 @@ class GeneOntologyTermsOfGene(APIView):
                 method='post'
             )
 
-        return Response({
+        return JsonResponse({
             'go_terms': data
         })
 
 
-class GeneOntologyTermsOfTerm(APIView):
+class GeneOntologyTermsOfTerm(AsyncMoleculesDetailsView):
     """
     Gets the list of related terms to a term.
     Examples:
     http://localhost:8000/molecules/gene-ontology-term-terms?term_id=0000122&relations=part_of,regulates&ontology_type=biological_process,molecular_function&general_depth=3&hierarchical_depth_to_children=3&to_root=1
     http://localhost:8000/molecules/gene-ontology-term-terms?term_id=0000122&general_depth=1&hierarchical_depth_to_children=3&to_root=0
     """
-    permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
     def __process_go_data(go_terms: dict) -> dict:
@@ -275,28 +300,28 @@ class GeneOntologyTermsOfTerm(APIView):
 
         return res
 
-    def get(self, request: HttpRequest):
+    async def get(self, request: HttpRequest):
         term_id = request.GET.get('term_id', '').strip()
         if not term_id:
-            return Response(status=400, data={"error": "Param 'term_id' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'term_id' is mandatory"})
 
         general_depth = request.GET.get('general_depth', '5').strip()
         if not general_depth:
-            return Response(status=400, data={"error": "Param 'general_depth' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'general_depth' is mandatory"})
         if not general_depth.isnumeric():
-            return Response(status=400, data={"error": "Param 'general_depth' must be a numeric value"})
+            return JsonResponse(status=400, data={"error": "Param 'general_depth' must be a numeric value"})
 
         hierarchical_depth_to_children = request.GET.get('hierarchical_depth_to_children', '0').strip()
         if hierarchical_depth_to_children:
             if not hierarchical_depth_to_children.isnumeric():
-                return Response(status=400, data={"error": "Param 'hierarchical_depth_to_children' must be a "
-                                                           "numeric value"})
+                return JsonResponse(status=400, data={"error": "Param 'hierarchical_depth_to_children' must be a "
+                                                               "numeric value"})
             hierarchical_depth_to_children = int(hierarchical_depth_to_children)
 
         to_root = request.GET.get('to_root', '1').strip()
         if to_root:
             if to_root not in ["0", "1"]:
-                return Response(status=400, data={"error": "Param 'to_root' must be '0' or '1'"})
+                return JsonResponse(status=400, data={"error": "Param 'to_root' must be '0' or '1'"})
             to_root = int(to_root)
 
         relations = request.GET.get('relations', '').strip()
@@ -306,9 +331,9 @@ class GeneOntologyTermsOfTerm(APIView):
             relations = relations.split(',')
             for relation in relations:
                 if relation not in ["part_of", "regulates", "has_part"]:
-                    return Response(status=400, data={"error": "The 'relations' parameter must be a combination of "
-                                                               "the following options: 'part_of', 'regulates' and "
-                                                               "'has_part'"})
+                    return JsonResponse(status=400, data={"error": "The 'relations' parameter must be a combination of "
+                                                                   "the following options: 'part_of', 'regulates' and "
+                                                                   "'has_part'"})
 
         ontology_type = request.GET.get('ontology_type', '').strip()
         if not ontology_type:
@@ -318,11 +343,12 @@ class GeneOntologyTermsOfTerm(APIView):
             ontology_type = ontology_type.split(',')
             for type_elem in ontology_type:
                 if type_elem not in ["biological_process", "molecular_function", "cellular_component"]:
-                    return Response(status=400, data={"error": "The 'ontology_type' parameter must be a combination "
-                                                               "of the following options: 'biological_process', "
-                                                               "'molecular_function' and 'cellular_component'"})
+                    return JsonResponse(status=400, data={"error": "The 'ontology_type' parameter must be a "
+                                                                   "combination of the following options: "
+                                                                   "'biological_process', 'molecular_function' "
+                                                                   "and 'cellular_component'"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             'related-terms',
             request_params={
                 'term_id': term_id,
@@ -337,14 +363,14 @@ class GeneOntologyTermsOfTerm(APIView):
         )
 
         # Generates structure for cytoscape in frontend
-        data = self.__process_go_data(data)
+        data = await sync_to_async(self.__process_go_data, thread_sensitive=False)(data)
 
-        return Response({
+        return JsonResponse({
             'go_terms': data
         })
 
 
-class ActionableAndCancerGenes(APIView):
+class ActionableAndCancerGenes(AsyncMoleculesDetailsView):
     """
     Retrieves information of actionable genes and drugs obtained from the
     OncoKB database, at a therapeutic, diagnostic and prognostic level.
@@ -354,22 +380,20 @@ class ActionableAndCancerGenes(APIView):
     http://localhost:8000/molecules/actionable-cancer-genes?gene=BRCA1,ATM&query=Olaparib
     """
 
-    permission_classes = [permissions.IsAuthenticated]
-
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
         query = request.GET.get('query', '')
 
         if not gene:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
         else:
             gene = gene.split(',')
 
         if not query:
             query = ""
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             'information-of-oncokb',
             request_params={
                 'gene_ids': gene,
@@ -379,29 +403,28 @@ class ActionableAndCancerGenes(APIView):
             method='post'
         )
 
-        return Response({
+        return JsonResponse({
             'data': data if data else None
         })
 
 
-class DrugsPharmGKB(APIView):
+class DrugsPharmGKB(AsyncMoleculesDetailsView):
     """
     Gets a list of related drugs to a list of genes.
     Examples:
     http://localhost:8000/molecules/drugs-pharmgkb?gene=EGFR
     http://localhost:8000/molecules/drugs-pharmgkb?gene=MSH6,EGFR,TP53,BRAF
     """
-    permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
         if not gene:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
         else:
             gene = gene.split(',')
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             'drugs-pharm-gkb',
             request_params={
                 'gene_ids': gene
@@ -410,12 +433,12 @@ class DrugsPharmGKB(APIView):
             method='post'
         )
 
-        return Response({
+        return JsonResponse({
             'data': data if data else None
         })
 
 
-class PredictedFunctionalAssociationsNetwork(APIView):
+class PredictedFunctionalAssociationsNetwork(AsyncMoleculesDetailsView):
     """
     Gets a list of genes and relations related to a gene.
     Examples:
@@ -423,8 +446,6 @@ class PredictedFunctionalAssociationsNetwork(APIView):
     http://localhost:8000/molecules/predicted-functional-associations-network?gene=BRCA1&score=995
     """
 
-    permission_classes = [permissions.IsAuthenticated]
-
     @staticmethod
     def __generate_node(association: dict[str, Any], id_key: str) -> dict[str, Any]:
         """
@@ -521,22 +542,22 @@ class PredictedFunctionalAssociationsNetwork(APIView):
         # Returns the list sorted to get the group == 'nodes' first to prevent "missing node" error in the frontend
         return sorted(res, key=lambda x: x['group'] == 'nodes', reverse=True)
 
-    def get(self, request: HttpRequest):
+    async def get(self, request: HttpRequest):
         gene_id = request.GET.get('gene_id', '').strip()
         min_combined_score = request.GET.get('min_combined_score', '').strip()
         if not gene_id:
-            return Response(status=400, data={"error": "Param 'gene_id' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene_id' is mandatory"})
         if not min_combined_score:
-            return Response(status=400, data={"error": "Param 'min_combined_score' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'min_combined_score' is mandatory"})
 
         if min_combined_score.isnumeric():
             if int(min_combined_score) < 1 or int(min_combined_score) > 1000:
-                return Response(status=400, data={"error": "Param 'min_combined_score' must be a number within "
-                                                           "the closed range 1-1000"})
+                return JsonResponse(status=400, data={"error": "Param 'min_combined_score' must be a number within "
+                                                               "the closed range 1-1000"})
         else:
-            return Response(status=400, data={"error": "Param 'min_combined_score' must be a numeric value"})
+            return JsonResponse(status=400, data={"error": "Param 'min_combined_score' must be a numeric value"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             'string-relations',
             request_params={
                 'gene_id': gene_id,
@@ -547,12 +568,12 @@ class PredictedFunctionalAssociationsNetwork(APIView):
         )
 
         # Generates structure for cytoscape in frontend
-        data = self.__process_associations_data(data)
+        data = await sync_to_async(self.__process_associations_data, thread_sensitive=False)(data)
 
-        return Response({'data': data})
+        return JsonResponse({'data': data})
 
 
-class DrugsRegulatingGene(APIView):
+class DrugsRegulatingGene(AsyncMoleculesDetailsView):
     """
     Service that takes gene symbol and returns a link to https://go.drugbank.com with
     all the drugs that up-regulate and down regulate its expression.
@@ -560,41 +581,39 @@ class DrugsRegulatingGene(APIView):
     http://localhost:8000/molecules/drugs-regulating-gene?gene=TP53
     http://localhost:8000/molecules/drugs-regulating-gene?gene=EGFR
     """
-    permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         gene = request.GET.get('gene', '').strip()
         if not gene:
-            return Response(status=400, data={"error": "Param 'gene' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'gene' is mandatory"})
 
-        data = global_mrna_service.get_bioapi_service_content(
+        data = await global_mrna_service.async_get_bioapi_service_content(
             f'/drugs-regulating-gene/{gene}',
             request_params={},  # No params needed
             is_paginated=False,
             method='get'
         )
-        return Response({
+        return JsonResponse({
             'data': data["link"] if data and "link" in data else None
         })
 
 
-class MethylationSiteInformation(APIView):
+class MethylationSiteInformation(AsyncMoleculesDetailsView):
     """
     Retrieves general data of a methylation site from Modulector 'methylation' service.
     Examples:
     http://localhost:8000/molecules/methylation-site-information?methylation_site=cg22461615
     """
-    permission_classes = [permissions.IsAuthenticated]
 
     @staticmethod
-    def get(request: HttpRequest):
+    async def get(request: HttpRequest):
         methylation_site = request.GET.get('methylation_site', '').strip()
 
         if not methylation_site:
-            return Response(status=400, data={"error": "Param 'methylation_site' is mandatory"})
+            return JsonResponse(status=400, data={"error": "Param 'methylation_site' is mandatory"})
 
-        data = global_mrna_service.get_modulector_service_content(
+        data = await global_mrna_service.async_get_modulector_service_content(
             'methylation',
             request_params={
                 'methylation_site': methylation_site
@@ -603,6 +622,6 @@ class MethylationSiteInformation(APIView):
             method='get'
         )
 
-        return Response({
+        return JsonResponse({
             'data': data if data else None
         })
@@ -1,6 +1,7 @@
+import logging
 import os
 from celery import Celery
-from celery.signals import worker_init
+from celery.signals import worker_init, worker_process_init, worker_ready, task_postrun
 from django.conf import settings
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "multiomics_intermediate.settings")
@@ -31,4 +32,48 @@ def restore_all_unacknowledged_messages():
 
 @worker_init.connect
 def configure(sender=None, conf=None, **kwargs):
-    restore_all_unacknowledged_messages()
\ No newline at end of file
+    restore_all_unacknowledged_messages()
+
+
+@worker_process_init.connect
+def warm_up_trained_models_cache(**kwargs):
+    """Loads the most recent TrainedModels in the cache of every worker process."""
+    if settings.TRAINED_MODELS_CACHE_WARM_UP <= 0:
+        return
+
+    from feature_selection.models import TrainedModel
+    from feature_selection.model_dump_service import warm_up_cache
+
+    model_dumps = TrainedModel.objects.exclude(model_dump='').order_by('-created').values_list(
+        'model_dump', flat=True
+    )[:settings.TRAINED_MODELS_CACHE_WARM_UP]
+    warm_up_cache(os.path.join(settings.MEDIA_ROOT, model_dump) for model_dump in model_dumps)
+
+
+@worker_ready.connect
+def dispatch_waiting_tasks(**kwargs):
+    """Dispatches the tasks waiting in the fair-share dispatcher (e.g. the ones that couldn't be sent to the broker)."""
+    if not settings.FAIR_SHARE_SCHEDULING_ENABLED:
+        return
+
+    from scheduling.fair_share_service import dispatch_pending_tasks
+
+    for queue in settings.FAIR_SHARE_QUEUES_MAX_RUNNING_TASKS:
+        try:
+            dispatch_pending_tasks(queue)
+        except Exception as ex:
+            logging.exception(ex)
+
+
+@task_postrun.connect
+def release_fair_share_slot(task_id=None, **kwargs):
+    """Releases the slot of a finished task in the fair-share dispatcher so the next waiting task is sent."""
+    if not settings.FAIR_SHARE_SCHEDULING_ENABLED:
+        return
+
+    from scheduling.fair_share_service import release_task
+
+    try:
+        release_task(task_id)
+    except Exception as ex:
+        logging.exception(ex)
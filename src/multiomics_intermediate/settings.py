@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
-from typing import Optional
+import tempfile
+from typing import Optional, Dict
 
 # Temporal fixing for the translation issue in django-chunked-upload when using Django 4.x.
 # See more in https://github.com/juliomalegria/django-chunked-upload/issues/68#issuecomment-1903413512
@@ -63,6 +64,7 @@ INSTALLED_APPS = [
     'molecules_details',
     'chunked_upload',
     'users',
+    'scheduling',
 ]
 
 MIDDLEWARE = [
@@ -111,6 +113,69 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Caches. The responses of Modulector/BioAPI are cached in Redis (shared among all the Django/Celery processes) when
+# MRNA_SERVICE_CACHE_USE_REDIS is 'true'. Otherwise, a size-bounded local memory cache is used in every process
+MRNA_SERVICE_CACHE_USE_REDIS: bool = os.getenv('MRNA_SERVICE_CACHE_USE_REDIS', 'true') == 'true'
+
+# Time (in seconds) during which a Modulector/BioAPI response is kept in cache. 0 to disable the cache
+MRNA_SERVICE_CACHE_TTL: int = int(os.getenv('MRNA_SERVICE_CACHE_TTL', 86400))  # 1 day
+
+# Maximum number of Modulector/BioAPI responses kept in the local memory cache
+MRNA_SERVICE_CACHE_MAX_ENTRIES: int = int(os.getenv('MRNA_SERVICE_CACHE_MAX_ENTRIES', 1000))
+
+# Maximum size (in bytes) of a Modulector/BioAPI response to be cached. Bigger responses are not cached to prevent
+# filling the cache with a few entries
+MRNA_SERVICE_CACHE_MAX_RESPONSE_SIZE: int = int(os.getenv('MRNA_SERVICE_CACHE_MAX_RESPONSE_SIZE', 1048576))  # 1MB
+
+# Time (in seconds) during which the prepared expressions matrix (and the generated payloads) of a
+# StatisticalValidation's heatmap are kept in cache
+HEATMAP_CACHE_TTL: int = int(os.getenv('HEATMAP_CACHE_TTL', 3600))  # 1 hour
+
+# Maximum number of heatmaps matrices/payloads kept in the local memory cache of every process
+HEATMAP_CACHE_MAX_ENTRIES: int = int(os.getenv('HEATMAP_CACHE_MAX_ENTRIES', 50))
+
+# Time (in seconds) during which the subsample (and the sources) of a correlation analysis preview are kept in cache
+CORRELATION_PREVIEW_CACHE_TTL: int = int(os.getenv('CORRELATION_PREVIEW_CACHE_TTL', 3600))  # 1 hour
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'mrna_service': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}',
+        'KEY_PREFIX': 'mrna_service',
+        'TIMEOUT': MRNA_SERVICE_CACHE_TTL,
+        'OPTIONS': {
+            # Prevents blocking the requests to Modulector/BioAPI if Redis is not available
+            'socket_connect_timeout': 1,
+            'socket_timeout': 1
+        }
+    } if MRNA_SERVICE_CACHE_USE_REDIS else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mrna_service',
+        'TIMEOUT': MRNA_SERVICE_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': MRNA_SERVICE_CACHE_MAX_ENTRIES
+        }
+    },
+    'heatmap': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'heatmap',
+        'TIMEOUT': HEATMAP_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': HEATMAP_CACHE_MAX_ENTRIES
+        }
+    },
+    # Shared among all the Django processes as the full analysis could be submitted to another one
+    'correlation_preview': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}',
+        'KEY_PREFIX': 'correlation_preview',
+        'TIMEOUT': CORRELATION_PREVIEW_CACHE_TTL
+    }
+}
+
 # For Webpack hashing. More in https://owais.lone.pw/blog/webpack-plus-reactjs-and-django/
 # Repo: https://github.com/owais/django-webpack-loader
 WEBPACK_LOADER = {
@@ -248,9 +313,47 @@ INFERENCE_SOFT_TIME_LIMIT: int = int(os.getenv('INFERENCE_SOFT_TIME_LIMIT', 1080
 # marked as TIMEOUT_EXCEEDED
 SYNC_STUDY_SOFT_TIME_LIMIT: int = int(os.getenv('SYNC_STUDY_SOFT_TIME_LIMIT', 3600))  # 1 hour
 
+# Folder (shared by all the Celery workers) where correlation analyses and Feature Selection experiments store the
+# result of every completed stage, so a task redelivered after a worker loss resumes from the last one. Empty string to
+# disable checkpoints
+TASKS_CHECKPOINTS_DIR: str = os.getenv('TASKS_CHECKPOINTS_DIR', os.path.join(MEDIA_ROOT, 'checkpoints'))
+
+# If enabled, correlation analyses, FS experiments, statistical validations, trained models and inference experiments
+# wait in the DB and are sent to their Celery queue by a fair-share dispatcher: the users with the cheapest running
+# tasks go first (and among their tasks, the cheapest ones). Otherwise, they are sent to the (FIFO) queue on submission
+FAIR_SHARE_SCHEDULING_ENABLED: bool = os.getenv('FAIR_SHARE_SCHEDULING_ENABLED', 'true') == 'true'
+
+# Maximum number of tasks sent to every Celery queue at the same time by the fair-share dispatcher. It should be the
+# CONCURRENCY of the queue's worker (multiplied by its number of replicas) so waiting tasks stay in the dispatcher
+FAIR_SHARE_QUEUES_MAX_RUNNING_TASKS: Dict[str, int] = {
+    'correlation_analysis': int(os.getenv('CORRELATION_ANALYSIS_MAX_RUNNING_TASKS', 2)),
+    'feature_selection': int(os.getenv('FEATURE_SELECTION_MAX_RUNNING_TASKS', 2)),
+    'stats': int(os.getenv('STATS_MAX_RUNNING_TASKS', 2)),
+    'inference': int(os.getenv('INFERENCE_MAX_RUNNING_TASKS', 2)),
+}
+
+# Time (in seconds) after which the estimated cost of a waiting task is considered to be half (a third after twice
+# this time, and so on) to order the tasks of the fair-share dispatcher. This prevents expensive tasks from waiting
+# forever while cheaper tasks keep being submitted. 0 = no aging
+FAIR_SHARE_AGING_TIME: int = int(os.getenv('FAIR_SHARE_AGING_TIME', 3600))
+
+# Maximum number of tasks of the same user (and of all the users of the same institution) running at the same time in
+# every queue. 0 = no limit
+FAIR_SHARE_MAX_RUNNING_TASKS_BY_USER: int = int(os.getenv('FAIR_SHARE_MAX_RUNNING_TASKS_BY_USER', 0))
+FAIR_SHARE_MAX_RUNNING_TASKS_BY_INSTITUTION: int = int(os.getenv('FAIR_SHARE_MAX_RUNNING_TASKS_BY_INSTITUTION', 0))
+
 # Number of elements to format the INSERT query statement from an experiment's result. This prevents memory errors
 INSERT_CHUNK_SIZE: int = int(os.getenv('INSERT_CHUNK_SIZE', 1000))
 
+# Number of samples predicted (and stored) at a time in an InferenceExperiment. This bounds the memory used by the
+# models during the prediction
+INFERENCE_PREDICTION_CHUNK_SIZE: int = int(os.getenv('INFERENCE_PREDICTION_CHUNK_SIZE', 5000))
+
+# Number of combinations (the ones with the highest absolute correlation) of a finished correlation analysis whose
+# source data statistical properties are computed in background in the 'stats' queue. 0 to disable it and compute them
+# only when the user requests them
+PRECOMPUTE_STATISTICAL_PROPERTIES_TOP_N: int = int(os.getenv('PRECOMPUTE_STATISTICAL_PROPERTIES_TOP_N', 0))
+
 # Number of last experiments returned to the user in the "Last experiments" panel in Pipeline page
 NUMBER_OF_LAST_EXPERIMENTS: int = int(os.getenv('NUMBER_OF_LAST_EXPERIMENTS', 4))
 
@@ -266,6 +369,29 @@ CGDS_READ_TIMEOUT: int = int(os.getenv('CGDS_READ_TIMEOUT', 60))
 # Chunk size (in bytes) in which CGDSStudy file is retrieved during CGDSStudy synchronization
 CGDS_CHUNK_SIZE: int = int(os.getenv('CGDS_CHUNK_SIZE', 2097152))  # Default 2MB
 
+# Number of rows in which every CGDSDataset file is read, standardized and inserted in MongoDB during CGDSStudy
+# synchronization. This bounds the memory used by the synchronization process regardless of the file size
+CGDS_SYNC_CHUNK_SIZE: int = int(os.getenv('CGDS_SYNC_CHUNK_SIZE', 5000))
+
+# Number of datasets of a CGDSStudy that are synchronized concurrently (every dataset is parsed, standardized and
+# inserted in MongoDB in its own thread). 1 to synchronize them sequentially
+CGDS_SYNC_MAX_WORKERS: int = int(os.getenv('CGDS_SYNC_MAX_WORKERS', 1))
+
+# Folder where the downloaded CGDSStudy files are cached to be reused by later synchronizations (retries, new versions,
+# etc.). Partial downloads are also stored here to be resumed with HTTP Range requests
+CGDS_DOWNLOAD_CACHE_DIR: str = os.getenv('CGDS_DOWNLOAD_CACHE_DIR',
+                                         os.path.join(tempfile.gettempdir(), 'cgds_download_cache'))
+
+# Maximum number of completed CGDSStudy files kept in the download cache (the least recently used are removed)
+CGDS_DOWNLOAD_CACHE_MAX_FILES: int = int(os.getenv('CGDS_DOWNLOAD_CACHE_MAX_FILES', 5))
+
+# Seconds during which a recently used (or written) entry of the download cache is never removed to make place for
+# other files. Entries being downloaded or read by a worker are never removed anyway
+CGDS_DOWNLOAD_CACHE_GRACE_PERIOD: int = int(os.getenv('CGDS_DOWNLOAD_CACHE_GRACE_PERIOD', 3600))
+
+# Number of times an interrupted CGDSStudy download is resumed before marking the synchronization as failed
+CGDS_DOWNLOAD_MAX_RETRIES: int = int(os.getenv('CGDS_DOWNLOAD_MAX_RETRIES', 3))
+
 # Threshold to check if the GEM data is ordinal or continuous. If the number of different values is <= this value
 # it's considered ordinal
 THRESHOLD_ORDINAL: int = int(os.getenv('THRESHOLD_ORDINAL', 5))
@@ -280,6 +406,40 @@ if threshold_gem_size_to_collect_str is not None:
 else:
     THRESHOLD_GEM_SIZE_TO_COLLECT = None
 
+# Engine used to compute correlation analyses: 'ggca' (Rust library, reads the datasets from temp files), 'numpy' (in
+# memory as blocked matrix products, Kendall is always computed with GGCA) or 'auto' to use NumPy when the number of
+# combinations to evaluate is not greater than NUMPY_CORRELATION_MAX_COMBINATIONS
+CORRELATION_ENGINE: str = os.getenv('CORRELATION_ENGINE', 'auto')
+NUMPY_CORRELATION_MAX_COMBINATIONS: int = int(os.getenv('NUMPY_CORRELATION_MAX_COMBINATIONS', 10_000_000))
+
+# If True, the NumPy correlation engine computes the matrix products in single precision (faster and less memory)
+NUMPY_CORRELATION_FLOAT32: bool = os.getenv('NUMPY_CORRELATION_FLOAT32', 'false') == 'true'
+
+# All-vs-all Pearson/Spearman analyses with more combinations than this are computed with the NumPy engine discarding
+# first (with a low-rank sketch of the rows) the pairs that cannot reach the correlation threshold. 0 to disable it
+CORRELATION_PRESCREEN_MIN_COMBINATIONS: int = int(os.getenv('CORRELATION_PRESCREEN_MIN_COMBINATIONS', 0))
+
+# Maximum number of values (rows of both datasets x samples) of a pre-screened analysis, as both datasets are kept in
+# memory (about 24 bytes by value). Bigger analyses are computed with GGCA
+CORRELATION_PRESCREEN_MAX_VALUES: int = int(os.getenv('CORRELATION_PRESCREEN_MAX_VALUES', 100_000_000))
+
+# Number of dimensions of the pre-screen sketch
+CORRELATION_PRESCREEN_RANK: int = int(os.getenv('CORRELATION_PRESCREEN_RANK', 32))
+
+# Factor of the residual bound of the pre-screen. 1 only discards the pairs that provably cannot reach the threshold,
+# lower values discard many more pairs at the cost of missing some of them
+CORRELATION_PRESCREEN_RESIDUAL_FACTOR: float = float(os.getenv('CORRELATION_PRESCREEN_RESIDUAL_FACTOR', 1.0))
+
+# Correlation analyses previews run on a random subsample of the datasets with about this number of combinations
+# (and this number of samples at most) and are cancelled if they take longer than the time budget (in seconds)
+CORRELATION_PREVIEW_MAX_COMBINATIONS: int = int(os.getenv('CORRELATION_PREVIEW_MAX_COMBINATIONS', 1_000_000))
+CORRELATION_PREVIEW_MAX_SAMPLES: int = int(os.getenv('CORRELATION_PREVIEW_MAX_SAMPLES', 500))
+CORRELATION_PREVIEW_TIME_BUDGET: int = int(os.getenv('CORRELATION_PREVIEW_TIME_BUDGET', 30))
+
+# If true, experiments identical (same datasets versions and parameters) to a completed one accessible by the user reuse
+# its results instead of being computed again. Correlation analyses with a higher threshold filter its results
+REUSE_IDENTICAL_EXPERIMENTS_RESULTS: bool = os.getenv('REUSE_IDENTICAL_EXPERIMENTS_RESULTS', 'true') == 'true'
+
 # Django email settings (https://docs.djangoproject.com/en/3.2/ref/settings/#email)
 EMAIL_NEW_USER_CONFIRMATION_ENABLED: bool = os.getenv('EMAIL_NEW_USER_CONFIRMATION_ENABLED', 'false') == 'true'
 EMAIL_HOST = os.getenv('EMAIL_HOST')
@@ -313,6 +473,29 @@ BIOAPI_SETTINGS = {
     'protocol': os.getenv('BIOAPI_PROTOCOL', 'https')
 }
 
+# Timeouts (in seconds) to establish the connection and to wait for the response of Modulector/BioAPI
+MRNA_SERVICE_CONNECTION_TIMEOUT: float = float(os.getenv('MRNA_SERVICE_CONNECTION_TIMEOUT', 5))
+MRNA_SERVICE_READ_TIMEOUT: float = float(os.getenv('MRNA_SERVICE_READ_TIMEOUT', 60))
+
+# Number of times a failed request (connection errors or 502/503/504 status codes) to Modulector/BioAPI is retried
+MRNA_SERVICE_MAX_RETRIES: int = int(os.getenv('MRNA_SERVICE_MAX_RETRIES', 3))
+
+# Backoff factor between retries to Modulector/BioAPI: the sleep is {backoff factor} * (2 ** ({retry number} - 1))
+MRNA_SERVICE_BACKOFF_FACTOR: float = float(os.getenv('MRNA_SERVICE_BACKOFF_FACTOR', 0.5))
+
+# Maximum number of keep-alive connections kept in the pool of every Modulector/BioAPI host
+MRNA_SERVICE_POOL_SIZE: int = int(os.getenv('MRNA_SERVICE_POOL_SIZE', 10))
+
+# Time (in seconds) during which the standard identifiers of a molecule retrieved from BioAPI/Modulector are kept in
+# the local aliases table before requesting them again
+MOLECULES_ALIASES_TTL: int = int(os.getenv('MOLECULES_ALIASES_TTL', 2592000))  # 30 days
+
+# Number of molecules sent in every request to BioAPI/Modulector to get the aliases not found in the local table
+MOLECULES_ALIASES_BATCH_SIZE: int = int(os.getenv('MOLECULES_ALIASES_BATCH_SIZE', 2000))
+
+# Maximum number of concurrent requests to BioAPI/Modulector to get the aliases not found in the local table
+MOLECULES_ALIASES_MAX_CONCURRENT_REQUESTS: int = int(os.getenv('MOLECULES_ALIASES_MAX_CONCURRENT_REQUESTS', 4))
+
 # Multiomix-aws-emr
 AWS_EMR_SETTINGS = {
     'host': os.getenv('AWS_EMR_HOST', '127.0.0.1'),
@@ -343,6 +526,28 @@ N_JOBS_CV: int = int(os.getenv('N_JOBS_CV', 1))
 # Number of cores used to compute GridSearch for the CoxNetSurvivalAnalysis
 COX_NET_GRID_SEARCH_N_JOBS: int = int(os.getenv('COX_NET_GRID_SEARCH_N_JOBS', 2))
 
+# Number of cores used to compute the hyperparameters search when a TrainedModel is trained. As TrainedModels are
+# trained in the 'stats' queue, this should be set considering the CONCURRENCY of that worker
+TRAINED_MODEL_SEARCH_N_JOBS: int = int(os.getenv('TRAINED_MODEL_SEARCH_N_JOBS', 1))
+
+# Proportion of candidates that are kept in every iteration of the successive halving search of a TrainedModel (1 / N)
+TRAINED_MODEL_HALVING_FACTOR: int = int(os.getenv('TRAINED_MODEL_HALVING_FACTOR', 3))
+
+# Minimum number of samples by CV fold used in the first iteration of the successive halving search. If there are not
+# enough samples, a complete Grid Search is computed
+TRAINED_MODEL_HALVING_MIN_SAMPLES_BY_FOLD: int = int(os.getenv('TRAINED_MODEL_HALVING_MIN_SAMPLES_BY_FOLD', 5))
+
+# Maximum size (in MB) of the process-local cache of deserialized TrainedModels (the size of the dumps on disk is used
+# as an approximation)
+TRAINED_MODELS_CACHE_MAX_SIZE_MB: int = int(os.getenv('TRAINED_MODELS_CACHE_MAX_SIZE_MB', 512))
+
+# Number of the most recent TrainedModels loaded in the cache when a Celery worker process starts (0 to disable it)
+TRAINED_MODELS_CACHE_WARM_UP: int = int(os.getenv('TRAINED_MODELS_CACHE_WARM_UP', 0))
+
+# Compression level (0-9) of the TrainedModels dumps. With 0, Numpy arrays are stored raw and memory-mapped when
+# loaded (faster and cheaper in RAM, but bigger on disk)
+TRAINED_MODELS_DUMP_COMPRESSION: int = int(os.getenv('TRAINED_MODELS_DUMP_COMPRESSION', 0))
+
 # Minimum and maximum number of iterations user can select to run the BBHA/PSO algorithm
 MIN_ITERATIONS_METAHEURISTICS: int = int(os.getenv('MIN_ITERATIONS_METAHEURISTICS', 1))
 MAX_ITERATIONS_METAHEURISTICS: int = int(os.getenv('MAX_ITERATIONS_METAHEURISTICS', 20))
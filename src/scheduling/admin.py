@@ -0,0 +1,11 @@
+from django.contrib import admin
+from scheduling.models import ScheduledTask
+
+
+class ScheduledTaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task_name', 'queue', 'user', 'state', 'estimated_cost', 'submit_date', 'dispatch_date')
+    search_fields = ('task_name', 'user__username')
+    list_filter = ('queue', 'state')
+
+
+admin.site.register(ScheduledTask, ScheduledTaskAdmin)
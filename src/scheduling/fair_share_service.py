@@ -0,0 +1,274 @@
+import logging
+import uuid
+import zlib
+from collections import defaultdict
+from datetime import timedelta, datetime
+from functools import partial
+from typing import List, Dict, Set, Sequence, Tuple, Iterable, Optional
+from celery import Task
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+from django.utils import timezone
+from institutions.models import InstitutionAdministration
+from multiomics_intermediate.celery import app, max_timeout
+from .models import ScheduledTask, ScheduledTaskState
+
+# Seconds after which a dispatched task which never reported its end is considered lost (e.g. its worker was killed
+# every time it was redelivered) to release its slot. A lost task is redelivered after the broker's visibility timeout
+# and then it can run until its soft time limit
+STALE_RUNNING_TASK_TIMEOUT = app.conf.broker_transport_options['visibility_timeout'] + max_timeout
+
+
+def __get_task_priority(task: ScheduledTask, now: datetime) -> Tuple[float, object, int]:
+    """
+    Gets the order of a task among the waiting tasks with the same user's usage: the cheapest and oldest first. The
+    cost decreases with the time the task has been waiting (see settings.FAIR_SHARE_AGING_TIME), so an expensive task
+    eventually runs even if cheaper tasks keep being submitted.
+    """
+    cost = task.estimated_cost
+    if settings.FAIR_SHARE_AGING_TIME > 0:
+        waiting_time = max((now - task.submit_date).total_seconds(), 0.0)
+        cost /= 1 + waiting_time / settings.FAIR_SHARE_AGING_TIME
+    return cost, task.submit_date, task.pk
+
+
+def get_fair_share_order(waiting_tasks: List[ScheduledTask], running_tasks: List[ScheduledTask],
+                         users_institutions: Dict[int, Set[int]], max_tasks: int, max_running_by_user: int,
+                         max_running_by_institution: int, now: Optional[datetime] = None) -> List[ScheduledTask]:
+    """
+    Selects the next waiting tasks to run in a queue. Every time, the next task belongs to the user with the lowest
+    usage (sum of the estimated cost of its running and already selected tasks), i.e. the one with the largest deficit
+    regarding its fair share of the queue. Ties (e.g. users without running tasks) are broken by estimated cost (aged
+    by the waiting time) and submit date, as well as the order of the tasks of the same user. Users (or institutions)
+    which have reached their limit of running tasks are skipped.
+    @param waiting_tasks: Waiting tasks of the queue.
+    @param running_tasks: Running tasks of the queue.
+    @param users_institutions: Dict with the institutions of the users of the tasks.
+    @param max_tasks: Maximum number of tasks to select.
+    @param max_running_by_user: Maximum number of running tasks of a user. 0 for no limit.
+    @param max_running_by_institution: Maximum number of running tasks of the users of an institution. 0 for no limit.
+    @param now: Date from which the waiting time of the tasks is computed. Current date if None.
+    @return: Selected tasks in the order they must be run.
+    """
+    if now is None:
+        now = timezone.now()
+
+    usage: Dict[int, float] = defaultdict(float)
+    running_by_user: Dict[int, int] = defaultdict(int)
+    running_by_institution: Dict[int, int] = defaultdict(int)
+
+    def add_running_task(task: ScheduledTask):
+        usage[task.user_id] += task.estimated_cost
+        running_by_user[task.user_id] += 1
+        for institution_id in users_institutions.get(task.user_id, set()):
+            running_by_institution[institution_id] += 1
+
+    def has_reached_limits(user_id: int) -> bool:
+        if max_running_by_user and running_by_user[user_id] >= max_running_by_user:
+            return True
+        return bool(max_running_by_institution) and any(
+            running_by_institution[institution_id] >= max_running_by_institution
+            for institution_id in users_institutions.get(user_id, set())
+        )
+
+    for running_task in running_tasks:
+        add_running_task(running_task)
+
+    # Waiting tasks of every user, the next one to run at the end of the list
+    users_tasks: Dict[int, List[ScheduledTask]] = defaultdict(list)
+    for waiting_task in sorted(waiting_tasks, key=lambda task: __get_task_priority(task, now), reverse=True):
+        users_tasks[waiting_task.user_id].append(waiting_task)
+
+    selected_tasks: List[ScheduledTask] = []
+    while len(selected_tasks) < max_tasks:
+        candidates = [tasks[-1] for user_id, tasks in users_tasks.items() if tasks and not has_reached_limits(user_id)]
+        if not candidates:
+            break
+
+        next_task = min(candidates, key=lambda task: (usage[task.user_id], __get_task_priority(task, now)))
+        users_tasks[next_task.user_id].pop()
+        add_running_task(next_task)
+        selected_tasks.append(next_task)
+
+    return selected_tasks
+
+
+def __get_users_institutions(tasks: Iterable[ScheduledTask]) -> Dict[int, Set[int]]:
+    """Gets the institutions of the users of some tasks."""
+    users_institutions: Dict[int, Set[int]] = defaultdict(set)
+    user_ids = {task.user_id for task in tasks}
+    for user_id, institution_id in InstitutionAdministration.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'institution_id'):
+        users_institutions[user_id].add(institution_id)
+    return users_institutions
+
+
+def __set_task_id(instance: models.Model, task_id: str):
+    """Saves the Celery task id in the Experiment, StatisticalValidation, etc. to be able to abort it."""
+    instance.task_id = task_id
+    instance.save(update_fields=['task_id'])
+
+
+def __send_task(scheduled_task: ScheduledTask):
+    """
+    Sends a dispatched task to its Celery queue. If the broker is not available, the task waits again.
+    @param scheduled_task: Dispatched task.
+    """
+    try:
+        app.send_task(scheduled_task.task_name, args=scheduled_task.args, queue=scheduled_task.queue,
+                      task_id=scheduled_task.task_id)
+    except Exception as ex:
+        logging.exception(ex)
+        ScheduledTask.objects.filter(pk=scheduled_task.pk).update(state=ScheduledTaskState.WAITING, task_id=None,
+                                                                  dispatch_date=None)
+
+
+def dispatch_pending_tasks(queue: str):
+    """
+    Sends the next waiting tasks of a queue (see get_fair_share_order) to Celery while there are free slots (see
+    settings.FAIR_SHARE_QUEUES_MAX_RUNNING_TASKS).
+    @param queue: Celery queue.
+    """
+    with transaction.atomic():
+        # Only one process (Django or Celery worker) dispatches the tasks of a queue at a time, so limits are respected
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(f'fair_share_{queue}'.encode())])
+
+        queue_tasks = ScheduledTask.objects.filter(queue=queue)
+        stale_limit = timezone.now() - timedelta(seconds=STALE_RUNNING_TASK_TIMEOUT)
+        stale_count, _ = queue_tasks.filter(state=ScheduledTaskState.RUNNING, dispatch_date__lt=stale_limit).delete()
+        if stale_count:
+            logging.warning(f'{stale_count} lost task(s) removed from the queue "{queue}"')
+
+        running_tasks = list(queue_tasks.filter(state=ScheduledTaskState.RUNNING))
+        free_slots = settings.FAIR_SHARE_QUEUES_MAX_RUNNING_TASKS.get(queue, 1) - len(running_tasks)
+        if free_slots <= 0:
+            return
+
+        waiting_tasks = list(queue_tasks.filter(state=ScheduledTaskState.WAITING))
+        next_tasks = get_fair_share_order(
+            waiting_tasks,
+            running_tasks,
+            __get_users_institutions(running_tasks + waiting_tasks),
+            free_slots,
+            settings.FAIR_SHARE_MAX_RUNNING_TASKS_BY_USER,
+            settings.FAIR_SHARE_MAX_RUNNING_TASKS_BY_INSTITUTION
+        )
+
+        has_removed_tasks = False
+        for scheduled_task in next_tasks:
+            # The experiment could have been removed while waiting
+            instance = scheduled_task.content_object
+            if instance is None:
+                scheduled_task.delete()
+                has_removed_tasks = True
+                continue
+
+            # The id is generated here to store it in the same transaction
+            scheduled_task.task_id = str(uuid.uuid4())
+            scheduled_task.state = ScheduledTaskState.RUNNING
+            scheduled_task.dispatch_date = timezone.now()
+            scheduled_task.save(update_fields=['task_id', 'state', 'dispatch_date'])
+            if scheduled_task.stores_task_id:
+                __set_task_id(instance, scheduled_task.task_id)
+            transaction.on_commit(partial(__send_task, scheduled_task))
+
+    # The slots selected for removed tasks are taken by the next waiting tasks
+    if has_removed_tasks:
+        dispatch_pending_tasks(queue)
+
+
+def schedule_task(task: Task, args: Sequence, queue: str, instance: models.Model, user: User,
+                  estimated_cost: float, is_auxiliary: bool = False):
+    """
+    Adds a heavy task to the fair-share dispatcher of its queue. If fair-share scheduling is disabled in settings, the
+    task is sent directly to the Celery queue.
+    @param task: Celery task to run.
+    @param args: Positional arguments of the task (JSON serializable).
+    @param queue: Celery queue of the task.
+    @param instance: Experiment, StatisticalValidation, etc. computed by the task. It must have a task_id field.
+    @param user: User who submitted the task.
+    @param estimated_cost: Estimated cost of the task (only compared with the tasks of the same queue).
+    @param is_auxiliary: True if the task is not the main task of the instance (e.g. the precomputation of an
+    Experiment statistical properties), so its id is not stored in the instance.
+    """
+    if not settings.FAIR_SHARE_SCHEDULING_ENABLED:
+        async_res = task.apply_async(tuple(args), queue=queue)
+        if not is_auxiliary:
+            __set_task_id(instance, async_res.task_id)
+
+        # Calls forget to release resources.
+        # Read more in https://docs.celeryq.dev/en/latest/getting-started/first-steps-with-celery.html#keeping-results
+        async_res.forget()
+        return
+
+    ScheduledTask.objects.create(
+        task_name=task.name,
+        args=list(args),
+        queue=queue,
+        user=user,
+        estimated_cost=estimated_cost,
+        content_object=instance,
+        stores_task_id=not is_auxiliary
+    )
+    transaction.on_commit(partial(dispatch_pending_tasks, queue))
+
+
+def release_task(task_id: str):
+    """
+    Removes a finished (successfully or not) task from the dispatcher and dispatches the next waiting tasks of its
+    queue.
+    @param task_id: Celery task id.
+    """
+    scheduled_task = ScheduledTask.objects.filter(task_id=task_id).first()
+    if scheduled_task is None:
+        return
+
+    scheduled_task.delete()
+    dispatch_pending_tasks(scheduled_task.queue)
+
+
+def cancel_scheduled_task(instance: models.Model):
+    """
+    Removes the waiting task of a stopped Experiment, StatisticalValidation, etc. so it's never dispatched. Running
+    tasks are aborted as usual and released when they end.
+    @param instance: Experiment, StatisticalValidation, etc. instance.
+    """
+    ScheduledTask.objects.filter(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+        state=ScheduledTaskState.WAITING
+    ).delete()
+
+
+def get_queue_positions(queue: str) -> Dict[Tuple[int, int], int]:
+    """
+    Gets the position (starting from 1) of the waiting tasks of a queue in the fair-share order. Users and institutions
+    limits are not considered, so it's an estimation.
+    @param queue: Celery queue.
+    @return: Dict with the position of every task by its (content type id, object id).
+    """
+    queue_tasks = list(ScheduledTask.objects.filter(queue=queue))
+    running_tasks = [task for task in queue_tasks if task.state == ScheduledTaskState.RUNNING]
+    waiting_tasks = [task for task in queue_tasks if task.state == ScheduledTaskState.WAITING]
+    ordered_tasks = get_fair_share_order(waiting_tasks, running_tasks, __get_users_institutions(queue_tasks),
+                                         max_tasks=len(waiting_tasks), max_running_by_user=0,
+                                         max_running_by_institution=0)
+    return {(task.content_type_id, task.object_id): position for position, task in enumerate(ordered_tasks, start=1)}
+
+
+def get_queue_position(instance: models.Model, queue: str,
+                       positions_cache: Dict[str, Dict[Tuple[int, int], int]]) -> Optional[int]:
+    """
+    Gets the position of a waiting Experiment, StatisticalValidation, etc. in the fair-share order of its queue.
+    @param instance: Experiment, StatisticalValidation, etc. instance.
+    @param queue: Celery queue of the instance's task.
+    @param positions_cache: Dict where the positions of every queue are kept to compute them once (e.g. when a list of
+    instances is serialized).
+    @return: Position or None if the task is not waiting in the dispatcher.
+    """
+    if queue not in positions_cache:
+        positions_cache[queue] = get_queue_positions(queue)
+    return positions_cache[queue].get((ContentType.objects.get_for_model(instance).pk, instance.pk))
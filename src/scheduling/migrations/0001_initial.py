@@ -0,0 +1,39 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(help_text='Name of the Celery task', max_length=150)),
+                ('args', models.JSONField(default=list, help_text='Positional arguments of the Celery task')),
+                ('queue', models.CharField(help_text='Celery queue where the task is sent', max_length=50)),
+                ('estimated_cost', models.FloatField(default=1.0, help_text='Estimated cost of the task (only comparable between tasks of the same queue)')),
+                ('state', models.IntegerField(choices=[(1, 'Waiting'), (2, 'Running')], default=1)),
+                ('task_id', models.CharField(blank=True, db_index=True, help_text='Celery Task ID', max_length=100, null=True)),
+                ('submit_date', models.DateTimeField(auto_now_add=True)),
+                ('dispatch_date', models.DateTimeField(blank=True, null=True)),
+                ('stores_task_id', models.BooleanField(default=True, help_text='False for auxiliary tasks (e.g. the precomputation of an Experiment statistical properties) whose id must not replace the task id of the instance')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['queue', 'state'], name='scheduling__queue_a5f601_idx'), models.Index(fields=['content_type', 'object_id'], name='scheduling__content_86b983_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class ScheduledTaskState(models.IntegerChoices):
+    """All the possible states of a ScheduledTask."""
+    WAITING = 1
+    RUNNING = 2
+
+
+class ScheduledTask(models.Model):
+    """
+    Heavy Celery task (correlation analysis, FS experiment, etc.) submitted by a user. It waits here until the
+    fair-share dispatcher sends it to its Celery queue and is removed when the task finishes.
+    """
+    task_name = models.CharField(max_length=150, help_text='Name of the Celery task')
+    args = models.JSONField(default=list, help_text='Positional arguments of the Celery task')
+    queue = models.CharField(max_length=50, help_text='Celery queue where the task is sent')
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    estimated_cost = models.FloatField(default=1.0, help_text='Estimated cost of the task (only comparable between '
+                                                              'tasks of the same queue)')
+    state = models.IntegerField(choices=ScheduledTaskState.choices, default=ScheduledTaskState.WAITING)
+    task_id = models.CharField(max_length=100, blank=True, null=True, db_index=True, help_text='Celery Task ID')
+    submit_date = models.DateTimeField(auto_now_add=True)
+    dispatch_date = models.DateTimeField(null=True, blank=True)
+    stores_task_id = models.BooleanField(default=True, help_text='False for auxiliary tasks (e.g. the precomputation '
+                                                                 'of an Experiment statistical properties) whose id '
+                                                                 'must not replace the task id of the instance')
+
+    # Experiment, StatisticalValidation, etc. computed by the task
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queue', 'state']),
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f'{self.task_name} ({self.queue}) for user {self.user_id}'
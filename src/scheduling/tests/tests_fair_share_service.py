@@ -0,0 +1,229 @@
+import datetime
+from typing import List, Optional
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from api_service.models import Experiment, ExperimentSource
+from api_service.tasks import eval_mrna_gem_experiment
+from common.tests_utils import create_toy_experiment
+from scheduling import fair_share_service
+from scheduling.fair_share_service import get_fair_share_order, schedule_task, dispatch_pending_tasks, release_task, \
+    cancel_scheduled_task, get_queue_positions, get_queue_position
+from scheduling.models import ScheduledTask, ScheduledTaskState
+
+
+class FairShareServiceTestCase(SimpleTestCase):
+    @staticmethod
+    def __get_task(pk: int, user_id: int, estimated_cost: float = 1.0,
+                   state: ScheduledTaskState = ScheduledTaskState.WAITING) -> ScheduledTask:
+        """Creates an unsaved ScheduledTask submitted pk minutes after a fixed date."""
+        return ScheduledTask(pk=pk, user_id=user_id, estimated_cost=estimated_cost, state=state,
+                             submit_date=FairShareServiceTestCase.__get_submit_date(pk), queue='feature_selection')
+
+    @staticmethod
+    def __get_submit_date(pk: int) -> datetime.datetime:
+        """Gets the submit date of the task with the given pk."""
+        return datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(minutes=pk)
+
+    @staticmethod
+    def __get_pks(tasks: List[ScheduledTask]) -> List[int]:
+        return [task.pk for task in tasks]
+
+    def test_heavy_user_does_not_starve_others(self):
+        """Tests that the tasks of a user who submitted many tasks don't delay the later tasks of other users"""
+        waiting = [self.__get_task(pk, user_id=1) for pk in range(1, 6)] + [self.__get_task(6, user_id=2),
+                                                                            self.__get_task(7, user_id=3)]
+        running = [self.__get_task(100, user_id=1, state=ScheduledTaskState.RUNNING)]
+        order = get_fair_share_order(waiting, running, {}, max_tasks=len(waiting), max_running_by_user=0,
+                                     max_running_by_institution=0)
+        self.assertEqual(self.__get_pks(order), [6, 7, 1, 2, 3, 4, 5])
+
+    def test_cheapest_tasks_first(self):
+        """Tests that users with the same usage are ordered by the cost of their tasks, and so their own tasks"""
+        waiting = [self.__get_task(1, user_id=1, estimated_cost=50), self.__get_task(2, user_id=1, estimated_cost=5),
+                   self.__get_task(3, user_id=2, estimated_cost=10)]
+        order = get_fair_share_order(waiting, [], {}, max_tasks=2, max_running_by_user=0,
+                                     max_running_by_institution=0)
+        self.assertEqual(self.__get_pks(order), [2, 3])
+
+    def test_running_limits(self):
+        """Tests that users and institutions at their limit of running tasks are skipped"""
+        waiting = [self.__get_task(1, user_id=1), self.__get_task(2, user_id=1), self.__get_task(3, user_id=2),
+                   self.__get_task(4, user_id=3)]
+        order = get_fair_share_order(waiting, [], {}, max_tasks=4, max_running_by_user=1,
+                                     max_running_by_institution=0)
+        self.assertEqual(self.__get_pks(order), [1, 3, 4])
+
+        # Users 1 and 2 belong to the same institution
+        users_institutions = {1: {10}, 2: {10}}
+        order = get_fair_share_order(waiting, [], users_institutions, max_tasks=4, max_running_by_user=0,
+                                     max_running_by_institution=2)
+        self.assertEqual(self.__get_pks(order), [1, 3, 4])
+
+    @override_settings(FAIR_SHARE_AGING_TIME=3600)
+    def test_expensive_task_aging(self):
+        """Tests that an expensive task runs before the cheap ones submitted much later"""
+        waiting = [self.__get_task(1, user_id=1, estimated_cost=100), self.__get_task(2, user_id=2)]
+        order = get_fair_share_order(waiting, [], {}, max_tasks=2, max_running_by_user=0,
+                                     max_running_by_institution=0, now=self.__get_submit_date(2))
+        self.assertEqual(self.__get_pks(order), [2, 1])
+
+        # A cheap task submitted 100 hours later waits for the expensive one
+        waiting = [self.__get_task(1, user_id=1, estimated_cost=100), self.__get_task(6000, user_id=2)]
+        order = get_fair_share_order(waiting, [], {}, max_tasks=2, max_running_by_user=0,
+                                     max_running_by_institution=0, now=self.__get_submit_date(6000))
+        self.assertEqual(self.__get_pks(order), [1, 6000])
+
+
+@override_settings(FAIR_SHARE_SCHEDULING_ENABLED=True, FAIR_SHARE_QUEUES_MAX_RUNNING_TASKS={'stats': 1},
+                   FAIR_SHARE_MAX_RUNNING_TASKS_BY_USER=0, FAIR_SHARE_MAX_RUNNING_TASKS_BY_INSTITUTION=0,
+                   CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class FairShareDispatcherTestCase(TestCase):
+    """Runs the dispatcher against the DB. Tasks are not sent to the broker."""
+    user: User
+    send_task: mock.MagicMock
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@test.com', password='test')
+        patcher = mock.patch.object(fair_share_service.app, 'send_task')
+        self.send_task = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def __create_experiment(self, user: Optional[User] = None) -> Experiment:
+        """Creates an experiment to be computed by a scheduled task."""
+        return create_toy_experiment(ExperimentSource.objects.create(), ExperimentSource.objects.create(),
+                                     user or self.user)
+
+    def __schedule(self, experiment: Experiment, estimated_cost: float = 1.0, is_auxiliary: bool = False):
+        """Schedules a task for an experiment running the dispatch that takes place when the request ends."""
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_task(eval_mrna_gem_experiment, (experiment.pk,), 'stats', experiment, experiment.user,
+                          estimated_cost, is_auxiliary=is_auxiliary)
+
+    @staticmethod
+    def __get_task(experiment: Experiment) -> ScheduledTask:
+        return ScheduledTask.objects.get(content_type=ContentType.objects.get_for_model(experiment),
+                                         object_id=experiment.pk)
+
+    def test_schedule_task(self):
+        """Tests that a task is dispatched only if there's a free slot in its queue"""
+        first, second = self.__create_experiment(), self.__create_experiment()
+        self.__schedule(first)
+        self.__schedule(second)
+
+        first_task = self.__get_task(first)
+        first.refresh_from_db()
+        self.assertEqual(first_task.state, ScheduledTaskState.RUNNING)
+        self.assertEqual(first.task_id, first_task.task_id)
+        self.send_task.assert_called_once_with(eval_mrna_gem_experiment.name, args=[first.pk], queue='stats',
+                                               task_id=first_task.task_id)
+        self.assertEqual(self.__get_task(second).state, ScheduledTaskState.WAITING)
+
+    def test_auxiliary_task(self):
+        """Tests that an auxiliary task doesn't replace the task id of its instance"""
+        experiment = self.__create_experiment()
+        experiment.task_id = 'own-task'
+        experiment.save(update_fields=['task_id'])
+        self.__schedule(experiment, is_auxiliary=True)
+
+        experiment.refresh_from_db()
+        self.assertEqual(self.__get_task(experiment).state, ScheduledTaskState.RUNNING)
+        self.assertEqual(experiment.task_id, 'own-task')
+
+    def test_release_task(self):
+        """Tests that a finished task releases its slot for the next waiting task"""
+        first, second = self.__create_experiment(), self.__create_experiment()
+        self.__schedule(first)
+        self.__schedule(second)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_task(self.__get_task(first).task_id)
+
+        self.assertFalse(ScheduledTask.objects.filter(object_id=first.pk).exists())
+        self.assertEqual(self.__get_task(second).state, ScheduledTaskState.RUNNING)
+        self.assertEqual(self.send_task.call_count, 2)
+
+        # Tasks not managed by the dispatcher are ignored
+        release_task('unknown-task')
+
+    def test_stale_running_task(self):
+        """Tests that a task which never reported its end releases its slot after the stale timeout"""
+        first, second = self.__create_experiment(), self.__create_experiment()
+        self.__schedule(first)
+        self.__schedule(second)
+        self.assertEqual(self.__get_task(second).state, ScheduledTaskState.WAITING)
+
+        stale_date = timezone.now() - datetime.timedelta(seconds=fair_share_service.STALE_RUNNING_TASK_TIMEOUT + 1)
+        ScheduledTask.objects.filter(object_id=first.pk).update(dispatch_date=stale_date)
+        with self.captureOnCommitCallbacks(execute=True):
+            dispatch_pending_tasks('stats')
+
+        self.assertFalse(ScheduledTask.objects.filter(object_id=first.pk).exists())
+        self.assertEqual(self.__get_task(second).state, ScheduledTaskState.RUNNING)
+
+    def test_deleted_content_object(self):
+        """Tests that the tasks of instances removed while waiting are discarded"""
+        first, second, third = self.__create_experiment(), self.__create_experiment(), self.__create_experiment()
+        for experiment in [first, second, third]:
+            self.__schedule(experiment)
+        second_pk = second.pk
+        second.delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_task(self.__get_task(first).task_id)
+
+        self.assertFalse(ScheduledTask.objects.filter(object_id=second_pk).exists())
+        self.assertEqual(self.__get_task(third).state, ScheduledTaskState.RUNNING)
+
+    def test_cancel_scheduled_task(self):
+        """Tests that only waiting tasks are removed when an instance is stopped"""
+        first, second = self.__create_experiment(), self.__create_experiment()
+        self.__schedule(first)
+        self.__schedule(second)
+
+        cancel_scheduled_task(first)
+        cancel_scheduled_task(second)
+
+        self.assertEqual(self.__get_task(first).state, ScheduledTaskState.RUNNING)
+        self.assertFalse(ScheduledTask.objects.filter(object_id=second.pk).exists())
+
+    def test_queue_positions(self):
+        """Tests that the positions of the waiting tasks follow the fair-share order"""
+        other_user = User.objects.create_user(username='other_user', email='other@test.com', password='test')
+        running, expensive, cheap = [self.__create_experiment() for _ in range(3)]
+        other_user_experiment = self.__create_experiment(other_user)
+        self.__schedule(running)
+        self.__schedule(expensive, estimated_cost=100.0)
+        self.__schedule(cheap, estimated_cost=10.0)
+        self.__schedule(other_user_experiment, estimated_cost=1000.0)
+
+        positions_cache = {}
+        self.assertIsNone(get_queue_position(running, 'stats', positions_cache))
+        self.assertEqual(get_queue_position(other_user_experiment, 'stats', positions_cache), 1)
+        self.assertEqual(get_queue_position(cheap, 'stats', positions_cache), 2)
+        self.assertEqual(get_queue_position(expensive, 'stats', positions_cache), 3)
+        self.assertEqual(len(get_queue_positions('stats')), 3)
+
+    @override_settings(FAIR_SHARE_SCHEDULING_ENABLED=False)
+    def test_scheduling_disabled(self):
+        """Tests that tasks are sent directly to Celery if the dispatcher is disabled"""
+        experiment = self.__create_experiment()
+        async_res = mock.MagicMock(task_id='celery-task')
+        with mock.patch.object(eval_mrna_gem_experiment, 'apply_async', return_value=async_res) as apply_async:
+            schedule_task(eval_mrna_gem_experiment, (experiment.pk,), 'stats', experiment, self.user, 1.0)
+            apply_async.assert_called_once_with((experiment.pk,), queue='stats')
+
+            experiment.refresh_from_db()
+            self.assertEqual(experiment.task_id, 'celery-task')
+            async_res.forget.assert_called_once()
+
+            # Auxiliary tasks don't replace the task id
+            async_res.task_id = 'auxiliary-task'
+            schedule_task(eval_mrna_gem_experiment, (experiment.pk,), 'stats', experiment, self.user, 1.0,
+                          is_auxiliary=True)
+            experiment.refresh_from_db()
+            self.assertEqual(experiment.task_id, 'celery-task')
+
+        self.assertFalse(ScheduledTask.objects.exists())
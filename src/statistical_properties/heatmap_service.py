@@ -0,0 +1,170 @@
+from typing import Dict, Any, Optional, List, Tuple
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+from scipy.cluster.hierarchy import linkage, leaves_list
+from common.datasets_utils import clean_dataset
+from common.exceptions import NoSamplesInCommon
+from statistical_properties.models import StatisticalValidation
+from user_files.models_choices import FileType
+from .stats_service import get_all_expressions
+
+# Possible suffix in a DataFrame to distinguish different kinds of molecules in a Biomarker
+TYPE_SUFFIX = f'_({FileType.MRNA.value}|{FileType.MIRNA.value}|{FileType.CNA.value}|{FileType.METHYLATION.value})$'
+
+# Name of the Django cache (see settings.CACHES) where the heatmaps data is stored
+CACHE_NAME = 'heatmap'
+
+# Number of decimal places of the expressions sent to the frontend
+HEATMAP_DECIMAL_PLACES = 4
+
+# Number of levels used to quantize the expressions (they fit in a single byte)
+QUANTIZATION_LEVELS = 255
+
+
+def __get_matrix_cache_key(stat_validation: StatisticalValidation) -> str:
+    """Gets the cache key of the prepared expressions matrix of a StatisticalValidation."""
+    return f'heatmap_matrix_{stat_validation.pk}'
+
+
+def __prepare_matrix(stat_validation: StatisticalValidation) -> pd.DataFrame:
+    """
+    Gets the expressions of all the molecules of a StatisticalValidation's Biomarker for all the samples removing NaNs
+    and the molecule type suffix. An empty DataFrame is returned if there are no samples in common.
+    @param stat_validation: StatisticalValidation instance.
+    @return: DataFrame with molecules as rows and samples as columns.
+    """
+    try:
+        molecules_df = get_all_expressions(stat_validation)
+    except NoSamplesInCommon:
+        return pd.DataFrame()
+
+    molecules_df = clean_dataset(molecules_df, axis='index')
+    molecules_df.index = molecules_df.index.str.replace(TYPE_SUFFIX, '', regex=True)
+    return molecules_df
+
+
+def get_heatmap_matrix(stat_validation: StatisticalValidation) -> pd.DataFrame:
+    """
+    Gets the prepared expressions matrix of a StatisticalValidation. The matrix is cached during
+    settings.HEATMAP_CACHE_TTL seconds to prevent reading all the datasets on every page view. It's stored as plain
+    NumPy arrays and lists, which are (un)pickled much faster than a DataFrame.
+    @param stat_validation: StatisticalValidation instance.
+    @return: DataFrame with molecules as rows and samples as columns. Empty if there are no samples in common.
+    """
+    cache = caches[CACHE_NAME]
+    cache_key = __get_matrix_cache_key(stat_validation)
+    cached_matrix: Optional[Tuple[List[str], List[str], np.ndarray]] = cache.get(cache_key)
+    if cached_matrix is None:
+        molecules_df = __prepare_matrix(stat_validation)
+        cached_matrix = (molecules_df.index.tolist(), molecules_df.columns.tolist(),
+                         molecules_df.to_numpy(dtype=float))
+        cache.set(cache_key, cached_matrix, timeout=settings.HEATMAP_CACHE_TTL)
+
+    rows, columns, values = cached_matrix
+    return pd.DataFrame(values, index=rows, columns=columns)
+
+
+def __get_clustered_order(values: np.ndarray) -> np.ndarray:
+    """
+    Gets the order of the rows of a matrix given by the leaves of a hierarchical clustering (average linkage over
+    euclidean distances), so similar rows are placed together.
+    @param values: Matrix to cluster.
+    @return: Indexes of the rows in the clustered order.
+    """
+    if values.shape[0] < 3:
+        return np.arange(values.shape[0])
+    return leaves_list(linkage(values, method='average', metric='euclidean'))
+
+
+def __get_downsampled_columns(n_columns: int, max_columns: Optional[int]) -> np.ndarray:
+    """
+    Gets evenly spaced columns indexes to keep at most max_columns columns.
+    @param n_columns: Number of columns of the matrix.
+    @param max_columns: Maximum number of columns to keep. None to keep all of them.
+    @return: Indexes of the columns to keep.
+    """
+    if max_columns is None or n_columns <= max_columns:
+        return np.arange(n_columns)
+    return np.unique(np.linspace(0, n_columns - 1, num=max_columns).round().astype(int))
+
+
+def __quantize(values: np.ndarray, min_value: float, max_value: float) -> np.ndarray:
+    """
+    Maps the values to integers in the range [0, QUANTIZATION_LEVELS]. The original value can be approximated in the
+    frontend as min + q * (max - min) / QUANTIZATION_LEVELS.
+    @param values: Values to quantize.
+    @param min_value: Minimum value of the matrix.
+    @param max_value: Maximum value of the matrix.
+    @return: Quantized values.
+    """
+    value_range = max_value - min_value
+    if value_range == 0:
+        return np.zeros(values.shape, dtype=np.uint8)
+    return np.round((values - min_value) / value_range * QUANTIZATION_LEVELS).astype(np.uint8)
+
+
+def __generate_compact_heatmap(stat_validation: StatisticalValidation, cluster_rows: bool, cluster_columns: bool,
+                               max_columns: Optional[int], quantize: bool) -> Dict[str, Any]:
+    """Generates the payload of get_compact_heatmap() with the values as a flat NumPy array. Same params."""
+    molecules_df = get_heatmap_matrix(stat_validation)
+    rows: List[str] = molecules_df.index.tolist()
+    columns: List[str] = molecules_df.columns.tolist()
+    values = molecules_df.to_numpy(dtype=float)
+    n_columns_total = len(columns)
+
+    if values.size > 0:
+        # Downsamples before clustering to bound the clustering cost for very wide cohorts
+        columns_idx = __get_downsampled_columns(values.shape[1], max_columns)
+        values = values[:, columns_idx]
+
+        rows_order = __get_clustered_order(values) if cluster_rows else np.arange(values.shape[0])
+        columns_order = __get_clustered_order(values.T) if cluster_columns else np.arange(values.shape[1])
+        values = values[np.ix_(rows_order, columns_order)]
+        rows = [rows[i] for i in rows_order]
+        columns = [columns[columns_idx[i]] for i in columns_order]
+
+        min_value, max_value = float(values.min()), float(values.max())
+    else:
+        min_value, max_value = 0.0, 0.0
+
+    if quantize:
+        flat_values = __quantize(values, min_value, max_value).ravel()
+    else:
+        flat_values = np.round(values, HEATMAP_DECIMAL_PLACES).ravel()
+
+    return {
+        'rows': rows,
+        'columns': columns,
+        'values': flat_values,
+        'min': min_value,
+        'max': max_value,
+        'quantized': quantize,
+        'quantization_levels': QUANTIZATION_LEVELS if quantize else None,
+        'n_columns_total': n_columns_total
+    }
+
+
+def get_compact_heatmap(stat_validation: StatisticalValidation, cluster_rows: bool, cluster_columns: bool,
+                        max_columns: Optional[int], quantize: bool) -> Dict[str, Any]:
+    """
+    Generates a compact columnar payload of the expressions matrix of a StatisticalValidation: rows names, columns
+    names and a flat (row-major) array of values. Payloads are cached as the matrix.
+    @param stat_validation: StatisticalValidation instance.
+    @param cluster_rows: If True, the molecules are ordered by hierarchical clustering.
+    @param cluster_columns: If True, the samples are ordered by hierarchical clustering.
+    @param max_columns: Maximum number of samples to return (evenly spaced samples are kept). None to return all.
+    @param quantize: If True, values are returned as integers in the range [0, QUANTIZATION_LEVELS].
+    @return: Dict with the payload.
+    """
+    cache = caches[CACHE_NAME]
+    cache_key = (f'heatmap_payload_{stat_validation.pk}_{int(cluster_rows)}_{int(cluster_columns)}_'
+                 f'{max_columns}_{int(quantize)}')
+    payload: Optional[Dict[str, Any]] = cache.get(cache_key)
+    if payload is None:
+        payload = __generate_compact_heatmap(stat_validation, cluster_rows, cluster_columns, max_columns, quantize)
+        cache.set(cache_key, payload, timeout=settings.HEATMAP_CACHE_TTL)
+
+    # Values are cached as a NumPy array (faster to pickle) and converted to be serialized
+    return {**payload, 'values': payload['values'].tolist()}
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:02
+
+from django.db import migrations, models
+import statistical_properties.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistical_properties', '0017_alter_statisticalvalidation_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statisticalvalidation',
+            name='prepared_data',
+            field=models.FileField(blank=True, null=True, upload_to=statistical_properties.models.user_directory_path_for_statistical_validations),
+        ),
+    ]
@@ -6,6 +6,11 @@ from user_files.models_choices import FileType, MoleculeType
 from django.db import models
 
 
+def user_directory_path_for_statistical_validations(instance, filename: str):
+    """File will be uploaded to MEDIA_ROOT/uploads/user_<id>/statistical_validations/<filename>"""
+    return f'uploads/user_{instance.biomarker.user.id}/statistical_validations/{filename}'
+
+
 # Create your models here.
 class CommonStatisticalTest(models.Model):
     """
@@ -193,6 +198,10 @@ class StatisticalValidation(models.Model):
 
     task_id = models.CharField(max_length=100, blank=True, null=True)  # Celery Task ID
 
+    # Binary artifact with the molecules and clinical data used in the validation (see stats_service)
+    prepared_data = models.FileField(upload_to=user_directory_path_for_statistical_validations, null=True,
+                                     blank=True)
+
     @property
     def survival_column_tuple(self):
         """Gets valid SurvivalColumnTuple"""
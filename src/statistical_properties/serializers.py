@@ -2,8 +2,10 @@ from math import isnan
 from typing import Optional, cast
 from rest_framework import serializers
 from api_service.serializers import ExperimentSourceSerializer, ExperimentClinicalSourceSerializer
+from biomarkers.models import BiomarkerState, TrainedModelState
 from feature_selection.fs_algorithms import FitnessFunction
 from feature_selection.models import TrainedModel, ClusteringScoringMethod, FitnessFunction, ClusteringParameters
+from scheduling.fair_share_service import get_queue_position
 from statistical_properties.models import NormalityTest, GoldfeldQuandtTest, LinearityTest, MonotonicTest, \
     BreuschPaganTest, SourceDataStatisticalProperties, SourceDataOutliers, StatisticalValidationSourceResult, \
     StatisticalValidation, MoleculeWithCoefficient, SampleAndCluster
@@ -87,6 +89,7 @@ class StatisticalValidationSourceResultSerializer(serializers.ModelSerializer):
 class StatisticalValidationSimpleSerializer(serializers.ModelSerializer):
     """StatisticalValidation serializer with few fields"""
     fitness_function = serializers.SerializerMethodField(method_name='get_fitness_function')
+    queue_position = serializers.SerializerMethodField(method_name='get_queue_position')
     trained_model = serializers.PrimaryKeyRelatedField(read_only=True)
 
     clinical_source = ExperimentClinicalSourceSerializer()
@@ -99,13 +102,20 @@ class StatisticalValidationSimpleSerializer(serializers.ModelSerializer):
         model = StatisticalValidation
         fields = ['id', 'name', 'description', 'state', 'created', 'fitness_function', 'trained_model',
                   'clinical_source', 'mrna_source_result', 'mirna_source_result', 'cna_source_result',
-                  'methylation_source_result']
+                  'methylation_source_result', 'queue_position']
 
     @staticmethod
     def get_fitness_function(ins: StatisticalValidation) -> FitnessFunction:
         """Gets the type of model used for training/testing (SVM/RF/Clustering)."""
         return ins.trained_model.fitness_function
 
+    def get_queue_position(self, ins: StatisticalValidation) -> Optional[int]:
+        """Gets the position of a waiting validation in the fair-share dispatcher (None if it's not waiting)."""
+        if ins.state != BiomarkerState.WAITING_FOR_QUEUE:
+            return None
+        positions_cache = self.context.setdefault('queue_positions', {})
+        return get_queue_position(ins, 'stats', positions_cache)
+
 
 class StatisticalValidationSerializer(serializers.ModelSerializer):
     """StatisticalValidation serializer with only the metrics."""
@@ -189,6 +199,7 @@ class TrainedModelForTableSerializer(serializers.ModelSerializer):
     best_fitness_value = serializers.SerializerMethodField(method_name='get_best_fitness_value')
     fitness_metric = serializers.SerializerMethodField(method_name='get_fitness_metric')
     can_be_deleted = serializers.SerializerMethodField(method_name='get_can_be_deleted')
+    queue_position = serializers.SerializerMethodField(method_name='get_queue_position')
 
     clinical_source = ExperimentSourceSerializer()
     mrna_source = ExperimentSourceSerializer()
@@ -199,9 +210,8 @@ class TrainedModelForTableSerializer(serializers.ModelSerializer):
     class Meta:
         model = TrainedModel
         fields = ['id', 'name', 'fitness_function', 'description', 'state', 'created', 'best_fitness_value',
-                  'fitness_metric', 'cv_folds_modified', 'can_be_deleted', 'clinical_source', 'mrna_source',
-                  'mirna_source', 'cna_source',
-                  'methylation_source']
+                  'fitness_metric', 'cv_folds_modified', 'search_strategy', 'can_be_deleted', 'clinical_source',
+                  'mrna_source', 'mirna_source', 'cna_source', 'methylation_source', 'queue_position']
 
     @staticmethod
     def get_best_fitness_value(instance: TrainedModel) -> Optional[float]:
@@ -237,3 +247,10 @@ class TrainedModelForTableSerializer(serializers.ModelSerializer):
         InferenceExperiments).
         """
         return not instance.statistical_validations.exists() and not instance.inference_experiments.exists()
+
+    def get_queue_position(self, instance: TrainedModel) -> Optional[int]:
+        """Gets the position of a waiting TrainedModel in the fair-share dispatcher (None if it's not waiting)."""
+        if instance.state != TrainedModelState.WAITING_FOR_QUEUE:
+            return None
+        positions_cache = self.context.setdefault('queue_positions', {})
+        return get_queue_position(instance, 'stats', positions_cache)
@@ -0,0 +1,213 @@
+import logging
+from typing import List, Dict, Tuple, Type
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Abs
+from api_service.models import Experiment, ExperimentSource, GeneGEMCombination
+from api_service.pipelines import get_common_samples, get_gem_row_identifier, get_valid_data_from_sources
+from statistical_properties.models import NormalityTest, GoldfeldQuandtTest, LinearityTest, MonotonicTest, \
+    BreuschPaganTest, SourceDataStatisticalProperties, SourceDataOutliers, CommonStatisticalTest
+from statistical_properties.statistics_utils import COMMON_DECIMAL_PLACES, P_VALUES_DECIMAL_PLACES, \
+    NUMBER_OF_NEEDED_SAMPLES, compute_statistical_properties_batch, compute_source_statistical_properties
+
+
+def __load_rows(source: ExperimentSource, rows: List[str], samples: np.ndarray) -> pd.DataFrame:
+    """
+    Loads some rows of a source keeping only the specified samples (in the same order).
+    @param source: Source to read.
+    @param rows: Rows to read.
+    @param samples: Samples to keep.
+    @return: DataFrame with molecules as rows and samples as columns.
+    """
+    chunks = [chunk.reindex(columns=samples) for chunk in source.get_df_in_chunks(rows=rows)]
+    if not chunks:
+        return pd.DataFrame(columns=samples, dtype=float)
+
+    df = pd.concat(chunks).astype(float)
+    return df[~df.index.duplicated()]
+
+
+def __round(value: float, decimal_places: int) -> float:
+    """Rounds a Numpy value to store it in the DB."""
+    return round(float(value), decimal_places)
+
+
+def __generate_common_tests(model: Type[CommonStatisticalTest], stats: Dict[str, np.ndarray],
+                            prefix: str) -> List[CommonStatisticalTest]:
+    """
+    Generates (without saving them) the instances of a statistical test for a batch of combinations.
+    @param model: CommonStatisticalTest subclass.
+    @param stats: Dict returned by compute_statistical_properties_batch.
+    @param prefix: Prefix of the test's statistic and p-value keys in stats.
+    @return: List of instances.
+    """
+    return [
+        model(statistic=__round(statistic, COMMON_DECIMAL_PLACES), p_value=__round(p_value, P_VALUES_DECIMAL_PLACES))
+        for statistic, p_value in zip(stats[f'{prefix}_statistic'], stats[f'{prefix}_p_value'])
+    ]
+
+
+def __save_statistical_properties_batch(
+        combinations: List[GeneGEMCombination],
+        gene_data: np.ndarray,
+        gem_data: np.ndarray,
+        samples: np.ndarray
+):
+    """
+    Computes the statistical properties of a batch of combinations and bulk inserts them (and their outliers).
+    @param combinations: Combinations of the batch.
+    @param gene_data: Matrix with the gene data of every combination (one combination per row) without NaNs.
+    @param gem_data: Matrix with the GEM data of every combination.
+    @param samples: Samples of the columns of both matrices.
+    """
+    stats = compute_statistical_properties_batch(gene_data, gem_data)
+    gene_normality_tests = __generate_common_tests(NormalityTest, stats, 'gene_normality')
+    gem_normality_tests = __generate_common_tests(NormalityTest, stats, 'gem_normality')
+    goldfeld_quandt_tests = __generate_common_tests(GoldfeldQuandtTest, stats, 'goldfeld_quandt')
+    linearity_tests = __generate_common_tests(LinearityTest, stats, 'linearity')
+    monotonic_tests = __generate_common_tests(MonotonicTest, stats, 'monotonicity')
+    breusch_pagan_tests = [
+        BreuschPaganTest(
+            lagrange_multiplier=__round(lagrange_multiplier, COMMON_DECIMAL_PLACES),
+            p_value=__round(p_value, P_VALUES_DECIMAL_PLACES),
+            f_value=__round(f_value, COMMON_DECIMAL_PLACES),
+            f_p_value=__round(f_p_value, P_VALUES_DECIMAL_PLACES)
+        )
+        for lagrange_multiplier, p_value, f_value, f_p_value in zip(
+            stats['breusch_pagan_lagrange_multiplier'],
+            stats['breusch_pagan_p_value'],
+            stats['breusch_pagan_f_value'],
+            stats['breusch_pagan_f_p_value']
+        )
+    ]
+
+    with transaction.atomic():
+        NormalityTest.objects.bulk_create(gene_normality_tests + gem_normality_tests)
+        GoldfeldQuandtTest.objects.bulk_create(goldfeld_quandt_tests)
+        LinearityTest.objects.bulk_create(linearity_tests)
+        MonotonicTest.objects.bulk_create(monotonic_tests)
+        BreuschPaganTest.objects.bulk_create(breusch_pagan_tests)
+
+        source_stats_props = SourceDataStatisticalProperties.objects.bulk_create([
+            SourceDataStatisticalProperties(
+                gene_mean=__round(stats['gene_mean'][i], COMMON_DECIMAL_PLACES),
+                gem_mean=__round(stats['gem_mean'][i], COMMON_DECIMAL_PLACES),
+                gene_standard_deviation=__round(stats['gene_standard_deviation'][i], COMMON_DECIMAL_PLACES),
+                gem_standard_deviation=__round(stats['gem_standard_deviation'][i], COMMON_DECIMAL_PLACES),
+                gene_normality=gene_normality_tests[i],
+                gem_normality=gem_normality_tests[i],
+                heteroscedasticity_breusch_pagan=breusch_pagan_tests[i],
+                homoscedasticity_goldfeld_quandt=goldfeld_quandt_tests[i],
+                linearity=linearity_tests[i],
+                monotonicity=monotonic_tests[i],
+                number_of_samples_evaluated=samples.size
+            )
+            for i in range(len(combinations))
+        ])
+
+        outliers: List[SourceDataOutliers] = []
+        for data, outliers_idx, is_gene_data in [(gene_data, stats['gene_outliers'], True),
+                                                 (gem_data, stats['gem_outliers'], False)]:
+            for row_idx, column_idx in zip(*np.nonzero(outliers_idx)):
+                outliers.append(SourceDataOutliers(
+                    sample_identifier=samples[column_idx],
+                    expression=data[row_idx, column_idx],
+                    is_gene_data=is_gene_data,
+                    stats_property=source_stats_props[row_idx]
+                ))
+        SourceDataOutliers.objects.bulk_create(outliers, batch_size=settings.INSERT_CHUNK_SIZE)
+
+        for combination, combination_stats_props in zip(combinations, source_stats_props):
+            combination.source_statistical_data = combination_stats_props
+        # Filters by experiment so the UPDATE only scans its partition
+        type(combinations[0]).objects.filter(experiment_id=combinations[0].experiment_id).bulk_update(
+            combinations, ['source_statistical_data']
+        )
+
+
+def __save_statistical_properties_one_by_one(combination: GeneGEMCombination, experiment: Experiment):
+    """
+    Computes the statistical properties of a combination with NaNs in its data (they are removed by pairs, so every
+    combination has a different number of samples) as CombinationSourceDataStatisticalPropertiesDetails does.
+    @param combination: Combination to compute.
+    @param experiment: Experiment of the combination.
+    """
+    gene_data, gem_data, gene_samples, gem_samples = get_valid_data_from_sources(
+        experiment,
+        combination.gene_id,
+        combination.gem,
+        round_values=False,
+        return_samples_identifiers=True
+    )
+    if gene_data.size < NUMBER_OF_NEEDED_SAMPLES:
+        return
+
+    with transaction.atomic():
+        combination.source_statistical_data = compute_source_statistical_properties(gene_data, gem_data,
+                                                                                    gene_samples, gem_samples)
+        type(combination).objects.filter(pk=combination.pk, experiment_id=experiment.pk).update(
+            source_statistical_data=combination.source_statistical_data
+        )
+
+
+def precompute_source_statistical_properties(experiment: Experiment, top_n: int):
+    """
+    Computes and stores the statistical properties of the source data of the top N combinations (by absolute
+    correlation) of an experiment, so they are not computed when the user opens the details panel. The data of all the
+    involved molecules is read only once and the combinations are computed (and inserted) in batches of
+    settings.INSERT_CHUNK_SIZE elements.
+    @param experiment: Experiment to compute.
+    @param top_n: Number of combinations to compute.
+    """
+    combination_class = experiment.get_combination_class()
+    top_combinations = combination_class.objects.filter(experiment=experiment).order_by(
+        Abs('correlation').desc()
+    )[:top_n]
+    combinations: List[GeneGEMCombination] = [combination for combination in top_combinations
+                                              if combination.source_statistical_data_id is None]
+    if not combinations:
+        return
+
+    # Loads the data of all the needed molecules for the samples in common
+    gene_source: ExperimentSource = experiment.mRNA_source
+    gem_source: ExperimentSource = experiment.gem_source
+    samples = get_common_samples(gene_source, gem_source, assume_unique=True)
+    if samples.size < NUMBER_OF_NEEDED_SAMPLES:
+        return
+
+    gem_platform = gem_source.get_methylation_platform_df()
+    rows: List[Tuple[str, str]] = [(combination.gene_id, get_gem_row_identifier(combination.gem, gem_platform))
+                                   for combination in combinations]
+    genes_df = __load_rows(gene_source, list(dict.fromkeys(gene for gene, _ in rows)), samples)
+    gems_df = __load_rows(gem_source, list(dict.fromkeys(gem for _, gem in rows)), samples)
+
+    # Combinations without NaNs are computed in batches
+    complete_combinations: List[GeneGEMCombination] = []
+    complete_rows: Dict[str, List[str]] = {'gene': [], 'gem': []}
+    n_one_by_one = 0
+    for combination, (gene, gem) in zip(combinations, rows):
+        if gene not in genes_df.index or gem not in gems_df.index:
+            continue
+
+        if genes_df.loc[gene].isnull().any() or gems_df.loc[gem].isnull().any():
+            __save_statistical_properties_one_by_one(combination, experiment)
+            n_one_by_one += 1
+        else:
+            complete_combinations.append(combination)
+            complete_rows['gene'].append(gene)
+            complete_rows['gem'].append(gem)
+
+    batch_size = settings.INSERT_CHUNK_SIZE
+    for start in range(0, len(complete_combinations), batch_size):
+        end = start + batch_size
+        __save_statistical_properties_batch(
+            complete_combinations[start:end],
+            genes_df.loc[complete_rows['gene'][start:end]].to_numpy(),
+            gems_df.loc[complete_rows['gem'][start:end]].to_numpy(),
+            samples
+        )
+
+    logging.warning(f'Statistical properties of {len(complete_combinations) + n_one_by_one} combinations of '
+                    f'experiment {experiment.pk} precomputed')
@@ -1,6 +1,6 @@
-from typing import Tuple, Optional, List, Any
+from typing import Tuple, Optional, List, Any, Dict
 import numpy as np
-from scipy.stats import shapiro
+from scipy.stats import shapiro, rankdata, chi2, f as f_distribution, t as t_distribution
 import statsmodels.stats.api as sms
 import statsmodels.api as sm
 from statsmodels.regression.linear_model import RegressionResults
@@ -12,6 +12,9 @@ from statistical_properties.models import NormalityTest, GoldfeldQuandtTest, Lin
 COMMON_DECIMAL_PLACES = 3
 P_VALUES_DECIMAL_PLACES = 4
 
+# Most of the statistics need at least 3 samples
+NUMBER_OF_NEEDED_SAMPLES: int = 3
+
 
 def compute_mean(data: np.ndarray) -> float:
     """
@@ -233,3 +236,101 @@ def compute_source_statistical_properties(
     compute_and_save_outliers(gem_data, gem_samples, False, source_stats_props)
 
     return source_stats_props
+
+
+def __ols_batch(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fits a simple linear regression (y = intercept + slope * x) for every row of two matrices.
+    @param x: Independent variable matrix (one regression per row).
+    @param y: Dependent variable matrix of the same shape as x.
+    @return: Residuals matrix and the coefficient of determination of every regression.
+    """
+    x_centered = x - x.mean(axis=1, keepdims=True)
+    y_centered = y - y.mean(axis=1, keepdims=True)
+    slope = (x_centered * y_centered).sum(axis=1, keepdims=True) / (x_centered ** 2).sum(axis=1, keepdims=True)
+    residuals = y_centered - slope * x_centered
+    r_squared = 1 - (residuals ** 2).sum(axis=1) / (y_centered ** 2).sum(axis=1)
+    return residuals, r_squared
+
+
+def mad_based_outliers_batch(data: np.ndarray, thresh: Optional[float] = 3.5) -> np.ndarray:
+    """
+    Same as mad_based_outliers for every row of a matrix
+    @param data: Matrix with the points of every row to consider
+    @param thresh: Threshold to consider outlier
+    @return: Outliers bool matrix where True is considered an outlier
+    """
+    diff = np.abs(data - np.median(data, axis=1, keepdims=True))
+    med_abs_deviation = np.median(diff, axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        modified_z_score = 0.6745 * diff / med_abs_deviation
+    return modified_z_score > thresh
+
+
+def compute_statistical_properties_batch(gene_data: np.ndarray, gem_data: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Computes the same statistical properties as compute_source_statistical_properties for a batch of GenexGEM
+    combinations without NaNs. All of them are vectorized except the Shapiro-Wilk and Harvey Collier tests.
+    @param gene_data: Matrix with the gene data of every combination (one combination per row)
+    @param gem_data: Matrix with the GEM data of every combination
+    @return: Dict with an array (or a matrix for the outliers) for every statistic, not rounded
+    """
+    n_combinations, n_samples = gene_data.shape
+    stats: Dict[str, np.ndarray] = {
+        'gene_mean': gene_data.mean(axis=1),
+        'gem_mean': gem_data.mean(axis=1),
+        'gene_standard_deviation': gene_data.std(axis=1, ddof=1),
+        'gem_standard_deviation': gem_data.std(axis=1, ddof=1)
+    }
+
+    # Normality
+    stats['gene_normality_statistic'], stats['gene_normality_p_value'] = shapiro(gene_data, axis=1)
+    stats['gem_normality_statistic'], stats['gem_normality_p_value'] = shapiro(gem_data, axis=1)
+
+    # Linear regression of GEM over gene
+    residuals, _ = __ols_batch(gene_data, gem_data)
+
+    # Breusch-Pagan (Koenker's robust version, as statsmodels' het_breuschpagan): regresses the squared residuals
+    # over the gene data
+    _, r_squared = __ols_batch(gene_data, residuals ** 2)
+    lagrange_multiplier = n_samples * r_squared
+    f_value = r_squared / ((1 - r_squared) / (n_samples - 2))
+    stats['breusch_pagan_lagrange_multiplier'] = lagrange_multiplier
+    stats['breusch_pagan_p_value'] = chi2.sf(lagrange_multiplier, 1)
+    stats['breusch_pagan_f_value'] = f_value
+    stats['breusch_pagan_f_p_value'] = f_distribution.sf(f_value, 1, n_samples - 2)
+
+    # Goldfeld-Quandt (as statsmodels' het_goldfeldquandt(residuals, exog)): compares the residuals' variance of the
+    # regressions over both halves of the samples
+    split = n_samples // 2
+    first_residuals, _ = __ols_batch(gene_data[:, :split], residuals[:, :split])
+    second_residuals, _ = __ols_batch(gene_data[:, split:], residuals[:, split:])
+    first_df, second_df = split - 2, n_samples - split - 2
+    goldfeld_quandt_statistic = ((second_residuals ** 2).sum(axis=1) / second_df) / \
+                                ((first_residuals ** 2).sum(axis=1) / first_df)
+    stats['goldfeld_quandt_statistic'] = goldfeld_quandt_statistic
+    stats['goldfeld_quandt_p_value'] = f_distribution.sf(goldfeld_quandt_statistic, second_df, first_df)
+
+    # Linearity
+    linearity = [linear_harvey_collier(compute_linear_regression(gene_data[i], gem_data[i])[0])
+                 for i in range(n_combinations)]
+    stats['linearity_statistic'] = np.array([statistic for statistic, _ in linearity])
+    stats['linearity_p_value'] = np.array([p_value for _, p_value in linearity])
+
+    # Monotonicity: Pearson correlation over the ranks (as scipy's spearmanr)
+    gene_ranks = rankdata(gene_data, axis=1)
+    gem_ranks = rankdata(gem_data, axis=1)
+    gene_ranks -= gene_ranks.mean(axis=1, keepdims=True)
+    gem_ranks -= gem_ranks.mean(axis=1, keepdims=True)
+    spearman = (gene_ranks * gem_ranks).sum(axis=1) / np.sqrt((gene_ranks ** 2).sum(axis=1) *
+                                                              (gem_ranks ** 2).sum(axis=1))
+    with np.errstate(divide='ignore'):
+        t_statistic = spearman * np.sqrt((n_samples - 2) / ((1 + spearman) * (1 - spearman)))
+    stats['monotonicity_statistic'] = spearman
+    stats['monotonicity_p_value'] = 2 * t_distribution.sf(np.abs(t_statistic), n_samples - 2)
+
+    # Outliers
+    stats['gene_outliers'] = mad_based_outliers_batch(gene_data)
+    stats['gem_outliers'] = mad_based_outliers_batch(gem_data)
+
+    return stats
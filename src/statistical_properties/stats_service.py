@@ -1,15 +1,22 @@
+import io
+import math
+import os
 import warnings
-from typing import Dict, Tuple, cast, Optional, Union, List
+from functools import partial
+from typing import Dict, Tuple, cast, Optional, Union, List, Any, Callable
 import numpy as np
 import pandas as pd
+from django.conf import settings
+from django.core.files.base import ContentFile
 from lifelines import CoxPHFitter
 from sklearn.metrics import mean_squared_error, r2_score, silhouette_score
-from sklearn.model_selection import GridSearchCV, StratifiedKFold
-from sklearn.cluster import AgglomerativeClustering
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401. Needed to import HalvingGridSearchCV
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, HalvingGridSearchCV
+from sklearn.cluster import AgglomerativeClustering, SpectralClustering
 from sksurv.metrics import concordance_index_censored
-from common.datasets_utils import get_common_samples, generate_molecules_file, format_data, \
-    generate_clinical_file, generate_molecules_dataframe, check_sample_classes, \
-    check_molecules_and_samples_number_or_exception, check_empty_dataframe_or_exception
+from common.datasets_utils import get_common_samples, generate_molecules_dataframe, format_data, \
+    generate_clinical_dataframe, check_sample_classes, check_molecules_and_samples_number_or_exception, \
+    check_empty_dataframe_or_exception
 from common.exceptions import ExperimentStopped, NoBestModelFound, NumberOfSamplesFewerThanCVFolds
 from common.functions import check_if_stopped
 from common.typing import AbortEvent
@@ -17,28 +24,92 @@ from common.utils import get_subset_of_features
 from feature_selection.fs_algorithms import SurvModel, select_top_cox_regression, GRID_SEARCH_CV_FOLDS
 from feature_selection.fs_models import ClusteringModels
 from feature_selection.models import TrainedModel, ClusteringScoringMethod, ClusteringParameters, FitnessFunction, \
-    RFParameters
+    RFParameters, SearchStrategy, SearchCandidateRecord
 from feature_selection.utils import create_models_parameters_and_classifier, save_model_dump_and_best_score
 from statistical_properties.models import StatisticalValidation, MoleculeWithCoefficient
 from user_files.models_choices import MoleculeType
 
 
 def __generate_df_molecules_and_clinical(stat_validation: Union[StatisticalValidation, TrainedModel],
-                                         samples_in_common: np.ndarray) -> Tuple[str, str]:
+                                         samples_in_common: np.ndarray) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Generates two DataFrames: one with all the selected molecules, and other with the selected clinical data.
     @param stat_validation: StatisticalValidation instance to extract molecules and clinical data from its sources.
     @param samples_in_common: Samples in common to extract from the datasets.
-    @return: Both DataFrames paths.
+    @return: Both DataFrames.
     """
     # Generates clinical DataFrame
     survival_tuple = stat_validation.survival_column_tuple
-    clinical_temp_file_path = generate_clinical_file(stat_validation, samples_in_common, survival_tuple)
+    clinical_df = generate_clinical_dataframe(stat_validation, samples_in_common, survival_tuple)
 
     # Generates molecules DataFrame
-    molecules_temp_file_path = generate_molecules_file(stat_validation, samples_in_common)
+    molecules_df = generate_molecules_dataframe(stat_validation, samples_in_common)
 
-    return molecules_temp_file_path, clinical_temp_file_path
+    return molecules_df, clinical_df
+
+
+def __save_prepared_data(instance: StatisticalValidation, molecules_df: pd.DataFrame, clinical_df: pd.DataFrame):
+    """
+    Saves the molecules and clinical data (with the samples in common and without any filtering) of a
+    StatisticalValidation as a binary artifact to prevent generating them again in its result views.
+    @param instance: StatisticalValidation instance.
+    @param molecules_df: Molecules DataFrame with molecules as rows and samples as columns.
+    @param clinical_df: Clinical DataFrame with the event and time columns (in that order).
+    """
+    event_column, time_column = clinical_df.columns.tolist()
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        values=molecules_df.to_numpy(dtype=float),
+        molecules=molecules_df.index.to_numpy(dtype=str),
+        samples=molecules_df.columns.to_numpy(dtype=str),
+        clinical_samples=clinical_df.index.to_numpy(dtype=str),
+        clinical_columns=np.array([event_column, time_column], dtype=str),
+        event=clinical_df[event_column].to_numpy(dtype=bool),
+        time=clinical_df[time_column].to_numpy(dtype=float)
+    )
+    instance.prepared_data.save(f'{instance.pk}_prepared_data.npz', ContentFile(buffer.getvalue()), save=False)
+    instance.save(update_fields=['prepared_data'])
+
+
+def __load_prepared_data(instance: StatisticalValidation) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Loads the molecules and clinical data artifact of a StatisticalValidation.
+    @param instance: StatisticalValidation instance.
+    @return: Molecules and clinical DataFrames. None if the artifact does not exist.
+    """
+    if not instance.prepared_data:
+        return None
+
+    prepared_data_path = os.path.join(settings.MEDIA_ROOT, instance.prepared_data.name)
+    if not os.path.isfile(prepared_data_path):
+        return None
+
+    with np.load(prepared_data_path) as data:
+        molecules_df = pd.DataFrame(data['values'], index=data['molecules'], columns=data['samples'])
+        event_column, time_column = data['clinical_columns'].tolist()
+        clinical_df = pd.DataFrame({event_column: data['event'], time_column: data['time']},
+                                   index=data['clinical_samples'])
+    return molecules_df, clinical_df
+
+
+def get_prepared_data(instance: StatisticalValidation) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Gets the molecules and clinical data (with the samples in common and without any filtering) of a
+    StatisticalValidation. The artifact saved during the computation is used if it exists, otherwise, data is
+    generated from the sources and saved for later calls.
+    @param instance: StatisticalValidation instance.
+    @raise NoSamplesInCommon in case no samples in common are present for all the sources.
+    @return: Molecules and clinical DataFrames.
+    """
+    prepared_data = __load_prepared_data(instance)
+    if prepared_data is not None:
+        return prepared_data
+
+    samples_in_common = get_common_samples(instance)
+    molecules_df, clinical_df = __generate_df_molecules_and_clinical(instance, samples_in_common)
+    __save_prepared_data(instance, molecules_df, clinical_df)
+    return molecules_df, clinical_df
 
 
 def __save_molecule_identifiers(created_stat_validation: StatisticalValidation,
@@ -62,13 +133,13 @@ def __save_molecule_identifiers(created_stat_validation: StatisticalValidation,
         )
 
 
-def __compute_stat_validation(stat_validation: StatisticalValidation, molecules_temp_file_path: str,
-                              clinical_temp_file_path: str, is_aborted: AbortEvent):
+def __compute_stat_validation(stat_validation: StatisticalValidation, molecules_df: pd.DataFrame,
+                              clinical_df: pd.DataFrame, is_aborted: AbortEvent):
     """
     Computes the statistical validation using the params defined by the user.
     @param stat_validation: StatisticalValidation instance.
-    @param molecules_temp_file_path: Path of the DataFrame with the molecule expressions.
-    @param clinical_temp_file_path: Path of the DataFrame with the clinical data.
+    @param molecules_df: DataFrame with the molecule expressions.
+    @param clinical_df: DataFrame with the clinical data.
     @param is_aborted: Method to call to check if the experiment has been stopped.
     """
     check_if_stopped(is_aborted, ExperimentStopped)
@@ -80,8 +151,7 @@ def __compute_stat_validation(stat_validation: StatisticalValidation, molecules_
 
     # Gets data in the correct format
     check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_df, clinical_df, clinical_data = format_data(molecules_temp_file_path, clinical_temp_file_path,
-                                                           is_regression)
+    molecules_df, clinical_df, clinical_data = format_data(molecules_df, clinical_df, is_regression)
 
     # Checks if there are fewer samples than splits in the CV to prevent ValueError
     n_samples = clinical_df.shape[0]
@@ -114,7 +184,8 @@ def __compute_stat_validation(stat_validation: StatisticalValidation, molecules_
     # Makes predictions
     if is_regression:
         check_if_stopped(is_aborted, ExperimentStopped)
-        if isinstance(classifier, AgglomerativeClustering):
+        # Spectral/Ward models trained before the out-of-sample assignment was added have to be refitted
+        if not hasattr(classifier, 'predict'):
             predictions = classifier.fit_predict(molecules_df)
         else:
             predictions = classifier.predict(molecules_df)
@@ -123,7 +194,7 @@ def __compute_stat_validation(stat_validation: StatisticalValidation, molecules_
         check_if_stopped(is_aborted, ExperimentStopped)
         y_true = clinical_data['time']
         stat_validation.mean_squared_error = mean_squared_error(y_true, predictions)
-        if isinstance(classifier, AgglomerativeClustering):
+        if isinstance(classifier, (AgglomerativeClustering, SpectralClustering)):
             stat_validation.c_index = silhouette_score(molecules_df, predictions)
         else:
             stat_validation.c_index = classifier.score(molecules_df, clinical_data)
@@ -135,8 +206,7 @@ def __compute_stat_validation(stat_validation: StatisticalValidation, molecules_
         stat_validation.save()
 
 
-def prepare_and_compute_stat_validation(stat_validation: StatisticalValidation,
-                                        is_aborted: AbortEvent) -> Tuple[str, str]:
+def prepare_and_compute_stat_validation(stat_validation: StatisticalValidation, is_aborted: AbortEvent):
     """
     Gets samples in common, generates needed DataFrames and finally computes the statistical validation.
     @param stat_validation: StatisticalValidation instance.
@@ -148,21 +218,106 @@ def prepare_and_compute_stat_validation(stat_validation: StatisticalValidation,
 
     # Generates needed DataFrames
     check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_temp_file_path, clinical_temp_file_path = __generate_df_molecules_and_clinical(stat_validation,
-                                                                                             samples_in_common)
+    molecules_df, clinical_df = __generate_df_molecules_and_clinical(stat_validation, samples_in_common)
 
-    __compute_stat_validation(stat_validation, molecules_temp_file_path, clinical_temp_file_path, is_aborted)
+    __compute_stat_validation(stat_validation, molecules_df, clinical_df, is_aborted)
 
-    return molecules_temp_file_path, clinical_temp_file_path
+    # Saves the data to be used by the StatisticalValidation's views
+    check_if_stopped(is_aborted, ExperimentStopped)
+    __save_prepared_data(stat_validation, molecules_df, clinical_df)
 
 
-def __compute_trained_model(trained_model: TrainedModel, molecules_temp_file_path: str,
-                            clinical_temp_file_path: str, model_parameters: Dict, is_aborted: AbortEvent):
+def __get_search_cv(trained_model: TrainedModel, classifier: SurvModel, param_grid: Dict[str, Any],
+                    scoring: Callable, cross_validation_folds: int,
+                    n_samples: int) -> Union[GridSearchCV, HalvingGridSearchCV]:
+    """
+    Generates the hyperparameters search instance. If the TrainedModel uses the successive halving strategy, all the
+    candidates are evaluated with a subset of the samples and only the best 1 / settings.TRAINED_MODEL_HALVING_FACTOR
+    of them are evaluated with more samples in the next iteration. A complete Grid Search is used if there is only one
+    candidate or there are not enough samples to evaluate the candidates in the first iteration.
+    @param trained_model: TrainedModel instance.
+    @param classifier: Classifier to optimize.
+    @param param_grid: Hyperparameters to evaluate.
+    @param scoring: Scoring function.
+    @param cross_validation_folds: Number of folds of the stratified CV.
+    @param n_samples: Number of samples in the dataset.
+    @return: GridSearchCV or HalvingGridSearchCV instance.
+    """
+    n_jobs = settings.TRAINED_MODEL_SEARCH_N_JOBS
+    n_candidates = math.prod(len(values) for values in param_grid.values())
+    if trained_model.search_strategy == SearchStrategy.SUCCESSIVE_HALVING and n_candidates > 1:
+        # Same as min_resources='exhaust' (the last iteration uses all the samples) but keeping a minimum number of
+        # samples by fold
+        factor = settings.TRAINED_MODEL_HALVING_FACTOR
+        n_iterations = 1 + math.floor(math.log(n_candidates, factor))
+        min_resources = max(n_samples // factor ** (n_iterations - 1),
+                            cross_validation_folds * settings.TRAINED_MODEL_HALVING_MIN_SAMPLES_BY_FOLD)
+
+        if min_resources < n_samples:
+            # Successive halving needs the same folds in every iteration, so a random seed is fixed for this search
+            cv = StratifiedKFold(n_splits=cross_validation_folds, shuffle=True,
+                                 random_state=np.random.randint(np.iinfo(np.int32).max))
+            return HalvingGridSearchCV(
+                classifier,
+                param_grid,
+                factor=factor,
+                resource='n_samples',
+                min_resources=min_resources,
+                scoring=scoring,
+                n_jobs=n_jobs,
+                refit=False,
+                cv=cv
+            )
+
+    return GridSearchCV(
+        classifier,
+        param_grid,
+        scoring=scoring,
+        n_jobs=n_jobs,
+        refit=False,
+        cv=StratifiedKFold(n_splits=cross_validation_folds, shuffle=True)
+    )
+
+
+def __to_json_value(value: Any) -> Any:
+    """Converts Numpy scalars to Python types to be stored in a JSONField."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def __save_search_candidates(trained_model: TrainedModel, search_cv: Union[GridSearchCV, HalvingGridSearchCV],
+                             n_samples: int):
+    """
+    Stores the score and times of every evaluated hyperparameters candidate.
+    @param trained_model: TrainedModel instance.
+    @param search_cv: Fitted GridSearchCV or HalvingGridSearchCV instance.
+    @param n_samples: Number of samples used in a complete Grid Search.
+    """
+    results = search_cv.cv_results_
+    n_candidates = len(results['params'])
+    iterations = results.get('iter', np.zeros(n_candidates, dtype=int))
+    number_of_samples = results.get('n_resources', np.full(n_candidates, n_samples))
+
+    SearchCandidateRecord.objects.bulk_create([
+        SearchCandidateRecord(
+            trained_model=trained_model,
+            parameters={key: __to_json_value(value) for key, value in results['params'][i].items()},
+            iteration=int(iterations[i]),
+            number_of_samples=int(number_of_samples[i]),
+            mean_score=None if np.isnan(results['mean_test_score'][i]) else float(results['mean_test_score'][i]),
+            mean_fit_time=float(results['mean_fit_time'][i]),
+            mean_score_time=float(results['mean_score_time'][i])
+        )
+        for i in range(n_candidates)
+    ])
+
+
+def __compute_trained_model(trained_model: TrainedModel, molecules_df: pd.DataFrame,
+                            clinical_df: pd.DataFrame, model_parameters: Dict, is_aborted: AbortEvent):
     """
     Computes the statistical validation using the params defined by the user.
     @param trained_model: StatisticalValidation instance.
-    @param molecules_temp_file_path: Path of the DataFrame with the molecule expressions.
-    @param clinical_temp_file_path: Path of the DataFrame with the clinical data.
+    @param molecules_df: DataFrame with the molecule expressions.
+    @param clinical_df: DataFrame with the clinical data.
     @param model_parameters: A dict with all the model parameters.
     @param is_aborted: Method to call to check if the experiment has been stopped.
     """
@@ -212,31 +367,21 @@ def __compute_trained_model(trained_model: TrainedModel, molecules_temp_file_pat
 
     # Gets data in the correct format
     check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_df, clinical_df, clinical_data = format_data(molecules_temp_file_path, clinical_temp_file_path,
-                                                           is_regression)
+    molecules_df, clinical_df, clinical_data = format_data(molecules_df, clinical_df, is_regression)
 
     # Gets all the molecules in the needed order. It's necessary to call get_subset_of_features to fix the
     # structure of data
     check_if_stopped(is_aborted, ExperimentStopped)
     molecules_df = get_subset_of_features(molecules_df, molecules_df.index)
 
-    # Stratified CV
     cross_validation_folds = trained_model.cross_validation_folds
-    cv = StratifiedKFold(n_splits=cross_validation_folds, shuffle=True)
 
-    # Generates GridSearchCV instance
+    # Generates the hyperparameters to search
     check_if_stopped(is_aborted, ExperimentStopped)
     clustering_parameters: Optional[ClusteringParameters] = None
     if trained_model.fitness_function == FitnessFunction.SVM:
         param_grid = {'alpha': 2. ** np.arange(-12, 13, 2)}
-        gcv = GridSearchCV(
-            classifier,
-            param_grid,
-            scoring=score_svm_rf,
-            n_jobs=1,
-            refit=False,
-            cv=cv
-        )
+        scoring = score_svm_rf
     elif trained_model.fitness_function == FitnessFunction.RF:
         rf_parameters: RFParameters = trained_model.rf_parameters
 
@@ -250,14 +395,7 @@ def __compute_trained_model(trained_model: TrainedModel, molecules_temp_file_pat
         else:
             param_grid = {'n_estimators': [rf_parameters.n_estimators]}
 
-        gcv = GridSearchCV(
-            classifier,
-            param_grid,
-            scoring=score_svm_rf,
-            n_jobs=1,
-            refit=False,
-            cv=cv
-        )
+        scoring = score_svm_rf
     else:
         # Clustering
         clustering_parameters: ClusteringParameters = trained_model.clustering_parameters
@@ -271,15 +409,8 @@ def __compute_trained_model(trained_model: TrainedModel, molecules_temp_file_pat
         else:
             param_grid = {'n_clusters': [clustering_parameters.n_clusters]}
 
-        gcv = GridSearchCV(
-            classifier,
-            param_grid,
-            scoring=lambda model, x, y: score_clustering(model, x, y, clustering_parameters.scoring_method,
-                                                         clustering_parameters.penalizer),
-            n_jobs=1,
-            refit=False,
-            cv=cv
-        )
+        scoring = partial(score_clustering, score_method=clustering_parameters.scoring_method,
+                          penalizer=clustering_parameters.penalizer)
 
     # Checks if there are fewer samples than splits in the CV to prevent ValueError
     n_samples = clinical_df.shape[0]
@@ -296,10 +427,15 @@ def __compute_trained_model(trained_model: TrainedModel, molecules_temp_file_pat
 
     # Trains the model
     check_if_stopped(is_aborted, ExperimentStopped)
+    gcv = __get_search_cv(trained_model, classifier, param_grid, scoring, trained_model.cross_validation_folds,
+                          n_samples)
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore", category=UserWarning)
         gcv = gcv.fit(molecules_df, clinical_data)
 
+    check_if_stopped(is_aborted, ExperimentStopped)
+    __save_search_candidates(trained_model, gcv, n_samples)
+
     best_score = gcv.best_score_
     if not best_score or np.isnan(best_score):
         raise NoBestModelFound(f'Best score is None/NaN: {best_score}')
@@ -323,34 +459,26 @@ def get_all_expressions(stat_validation: StatisticalValidation) -> pd.DataFrame:
     @raise NoSamplesInCommon in case no samples in common are present for all the sources.
     @return: Molecules DataFrame
     """
-    # Get samples in common
-    samples_in_common = get_common_samples(stat_validation)
-
-    # Generates all the molecules DataFrame
-    return generate_molecules_dataframe(stat_validation, samples_in_common)
+    molecules_df, _clinical_df = get_prepared_data(stat_validation)
+    return molecules_df
 
 
 def get_molecules_and_clinical_df(stat_validation: StatisticalValidation) -> Tuple[pd.DataFrame, np.ndarray]:
     """
-    Gets samples in common, generates needed DataFrames and finally computes the statistical validation.
+    Gets the molecules and clinical data of a StatisticalValidation without NaNs values.
     @param stat_validation: StatisticalValidation instance.
+    @raise NoSamplesInCommon in case no samples in common are present for all the sources.
+    @return: Molecules DataFrame and clinical data as a Numpy structured array.
     """
-    # Get samples in common
-    samples_in_common = get_common_samples(stat_validation)
-
-    # Generates needed DataFrames
-    molecules_temp_file_path, clinical_temp_file_path = __generate_df_molecules_and_clinical(stat_validation,
-                                                                                             samples_in_common)
+    molecules_df, clinical_df = get_prepared_data(stat_validation)
 
     # Gets both DataFrames without NaNs values
-    molecules_df, _clinical_df, clinical_data = format_data(molecules_temp_file_path, clinical_temp_file_path,
-                                                            is_regression=False)
+    molecules_df, _clinical_df, clinical_data = format_data(molecules_df, clinical_df, is_regression=False)
 
     return molecules_df, clinical_data
 
 
-def prepare_and_compute_trained_model(trained_model: TrainedModel, model_parameters: Dict,
-                                      is_aborted: AbortEvent) -> Tuple[str, str]:
+def prepare_and_compute_trained_model(trained_model: TrainedModel, model_parameters: Dict, is_aborted: AbortEvent):
     """
     Gets samples in common, generates needed DataFrames and finally computes the TrainedModel's training process.
     @param trained_model: TrainedModel instance.
@@ -363,10 +491,6 @@ def prepare_and_compute_trained_model(trained_model: TrainedModel, model_paramet
 
     # Generates needed DataFrames
     check_if_stopped(is_aborted, ExperimentStopped)
-    molecules_temp_file_path, clinical_temp_file_path = __generate_df_molecules_and_clinical(trained_model,
-                                                                                             samples_in_common)
-
-    __compute_trained_model(trained_model, molecules_temp_file_path, clinical_temp_file_path, model_parameters,
-                            is_aborted)
+    molecules_df, clinical_df = __generate_df_molecules_and_clinical(trained_model, samples_in_common)
 
-    return molecules_temp_file_path, clinical_temp_file_path
+    __compute_trained_model(trained_model, molecules_df, clinical_df, model_parameters, is_aborted)
@@ -5,7 +5,6 @@ from lifelines import KaplanMeierFitter, CoxPHFitter
 from lifelines.statistics import logrank_test
 from common.utils import get_subset_of_features
 from feature_selection.fs_models import ClusteringModels
-from sklearn.cluster import AgglomerativeClustering
 
 KaplanMeierSample = Tuple[
     int,
@@ -138,8 +137,9 @@ def generate_survival_groups_by_clustering(
     # structure of data
     molecules_df = get_subset_of_features(molecules_df,  molecules_df.index)
 
-    # Gets the groups
-    if isinstance(classifier, AgglomerativeClustering):
+    # Gets the groups. Spectral/Ward models trained before the out-of-sample assignment was added don't have a
+    # predict() method, so they have to be refitted
+    if not hasattr(classifier, 'predict'):
         clustering_result = classifier.fit_predict(molecules_df.values)
     else:
         clustering_result = classifier.predict(molecules_df.values)
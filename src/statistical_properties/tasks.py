@@ -1,19 +1,20 @@
 import logging
-import os
 import time
-from typing import Optional, Dict
+from typing import Dict
 from billiard.exceptions import SoftTimeLimitExceeded
 from celery.contrib.abortable import AbortableTask
 from django.conf import settings
 from pymongo.errors import ServerSelectionTimeoutError
 from sksurv.exceptions import NoComparablePairException
 
+from api_service.models import Experiment
 from biomarkers.models import Biomarker, BiomarkerState, TrainedModelState
 from common.exceptions import ExperimentStopped, NoSamplesInCommon, ExperimentFailed, NoBestModelFound, \
     NumberOfSamplesFewerThanCVFolds, NoValidMoleculesForModel, EmptyDataset
 from feature_selection.models import TrainedModel
 from multiomics_intermediate.celery import app
 from statistical_properties.models import StatisticalValidation
+from statistical_properties.source_properties_service import precompute_source_statistical_properties
 from statistical_properties.stats_service import prepare_and_compute_stat_validation, prepare_and_compute_trained_model
 
 
@@ -48,17 +49,12 @@ def eval_statistical_validation(self, stat_validation_pk: int) -> None:
     biomarker: Biomarker = stat_validation.biomarker
 
     # Computes the stat_validation
-    molecules_temp_file_path: Optional[str] = None
-    clinical_temp_file_path: Optional[str] = None
     try:
         logging.warning(f'ID Statistical validation -> {stat_validation.pk}')
 
         # Computes statistical validation
         start = time.time()
-        molecules_temp_file_path, clinical_temp_file_path = prepare_and_compute_stat_validation(
-            stat_validation,
-            self.is_aborted
-        )
+        prepare_and_compute_stat_validation(stat_validation, self.is_aborted)
         total_execution_time = time.time() - start
         logging.warning(f'StatisticalValidation {stat_validation.pk} total time -> {total_execution_time} seconds')
 
@@ -101,13 +97,6 @@ def eval_statistical_validation(self, stat_validation_pk: int) -> None:
         logging.exception(e)
         logging.warning(f'Setting BiomarkerState.FINISHED_WITH_ERROR to StatisticalValidation {biomarker.pk}')
         stat_validation.state = BiomarkerState.FINISHED_WITH_ERROR
-    finally:
-        # Removes the temporary files
-        if molecules_temp_file_path is not None:
-            os.unlink(molecules_temp_file_path)
-
-        if clinical_temp_file_path is not None:
-            os.unlink(clinical_temp_file_path)
 
     # Saves changes in DB
     biomarker.save()
@@ -143,18 +132,12 @@ def eval_trained_model(self, trained_model_pk: int, model_parameters: Dict) -> N
     trained_model.save(update_fields=['attempt', 'state'])
 
     # Computes the TrainedModel
-    molecules_temp_file_path: Optional[str] = None
-    clinical_temp_file_path: Optional[str] = None
     try:
         logging.warning(f'ID TrainedModel -> {trained_model.pk}')
 
         # Computes statistical validation
         start = time.time()
-        molecules_temp_file_path, clinical_temp_file_path = prepare_and_compute_trained_model(
-            trained_model,
-            model_parameters,
-            self.is_aborted
-        )
+        prepare_and_compute_trained_model(trained_model, model_parameters, self.is_aborted)
         total_execution_time = time.time() - start
         logging.warning(f'TrainedModel {trained_model.pk} total time -> {total_execution_time} seconds')
 
@@ -197,13 +180,32 @@ def eval_trained_model(self, trained_model_pk: int, model_parameters: Dict) -> N
         logging.exception(e)
         logging.warning(f'Setting TrainedModelState.FINISHED_WITH_ERROR to TrainedModel {trained_model.pk}')
         trained_model.state = TrainedModelState.FINISHED_WITH_ERROR
-    finally:
-        # Removes the temporary files
-        if molecules_temp_file_path is not None:
-            os.unlink(molecules_temp_file_path)
-
-        if clinical_temp_file_path is not None:
-            os.unlink(clinical_temp_file_path)
 
     # Saves changes in DB
     trained_model.save()
+
+
+@app.task(acks_late=True, reject_on_worker_lost=True, soft_time_limit=settings.STAT_VALIDATION_SOFT_TIME_LIMIT)
+def precompute_experiment_statistical_properties(experiment_pk: int) -> None:
+    """
+    Computes the source data statistical properties of the top settings.PRECOMPUTE_STATISTICAL_PROPERTIES_TOP_N
+    combinations of a finished correlation analysis.
+    @param experiment_pk: Experiment's PK to be processed.
+    """
+    # Due to Celery getting old jobs from the queue, we need to check if the experiment still exists
+    try:
+        experiment: Experiment = Experiment.objects.get(pk=experiment_pk)
+    except Experiment.DoesNotExist:
+        logging.error(f'Experiment {experiment_pk} does not exist')
+        return
+
+    # Any error is only logged, properties are computed on demand anyway
+    try:
+        start = time.time()
+        precompute_source_statistical_properties(experiment, settings.PRECOMPUTE_STATISTICAL_PROPERTIES_TOP_N)
+        logging.warning(f'Statistical properties of experiment {experiment.pk} precomputed in '
+                        f'{time.time() - start} seconds')
+    except (ServerSelectionTimeoutError, SoftTimeLimitExceeded) as ex:
+        logging.error(f'Statistical properties of experiment {experiment.pk} could not be precomputed: {ex}')
+    except Exception as ex:
+        logging.exception(ex)
@@ -0,0 +1,75 @@
+from typing import List
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from biomarkers.models import TrainedModelState
+from feature_selection.models import TrainedModel, FitnessFunction, SearchStrategy, SVMTask, SVMKernel, \
+    SVMParameters, SearchCandidateRecord
+from statistical_properties import stats_service
+from statistical_properties.tasks import eval_trained_model
+
+# Number of samples of the generated datasets
+N_SAMPLES = 120
+
+
+class SearchStrategyTestCase(SimpleTestCase):
+    """Runs the eval_trained_model task with a generated dataset stubbing the DB and Mongo access."""
+    trained_model: TrainedModel
+    saved_candidates: List[SearchCandidateRecord]
+
+    def setUp(self):
+        self.saved_candidates = []
+
+        rng = np.random.default_rng(0)
+        samples = [f'sample_{i}' for i in range(N_SAMPLES)]
+        self.molecules_df = pd.DataFrame(rng.normal(size=(10, N_SAMPLES)), columns=samples,
+                                         index=[f'gene_{i}' for i in range(10)])
+        # A few distinct times to have enough samples of every (event, time) class for the stratified CV
+        self.clinical_df = pd.DataFrame({'event': rng.integers(0, 2, N_SAMPLES),
+                                         'time': rng.integers(1, 5, N_SAMPLES).astype(float)}, index=samples)
+
+    def __run_task(self, search_strategy: SearchStrategy):
+        """Runs the task for a TrainedModel with the given hyperparameters search strategy."""
+        self.trained_model = TrainedModel(pk=1, fitness_function=FitnessFunction.SVM, cross_validation_folds=3,
+                                          search_strategy=search_strategy, state=TrainedModelState.WAITING_FOR_QUEUE)
+        model_parameters = {
+            'svmParameters': {'task': SVMTask.RANKING, 'kernel': SVMKernel.LINEAR, 'maxIterations': 100,
+                              'randomState': 0}
+        }
+
+        with mock.patch.object(TrainedModel.objects, 'get', return_value=self.trained_model), \
+                mock.patch.object(TrainedModel, 'save'), \
+                mock.patch.object(eval_trained_model, 'is_aborted', return_value=False), \
+                mock.patch.object(stats_service, 'get_common_samples', return_value=self.clinical_df.index.values), \
+                mock.patch.object(stats_service, '__generate_df_molecules_and_clinical',
+                                  return_value=(self.molecules_df, self.clinical_df)), \
+                mock.patch.object(SVMParameters.objects, 'create',
+                                  side_effect=lambda **kwargs: SVMParameters(**kwargs)), \
+                mock.patch.object(SearchCandidateRecord.objects, 'bulk_create',
+                                  side_effect=self.saved_candidates.extend), \
+                mock.patch.object(stats_service, 'save_model_dump_and_best_score'):
+            eval_trained_model.run(self.trained_model.pk, model_parameters)
+
+        self.assertEqual(self.trained_model.state, TrainedModelState.COMPLETED)
+
+    def test_grid_search(self):
+        """Tests that a Grid Search evaluates all the candidates with all the samples"""
+        self.__run_task(SearchStrategy.GRID_SEARCH)
+
+        self.assertGreater(len(self.saved_candidates), 1)
+        self.assertTrue(all(candidate.iteration == 0 for candidate in self.saved_candidates))
+        self.assertTrue(all(candidate.number_of_samples == N_SAMPLES for candidate in self.saved_candidates))
+
+    def test_successive_halving(self):
+        """Tests that the successive halving strategy chosen by the user is used to train the model"""
+        self.__run_task(SearchStrategy.SUCCESSIVE_HALVING)
+
+        iterations = {candidate.iteration for candidate in self.saved_candidates}
+        self.assertGreater(len(iterations), 1)
+
+        # Only the best candidates reach the last iteration, which uses more samples than the first one
+        first_iteration = [candidate for candidate in self.saved_candidates if candidate.iteration == 0]
+        last_iteration = [candidate for candidate in self.saved_candidates if candidate.iteration == max(iterations)]
+        self.assertLess(len(last_iteration), len(first_iteration))
+        self.assertLess(first_iteration[0].number_of_samples, last_iteration[0].number_of_samples)
@@ -0,0 +1,35 @@
+import numpy as np
+import statsmodels.stats.api as sms
+from django.test import SimpleTestCase
+from scipy.stats import shapiro, spearmanr
+from statsmodels.stats.diagnostic import linear_harvey_collier
+from statistical_properties.statistics_utils import compute_statistical_properties_batch, \
+    compute_linear_regression, mad_based_outliers
+
+
+class StatisticalPropertiesBatchTestCase(SimpleTestCase):
+    def test_batch_is_equal_to_one_by_one(self):
+        """Tests that the vectorized statistical properties are the same as the computed one by one"""
+        rng = np.random.default_rng(0)
+        gene_data = rng.normal(size=(8, 40))
+        gem_data = 0.5 * gene_data + rng.normal(size=gene_data.shape) * (1 + 0.3 * np.abs(gene_data))
+        gem_data[0, 10] = 8.0  # Outlier
+        stats = compute_statistical_properties_batch(gene_data, gem_data)
+
+        for i, (gene, gem) in enumerate(zip(gene_data, gem_data)):
+            fitted_model, residuals = compute_linear_regression(gene, gem)
+            expected = {
+                'gene_standard_deviation': gene.std(ddof=1),
+                'gem_normality_statistic': shapiro(gem)[0],
+                'linearity_statistic': linear_harvey_collier(fitted_model)[0],
+                'monotonicity_p_value': spearmanr(gene, gem)[1]
+            }
+            (expected['breusch_pagan_lagrange_multiplier'], _, _,
+             expected['breusch_pagan_f_p_value']) = sms.het_breuschpagan(residuals, fitted_model.model.exog)
+            (expected['goldfeld_quandt_statistic'],
+             expected['goldfeld_quandt_p_value']) = sms.het_goldfeldquandt(residuals, fitted_model.model.exog)[:-1]
+
+            for key, value in expected.items():
+                self.assertAlmostEqual(stats[key][i], value, places=8, msg=key)
+            np.testing.assert_array_equal(stats['gem_outliers'][i], mad_based_outliers(gem))
+        self.assertTrue(stats['gem_outliers'][0, 10])
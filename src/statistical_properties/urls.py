@@ -32,6 +32,11 @@ urlpatterns = [
         views.StatisticalValidationHeatMap.as_view(),
         name='statistical_validation_heatmap'
     ),
+    path(
+        'statistical-validation-heatmap-compact',
+        views.StatisticalValidationCompactHeatMap.as_view(),
+        name='statistical_validation_heatmap_compact'
+    ),
     path(
         'statistical-validation-kaplan-meier-clustering',
         views.StatisticalValidationKaplanMeierClustering.as_view(),
@@ -26,31 +26,27 @@ from api_service.utils import get_experiment_source
 from biomarkers.models import Biomarker, BiomarkerState, TrainedModelState
 from common.datasets_utils import clinical_df_to_struct_array, clean_dataset
 from common.enums import ResponseCode
-from common.exceptions import NoSamplesInCommon
 from common.pagination import StandardResultsSetPagination
 from common.response import ResponseStatus
 from common.utils import get_source_pk, get_subset_of_features
 from datasets_synchronization.models import SurvivalColumnsTupleCGDSDataset, SurvivalColumnsTupleUserFile
 from feature_selection.models import TrainedModel, FitnessFunction, ClusteringParameters, SVMParameters, RFParameters, \
-    ClusterLabelsSet, PredictionRangeLabelsSet
+    ClusterLabelsSet, PredictionRangeLabelsSet, SearchStrategy
 from feature_selection.serializers import ClusterLabelsSetSerializer, PredictionRangeLabelsSetSerializer
 from statistical_properties.models import StatisticalValidation, StatisticalValidationSourceResult, SampleAndCluster
 from statistical_properties.serializers import SourceDataStatisticalPropertiesSerializer, \
     StatisticalValidationSimpleSerializer, StatisticalValidationSerializer, MoleculeWithCoefficientSerializer, \
     SampleAndClusterSerializer, TrainedModelForTableSerializer
 from common.functions import get_integer_enum_from_value
-from statistical_properties.statistics_utils import COMMON_DECIMAL_PLACES, compute_source_statistical_properties
+from statistical_properties.statistics_utils import COMMON_DECIMAL_PLACES, NUMBER_OF_NEEDED_SAMPLES, \
+    compute_source_statistical_properties
 from statistical_properties.survival_functions import generate_survival_groups_by_clustering, LabelOrKaplanMeierResult, \
     get_group_survival_function, compute_c_index_and_log_likelihood, struct_array_to_kaplan_meier_samples
 from user_files.models_choices import FileType
+from .heatmap_service import get_heatmap_matrix, get_compact_heatmap
 from .stats_service import get_all_expressions, get_molecules_and_clinical_df
 from .tasks import eval_statistical_validation, eval_trained_model
-
-# Possible suffix in a DataFrame to distinguish different kinds of molecules in a Biomarker
-TYPE_SUFFIX = f'_({FileType.MRNA.value}|{FileType.MIRNA.value}|{FileType.CNA.value}|{FileType.METHYLATION.value})$'
-
-# Most of the statistics need at least 3 samples
-NUMBER_OF_NEEDED_SAMPLES: int = 3
+from scheduling.fair_share_service import schedule_task, cancel_scheduled_task
 
 
 def get_cluster_labels_set_instances(trained_model_id: Optional[int],
@@ -98,6 +94,11 @@ class CombinationSourceDataStatisticalPropertiesDetails(APIView):
         # Gets the specific GenexGEM combination
         combination_class = get_combination_class(combination_type)
         queryset = combination_class.objects.all()
+
+        # Filtering by experiment only the partition of the experiment is scanned
+        experiment_id = request.GET.get('experiment_id', None)
+        if experiment_id is not None:
+            queryset = queryset.filter(experiment_id=experiment_id)
         gene_gem_combination: GeneGEMCombination = get_object_or_404(queryset, pk=pk)
         source_stats_props = gene_gem_combination.source_statistical_data
 
@@ -128,7 +129,10 @@ class CombinationSourceDataStatisticalPropertiesDetails(APIView):
                         gem_samples
                     )
                     gene_gem_combination.source_statistical_data = source_stats_props
-                    gene_gem_combination.save()
+                    combination_class.objects.filter(
+                        pk=gene_gem_combination.pk,
+                        experiment_id=gene_gem_combination.experiment_id
+                    ).update(source_statistical_data=source_stats_props)
 
             # Rounds to improve network usage and performance in frontend charts
             gene_data = np.round(gene_data, COMMON_DECIMAL_PLACES)
@@ -200,27 +204,53 @@ class StatisticalValidationHeatMap(APIView):
     """Gets the expressions of all the molecules of a Biomarker for all the samples."""
 
     @staticmethod
-    def __remove_suffix(df: pd.DataFrame) -> pd.DataFrame:
-        """Removes the molecule type suffix from the index of a DataFrame."""
-        df.index = df.index.str.replace(TYPE_SUFFIX, '', regex=True)
-        return df
-
-    def get(self, request: Request):
+    def get(request: Request):
         stat_validation = get_stat_validation_instance(request)
 
-        try:
-            molecules_df = get_all_expressions(stat_validation)
-            molecules_df = clean_dataset(molecules_df, axis='index')
-            molecules_df = self.__remove_suffix(molecules_df)
-
-            return Response({
-                'data': molecules_df.to_dict('index'),
-                'min': molecules_df.min().min(),
-                'max': molecules_df.max().max()
-            })
-        except NoSamplesInCommon:
+        molecules_df = get_heatmap_matrix(stat_validation)
+        if molecules_df.empty:
             return Response({'data': [], 'min': 0.0, 'max': 0.0})
 
+        return Response({
+            'data': molecules_df.to_dict('index'),
+            'min': molecules_df.min().min(),
+            'max': molecules_df.max().max()
+        })
+
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class StatisticalValidationCompactHeatMap(APIView):
+    """
+    Gets the expressions of all the molecules of a Biomarker for all the samples in a compact columnar format (rows
+    names, columns names and a flat array of values). Supports ordering by hierarchical clustering, samples
+    downsampling and values quantization.
+    Examples:
+    http://localhost:8000/statistical-properties/statistical-validation-heatmap-compact?statistical_validation_pk=1
+    The same URL with the optional params: &cluster_rows=true&cluster_columns=true&max_columns=500&quantize=true
+    """
+
+    @staticmethod
+    def get(request: Request):
+        stat_validation = get_stat_validation_instance(request)
+
+        max_columns = request.GET.get('max_columns', '').strip()
+        if max_columns:
+            if not max_columns.isnumeric() or int(max_columns) < 1:
+                return Response(status=400, data={"error": "Param 'max_columns' must be a positive integer"})
+            max_columns = int(max_columns)
+        else:
+            max_columns = None
+
+        payload = get_compact_heatmap(
+            stat_validation,
+            cluster_rows=request.GET.get('cluster_rows') == 'true',
+            cluster_columns=request.GET.get('cluster_columns') == 'true',
+            max_columns=max_columns,
+            quantize=request.GET.get('quantize') == 'true'
+        )
+        return Response(payload)
+
     permission_classes = [permissions.IsAuthenticated]
 
 
@@ -543,12 +573,10 @@ class BiomarkerNewStatisticalValidations(APIView):
                 methylation_source_result=stat_methylation_source,
             )
 
-        # Adds the experiment to the TaskQueue and gets Task id
-        async_res: AbortableAsyncResult = eval_statistical_validation.apply_async((stat_validation.pk,),
-                                                                                  queue='stats')
-
-        stat_validation.task_id = async_res.task_id
-        stat_validation.save(update_fields=['task_id'])
+        # Adds the experiment to the fair-share dispatcher of the queue
+        estimated_cost = biomarker.number_of_molecules * clinical_source.number_of_samples
+        schedule_task(eval_statistical_validation, (stat_validation.pk,), 'stats', stat_validation, request.user,
+                      estimated_cost)
 
         return Response({'ok': True})
 
@@ -577,7 +605,8 @@ class StopStatisticalValidation(APIView):
 
                 logging.warning(f'Aborting StatisticalValidation {stat_validation_id}')
 
-                # Sends the signal to abort it
+                # Sends the signal to abort it (or removes it from the dispatcher if it's still waiting)
+                cancel_scheduled_task(stat_validation)
                 if stat_validation.task_id:
                     abortable_async_result = AbortableAsyncResult(stat_validation.task_id)
                     abortable_async_result.abort()
@@ -662,6 +691,11 @@ class BiomarkerNewTrainedModel(APIView):
             # Cast to int
             cross_validation_folds = int(cross_validation_folds)
 
+            # Hyperparameters search strategy
+            search_strategy = int(request.POST.get('searchStrategy', SearchStrategy.GRID_SEARCH))
+            if search_strategy not in SearchStrategy.values:
+                raise ValidationError(f'Invalid search strategy: {search_strategy}')
+
             # Clinical source
             clinical_source_type = get_source_pk(request.POST, 'clinicalType')
             clinical_source, clinical_aux = get_experiment_source(clinical_source_type, request, FileType.CLINICAL,
@@ -729,16 +763,13 @@ class BiomarkerNewTrainedModel(APIView):
                 cna_source=cna_source,
                 methylation_source=methylation_source,
                 cross_validation_folds=cross_validation_folds,
+                search_strategy=search_strategy
             )
 
-        # Adds the experiment to the TaskQueue and gets Task id
-        async_res: AbortableAsyncResult = eval_trained_model.apply_async(
-            (trained_model.pk, model_parameters),
-            queue='stats'
-        )
-
-        trained_model.task_id = async_res.task_id
-        trained_model.save(update_fields=['task_id'])
+        # Adds the experiment to the fair-share dispatcher of the queue
+        estimated_cost = biomarker.number_of_molecules * clinical_source.number_of_samples
+        schedule_task(eval_trained_model, (trained_model.pk, model_parameters), 'stats', trained_model, request.user,
+                      estimated_cost)
 
         return Response({'ok': True})
 
@@ -780,7 +811,8 @@ class StopTrainedModel(APIView):
 
                 logging.warning(f'Aborting TrainedModel {trained_model_id}')
 
-                # Sends the signal to abort it
+                # Sends the signal to abort it (or removes it from the dispatcher if it's still waiting)
+                cancel_scheduled_task(trained_model)
                 if trained_model.task_id:
                     abortable_async_result = AbortableAsyncResult(trained_model.task_id)
                     abortable_async_result.abort()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from api_service.mongo_service import global_mongo_service
+from datasets_synchronization.models import CGDSDataset, CGDSDatasetSynchronizationState
+from user_files.models import UserFile, save_row_statistics
+from user_files.models_choices import FileType
+
+
+class Command(BaseCommand):
+    help = ('Computes the rows statistics (used to filter rows in correlation analyses) of the numerical UserFiles and '
+            'synchronized CGDSDatasets that do not have them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recomputes the statistics of all the datasets')
+
+    def handle(self, *args, **options):
+        user_files = UserFile.objects.exclude(file_type=FileType.CLINICAL)
+        cgds_datasets = CGDSDataset.objects.filter(state=CGDSDatasetSynchronizationState.SUCCESS)
+        if not options['all']:
+            user_files = user_files.filter(row_statistics__isnull=True)
+            cgds_datasets = cgds_datasets.filter(row_statistics__isnull=True)
+
+        n_computed = 0
+        for user_file in user_files.distinct():
+            save_row_statistics(user_file)
+            n_computed += 1
+
+        for dataset in cgds_datasets.distinct():
+            if dataset.file_type == FileType.CLINICAL:
+                continue
+
+            # Collections synchronized before the STANDARD_SYMBOL index was added
+            global_mongo_service.create_standard_symbol_index(dataset.mongo_collection_name)
+            save_row_statistics(dataset)
+            n_computed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rows statistics computed for {n_computed} datasets'))
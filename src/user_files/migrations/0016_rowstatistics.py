@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-19 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets_synchronization', '0035_auto_20230922_2356'),
+        ('user_files', '0015_alter_userfile_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.TextField()),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('std', models.FloatField(blank=True, null=True)),
+                ('nan_count', models.PositiveIntegerField()),
+                ('cgds_dataset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='row_statistics', to='datasets_synchronization.cgdsdataset')),
+                ('user_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='row_statistics', to='user_files.userfile')),
+            ],
+        ),
+    ]
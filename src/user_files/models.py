@@ -1,12 +1,13 @@
 import csv
+import logging
 import os
-from typing import List, TextIO, Optional, Iterable, Union, cast
+from typing import List, TextIO, Optional, Iterable, Union, cast, TYPE_CHECKING
 
 import numpy as np
 import pandas as pd
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.db.models import QuerySet
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
@@ -15,7 +16,12 @@ from common.methylation import MethylationPlatform
 from institutions.models import Institution
 from tags.models import Tag
 from user_files.models_choices import FileType, FileDecimalSeparator
-from user_files.utils import get_decimal_separator_and_numerical_data, read_excel_in_chunks
+from user_files.utils import get_decimal_separator_and_numerical_data, read_excel_in_chunks, \
+    compute_row_statistics
+
+if TYPE_CHECKING:
+    # Imported only for type hints, as datasets_synchronization.models imports this module
+    from datasets_synchronization.models import CGDSDataset
 
 
 def user_directory_path(instance, filename: str):
@@ -27,6 +33,7 @@ class UserFile(models.Model):
     """User Files to submit experiments: mRNA and Gene Expression Modulators (GEM) file (miRNA, CNA or Methylation)"""
     survival_columns: QuerySet['SurvivalColumnsTupleUserFile']
     user_file: QuerySet['ExperimentSource']
+    row_statistics: QuerySet['RowStatistics']
     name = models.CharField(max_length=200)
     description = models.CharField(max_length=300, blank=True, null=True)
     file_obj = models.FileField(upload_to=user_directory_path)
@@ -104,6 +111,10 @@ class UserFile(models.Model):
         super().save(update_fields=['number_of_rows', 'number_of_samples', 'contains_nan_values',
                                     'column_used_as_index', 'decimal_separator'])
 
+        # Computes the rows' statistics used to filter them in correlation analyses
+        if self.file_type != FileType.CLINICAL:
+            save_row_statistics(self)
+
     def get_row_indexes(self) -> List[str]:
         """
         Get all the rows indexes (useful, for example, when you need the samples in a clinical dataset)
@@ -180,14 +191,21 @@ class UserFile(models.Model):
         """
         return self.__get_dataframe()
 
-    def get_df_in_chunks(self, _only_matching: bool = False) -> Iterable[pd.DataFrame]:
+    def get_df_in_chunks(self, _only_matching: bool = False,
+                         rows: Optional[List[str]] = None) -> Iterable[pd.DataFrame]:
         """
         Returns an Iterator of a DataFrame in divided in chunks from an UserFile.
         @param _only_matching: If True, returns only the matching samples. Not used for UserFiles sources (only
         for CGDSDatasets).
+        @param rows: If specified, only these rows are kept (the file is read entirely anyway).
         @return: A DataFrame Iterator with the data to work.
         """
-        return self.__get_dataframe(chunk_size=settings.EXPERIMENT_CHUNK_SIZE)
+        chunks = self.__get_dataframe(chunk_size=settings.EXPERIMENT_CHUNK_SIZE)
+        if rows is None:
+            return chunks
+
+        rows_set = set(rows)
+        return (chunk[chunk.index.isin(rows_set)] for chunk in chunks)
 
     def get_column_names(self, include_first_column: Optional[bool] = False) -> List[str]:
         """
@@ -279,6 +297,52 @@ class UserFile(models.Model):
         ordering = ['-id']
 
 
+class RowStatistics(models.Model):
+    """
+    Statistics of a row (molecule) of a numerical UserFile or CGDSDataset computed at upload/synchronization time. They
+    are used to discard the rows that can not pass the filters of a correlation analysis before reading the dataset.
+    """
+    row = models.TextField()
+    mean = models.FloatField(blank=True, null=True)
+    std = models.FloatField(blank=True, null=True)  # Sample standard deviation (ddof=1) of the non-NaN values
+    nan_count = models.PositiveIntegerField()
+    user_file = models.ForeignKey(UserFile, on_delete=models.CASCADE, related_name='row_statistics', blank=True,
+                                  null=True)
+    cgds_dataset = models.ForeignKey('datasets_synchronization.CGDSDataset', on_delete=models.CASCADE,
+                                     related_name='row_statistics', blank=True, null=True)
+
+
+def save_row_statistics(dataset: Union[UserFile, 'CGDSDataset']):
+    """
+    Computes and saves (replacing the previous ones) the statistics of all the rows of a numerical dataset. If
+    something goes wrong no statistics are kept, so correlation analyses read all the rows of the dataset.
+    @param dataset: UserFile or CGDSDataset instance.
+    """
+    dataset_field = 'user_file' if isinstance(dataset, UserFile) else 'cgds_dataset'
+
+    # The old statistics are removed outside the atomic block as a rollback must not restore them: they could prune
+    # rows that were added to the dataset
+    dataset.row_statistics.all().delete()
+    try:
+        with transaction.atomic():
+            # Only the samples are considered (CGDSDatasets chunks contain the molecule symbol column)
+            samples = dataset.get_column_names()
+            for chunk in dataset.get_df_in_chunks():
+                statistics = compute_row_statistics(chunk.reindex(columns=samples))
+                RowStatistics.objects.bulk_create([
+                    RowStatistics(
+                        row=row,
+                        mean=None if np.isnan(mean) else mean,
+                        std=None if np.isnan(std) else std,
+                        nan_count=nan_count,
+                        **{dataset_field: dataset}
+                    )
+                    for row, mean, std, nan_count in statistics.itertuples()
+                ], batch_size=settings.INSERT_CHUNK_SIZE)
+    except Exception as e:
+        logging.warning(f'Could not compute the rows statistics of dataset "{dataset}": {e}')
+
+
 @receiver(post_delete, sender=UserFile)
 def user_file_post_delete(sender, instance, **kwargs):
     """
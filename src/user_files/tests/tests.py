@@ -1,6 +1,7 @@
+from unittest import mock
 from django.test import TestCase
 from common.tests_utils import create_user_file
-from user_files.models import UserFile
+from user_files.models import UserFile, save_row_statistics
 from user_files.models_choices import FileType, FileDecimalSeparator
 import os
 from django.contrib.auth.models import User
@@ -58,3 +59,22 @@ class ExperimentCommonsTestCase(TestCase):
         """Test correct decimal separator inference"""
         self.assertEqual(self.with_dots.decimal_separator, FileDecimalSeparator.DOT)
         self.assertEqual(self.with_commas.decimal_separator, FileDecimalSeparator.COMMA)
+
+    def test_row_statistics(self):
+        """Tests that the rows statistics are computed on upload"""
+        df = self.with_dots.get_df()
+        statistics = {stat.row: stat for stat in self.with_dots.row_statistics.all()}
+        self.assertEqual(len(statistics), df.shape[0])
+
+        for row, values in df.iterrows():
+            self.assertEqual(statistics[row].nan_count, values.isnull().sum())
+            self.assertAlmostEqual(statistics[row].std, values.std(ddof=1))
+
+    def test_row_statistics_failure(self):
+        """Tests that no statistics are kept (instead of the old ones) if they can not be computed again"""
+        self.assertTrue(self.with_dots.row_statistics.exists())
+
+        with mock.patch.object(UserFile, 'get_df_in_chunks', side_effect=ValueError('Invalid file')):
+            save_row_statistics(self.with_dots)
+
+        self.assertFalse(self.with_dots.row_statistics.exists())
@@ -111,3 +111,18 @@ def get_invalid_format_response() -> Dict:
             internal_code=UserFileUploadErrorCode.INVALID_FORMAT_NON_NUMERIC
         ).to_json(),
     }
+
+
+def compute_row_statistics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the mean, standard deviation and number of NaNs of every row of a dataset. NaNs are skipped and the
+    standard deviation is the sample one (ddof=1), the same used to filter rows in correlation analyses.
+    @param df: DataFrame (or chunk) with molecules as rows and samples as columns.
+    @return: DataFrame indexed by the rows of df with the 'mean', 'std' and 'nan_count' columns.
+    """
+    values = df.astype(float)
+    return pd.DataFrame({
+        'mean': values.mean(axis=1),
+        'std': values.std(axis=1, ddof=1),
+        'nan_count': values.isnull().sum(axis=1)
+    })